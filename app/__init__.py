@@ -4,12 +4,28 @@ from flask import Flask, render_template, send_from_directory, jsonify, request,
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_socketio import SocketIO
+from werkzeug.exceptions import NotFound
+from app.utils.db_routing import RoutingSession, replica_binds, replica_router
 import os
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 socketio = SocketIO()
 
+def start_background_workers(app):
+    """Start the webhook worker and billing scheduler threads, if enabled
+
+    Only the serving process calls this (run.py, or a gunicorn post_fork
+    hook); create_app never does, so CLI commands, migrations and scripts
+    stay free of threads polling the database.
+    """
+    from app.services.webhook_queue import webhook_queue
+    from app.services.billing_rollover import billing_rollover
+    if app.config.get('WEBHOOK_WORKER_ENABLED'):
+        webhook_queue.start(app)
+    if app.config.get('BILLING_ROLLOVER_SCHEDULER'):
+        billing_rollover.start(app)
+
 def create_app(config_name='development'):
     """Application factory pattern"""
     
@@ -20,18 +36,14 @@ def create_app(config_name='development'):
     # Set static folder path
     static_folder = os.path.join(project_root, 'static')
     
-    app = Flask(__name__, 
-                static_folder=static_folder,
-                static_url_path='/static')
-    
-    print(f"📁 App directory: {app_dir}")
-    print(f"📁 Project root: {project_root}")
-    print(f"📁 Static folder: {static_folder}")
-    print(f"📁 Static folder exists: {os.path.exists(static_folder)}")
+    # Static files are served by static_files below (fingerprinted build output)
+    app = Flask(__name__, static_folder=None)
     
     # Load configuration
     from config import config
     app.config.from_object(config[config_name])
+    
+    app.logger.debug(f"📁 Static folder: {static_folder}")
 
     # Add these session configurations
     app.config.update(
@@ -41,8 +53,58 @@ def create_app(config_name='development'):
         SESSION_COOKIE_DOMAIN=None,  # Allow localhost
         PERMANENT_SESSION_LIFETIME=timedelta(hours=24)
     )
+    # Read replicas become extra binds; @read_only routes send SELECTs there
+    replica_urls = app.config.get('DATABASE_REPLICA_URLS') or []
+    if replica_urls:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **replica_binds(replica_urls))
+    
+    # Timed QueuePool with per-environment sizing (config.py)
+    from app.utils.pool_metrics import engine_options, pool_metrics
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config.get('SQLALCHEMY_ENGINE_OPTIONS')
+    )
+    
     # Initialize extensions
     db.init_app(app)
+    replica_router.init_app(app)
+    
+    # Per-request route/DB/AI timings (Server-Timing header, /internal/metrics)
+    from app.utils.request_metrics import request_metrics
+    request_metrics.init_app(app)
+    
+    # Development/staging: slow-query log with EXPLAIN plans and N+1 detection
+    from app.utils.query_diagnostics import query_diagnostics
+    query_diagnostics.init_app(app)
+    
+    # Search/mention indexes and revision history, maintained on flush by mapper events
+    from app.services.search_index import search_index
+    search_index.init_app(app)
+    from app.services.mention_index import mention_index
+    mention_index.init_app(app)
+    from app.services.revision_history import revision_history
+    revision_history.init_app(app)
+    
+    # Payment webhooks are applied by a background worker and billing periods roll
+    # over on a schedule; both only run once start_background_workers is called
+    from app.services.webhook_queue import webhook_queue
+    webhook_queue.init_app(app)
+    from app.services.billing_rollover import billing_rollover
+    billing_rollover.init_app(app)
+    
+    # Per engine: pool and SQL timing, and for SQLite WAL/busy timeout/cache pragmas
+    from app.utils.sqlite_tuning import apply_sqlite_profile, sqlite_profile_from_config
+    sqlite_profile = sqlite_profile_from_config(app.config)
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            pool_metrics.register(bind_key or 'default', engine)
+            if app.config.get('REQUEST_METRICS_ENABLED', True):
+                request_metrics.instrument_engine(engine)
+            query_diagnostics.instrument_engine(engine)
+            if sqlite_profile:
+                apply_sqlite_profile(engine, sqlite_profile)
+    
+    from app.services.static_assets import static_assets
+    static_assets.init_app(app, static_folder)
 
     # Replace your current CORS configuration
     CORS(app, supports_credentials=True, 
@@ -56,26 +118,27 @@ def create_app(config_name='development'):
     from app.scenes import scenes_bp
     from app.ai import ai_bp
     from app.collaboration import collaboration_bp
+    from app.story.routes import story_bp
     from app.routes.debug import debug_bp
+    from app.routes.internal import internal_bp
     
     app.register_blueprint(debug_bp)
+    app.register_blueprint(internal_bp)
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(projects_bp, url_prefix='/api/projects')
     app.register_blueprint(scenes_bp, url_prefix='/api/scenes')
     app.register_blueprint(ai_bp, url_prefix='/api/ai')
     app.register_blueprint(collaboration_bp, url_prefix='/api/collaboration')
+    app.register_blueprint(story_bp, url_prefix='/api')
     
     # Main/Frontend routes (přímo v app)
     @app.route('/')
     def index():
         """Serve the main frontend application"""
-        try:
-            # Try to serve the HTML file directly from frontend folder
-            frontend_path = os.path.join(project_root, 'frontend')
-            if os.path.exists(os.path.join(frontend_path, 'index.html')):
-                return send_from_directory(frontend_path, 'index.html')
-        except Exception as e:
-            print(f"Error serving frontend: {e}")
+        frontend_path = os.path.join(project_root, 'frontend')
+        page = static_assets.page(frontend_path, 'index.html')
+        if page is not None:
+            return page
         
         # If file doesn't exist, show a simple API info page
         return '''
@@ -145,31 +208,27 @@ def create_app(config_name='development'):
         except:
             return '', 204
 
-    # Alternative static file route (backup)
-    @app.route('/static/<path:filename>')
-    def static_files_backup(filename):
-        """Backup static file route"""
+    @app.route('/static/<path:filename>', endpoint='static')
+    def static_files(filename):
+        """Static files; fingerprinted dist/ assets are precompressed and immutable"""
         try:
-            print(f"🔍 Requesting static file: {filename}")
-            print(f"🔍 Looking in: {static_folder}")
-            print(f"🔍 Full path: {os.path.join(static_folder, filename)}")
-            print(f"🔍 File exists: {os.path.exists(os.path.join(static_folder, filename))}")
-            
-            return send_from_directory(static_folder, filename)
-        except Exception as e:
-            print(f"❌ Static file error: {e}")
+            return static_assets.send(filename)
+        except NotFound:
             return f"Static file not found: {filename}", 404
 
     @app.route('/health')
     def health_check():
         """Health check endpoint"""
+        from app.services.password_hasher import password_hasher
         return jsonify({
             'status': 'healthy',
             'service': 'StoryForge AI API',
             'version': '1.0.0',
             'database': 'connected',
             'static_folder': static_folder,
-            'static_folder_exists': os.path.exists(static_folder)
+            'static_folder_exists': os.path.exists(static_folder),
+            'password_hashing': password_hasher.stats(),
+            'database_routing': replica_router.stats()
         })
 
     @app.route('/api')
@@ -217,14 +276,14 @@ def create_app(config_name='development'):
     def frontend_explicit():
         """Serve frontend explicitly"""
         frontend_path = os.path.join(project_root, 'frontend')
-        try:
-            return send_from_directory(frontend_path, 'index.html')
-        except:
+        page = static_assets.page(frontend_path, 'index.html')
+        if page is None:
             return '''
             <h1>Frontend not found</h1>
             <p>Create frontend/index.html to display your frontend application.</p>
             <a href="/">Back to API info</a>
             '''
+        return page
    
     # Debug route to check static files
     @app.route('/debug/static')
@@ -281,13 +340,19 @@ def create_app(config_name='development'):
     from app.cli import register_commands
     register_commands(app)
     
-    # Add this before the "return app" line
-    @app.after_request
-    def after_request_func(response):
-        print(f"🔍 Request: {request.method} {request.path}")
-        print(f"🍪 Session: {dict(session)}")
-        print(f"🔄 Response status: {response.status_code}")
-        print(f"📝 Response headers: {dict(response.headers)}")
-        return response
+    # Verbose per-request diagnostics (off by default)
+    if app.config.get('LOG_REQUEST_DETAILS'):
+        @app.after_request
+        def after_request_func(response):
+            app.logger.debug(f"🔍 Request: {request.method} {request.path}")
+            app.logger.debug(f"🍪 Session: {dict(session)}")
+            app.logger.debug(f"🔄 Response status: {response.status_code}")
+            app.logger.debug(f"📝 Response headers: {dict(response.headers)}")
+            return response
+    
+    # Import export/NLP/AI backends in the background instead of on first request
+    if app.config.get('LAZY_IMPORT_PREWARM'):
+        from app.utils.lazy_imports import prewarm
+        prewarm(app.config.get('LAZY_IMPORT_PREWARM_MODULES'))
     
     return app
\ No newline at end of file
@@ -3,9 +3,11 @@ from flask import request, jsonify, session
 from app.ai import ai_bp
 from app.models import Project, Scene, StoryObject
 from app.utils.auth import login_required, track_ai_operation, enhanced_token_check
+from app.utils.jwt_auth import token_required
 from app.services.ai_analyzer import AIAnalyzer
 from app.services.ai_critics import EnhancedAICritics
 from app.services.token_manager import token_manager
+from app.utils.db_session import external_calls
 from app import db
 import time
 
@@ -30,7 +32,8 @@ def analyze_idea():
     try:
         start_time = time.time()
         analyzer = AIAnalyzer()
-        analysis = analyzer.analyze_idea(idea_text, story_intent)
+        with external_calls():
+            analysis = analyzer.analyze_idea(idea_text, story_intent)
         processing_time = int((time.time() - start_time) * 1000)
         
         return jsonify({
@@ -182,9 +185,10 @@ def analyze_structure(project_id):
         data = request.get_json() or {}
         focus_areas = data.get('focus_areas', ['structure', 'character', 'pacing'])
         
-        comprehensive_analysis = critics.get_all_critiques(
-            project, scenes, objects, focus_areas
-        )
+        with external_calls():
+            comprehensive_analysis = critics.get_all_critiques(
+                project, scenes, objects, focus_areas
+            )
         
         processing_time = int((time.time() - start_time) * 1000)
         
@@ -224,9 +228,10 @@ def get_enhanced_critics(project_id):
         start_time = time.time()
         critics = EnhancedAICritics()
         
-        comprehensive_critiques = critics.get_all_critiques(
-            project, scenes, objects, requested_critics
-        )
+        with external_calls():
+            comprehensive_critiques = critics.get_all_critiques(
+                project, scenes, objects, requested_critics
+            )
         
         processing_time = int((time.time() - start_time) * 1000)
         
@@ -284,17 +289,21 @@ def get_specific_critic(project_id, critic_type):
         critics = EnhancedAICritics()
         
         # Route to specific critic
-        if critic_type == 'dialog':
-            characters = [obj for obj in objects if obj.object_type == 'character']
-            critique = critics.dialog_critique(project, scenes, characters)
-        elif critic_type == 'pacing':
-            critique = critics.pacing_critique(project, scenes)
-        elif critic_type == 'genre':
-            critique = critics.genre_expert_critique(project, scenes)
-        elif critic_type == 'plot_holes':
-            critique = critics.plot_hole_detection(project, scenes, objects)
-        else:
-            return jsonify({'error': f'Unknown critic type: {critic_type}'}), 400
+        with external_calls():
+            if critic_type == 'dialog':
+                characters = [obj for obj in objects if obj.object_type == 'character']
+                critique = critics.dialog_critique(project, scenes, characters)
+            elif critic_type == 'pacing':
+                critique = critics.pacing_critique(project, scenes)
+            elif critic_type == 'genre':
+                critique = critics.genre_expert_critique(project, scenes)
+            elif critic_type == 'plot_holes':
+                critique = critics.plot_hole_detection(project, scenes, objects)
+            elif critic_type == 'character_arc':
+                characters = [obj for obj in objects if obj.object_type == 'character']
+                critique = critics.character_arc_analysis(project, scenes, characters)
+            else:
+                return jsonify({'error': f'Unknown critic type: {critic_type}'}), 400
         
         processing_time = int((time.time() - start_time) * 1000)
         
@@ -348,7 +357,8 @@ def suggest_scenes(project_id):
     try:
         start_time = time.time()
         analyzer = AIAnalyzer()
-        suggestions = analyzer.suggest_next_scenes(project_id, scenes, objects)
+        with external_calls():
+            suggestions = analyzer.suggest_next_scenes(project_id, scenes, objects)
         
         # Filter suggestions based on focus_type if specified
         if focus_type != 'any':
@@ -393,7 +403,8 @@ def generate_story(project_id):
     try:
         start_time = time.time()
         analyzer = AIAnalyzer()
-        story = analyzer.generate_story_from_scenes(project, scenes, objects)
+        with external_calls():
+            story = analyzer.generate_story_from_scenes(project, scenes, objects)
         
         # Update project phase and metadata
         project.current_phase = 'story'
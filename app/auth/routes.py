@@ -3,12 +3,12 @@ from flask import request, jsonify, session
 from app.auth import auth_bp
 from app.models import User
 from app import db
+from app.services.password_hasher import PasswordHasherBusy
 
 # JWT imports with fallback
 try:
-    from app.utils.jwt_auth import generate_token, verify_token, token_required
+    from app.utils.jwt_auth import generate_user_token, decode_token, verify_token, token_required
     JWT_AVAILABLE = True
-    print("✅ JWT authentication available")
 except ImportError:
     JWT_AVAILABLE = False
     print("⚠️ JWT not available, using session authentication only")
@@ -40,9 +40,12 @@ def login():
         print(f"❌ User not found with email: {email}")
         return jsonify({'error': 'Invalid credentials'}), 401
     
-    if not user.check_password(password):
-        print(f"❌ Invalid password for user: {email}")
-        return jsonify({'error': 'Invalid credentials'}), 401
+    try:
+        if not user.check_password(password):
+            print(f"❌ Invalid password for user: {email}")
+            return jsonify({'error': 'Invalid credentials'}), 401
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     
     if not user.is_active:
         print(f"❌ User account inactive: {email}")
@@ -50,8 +53,10 @@ def login():
     
     print(f"✅ Login successful for user ID: {user.id}")
     
-    # Update last login
+    # Update last login (and upgrade the hash if cost parameters changed)
     try:
+        if user.rehash_password_if_needed(password):
+            print("🔐 Password re-hashed with current parameters")
         user.last_login = db.func.now()
         db.session.commit()
         print("📅 Updated last login timestamp")
@@ -84,7 +89,7 @@ def login():
     if JWT_AVAILABLE:
         print("🔑 Generating JWT token")
         try:
-            token = generate_token(user.id)
+            token = generate_user_token(user)
             response_data['token'] = token
             response_data['authMethod'] = 'jwt'
             print(f"✅ JWT token generated: {token[:20]}...")
@@ -118,12 +123,13 @@ def get_current_user():
                 token = auth_header.split(' ')[1]
                 print(f"🎫 Extracted token: {token[:20]}...")
                 
-                user_id = verify_token(token)
+                payload = decode_token(token)
+                user_id = payload['user_id'] if payload else None
                 print(f"👤 Verified user_id: {user_id}")
                 
                 if user_id:
                     user = User.query.get(user_id)
-                    if user and user.is_active:
+                    if user and user.is_active and payload.get('epoch', 0) >= (user.token_epoch or 0):
                         tokens_remaining = max(0, user.tokens_limit - user.tokens_used)
                         user_data = {
                             'id': user.id,
@@ -238,6 +244,9 @@ def register():
         
         print(f"✅ User created successfully: {user.id}")
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"❌ User creation failed: {e}")
         db.session.rollback()
@@ -266,7 +275,7 @@ def register():
     if JWT_AVAILABLE:
         print("🔑 Generating JWT token for new user")
         try:
-            token = generate_token(user.id)
+            token = generate_user_token(user)
             response_data['token'] = token
             response_data['authMethod'] = 'jwt'
             print(f"✅ JWT token generated for new user")
@@ -294,8 +303,17 @@ def logout():
         print(f"🍪 Clearing session for user ID: {user_id}")
         session.pop('user_id', None)
     
-    # For JWT, the frontend handles token removal
-    # We could implement a token blacklist here if needed
+    # For JWT, the frontend handles token removal; all_devices revokes
+    # every issued token by bumping the user's token epoch
+    data = request.get_json(silent=True) or {}
+    auth_header = request.headers.get('Authorization')
+    if JWT_AVAILABLE and data.get('all_devices') and auth_header and auth_header.startswith('Bearer '):
+        jwt_user_id = verify_token(auth_header.split(' ')[1])
+        user = User.query.get(jwt_user_id) if jwt_user_id else None
+        if user:
+            user.revoke_tokens()
+            db.session.commit()
+            print(f"🔒 Revoked all tokens for user ID: {user.id}")
     
     print("✅ Logout successful")
     return jsonify({
@@ -317,17 +335,19 @@ def refresh_token():
     
     try:
         token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
+        payload = decode_token(token)
         
-        if not user_id:
+        if not payload:
             return jsonify({'error': 'Invalid token'}), 401
         
-        user = User.query.get(user_id)
+        user = User.query.get(payload['user_id'])
         if not user or not user.is_active:
             return jsonify({'error': 'User not found or inactive'}), 401
+        if payload.get('epoch', 0) < (user.token_epoch or 0):
+            return jsonify({'error': 'Token has been revoked'}), 401
         
-        # Generate new token
-        new_token = generate_token(user.id)
+        # Generate new token (picks up plan changes)
+        new_token = generate_user_token(user)
         
         print(f"✅ Token refreshed for user: {user.email}")
         return jsonify({
@@ -3,8 +3,11 @@ from flask import request, jsonify, session, current_app
 from app.billing import billing_bp
 from app.models import User, BillingPlan, UserSubscription, TokenPurchase, TokenUsageLog
 from app.utils.auth import login_required
+from app.utils.jwt_auth import token_required
+from app.utils.db_routing import read_only
 from app.services.token_manager import token_manager
 from app.services.payment_processor import PaymentProcessor
+from app.services.webhook_queue import webhook_queue
 from app import db
 from datetime import datetime, timedelta
 import json
@@ -281,6 +284,7 @@ def buy_tokens():
 
 @billing_bp.route('/usage-analytics', methods=['GET'])
 @token_required
+@read_only
 def get_usage_analytics():
     """Get detailed usage analytics"""
     user_id = session['user_id']
@@ -336,7 +340,11 @@ def get_invoice(invoice_id):
 
 @billing_bp.route('/webhooks/stripe', methods=['POST'])
 def stripe_webhook():
-    """Handle Stripe webhooks"""
+    """Handle Stripe webhooks: verify, store once and acknowledge
+
+    Events are applied by the webhook queue worker, so Stripe retries of an
+    event already stored are acknowledged without being applied again.
+    """
     payload = request.get_data()
     sig_header = request.headers.get('Stripe-Signature')
     
@@ -344,20 +352,18 @@ def stripe_webhook():
         # Verify webhook signature
         payment_processor = PaymentProcessor('stripe')
         event = payment_processor.verify_webhook(payload, sig_header)
-        
-        # Handle different event types
-        if event['type'] == 'invoice.payment_succeeded':
-            handle_successful_payment(event['data']['object'])
-        elif event['type'] == 'invoice.payment_failed':
-            handle_failed_payment(event['data']['object'])
-        elif event['type'] == 'customer.subscription.deleted':
-            handle_subscription_cancelled(event['data']['object'])
-        
-        return jsonify({'success': True})
-        
     except Exception as e:
-        current_app.logger.error(f"Webhook processing failed: {str(e)}")
-        return jsonify({'error': 'Webhook processing failed'}), 400
+        current_app.logger.error(f"Webhook verification failed: {str(e)}")
+        return jsonify({'error': 'Invalid webhook'}), 400
+    
+    try:
+        _, created = webhook_queue.ingest('stripe', event, payload)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Webhook could not be stored: {str(e)}")
+        return jsonify({'error': 'Webhook processing failed'}), 500  # Stripe will retry
+    
+    return jsonify({'success': True, 'duplicate': not created})
 
 def calculate_proration(current_plan: BillingPlan, new_plan: BillingPlan, days_remaining: int) -> Dict:
     """Calculate prorated charges for plan upgrade"""
@@ -429,60 +435,3 @@ def get_usage_recommendations(analytics: Dict) -> List[str]:
         recommendations.append("Vysoké denní využití. Pro lepší hodnotu zvažte upgrade na vyšší plán.")
     
     return recommendations
-
-def handle_successful_payment(invoice):
-    """Handle successful payment webhook"""
-    customer_id = invoice.get('customer')
-    subscription_id = invoice.get('subscription')
-    
-    if subscription_id:
-        subscription = UserSubscription.query.filter_by(
-            stripe_subscription_id=subscription_id
-        ).first()
-        
-        if subscription:
-            # Reset tokens for new billing period
-            subscription.tokens_used_this_period = 0
-            subscription.current_period_start = datetime.utcnow()
-            subscription.current_period_end = datetime.utcnow() + timedelta(days=30)
-            
-            # Update user token limit
-            user = subscription.user
-            user.tokens_used = 0
-            user.tokens_limit = subscription.plan.monthly_token_limit
-            
-            db.session.commit()
-
-def handle_failed_payment(invoice):
-    """Handle failed payment webhook"""
-    subscription_id = invoice.get('subscription')
-    
-    if subscription_id:
-        subscription = UserSubscription.query.filter_by(
-            stripe_subscription_id=subscription_id
-        ).first()
-        
-        if subscription:
-            # Could implement dunning management here
-            # For now, just log the failure
-            current_app.logger.warning(f"Payment failed for subscription {subscription.id}")
-
-def handle_subscription_cancelled(subscription_obj):
-    """Handle subscription cancellation webhook"""
-    subscription_id = subscription_obj.get('id')
-    
-    subscription = UserSubscription.query.filter_by(
-        stripe_subscription_id=subscription_id
-    ).first()
-    
-    if subscription:
-        subscription.status = 'cancelled'
-        
-        # Downgrade user to free plan
-        user = subscription.user
-        free_plan = BillingPlan.query.filter_by(name='free').first()
-        if free_plan:
-            user.plan = 'free'
-            user.tokens_limit = free_plan.monthly_token_limit
-        
-        db.session.commit()
\ No newline at end of file
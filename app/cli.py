@@ -323,6 +323,283 @@ def reset_demo_command():
     db.session.commit()
     print("✅ Demo user data reset successfully!")
 
+@click.command('rebuild-collaboration-stats')
+@with_appcontext
+def rebuild_collaboration_stats_command():
+    """Recompute denormalized collaboration counters for all projects"""
+    from app.services.collaboration_manager import CollaborationManager
+    
+    collaboration_manager = CollaborationManager()
+    project_ids = [row.id for row in db.session.query(Project.id).all()]
+    for project_id in project_ids:
+        collaboration_manager.rebuild_counters(project_id)
+    
+    db.session.commit()
+    print(f"✅ Rebuilt collaboration stats for {len(project_ids):,} projects")
+
+@click.command('rebuild-search-index')
+@click.option('--project', 'project_id', default=None, help='Only reindex this project')
+@with_appcontext
+def rebuild_search_index_command(project_id):
+    """Reindex scenes, objects, comments and chapters for full-text search"""
+    from app.services.search_index import search_index
+    
+    try:
+        counts = search_index.rebuild(project_id)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    for kind, count in counts.items():
+        print(f"  {kind:<10} {count:>10,}")
+    print(f"✅ Search index rebuilt ({sum(counts.values()):,} documents)")
+
+@click.command('rebuild-mention-index')
+@click.option('--project', 'project_id', default=None, help='Only reindex this project')
+@with_appcontext
+def rebuild_mention_index_command(project_id):
+    """Recompute which scenes mention each story object"""
+    from app.services.mention_index import mention_index
+    
+    counts = mention_index.rebuild(project_id)
+    print(f"✅ Mention index rebuilt: {counts['mentions']:,} mentions in "
+          f"{counts['scenes']:,} scenes of {counts['projects']:,} projects")
+
+@click.command('prune-revisions')
+@with_appcontext
+def prune_revisions_command():
+    """Apply the revision retention policy (REVISION_KEEP_LAST / REVISION_MAX_AGE_DAYS)"""
+    from app.services.revision_history import revision_history
+    
+    removed = revision_history.prune_all()
+    print(f"✅ Pruned {removed:,} revisions")
+
+@click.command('process-webhooks')
+@click.option('--watch', is_flag=True, help='Keep polling instead of exiting once drained')
+@with_appcontext
+def process_webhooks_command(watch):
+    """Apply stored webhook events that are due (for a separate worker or cron)"""
+    import time
+    from app.services.webhook_queue import webhook_queue
+    
+    totals = {}
+    while True:
+        stats = webhook_queue.process_due()
+        for key, count in stats.items():
+            totals[key] = totals.get(key, 0) + count
+        if sum(stats.values()) > stats['skipped']:
+            continue  # Next batch
+        if not watch:
+            break
+        time.sleep(webhook_queue.poll_interval)
+    print(f"✅ Webhooks: {totals['processed']} processed, {totals['ignored']} ignored, "
+          f"{totals['retry']} retrying, {totals['dead']} dead")
+
+@click.command('rollover-billing-periods')
+@click.option('--batch-size', type=int, help='Subscriptions per transaction (default BILLING_ROLLOVER_BATCH_SIZE)')
+@with_appcontext
+def rollover_billing_periods_command(batch_size):
+    """Roll over ended free-plan periods and end cancelled subscriptions (paid periods start on payment)"""
+    from app.services.billing_rollover import billing_rollover
+    
+    if batch_size:
+        billing_rollover.batch_size = batch_size
+    totals = billing_rollover.run()
+    print(f"✅ Rolled over {totals['renewed']:,} subscriptions, cancelled {totals['cancelled']:,} "
+          f"({totals['batches']} batches, {totals['conflicts']} conflicts)")
+
+@click.command('startup-profile')
+@click.option('--config', 'config_name', default='production', help='Config to boot with')
+@click.option('--top', default=15, help='Number of modules to list')
+def startup_profile_command(config_name, top):
+    """Report per-module import cost of create_app in a fresh interpreter"""
+    from app.utils.startup_profile import profile_startup, top_level_costs
+    from app.utils.lazy_imports import lazy_module
+    
+    report = profile_startup(config_name)
+    modules = report['modules']
+    
+    print(f"\n⏱️ Startup Profile ({config_name})")
+    print(f"{'=' * 50}")
+    print(f"Process wall time: {report['wall_seconds'] * 1000:,.0f} ms")
+    print(f"create_app(): {report['create_app_seconds'] * 1000:,.0f} ms")
+    print(f"Total import time: {sum(m['cumulative_ms'] for m in modules if m['depth'] == 0):,.0f} ms")
+    
+    print(f"\n📦 Top packages (cumulative):")
+    for entry in top_level_costs(modules)[:top]:
+        print(f"  {entry['package']:<30} {entry['cumulative_ms']:>8,.1f} ms")
+    
+    print(f"\n🐢 Slowest modules (self):")
+    for entry in sorted(modules, key=lambda m: -m['self_ms'])[:top]:
+        print(f"  {entry['module']:<50} {entry['self_ms']:>8,.1f} ms")
+    
+    if report['heavy_loaded']:
+        print(f"\n⚠️ Heavy modules imported at startup: {', '.join(report['heavy_loaded'])}")
+    else:
+        print(f"\n✅ No heavy optional dependencies imported at startup")
+    
+    print(f"\n💤 Lazy dependencies (loaded on first use):")
+    for name in ('anthropic', 'tiktoken', 'docx', 'app.services.pdf_fragments'):
+        module = lazy_module(name)
+        state = 'available' if module.available else 'missing'
+        print(f"  {name:<30} {state}")
+
+@click.command('build-assets')
+@click.option('--brotli-quality', default=11, help='Brotli level 0-11')
+@click.option('--prune-previous', is_flag=True, help='Also delete files of the previous build')
+@with_appcontext
+def build_assets_command(brotli_quality, prune_previous):
+    """Fingerprint and precompress static files into static/dist"""
+    import os
+    from app.services.static_assets import static_assets, build_assets, ASSET_DIST_DIR
+    
+    static_folder = static_assets.static_folder
+    manifest = build_assets(static_folder, brotli_quality=brotli_quality, keep_previous=not prune_previous)
+    stats = manifest['stats']
+    
+    print(f"\n📦 Static Assets -> {os.path.join(static_folder, ASSET_DIST_DIR)}")
+    print(f"{'=' * 50}")
+    for logical, entry in sorted(manifest['assets'].items()):
+        encodings = ', '.join(entry['encodings']) or 'uncompressed'
+        print(f"  {logical:<30} -> {entry['file']} ({entry['size']:,} B, {encodings})")
+    print(f"\nFiles: {stats['files']:,} ({stats['written']:,} new, {stats['pruned']:,} pruned)")
+    print(f"Bytes: {stats['bytes']:,} raw, {stats['gzip_bytes']:,} gzip, {stats['br_bytes']:,} brotli")
+    if not stats['brotli']:
+        print("⚠️ brotli not installed, only gzip variants were written")
+    print("✅ Manifest written")
+
+@click.command('seed-load-data')
+@click.option('--users', default=50, help='Seeded accounts (loadtest-NNNNN@storyforge.test)')
+@click.option('--projects-per-user', default=2)
+@click.option('--min-scenes', default=10)
+@click.option('--max-scenes', default=500)
+@click.option('--objects-per-project', default=25)
+@click.option('--comments-per-scene', default=1.0, help='Average top-level comments per scene')
+@click.option('--token-logs-per-user', default=200)
+@click.option('--collaborators', default=5, help='Editors of the shared socketio project')
+@click.option('--seed', default=42, help='Same seed, same data')
+@click.option('--reset/--no-reset', default=True, help='Delete previous load-test data first')
+@with_appcontext
+def seed_load_data_command(users, projects_per_user, min_scenes, max_scenes, objects_per_project,
+                           comments_per_scene, token_logs_per_user, collaborators, seed, reset):
+    """Bulk-insert a reproducible data set for load tests"""
+    import time
+    from app.utils.load_seed import clear_load_data, seed_load_data, LOAD_TEST_PASSWORD
+    
+    start = time.perf_counter()
+    if reset:
+        removed = clear_load_data()
+        if removed:
+            print(f"🧹 Removed {removed:,} previous load-test users and their data")
+    counts = seed_load_data(
+        users=users, projects_per_user=projects_per_user, min_scenes=min_scenes, max_scenes=max_scenes,
+        objects_per_project=objects_per_project, comments_per_scene=comments_per_scene,
+        token_logs_per_user=token_logs_per_user, collaborators=collaborators, seed=seed
+    )
+    
+    print(f"\n🌱 Load-test data (seed {seed}) in {time.perf_counter() - start:.1f} s")
+    print(f"{'=' * 50}")
+    for name, count in counts.items():
+        if name != 'seed':
+            print(f"  {name:<15} {count:>10,}")
+    print(f"\n🔑 Password for all accounts: {LOAD_TEST_PASSWORD}")
+
+@click.command('load-test')
+@click.option('--users', default=10, help='Concurrent virtual users')
+@click.option('--iterations', default=3, help='Journeys per virtual user')
+@click.option('--collaborators', default=5, help='Concurrent socketio editors of the shared project')
+@click.option('--scenes', default=3, help='Scenes added per authoring journey')
+@click.option('--socket-events', default=50, help='Events emitted per collaborator')
+@click.option('--reader-ratio', default=0.5, help='Share of journeys that only browse')
+@click.option('--seed', default=1, help='Journey choices are reproducible per seed')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON result here')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Earlier result to compare with')
+@click.option('--tolerance', default=0.25, help='Allowed relative p95 increase against the baseline')
+@click.option('--allow-live-ai', is_flag=True, help='Do not force AI_SIMULATION_MODE')
+@click.option('--ai-profile', default='realistic', help='Simulated Claude profile (fixed, instant, realistic, degraded)')
+@click.pass_context
+@with_appcontext
+def load_test_command(ctx, users, iterations, collaborators, scenes, socket_events, reader_ratio, seed,
+                      output, baseline, tolerance, allow_live_ai, ai_profile):
+    """Run scripted journeys and socketio collaborators, report latency percentiles"""
+    import os
+    from flask import current_app
+    from app.utils.load_test import run_load_test, compare_results, write_result
+    
+    from app.services.simulated_claude import simulated_claude
+    
+    if not allow_live_ai:
+        # Offline and free: ClaudeAPIClient reads this on every construction
+        os.environ['AI_SIMULATION_MODE'] = 'true'
+        current_app.config['AI_SIMULATION_MODE'] = True
+    # Seeded with the run so AI latencies and failures repeat across commits
+    os.environ['AI_SIM_PROFILE'] = ai_profile
+    os.environ.setdefault('AI_SIM_SEED', str(seed))
+    simulated_claude.configure()
+    
+    app = current_app._get_current_object()
+    try:
+        result = run_load_test(
+            app, users=users, iterations=iterations, collaborators=collaborators, scenes=scenes,
+            socket_events=socket_events, reader_ratio=reader_ratio, seed=seed
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        ctx.exit(1)
+    
+    print(f"\n🏋️ Load Test @ {result['revision'] or 'unknown revision'} (AI profile: {ai_profile})")
+    print(f"{'=' * 78}")
+    print(f"Wall time: {result['wall_seconds']:.1f} s, {result['requests']:,} requests, "
+          f"{result['throughput_rps']:.1f} req/s, {result['journeys_completed']:,} journeys")
+    print(f"\n{'step':<28}{'count':>7}{'err':>5}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for step, stats in result['steps'].items():
+        print(f"{step:<28}{stats['count']:>7}{stats['errors']:>5}"
+              + ''.join(f"{stats[k]:>10.1f}" if stats[k] is not None else f"{'-':>10}"
+                        for k in ('p50', 'p95', 'p99', 'max')))
+    
+    if output:
+        write_result(result, output)
+        print(f"\n💾 Result written to {output}")
+    
+    if baseline:
+        with open(baseline, encoding='utf-8') as f:
+            regressions = compare_results(json.load(f), result, tolerance=tolerance)
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regression(s) against {baseline}:")
+            for regression in regressions:
+                print(f"  {regression['step']}: {regression['reason']}")
+            ctx.exit(1)
+        print(f"\n✅ No regressions against {baseline}")
+
+@click.command('claude-stub')
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=8765)
+@click.option('--profile', default='realistic', help='fixed, instant, realistic or degraded')
+@click.option('--seed', default=None, help='Repeat the same latencies and failures')
+def claude_stub_command(host, port, profile, seed):
+    """Serve a simulated Anthropic Messages API (set ANTHROPIC_BASE_URL to use it)"""
+    import os
+    from app.services.simulated_claude import make_stand_in_server, simulated_claude, simulation_profile_from_env
+    
+    environ = dict(os.environ, AI_SIM_PROFILE=profile)
+    if seed is not None:
+        environ['AI_SIM_SEED'] = str(seed)
+    simulated_claude.configure(simulation_profile_from_env(environ))
+    server = make_stand_in_server(host, port)
+    
+    settings = simulated_claude.describe()
+    print(f"\n🤖 Simulated Claude on http://{host}:{port}/v1/messages ({profile})")
+    print(f"   TTFT ~{settings['ttft_ms']:.0f} ms, {settings['ms_per_token']:.1f} ms/token, "
+          f"429 {settings['rate_limit_rate']:.0%}, 5xx {settings['server_error_rate']:.0%}, "
+          f"timeouts {settings['timeout_rate']:.0%}")
+    print(f"   export ANTHROPIC_BASE_URL=http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 {simulated_claude.stats()}")
+
 # Register all commands
 def register_commands(app):
     """Register all CLI commands with the app"""
@@ -331,4 +608,15 @@ def register_commands(app):
     app.cli.add_command(token_stats_command)
     app.cli.add_command(cleanup_data_command)
     app.cli.add_command(add_tokens_command)
-    app.cli.add_command(reset_demo_command)
\ No newline at end of file
+    app.cli.add_command(reset_demo_command)
+    app.cli.add_command(rebuild_collaboration_stats_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_mention_index_command)
+    app.cli.add_command(prune_revisions_command)
+    app.cli.add_command(process_webhooks_command)
+    app.cli.add_command(rollover_billing_periods_command)
+    app.cli.add_command(startup_profile_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(seed_load_data_command)
+    app.cli.add_command(load_test_command)
+    app.cli.add_command(claude_stub_command)
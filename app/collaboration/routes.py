@@ -4,7 +4,10 @@ from flask_socketio import emit, join_room, leave_room, rooms
 from app.collaboration import collaboration_bp
 from app.models import Project, ProjectCollaborator, Comment, User, Scene
 from app.utils.auth import login_required, collaboration_permission_required
+from app.utils.jwt_auth import token_required
+from app.utils.db_routing import read_only
 from app.services.collaboration_manager import CollaborationManager
+from app.utils.pagination import clamp_limit
 from app import db, socketio
 from datetime import datetime
 import secrets
@@ -53,6 +56,7 @@ def invite_collaborator(project_id):
         )
         
         db.session.add(collaborator)
+        collaboration_manager.record_invitation_sent(project_id)
         db.session.commit()
         
         # Send real-time notification
@@ -104,6 +108,7 @@ def accept_invitation(invitation_token):
         collaborator.status = 'active'
         collaborator.joined_at = datetime.utcnow()
         collaborator.invitation_token = None  # Clear token after use
+        collaboration_manager.record_invitation_accepted(collaborator.project_id)
         
         db.session.commit()
         
@@ -126,20 +131,56 @@ def accept_invitation(invitation_token):
 @collaboration_bp.route('/projects/<project_id>/comments', methods=['GET'])
 @token_required
 @collaboration_permission_required('view_comments')
+@read_only
 def get_comments(project_id):
-    """Get comments for project or scene"""
+    """Get comments for project or scene (cursor paginated, optionally threaded)"""
     scene_id = request.args.get('scene_id', type=int)
+    cursor = request.args.get('cursor')
+    threaded = request.args.get('threaded', 'false').lower() == 'true'
+    
+    if threaded:
+        limit = clamp_limit(request.args.get('limit', type=int), default=20)
+        reply_limit = min(max(request.args.get('reply_limit', 3, type=int), 0), 20)
+        result = collaboration_manager.list_comment_threads(
+            project_id, scene_id, cursor, limit, reply_limit
+        )
+        return jsonify({
+            'success': True,
+            'threads': result['threads'],
+            'total': len(result['threads']),
+            'next_cursor': result['next_cursor']
+        })
     
-    query = Comment.query.filter_by(project_id=project_id)
-    if scene_id:
-        query = query.filter_by(scene_id=scene_id)
+    limit = clamp_limit(request.args.get('limit', type=int))
+    result = collaboration_manager.list_comments(project_id, scene_id, cursor, limit)
     
-    comments = query.order_by(Comment.created_at.desc()).all()
+    return jsonify({
+        'success': True,
+        'comments': result['comments'],
+        'total': len(result['comments']),
+        'next_cursor': result['next_cursor']
+    })
+
+@collaboration_bp.route('/projects/<project_id>/comments/<int:comment_id>/replies', methods=['GET'])
+@token_required
+@collaboration_permission_required('view_comments')
+@read_only
+def get_comment_replies(project_id, comment_id):
+    """Get further replies of a comment thread (cursor paginated)"""
+    root = Comment.query.filter_by(id=comment_id, project_id=project_id).first()
+    if not root:
+        return jsonify({'error': 'Comment not found'}), 404
+    
+    limit = clamp_limit(request.args.get('limit', type=int))
+    result = collaboration_manager.list_thread_replies(
+        root.root_comment_id or root.id, request.args.get('cursor'), limit
+    )
     
     return jsonify({
         'success': True,
-        'comments': [c.to_dict() for c in comments],
-        'total': len(comments)
+        'comments': result['comments'],
+        'total': len(result['comments']),
+        'next_cursor': result['next_cursor']
     })
 
 @collaboration_bp.route('/projects/<project_id>/comments', methods=['POST'])
@@ -157,19 +198,22 @@ def add_comment(project_id):
     if not content:
         return jsonify({'error': 'Comment content is required'}), 400
     
+    # Replies must stay inside the project the caller has access to
+    parent = None
+    if parent_comment_id:
+        parent = Comment.query.filter_by(id=parent_comment_id, project_id=project_id).first()
+        if not parent:
+            return jsonify({'error': 'Parent comment not found in this project'}), 400
+    
     try:
         # Calculate thread depth
-        thread_depth = 0
-        if parent_comment_id:
-            parent = Comment.query.get(parent_comment_id)
-            if parent:
-                thread_depth = parent.thread_depth + 1
+        thread_depth = parent.thread_depth + 1 if parent else 0
         
         comment = Comment(
             content=content,
             project_id=project_id,
             scene_id=scene_id,
-            user_id=session['user_id'],
+            user_id=request.current_user.id,
             parent_comment_id=parent_comment_id,
             thread_depth=thread_depth,
             comment_type=comment_type,
@@ -177,6 +221,9 @@ def add_comment(project_id):
         )
         
         db.session.add(comment)
+        db.session.flush()
+        comment.set_thread_position(parent)
+        collaboration_manager.record_comment_added(project_id)
         db.session.commit()
         
         # Notify collaborators in real-time
@@ -212,10 +259,14 @@ def resolve_comment(comment_id):
         return jsonify({'error': 'Permission denied'}), 403
     
     try:
+        was_resolved = comment.is_resolved
         comment.is_resolved = True
         comment.resolved_by = session['user_id']
         comment.resolved_at = datetime.utcnow()
         
+        if not was_resolved:
+            collaboration_manager.record_comment_resolved(comment.project_id)
+        
         db.session.commit()
         
         # Notify collaborators
@@ -232,6 +283,18 @@ def resolve_comment(comment_id):
         db.session.rollback()
         return jsonify({'error': f'Failed to resolve comment: {str(e)}'}), 500
 
+@collaboration_bp.route('/projects/<project_id>/analytics', methods=['GET'])
+@token_required
+@collaboration_permission_required('view_analytics')
+@read_only
+def get_analytics(project_id):
+    """Get collaboration analytics for project"""
+    analytics = collaboration_manager.get_collaboration_analytics(project_id)
+    return jsonify({
+        'success': True,
+        'analytics': analytics
+    })
+
 @collaboration_bp.route('/projects/<project_id>/presence', methods=['GET'])
 @token_required
 @collaboration_permission_required('view_presence')
@@ -3,7 +3,6 @@ from app import db
 from datetime import datetime
 import uuid
 import json
-from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
     """User model for authentication and user management"""
@@ -12,11 +11,12 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(256))
     plan = db.Column(db.String(20), default='free', index=True)
     tokens_used = db.Column(db.Integer, default=0)
     tokens_limit = db.Column(db.Integer, default=1000)
     is_active = db.Column(db.Boolean, default=True)
+    token_epoch = db.Column(db.Integer, default=0, nullable=False)  # Bump to revoke issued JWTs
     last_login = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
@@ -24,10 +24,25 @@ class User(db.Model):
     projects = db.relationship('Project', backref='owner', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        from app.services.password_hasher import password_hasher
+        self.password_hash = password_hasher.hash(password)
+    
+    def revoke_tokens(self):
+        """Invalidate every JWT issued before now"""
+        self.token_epoch = (self.token_epoch or 0) + 1
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        from app.services.password_hasher import password_hasher
+        return password_hasher.verify(self.password_hash, password)
+    
+    def rehash_password_if_needed(self, password):
+        """Re-hash with current cost parameters after a successful login"""
+        from app.services.password_hasher import password_hasher
+        if not password_hasher.needs_rehash(self.password_hash):
+            return False
+        self.password_hash = password_hasher.hash(password)
+        password_hasher.note_rehash()
+        return True
     
     def to_dict(self):
         return {
@@ -86,7 +101,7 @@ class UserSubscription(db.Model):
     stripe_subscription_id = db.Column(db.String(100), unique=True)
     stripe_customer_id = db.Column(db.String(100))
     current_period_start = db.Column(db.DateTime, nullable=False)
-    current_period_end = db.Column(db.DateTime, nullable=False)
+    current_period_end = db.Column(db.DateTime, nullable=False, index=True)  # Rollover scans on this
     cancel_at_period_end = db.Column(db.Boolean, default=False)
     tokens_used_this_period = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -141,6 +156,7 @@ class Project(db.Model):
     collaborators = db.relationship('ProjectCollaborator', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     comments = db.relationship('Comment', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     token_usage_logs = db.relationship('TokenUsageLog', backref='project', lazy='dynamic')
+    collaboration_stats = db.relationship('ProjectCollaborationStats', backref='project', uselist=False, cascade='all, delete-orphan')
     
     def to_dict(self):
         """Convert project to dictionary"""
@@ -275,6 +291,29 @@ class SceneObject(db.Model):
     scene_id = db.Column(db.Integer, db.ForeignKey('scene.id'), nullable=False, index=True)
     object_id = db.Column(db.Integer, db.ForeignKey('story_object.id'), nullable=False, index=True)
 
+class ObjectMention(db.Model):
+    """Where a story object's name or aliases occur in scene text (see services/mention_index.py)"""
+    __tablename__ = 'object_mention'
+
+    id = db.Column(db.Integer, primary_key=True)
+    mention_count = db.Column(db.Integer, default=0, nullable=False)
+    positions = db.Column(db.JSON)  # {field: [[start, end], ...]} character offsets
+
+    # Foreign Keys
+    project_id = db.Column(db.String(36), db.ForeignKey('project.id'), nullable=False, index=True)
+    object_id = db.Column(db.Integer, db.ForeignKey('story_object.id'), nullable=False, index=True)
+    scene_id = db.Column(db.Integer, db.ForeignKey('scene.id'), nullable=False, index=True)
+
+    __table_args__ = (db.UniqueConstraint('object_id', 'scene_id', name='unique_object_scene_mention'),)
+
+    def to_dict(self):
+        return {
+            'object_id': self.object_id,
+            'scene_id': self.scene_id,
+            'mention_count': self.mention_count,
+            'positions': self.positions or {}
+        }
+
 class Story(db.Model):
     """Story model - final narrative content generated from scenes"""
     __tablename__ = 'story'
@@ -339,6 +378,38 @@ class StoryChapter(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class Revision(db.Model):
+    """One version of a scene or chapter: a keyframe snapshot or a compressed delta (see services/revision_history.py)"""
+    __tablename__ = 'revision'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # scene, chapter
+    entity_id = db.Column(db.Integer, nullable=False)
+    number = db.Column(db.Integer, nullable=False)  # 1, 2, ... per entity
+    keyframe_number = db.Column(db.Integer, nullable=False)  # == number for keyframes
+    base_number = db.Column(db.Integer)  # Revision the delta applies to (skip-delta)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON
+    payload_size = db.Column(db.Integer, default=0)
+    changed_fields = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+    __table_args__ = (db.UniqueConstraint('entity_type', 'entity_id', 'number', name='unique_entity_revision'),)
+
+    def to_dict(self):
+        return {
+            'number': self.number,
+            'entity_type': self.entity_type,
+            'entity_id': self.entity_id,
+            'is_keyframe': self.number == self.keyframe_number,
+            'changed_fields': self.changed_fields or [],
+            'payload_size': self.payload_size,
+            'user_id': self.user_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
 class ProjectCollaborator(db.Model):
     """Collaboration permissions for projects"""
     __tablename__ = 'project_collaborator'
@@ -381,6 +452,27 @@ class ProjectCollaborator(db.Model):
             'last_access': self.last_access.isoformat() if self.last_access else None
         }
 
+class ProjectCollaborationStats(db.Model):
+    """Denormalized per-project collaboration counters for O(1) analytics"""
+    __tablename__ = 'project_collaboration_stats'
+    
+    project_id = db.Column(db.String(36), db.ForeignKey('project.id'), primary_key=True)
+    total_collaborators = db.Column(db.Integer, default=0, nullable=False)
+    pending_invitations = db.Column(db.Integer, default=0, nullable=False)
+    total_comments = db.Column(db.Integer, default=0, nullable=False)
+    resolved_comments = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'project_id': self.project_id,
+            'total_collaborators': self.total_collaborators,
+            'pending_invitations': self.pending_invitations,
+            'total_comments': self.total_comments,
+            'resolved_comments': self.resolved_comments,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
 class Comment(db.Model):
     """Comments on scenes or projects"""
     __tablename__ = 'comment'
@@ -389,7 +481,7 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     
     # Target (either scene or project level)
-    project_id = db.Column(db.String(36), db.ForeignKey('project.id'), nullable=False)
+    project_id = db.Column(db.String(36), db.ForeignKey('project.id'), nullable=False, index=True)
     scene_id = db.Column(db.Integer, db.ForeignKey('scene.id'))  # Optional - project level if None
     
     # Author
@@ -398,6 +490,8 @@ class Comment(db.Model):
     # Threading
     parent_comment_id = db.Column(db.Integer, db.ForeignKey('comment.id'))
     thread_depth = db.Column(db.Integer, default=0)
+    root_comment_id = db.Column(db.Integer, index=True)  # Top-level comment of the thread
+    thread_path = db.Column(db.String(512), index=True)  # Materialized path of zero-padded ids
     
     # Status
     is_resolved = db.Column(db.Boolean, default=False)
@@ -416,6 +510,19 @@ class Comment(db.Model):
     resolver = db.relationship('User', foreign_keys=[resolved_by])
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]))
     
+    PATH_SEGMENT_WIDTH = 10
+    
+    def set_thread_position(self, parent=None):
+        """Derive thread root and materialized path (requires a flushed id)"""
+        segment = str(self.id).zfill(self.PATH_SEGMENT_WIDTH)
+        if parent:
+            parent_path = parent.thread_path or str(parent.id).zfill(self.PATH_SEGMENT_WIDTH)
+            self.root_comment_id = parent.root_comment_id or parent.id
+            self.thread_path = f'{parent_path}/{segment}'
+        else:
+            self.root_comment_id = self.id
+            self.thread_path = segment
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -435,6 +542,73 @@ class Comment(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class UsagePeriod(db.Model):
+    """Token usage of one finished billing period, written by the rollover job (services/billing_rollover.py)"""
+    __tablename__ = 'usage_period'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey('user_subscription.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey('billing_plan.id'))
+    period_start = db.Column(db.DateTime, nullable=False)
+    period_end = db.Column(db.DateTime, nullable=False)
+    tokens_used = db.Column(db.Integer, default=0)  # UserSubscription.tokens_used_this_period
+    user_tokens_used = db.Column(db.Integer, default=0)  # User.tokens_used (includes purchased tokens)
+    tokens_limit = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('subscription_id', 'period_start', name='unique_subscription_period'),)
+
+    def to_dict(self):
+        return {
+            'subscription_id': self.subscription_id,
+            'user_id': self.user_id,
+            'plan_id': self.plan_id,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'period_end': self.period_end.isoformat() if self.period_end else None,
+            'tokens_used': self.tokens_used,
+            'user_tokens_used': self.user_tokens_used,
+            'tokens_limit': self.tokens_limit
+        }
+
+class WebhookEvent(db.Model):
+    """Verified payment-provider event, stored on receipt and processed by services/webhook_queue.py"""
+    __tablename__ = 'webhook_event'
+
+    id = db.Column(db.Integer, primary_key=True)
+    provider = db.Column(db.String(20), nullable=False, default='stripe')
+    event_id = db.Column(db.String(255), nullable=False)  # Provider's id; retries reuse it
+    event_type = db.Column(db.String(100), nullable=False, index=True)
+    customer_id = db.Column(db.String(100), nullable=False, default='')  # Ordering key
+    payload = db.Column(db.Text, nullable=False)  # Event JSON
+    event_created = db.Column(db.DateTime)  # Provider timestamp, orders a customer's events
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, retry, processing, processed, dead
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime)  # Backoff deadline, or lease expiry while processing
+    last_error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'event_id', name='unique_provider_event'),
+        db.Index('ix_webhook_event_queue', 'status', 'customer_id', 'event_created'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'provider': self.provider,
+            'event_id': self.event_id,
+            'event_type': self.event_type,
+            'customer_id': self.customer_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'received_at': self.received_at.isoformat() if self.received_at else None,
+            'processed_at': self.processed_at.isoformat() if self.processed_at else None
+        }
+
 class TokenUsageLog(db.Model):
     """Log of all token operations for analytics and billing"""
     __tablename__ = 'token_usage_log'
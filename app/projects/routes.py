@@ -1,10 +1,19 @@
 # app/projects/routes.py - Project Routes
 from flask import request, jsonify, session
 from app.projects import projects_bp
-from app.models import Project, Scene, StoryObject
+from app.models import Project, Scene, StoryObject, Story, StoryChapter
 from app.utils.auth import login_required
+from app.utils.jwt_auth import token_required
+from app.utils.db_routing import read_only
+from app.utils.pagination import clamp_limit
+from app.services.collaboration_manager import CollaborationManager
+from app.services.search_index import search_index
+from app.services.mention_index import mention_index
+from app.services.revision_history import revision_history
 from app import db
 
+collaboration_manager = CollaborationManager()
+
 @projects_bp.route('', methods=['GET'])
 @token_required
 def get_projects():
@@ -30,6 +39,7 @@ def create_project():
 
 @projects_bp.route('/<project_id>', methods=['GET'])
 @token_required
+@read_only
 def get_project(project_id):
     project = Project.query.filter_by(id=project_id, user_id=session['user_id']).first()
     if not project:
@@ -43,3 +53,86 @@ def get_project(project_id):
         'scenes': [s.to_dict() for s in scenes],
         'objects': [o.to_dict() for o in objects]
     })
+
+@projects_bp.route('/<project_id>/search', methods=['GET'])
+@token_required
+@read_only
+def search_project(project_id):
+    """Ranked full-text search over the project's scenes, objects, comments and chapters"""
+    if not collaboration_manager.verify_project_access(request.current_user.id, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+    
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'Search query (q) is required'}), 400
+    
+    limit = clamp_limit(request.args.get('limit', type=int), default=20)
+    try:
+        result = search_index.search(project_id, query, request.args.get('cursor'), limit)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+    
+    return jsonify({
+        'query': query,
+        'terms': result['terms'],
+        'results': result['results'],
+        'next_cursor': result['next_cursor']
+    })
+
+@projects_bp.route('/<project_id>/mentions', methods=['GET'])
+@token_required
+@read_only
+def get_object_mentions(project_id):
+    """Scenes naming each story object (optionally one object) from the mention index"""
+    if not collaboration_manager.verify_project_access(request.current_user.id, project_id):
+        return jsonify({'error': 'Project not found'}), 404
+    
+    object_id = request.args.get('object_id', type=int)
+    query = StoryObject.query.filter_by(project_id=project_id)
+    if object_id is not None:
+        query = query.filter_by(id=object_id)
+    objects = query.order_by(StoryObject.id).all()
+    usage = mention_index.usage(project_id, object_id)
+    
+    return jsonify({
+        'objects': [{
+            'object_id': obj.id,
+            'name': obj.name,
+            'object_type': obj.object_type,
+            'scene_count': len(usage.get(obj.id, [])),
+            'mention_count': sum(m['mention_count'] for m in usage.get(obj.id, [])),
+            'scenes': usage.get(obj.id, [])
+        } for obj in objects]
+    })
+
+def _project_chapter(project_id, chapter_id):
+    return StoryChapter.query.join(Story, Story.id == StoryChapter.story_id).filter(
+        StoryChapter.id == chapter_id, Story.project_id == project_id
+    ).first()
+
+@projects_bp.route('/<project_id>/chapters/<int:chapter_id>/revisions', methods=['GET'])
+@token_required
+@read_only
+def list_chapter_revisions(project_id, chapter_id):
+    """Chapter history, newest first (cursor paginated)"""
+    if not collaboration_manager.verify_project_access(request.current_user.id, project_id) \
+            or not _project_chapter(project_id, chapter_id):
+        return jsonify({'error': 'Chapter not found'}), 404
+    
+    limit = clamp_limit(request.args.get('limit', type=int))
+    result = revision_history.list_revisions('chapter', chapter_id, request.args.get('cursor'), limit)
+    return jsonify({'success': True, **result})
+
+@projects_bp.route('/<project_id>/chapters/<int:chapter_id>/revisions/<int:number>', methods=['GET'])
+@token_required
+@read_only
+def get_chapter_revision(project_id, chapter_id, number):
+    """Chapter as it was at revision `number`"""
+    if not collaboration_manager.verify_project_access(request.current_user.id, project_id) \
+            or not _project_chapter(project_id, chapter_id):
+        return jsonify({'error': 'Chapter not found'}), 404
+    
+    revision = revision_history.get('chapter', chapter_id, number)
+    if not revision:
+        return jsonify({'error': 'Revision not found'}), 404
+    return jsonify({'success': True, 'revision': revision})
@@ -0,0 +1,44 @@
+# app/routes/internal.py - Internal operational endpoints (not exposed through nginx)
+import hmac
+from flask import Blueprint, Response, jsonify, request, current_app, abort
+from app.utils.pool_metrics import pool_metrics
+from app.utils.request_metrics import request_metrics, pool_prometheus_lines
+from app.utils.query_diagnostics import query_diagnostics
+
+internal_bp = Blueprint('internal', __name__, url_prefix='/internal')
+
+@internal_bp.before_request
+def restrict_to_operators():
+    """Loopback/allow-listed addresses, or the internal token header"""
+    token = current_app.config.get('INTERNAL_METRICS_TOKEN')
+    supplied = request.headers.get('X-Internal-Token')
+    if token and supplied and hmac.compare_digest(token, supplied):
+        return None
+    if request.remote_addr in current_app.config.get('INTERNAL_ALLOWED_IPS', ()):
+        return None
+    abort(404)
+
+@internal_bp.route('/pool', methods=['GET'])
+def pool_status():
+    """Connection pool sizing, in-use counts and checkout wait times"""
+    return jsonify({
+        'engines': pool_metrics.snapshot(),
+        'options': {
+            key: value for key, value in current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items()
+            if key != 'poolclass'
+        }
+    })
+
+@internal_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request latency quantiles, query/AI counts and pool gauges (Prometheus text format)"""
+    body = request_metrics.prometheus(pool_prometheus_lines(pool_metrics.snapshot()))
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@internal_bp.route('/queries', methods=['GET'])
+def recent_query_findings():
+    """Recent suspected N+1 patterns and slow queries (when diagnostics are on)"""
+    return jsonify({
+        'enabled': query_diagnostics.enabled,
+        'findings': list(query_diagnostics.findings)
+    })
@@ -3,9 +3,16 @@ from flask import request, jsonify, session, current_app
 from app.scenes import scenes_bp
 from app.models import Scene, Project, StoryObject, SceneObject
 from app.utils.auth import login_required, check_tokens, use_tokens
+from app.utils.jwt_auth import token_required
+from app.utils.db_routing import read_only
+from app.utils.pagination import clamp_limit
 from app.services.ai_analyzer import AIAnalyzer
+from app.services.collaboration_manager import CollaborationManager
+from app.services.revision_history import revision_history
 from app import db
 
+collaboration_manager = CollaborationManager()
+
 @scenes_bp.route('', methods=['POST'])
 @token_required
 @check_tokens(5)
@@ -44,7 +51,7 @@ def create_scene():
             # Get project context for better analysis
             project_context = f"Projekt: {project.title}\nŽánr: {project.genre or 'neurčeno'}\nPopis: {project.description or ''}"
             
-            extracted_objects = analyzer.analyze_scene_objects(scene.description, project_context)
+            extracted_objects = analyzer.analyze_scene_objects(scene.description, project_context, project_id)
             
             # Create/find objects and link to scene
             for obj_type, obj_names in extracted_objects.items():
@@ -95,4 +102,36 @@ def create_scene():
     db.session.commit()
     use_tokens(5)
     
-    return jsonify({'success': True, 'scene': scene.to_dict()})
\ No newline at end of file
+    return jsonify({'success': True, 'scene': scene.to_dict()})
+
+
+def _accessible_scene(scene_id):
+    scene = db.session.get(Scene, scene_id)
+    if scene and collaboration_manager.verify_project_access(request.current_user.id, scene.project_id):
+        return scene
+    return None
+
+@scenes_bp.route('/<int:scene_id>/revisions', methods=['GET'])
+@token_required
+@read_only
+def list_scene_revisions(scene_id):
+    """Scene history, newest first (cursor paginated)"""
+    if not _accessible_scene(scene_id):
+        return jsonify({'error': 'Scene not found'}), 404
+    
+    limit = clamp_limit(request.args.get('limit', type=int))
+    result = revision_history.list_revisions('scene', scene_id, request.args.get('cursor'), limit)
+    return jsonify({'success': True, **result})
+
+@scenes_bp.route('/<int:scene_id>/revisions/<int:number>', methods=['GET'])
+@token_required
+@read_only
+def get_scene_revision(scene_id, number):
+    """Scene as it was at revision `number`"""
+    if not _accessible_scene(scene_id):
+        return jsonify({'error': 'Scene not found'}), 404
+    
+    revision = revision_history.get('scene', scene_id, number)
+    if not revision:
+        return jsonify({'error': 'Revision not found'}), 404
+    return jsonify({'success': True, 'revision': revision})
@@ -4,7 +4,31 @@ import re
 from typing import Dict, List, Optional
 from flask import current_app
 from app.services.claude_api import ClaudeAPIClient
+from app.services.mention_index import mention_index, name_pattern, scan_text
 from app.models import StoryObject, Scene, Project
+from app.utils.aho_corasick import AhoCorasick
+
+# Keyword fallback when Claude is unavailable: (category, keyword, label)
+FALLBACK_KEYWORDS = [
+    ('characters', 'sarah', 'Sarah'), ('characters', 'pavel', 'Pavel'),
+    ('characters', 'matka', 'Matka'), ('characters', 'máma', 'Matka'),
+    ('characters', 'babička', 'Babička Anna'),
+] + [
+    ('locations', loc, loc.capitalize())
+    for loc in ['knihovna', 'pokoj', 'kavárna', 'dům', 'archiv', 'kancelář']
+] + [
+    ('objects', obj, obj.capitalize())
+    for obj in ['dopis', 'fotografie', 'kniha', 'dokument', 'klíče', 'telefon']
+]
+
+def _keyword_matcher() -> AhoCorasick:
+    matcher = AhoCorasick()
+    for category, keyword, label in FALLBACK_KEYWORDS:
+        matcher.add(name_pattern(keyword), (category, label))
+    return matcher.build()
+
+# One pass over the text finds every keyword (inflected forms included)
+_FALLBACK_MATCHER = _keyword_matcher()
 
 class AIAnalyzer:
     """AI Analyzer using Claude API for story analysis"""
@@ -254,7 +278,8 @@ Buďte kreativní ale zůstaňte věrní původnímu nápadu."""
             }
         }
 
-    def analyze_scene_objects(self, scene_description: str, project_context: str = "") -> Dict[str, List[str]]:
+    def analyze_scene_objects(self, scene_description: str, project_context: str = "",
+                              project_id: Optional[str] = None) -> Dict[str, List[str]]:
         """Extract objects from scene description using Claude"""
         
         system_prompt = """Jste expert na analýzu literárních textů. Vaším úkolem je analyzovat popis scény a extrahovat klíčové objekty.
@@ -312,10 +337,10 @@ Buďte precizní a extrahujte pouze objekty explicitně zmíněné v textu."""
                 print(f"Error in analyze_scene_objects: {str(e)}")
             
             # Fallback to simple keyword extraction
-            return self._fallback_object_extraction(scene_description)
+            return self._fallback_object_extraction(scene_description, project_id)
     
-    def _fallback_object_extraction(self, description: str) -> Dict[str, List[str]]:
-        """Fallback object extraction using keywords"""
+    def _fallback_object_extraction(self, description: str, project_id: Optional[str] = None) -> Dict[str, List[str]]:
+        """Fallback object extraction: the project's known objects, then keywords"""
         keywords = {
             'characters': [],
             'locations': [],
@@ -323,29 +348,14 @@ Buďte precizní a extrahujte pouze objekty explicitně zmíněné v textu."""
             'conflicts': []
         }
         
-        description_lower = description.lower()
-        
-        # Character detection
-        if 'sarah' in description_lower:
-            keywords['characters'].append('Sarah')
-        if 'pavel' in description_lower:
-            keywords['characters'].append('Pavel')
-        if 'matka' in description_lower or 'máma' in description_lower:
-            keywords['characters'].append('Matka')
-        if 'babička' in description_lower:
-            keywords['characters'].append('Babička Anna')
-        
-        # Location detection
-        locations = ['knihovna', 'pokoj', 'kavárna', 'dům', 'archiv', 'kancelář']
-        for loc in locations:
-            if loc in description_lower:
-                keywords['locations'].append(loc.capitalize())
+        if project_id:
+            for category, names in mention_index.find_in_text(project_id, description).items():
+                keywords[category].extend(names)
         
-        # Object detection
-        objects = ['dopis', 'fotografie', 'kniha', 'dokument', 'klíče', 'telefon']
-        for obj in objects:
-            if obj in description_lower:
-                keywords['objects'].append(obj.capitalize())
+        found = scan_text(_FALLBACK_MATCHER, description)
+        for category, keyword, label in FALLBACK_KEYWORDS:
+            if (category, label) in found and label not in keywords[category]:
+                keywords[category].append(label)
         
         return keywords
     
@@ -2,6 +2,7 @@
 from typing import Dict, List, Optional
 from flask import current_app
 from app.services.claude_api import ClaudeAPIClient
+from app.services.mention_index import mention_index
 from app.models import Scene, Project, StoryObject, Comment
 import json
 import re
@@ -111,11 +112,15 @@ Analyzujte dialogy v příběhu a poskytněte konstruktivní kritiku zaměřenou
 
 Hodnotíte na škále 1-5 a poskytujete konkrétní příklady."""
 
-        # Extract dialogue from scenes
+        # Extract dialogue from scenes, with the characters each scene names
+        mentioned = mention_index.objects_by_scene(project.id)
+        names = {char.id: char.name for char in characters}
         dialogue_examples = []
         for scene in scenes:
             if scene.description and ('"' in scene.description or "'" in scene.description):
-                dialogue_examples.append(f"Scéna '{scene.title}': {scene.description[:300]}")
+                speakers = [names[i] for i in mentioned.get(scene.id, []) if i in names]
+                cast = f" (postavy: {', '.join(speakers)})" if speakers else ''
+                dialogue_examples.append(f"Scéna '{scene.title}'{cast}: {scene.description[:300]}")
         
         character_info = "\n".join([
             f"Postava: {char.name} - {char.description or 'bez popisu'}"
@@ -305,18 +310,20 @@ Analyzujete logickou konzistenci příběhu a hledáte:
 
 Buďte pečliví a systematičtí jako forenzní analytik."""
 
-        # Build timeline and object usage
+        # Build timeline; object usage comes from the precomputed mention index
         timeline = []
-        object_usage = {}
+        scene_labels = {}
         
         for i, scene in enumerate(scenes):
             timeline.append(f"Bod {i+1}: {scene.title} - {scene.description}")
-            
-            for scene_obj in scene.scene_objects:
-                obj_name = scene_obj.story_object.name
-                if obj_name not in object_usage:
-                    object_usage[obj_name] = []
-                object_usage[obj_name].append(f"Scéna {i+1}: {scene.title}")
+            scene_labels[scene.id] = f"Scéna {i+1}: {scene.title}"
+        
+        names = {obj.id: obj.name for obj in objects}
+        object_usage = {}
+        for object_id, mentions in mention_index.usage(project.id).items():
+            usage = [scene_labels[m['scene_id']] for m in mentions if m['scene_id'] in scene_labels]
+            if object_id in names and usage:
+                object_usage[names[object_id]] = usage
 
         prompt = f"""Analyzujte logickou konzistenci tohoto příběhu:
 
@@ -363,6 +370,71 @@ Vraťte JSON analýzu:
             self._safe_log(f"Error in plot_hole_detection: {str(e)}", 'error')
             return self._fallback_critique('plot_holes')
 
+    def character_arc_analysis(self, project: Project, scenes: List[Scene],
+                               characters: List[StoryObject]) -> Dict:
+        """Character arcs traced through the scenes that name each character"""
+        
+        critic_info = self.critics['character']
+        system_prompt = f"""Jste {critic_info['name']}, {critic_info['persona']}.
+
+Specializujete se na: {', '.join(critic_info['focus'])}
+
+Sledujete vývoj každé postavy napříč scénami a hodnotíte:
+- Úplnost a uvěřitelnost oblouku postavy
+- Konzistenci motivací
+- Dlouhé nepřítomnosti a náhlé návraty
+- Vztah vývoje postavy k emocionální intenzitě scén"""
+
+        positions = {scene.id: (i + 1, scene) for i, scene in enumerate(scenes)}
+        usage = mention_index.usage(project.id)
+        arcs = []
+        for char in characters:
+            appearances = [positions[m['scene_id']] + (m['mention_count'],)
+                           for m in usage.get(char.id, []) if m['scene_id'] in positions]
+            if not appearances:
+                arcs.append(f"{char.name}: v textu scén se nevyskytuje")
+                continue
+            steps = ', '.join(
+                f"{number}. {scene.title} (intenzita {scene.emotional_intensity or 0:.1f}, {count}×)"
+                for number, scene, count in appearances
+            )
+            gaps = [b[0] - a[0] for a, b in zip(appearances, appearances[1:]) if b[0] - a[0] > 3]
+            gap_note = f"; nejdelší pauza {max(gaps)} scén" if gaps else ''
+            arcs.append(f"{char.name} ({char.character_role or 'role neurčena'}): {steps}{gap_note}")
+
+        prompt = f"""Analyzujte oblouky postav v tomto příběhu:
+
+PROJEKT: {project.title} ({project.genre or 'neurčeno'})
+POČET SCÉN: {len(scenes)}
+
+VÝSKYT POSTAV VE SCÉNÁCH:
+{chr(10).join(arcs) if arcs else 'Projekt zatím nemá žádné postavy.'}
+
+Vraťte JSON kritiku:
+{{
+    "critic_name": "{critic_info['name']}",
+    "score": 1-5,
+    "main_feedback": "hlavní zpětná vazba o vývoji postav",
+    "character_arcs": [
+        {{
+            "character": "jméno postavy",
+            "arc_summary": "shrnutí oblouku",
+            "issues": ["problémy oblouku"],
+            "suggestions": ["návrhy na zlepšení"]
+        }}
+    ],
+    "specific_recommendations": ["konkrétní doporučení"],
+    "strengths": ["silné stránky"],
+    "areas_for_improvement": ["oblasti k zlepšení"]
+}}"""
+
+        try:
+            response = self.claude._make_request(prompt, system_prompt, max_tokens=2000)
+            return self._parse_critique_response(response, critic_info['name'], 3.8)
+        except Exception as e:
+            self._safe_log(f"Error in character_arc_analysis: {str(e)}", 'error')
+            return self._fallback_critique('character')
+
     def _get_critic_analysis(self, critic_type: str, project: Project, 
                            scenes: List[Scene], objects: List[StoryObject]) -> Dict:
         """Route to appropriate critic analysis"""
@@ -380,7 +452,7 @@ Vraťte JSON analýzu:
             return self.structure_critique(project, scenes)
         elif critic_type == 'character':
             characters = [obj for obj in objects if obj.object_type == 'character']
-            return self.character_critique(project, scenes, characters)
+            return self.character_arc_analysis(project, scenes, characters)
         else:
             return self._fallback_critique(critic_type)
 
@@ -0,0 +1,218 @@
+# app/services/billing_rollover.py - Scheduled, batched billing-period rollover
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import User, BillingPlan, UserSubscription, UsagePeriod
+from app.utils.identity import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# Subscriptions the job advances; 'cancelling' ones end at their period end
+ROLLING_STATUSES = ('active', 'cancelling')
+
+# Paid periods are started by the payment webhook (apply_paid_period); the
+# schedule only rolls what needs no payment: free plans and cancellations
+NEEDS_NO_PAYMENT = or_(
+    UserSubscription.status == 'cancelling',
+    func.coalesce(BillingPlan.monthly_price_cents, 0) == 0
+)
+
+def next_period(period_end: datetime, now: datetime, length: timedelta) -> Tuple[datetime, datetime]:
+    """The period containing now, counted in whole periods from period_end (catches up missed runs)"""
+    missed = max((now - period_end) // length, 0)
+    start = period_end + missed * length
+    return start, start + length
+
+class BillingRollover:
+    """Advances subscriptions whose current_period_end has passed
+
+    Free and cancelling subscriptions are rolled by the schedule; paid ones
+    only when their renewal invoice is paid, to the invoice's period.
+    Due subscriptions are read in pages off the current_period_end index.
+    Each page writes its usage snapshots, advances the periods and resets
+    the counters with a few bulk statements in one transaction. The snapshot's
+    unique (subscription_id, period_start) makes a page that another runner
+    already rolled fail as a whole, so concurrent runners are safe.
+    """
+
+    def __init__(self):
+        self.scheduler_enabled = True
+        self.interval = 300.0
+        self.batch_size = 500
+        self.period_length = timedelta(days=30)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.scheduler_enabled = app.config.get('BILLING_ROLLOVER_SCHEDULER', True)
+        self.interval = float(app.config.get('BILLING_ROLLOVER_INTERVAL', 300))
+        self.batch_size = max(int(app.config.get('BILLING_ROLLOVER_BATCH_SIZE', 500)), 1)
+        self.period_length = timedelta(days=int(app.config.get('BILLING_PERIOD_DAYS', 30)))
+
+    # Selection
+
+    def _select(self):
+        """Subscription rows with what the snapshot and reset need"""
+        return (
+            select(
+                UserSubscription.id, UserSubscription.user_id, UserSubscription.plan_id,
+                UserSubscription.status, UserSubscription.current_period_start,
+                UserSubscription.current_period_end, UserSubscription.tokens_used_this_period,
+                User.tokens_used, User.tokens_limit, BillingPlan.monthly_token_limit
+            )
+            .join(User, User.id == UserSubscription.user_id)
+            .outerjoin(BillingPlan, BillingPlan.id == UserSubscription.plan_id)
+        )
+
+    def due(self, now: datetime, limit: int) -> List:
+        """Oldest-due subscriptions that need no payment first"""
+        query = (
+            self._select()
+            .where(UserSubscription.current_period_end <= now,
+                   UserSubscription.status.in_(ROLLING_STATUSES), NEEDS_NO_PAYMENT)
+            .order_by(UserSubscription.current_period_end, UserSubscription.id)
+            .limit(limit)
+        )
+        return db.session.execute(query).all()
+
+    # Rolling
+
+    def roll(self, rows: List, now: datetime,
+             paid_periods: Optional[Dict[int, Tuple[datetime, datetime]]] = None) -> Dict[str, int]:
+        """Snapshot and advance one page of subscriptions; the caller commits
+
+        paid_periods ({subscription id: (start, end)}) renews those to the paid
+        period; the rest advance by whole periods or end if cancelling.
+        """
+        paid_periods = paid_periods or {}
+        stats = {'renewed': 0, 'cancelled': 0}
+        if not rows:
+            return stats
+
+        snapshots = [{
+            'subscription_id': row.id, 'user_id': row.user_id, 'plan_id': row.plan_id,
+            'period_start': row.current_period_start, 'period_end': row.current_period_end,
+            'tokens_used': row.tokens_used_this_period or 0, 'user_tokens_used': row.tokens_used or 0,
+            'tokens_limit': row.tokens_limit, 'created_at': now
+        } for row in rows if row.current_period_start is not None]  # First paid period has none
+        if snapshots:
+            db.session.execute(insert(UsagePeriod), snapshots)
+
+        subscriptions = []
+        renewed_by_limit = {}  # {plan token limit: [user ids]}
+        cancelled_users = []
+        for row in rows:
+            if row.id in paid_periods:
+                (start, end), status = paid_periods[row.id], 'active'
+                renewed_by_limit.setdefault(row.monthly_token_limit, []).append(row.user_id)
+            elif row.status == 'cancelling':
+                start, end, status = row.current_period_end, row.current_period_end, 'cancelled'
+                cancelled_users.append(row.user_id)
+            else:
+                start, end = next_period(row.current_period_end, now, self.period_length)
+                status = row.status
+                renewed_by_limit.setdefault(row.monthly_token_limit, []).append(row.user_id)
+            subscriptions.append({'b_id': row.id, 'b_start': start, 'b_end': end, 'b_status': status})
+
+        table = UserSubscription.__table__
+        db.session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(
+                current_period_start=bindparam('b_start'), current_period_end=bindparam('b_end'),
+                status=bindparam('b_status'), tokens_used_this_period=0, updated_at=now
+            ),
+            subscriptions
+        )
+
+        for limit, user_ids in renewed_by_limit.items():
+            values = {'tokens_used': 0}
+            if limit is not None:
+                values['tokens_limit'] = limit
+            db.session.execute(update(User).where(User.id.in_(user_ids)).values(**values)
+                               .execution_options(synchronize_session=False))
+        if cancelled_users:
+            values = {'tokens_used': 0, 'plan': 'free'}
+            free_limit = db.session.execute(
+                select(BillingPlan.monthly_token_limit).where(BillingPlan.name == 'free')
+            ).scalar()
+            if free_limit is not None:
+                values['tokens_limit'] = free_limit
+            db.session.execute(update(User).where(User.id.in_(cancelled_users)).values(**values)
+                               .execution_options(synchronize_session=False))
+            # Bulk updates skip the User mapper events that drop cached identities
+            for user_id in cancelled_users:
+                invalidate_user(user_id)
+
+        stats['renewed'] = len(rows) - len(cancelled_users)
+        stats['cancelled'] = len(cancelled_users)
+        return stats
+
+    def apply_paid_period(self, subscription_id: int, period_start: datetime, period_end: datetime,
+                          now: Optional[datetime] = None) -> bool:
+        """Start the period a paid invoice covers (payment webhooks); the caller commits
+
+        Whenever the payment arrives, the subscription moves to the invoice's
+        period; a period that is not newer than the current one is a no-op.
+        """
+        row = db.session.execute(
+            self._select().where(UserSubscription.id == subscription_id)
+        ).first()
+        if row is None or (row.current_period_start is not None and period_start <= row.current_period_start):
+            return False
+        self.roll([row], now or datetime.utcnow(), {row.id: (period_start, period_end)})
+        return True
+
+    def run(self, now: Optional[datetime] = None, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """Roll every due subscription, one committed page at a time"""
+        now = now or datetime.utcnow()
+        totals = {'renewed': 0, 'cancelled': 0, 'batches': 0, 'conflicts': 0}
+        previous = None
+        while max_batches is None or totals['batches'] < max_batches:
+            rows = self.due(now, self.batch_size)
+            if not rows:
+                break
+            try:
+                stats = self.roll(rows, now)
+                db.session.commit()
+            except IntegrityError:
+                # Another runner rolled (part of) this page first; re-read what is still due
+                db.session.rollback()
+                totals['conflicts'] += 1
+                ids = [row.id for row in rows]
+                if ids == previous:
+                    logger.error(f"Billing rollover stuck on subscriptions {ids[:10]}")
+                    break
+                previous = ids
+                continue
+            totals['renewed'] += stats['renewed']
+            totals['cancelled'] += stats['cancelled']
+            totals['batches'] += 1
+        return totals
+
+    # Scheduler
+
+    def start(self, app):
+        """Run the rollover every BILLING_ROLLOVER_INTERVAL seconds in a daemon thread (serving process only)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name='billing-rollover', daemon=True)
+            self._thread.start()
+
+    def _run(self, app):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with app.app_context():
+                    totals = self.run()
+                if totals['renewed'] or totals['cancelled']:
+                    logger.info(f"Billing rollover: {totals['renewed']} renewed, {totals['cancelled']} cancelled")
+            except Exception:
+                logger.exception('Billing rollover run failed')
+
+# Global billing rollover instance
+billing_rollover = BillingRollover()
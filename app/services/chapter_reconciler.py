@@ -0,0 +1,129 @@
+# app/services/chapter_reconciler.py - Apply chapter edits as a diff against existing rows
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+from app import db
+from app.models import StoryChapter
+
+def chapter_section(title: Optional[str], content: Optional[str]) -> str:
+    """A chapter's part of Story.content"""
+    return f"# {title}\n\n{content or ''}\n\n"
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+def _incoming_fields(data: Dict) -> Dict:
+    """Only the fields the client sent; absent keys leave the row as is"""
+    fields = {}
+    if 'title' in data:
+        fields['title'] = data['title']
+    if 'content' in data:
+        fields['content'] = data['content']
+    if 'scenes' in data:
+        fields['scene_ids'] = json.dumps(data['scenes'] or [])
+    return fields
+
+def reconcile_chapters(story, incoming: List[Dict], partial: bool = False,
+                       sync_content: Optional[bool] = None) -> Dict:
+    """Match incoming chapters to story.chapters and write only what changed
+
+    Chapters match by id, then by identical title and content (moved
+    chapters), then by position. Unmatched incoming chapters are created and,
+    unless partial, unmatched rows are deleted. With partial the list is a
+    set of edits to existing chapters (by id or position) in no given order.
+
+    Story.content is kept as the concatenation of chapter sections when it
+    already was one (sync_content=None), always (True) or never (False);
+    word_count is adjusted by the changed sections only when possible.
+    """
+    existing = sorted(story.chapters, key=lambda c: (c.order or 0, c.id or 0))
+    old_sections = {c.id: chapter_section(c.title, c.content) for c in existing}
+    composed = story.content == ''.join(old_sections[c.id] for c in existing)
+    if sync_content is None:
+        sync_content = composed and bool(existing)
+
+    by_id = {c.id: c for c in existing}
+    by_text = {}
+    for chapter in existing:
+        by_text.setdefault((chapter.title, chapter.content), []).append(chapter)
+
+    matches = [None] * len(incoming)
+    used = set()
+    for i, data in enumerate(incoming):
+        chapter = by_id.get(data.get('id'))
+        if chapter is not None and chapter.id not in used:
+            matches[i] = chapter
+            used.add(chapter.id)
+    if not partial:
+        for i, data in enumerate(incoming):
+            if matches[i] is None:
+                for chapter in by_text.get((data.get('title'), data.get('content')), []):
+                    if chapter.id not in used:
+                        matches[i] = chapter
+                        used.add(chapter.id)
+                        break
+    for i, data in enumerate(incoming):
+        position = data.get('index', i) if partial else i
+        if matches[i] is None and 0 <= position < len(existing) and existing[position].id not in used:
+            matches[i] = existing[position]
+            used.add(existing[position].id)
+
+    stats = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    changed_sections = {}  # chapter -> (old section, new section)
+    reordered = False
+    now = datetime.utcnow()
+
+    for i, data in enumerate(incoming):
+        chapter = matches[i]
+        fields = _incoming_fields(data)
+        if chapter is None:
+            if partial:
+                continue  # Edits only ever target existing chapters
+            chapter = StoryChapter(story_id=story.id, title=fields.get('title') or f'Kapitola {i + 1}',
+                                   content=fields.get('content'), scene_ids=fields.get('scene_ids', '[]'),
+                                   order=i)
+            story.chapters.append(chapter)
+            db.session.add(chapter)
+            stats['created'] += 1
+            changed_sections[chapter] = ('', chapter_section(chapter.title, chapter.content))
+            continue
+
+        if not partial:
+            fields['order'] = i
+        changes = {name: value for name, value in fields.items() if getattr(chapter, name) != value}
+        if not changes:
+            stats['unchanged'] += 1
+            continue
+        for name, value in changes.items():
+            setattr(chapter, name, value)
+        chapter.updated_at = now
+        stats['updated'] += 1
+        reordered = reordered or 'order' in changes
+        if 'title' in changes or 'content' in changes:
+            changed_sections[chapter] = (old_sections[chapter.id], chapter_section(chapter.title, chapter.content))
+
+    if not partial:
+        for chapter in existing:
+            if chapter.id not in used:
+                story.chapters.remove(chapter)
+                db.session.delete(chapter)
+                stats['deleted'] += 1
+                changed_sections[chapter] = (old_sections[chapter.id], '')
+
+    chapters = sorted(story.chapters, key=lambda c: (c.order or 0, c.id or 0))
+    if sync_content and (changed_sections or reordered or not composed):
+        story.content = ''.join(
+            changed_sections[c][1] if c in changed_sections else old_sections[c.id] for c in chapters
+        )
+        if composed:
+            # Only the sections that changed are re-counted
+            story.word_count = (story.word_count or 0) + sum(
+                _words(new) - _words(old) for old, new in changed_sections.values()
+            )
+        else:
+            story.word_count = _words(story.content)
+    if any(stats[k] for k in ('created', 'updated', 'deleted')):
+        story.updated_at = now
+
+    stats['chapters'] = chapters
+    return stats
@@ -13,21 +13,22 @@ try:
 except ImportError:
     FLASK_AVAILABLE = False
 
-# Try different Anthropic imports for compatibility
-try:
-    from anthropic import Anthropic, Client
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
-    print("Warning: Anthropic package not installed. AI will run in simulation mode.")
+from app.utils.lazy_imports import lazy_module
+from app.utils.db_session import before_external_call
+from app.utils.request_metrics import record_ai_time
+from app.services.simulated_claude import simulated_claude
+
+# SDKs are imported on first use; availability checks don't import them
+anthropic = lazy_module('anthropic')
+ANTHROPIC_AVAILABLE = anthropic.available
 
 # Try tiktoken for token counting
-try:
-    import tiktoken
-    TIKTOKEN_AVAILABLE = True
-except ImportError:
-    TIKTOKEN_AVAILABLE = False
-    print("Warning: tiktoken not installed. Token counting will use estimation.")
+tiktoken = lazy_module('tiktoken')
+TIKTOKEN_AVAILABLE = tiktoken.available
+
+@lru_cache(maxsize=1)
+def _get_tokenizer():
+    return tiktoken.encoding_for_model("gpt-4")  # Close approximation for Claude
 
 class ClaudeAPIClient:
     """Claude API client for StoryForge AI with compatibility fixes"""
@@ -66,7 +67,7 @@ class ClaudeAPIClient:
                 http_client = CustomHTTPClient(session=session)
                 
                 # Initialize Anthropic client with custom HTTP client
-                self.client = Anthropic(
+                self.client = anthropic.Anthropic(
                     api_key=self.api_key,
                     http_client=http_client
                 )
@@ -119,16 +120,19 @@ class ClaudeAPIClient:
         
         try:
             # Use tiktoken for more accurate counting
-            tokenizer = tiktoken.encoding_for_model("gpt-4")  # Close approximation for Claude
-            return len(tokenizer.encode(text))
+            return len(_get_tokenizer().encode(text))
         except Exception:
             # Fallback estimation
             return int(len(text.split()) * 1.3)
     
+    @record_ai_time
     def _make_request(self, prompt: str, system_prompt: str = None, max_tokens: int = 2000) -> str:
         """Make request to Claude API with error handling"""
+        # Don't hold a pooled DB connection for the whole round-trip
+        before_external_call()
+        
         if self.simulation_mode:
-            return self._simulate_response(prompt)
+            return self._simulate_response(prompt, max_tokens)
         
         try:
             self._check_rate_limit()
@@ -179,16 +183,23 @@ class ClaudeAPIClient:
             if any(keyword in error_msg.lower() for keyword in ['rate limit', 'quota', 'billing', 'api key', 'proxy']):
                 self._safe_log("Claude API: Critical error, switching to simulation mode", 'warning')
                 self.simulation_mode = True
-                return self._simulate_response(prompt)
+                return self._simulate_response(prompt, max_tokens, inject_errors=False)
             else:
                 # For other errors, try simulation as fallback
                 self._safe_log("Claude API: Temporary error, using simulation fallback", 'info')
-                return self._simulate_response(prompt)
+                return self._simulate_response(prompt, max_tokens, inject_errors=False)
     
-    def _simulate_response(self, prompt: str) -> str:
-        """Simulate AI response for development/testing"""
-        time.sleep(0.5)  # Simulate API delay
+    def _simulate_response(self, prompt: str, max_tokens: int = 2000, inject_errors: bool = True) -> str:
+        """Simulate AI response for development/testing
         
+        Latency, output size and injected failures follow the AI_SIM_* profile
+        (see app/services/simulated_claude.py); the default matches a fixed 0.5 s.
+        """
+        return simulated_claude.complete(prompt, self.canned_response(prompt), max_tokens, inject_errors)
+    
+    @staticmethod
+    def canned_response(prompt: str) -> str:
+        """Fixed simulated answer for the kind of prompt"""
         prompt_lower = prompt.lower()
         
         # FIXED: Return clean JSON without newlines or extra spaces
@@ -213,6 +224,7 @@ class ClaudeAPIClient:
             return {
                 "status": "simulation",
                 "message": "Running in simulation mode",
+                "simulation_profile": simulated_claude.stats(),
                 "api_key_present": bool(self.api_key),
                 "sdk_available": ANTHROPIC_AVAILABLE
             }
@@ -1,7 +1,11 @@
 # app/services/collaboration_manager.py - Collaboration Management
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
-from app.models import ProjectCollaborator, Project, User
+from flask import current_app
+from sqlalchemy.orm import joinedload
+from app.models import ProjectCollaborator, ProjectCollaborationStats, Project, User, Comment
+from app.utils.pagination import encode_cursor, decode_cursor, parse_datetime
+from app.utils.identity import get_user_identity
 from app import db
 import json
 
@@ -139,9 +143,139 @@ class CollaborationManager:
             'timestamp': datetime.utcnow().isoformat()
         }, room=f'project_{project_id}')
     
+    # Comment retrieval
+    
+    def list_comments(self, project_id: str, scene_id: Optional[int] = None,
+                      cursor: Optional[str] = None, limit: int = 50) -> Dict:
+        """Newest-first comment page with authors preloaded"""
+        query = Comment.query.options(joinedload(Comment.user)).filter(
+            Comment.project_id == project_id
+        )
+        if scene_id:
+            query = query.filter(Comment.scene_id == scene_id)
+        
+        query = self._apply_created_cursor(query, cursor)
+        rows = query.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1).all()
+        
+        page, next_cursor = self._split_page(rows, limit)
+        return {
+            'comments': [c.to_dict() for c in page],
+            'next_cursor': next_cursor
+        }
+    
+    def list_comment_threads(self, project_id: str, scene_id: Optional[int] = None,
+                             cursor: Optional[str] = None, limit: int = 20,
+                             reply_limit: int = 3) -> Dict:
+        """Newest-first top-level comments with reply counts and first replies"""
+        query = Comment.query.options(joinedload(Comment.user)).filter(
+            Comment.project_id == project_id,
+            Comment.parent_comment_id.is_(None)
+        )
+        if scene_id:
+            query = query.filter(Comment.scene_id == scene_id)
+        
+        query = self._apply_created_cursor(query, cursor)
+        rows = query.order_by(Comment.created_at.desc(), Comment.id.desc()).limit(limit + 1).all()
+        roots, next_cursor = self._split_page(rows, limit)
+        
+        replies_by_root = self._first_replies(
+            [root.id for root in roots], reply_limit
+        )
+        
+        threads = []
+        for root in roots:
+            reply_count, replies = replies_by_root.get(root.id, (0, []))
+            thread = root.to_dict()
+            thread['reply_count'] = reply_count
+            thread['replies'] = [r.to_dict() for r in replies]
+            threads.append(thread)
+        
+        return {
+            'threads': threads,
+            'next_cursor': next_cursor
+        }
+    
+    def list_thread_replies(self, root_comment_id: int, cursor: Optional[str] = None,
+                            limit: int = 50) -> Dict:
+        """Replies of one thread in depth-first (materialized path) order"""
+        query = Comment.query.options(joinedload(Comment.user)).filter(
+            Comment.root_comment_id == root_comment_id,
+            Comment.id != root_comment_id
+        )
+        
+        decoded = decode_cursor(cursor)
+        if decoded:
+            query = query.filter(Comment.thread_path > str(decoded[0]))
+        
+        rows = query.order_by(Comment.thread_path).limit(limit + 1).all()
+        page = rows[:limit]
+        next_cursor = encode_cursor(page[-1].thread_path) if len(rows) > limit else None
+        
+        return {
+            'comments': [c.to_dict() for c in page],
+            'next_cursor': next_cursor
+        }
+    
+    def _first_replies(self, root_ids: List[int], reply_limit: int) -> Dict:
+        """Fetch reply counts and the first K replies of many threads in one query"""
+        if not root_ids:
+            return {}
+        
+        ranked = db.session.query(
+            Comment.id.label('comment_id'),
+            db.func.row_number().over(
+                partition_by=Comment.root_comment_id,
+                order_by=Comment.thread_path
+            ).label('position'),
+            db.func.count(Comment.id).over(
+                partition_by=Comment.root_comment_id
+            ).label('reply_count')
+        ).filter(
+            Comment.root_comment_id.in_(root_ids),
+            Comment.parent_comment_id.isnot(None)
+        ).subquery()
+        
+        rows = db.session.query(Comment, ranked.c.position, ranked.c.reply_count).options(
+            joinedload(Comment.user)
+        ).join(
+            ranked, ranked.c.comment_id == Comment.id
+        ).filter(
+            ranked.c.position <= max(reply_limit, 1)
+        ).order_by(Comment.root_comment_id, ranked.c.position).all()
+        
+        result = {}
+        for comment, position, reply_count in rows:
+            count, replies = result.setdefault(comment.root_comment_id, (reply_count, []))
+            if position <= reply_limit:
+                replies.append(comment)
+        return result
+    
+    def _apply_created_cursor(self, query, cursor: Optional[str]):
+        """Keyset filter for (created_at DESC, id DESC) ordering"""
+        decoded = decode_cursor(cursor)
+        if not decoded or len(decoded) != 2:
+            return query
+        
+        created_at, comment_id = parse_datetime(decoded[0]), decoded[1]
+        if created_at is None:
+            return query
+        
+        return query.filter(db.or_(
+            Comment.created_at < created_at,
+            db.and_(Comment.created_at == created_at, Comment.id < comment_id)
+        ))
+    
+    def _split_page(self, rows: List[Comment], limit: int):
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return page, next_cursor
+    
     def _get_user_info(self, user_id: int) -> Dict:
         """Get basic user info for notifications"""
-        user = User.query.get(user_id)
+        user = get_user_identity(user_id)
         if user:
             return {
                 'id': user.id,
@@ -152,33 +286,127 @@ class CollaborationManager:
     
     def get_collaboration_analytics(self, project_id: str) -> Dict:
         """Get collaboration analytics for project"""
-        collaborators = ProjectCollaborator.query.filter_by(
-            project_id=project_id
-        ).all()
+        stats = self._get_counter_stats(project_id)
+        if stats is None:
+            stats = self._aggregate_collaboration_stats(project_id)
         
-        # Calculate activity metrics
-        total_collaborators = len(collaborators)
-        active_collaborators = len([
-            c for c in collaborators 
-            if c.last_access and (datetime.utcnow() - c.last_access).days < 7
-        ])
-        
-        # Comment metrics
-        from app.models import Comment
-        comments = Comment.query.filter_by(project_id=project_id).all()
-        total_comments = len(comments)
-        resolved_comments = len([c for c in comments if c.is_resolved])
+        total_collaborators = stats['total_collaborators']
+        active_collaborators = self._count_active_collaborators(project_id)
+        total_comments = stats['total_comments']
         
         return {
             'total_collaborators': total_collaborators,
             'active_collaborators': active_collaborators,
+            'pending_invitations': stats['pending_invitations'],
             'total_comments': total_comments,
-            'resolved_comments': resolved_comments,
+            'resolved_comments': stats['resolved_comments'],
             'collaboration_score': self._calculate_collaboration_score(
                 total_collaborators, active_collaborators, total_comments
             )
         }
     
+    def _aggregate_collaboration_stats(self, project_id: str) -> Dict:
+        """Compute collaborator and comment counts in a single SQL round-trip"""
+        collaborator_counts = db.session.query(
+            db.func.count(ProjectCollaborator.id).label('total_collaborators'),
+            db.func.coalesce(db.func.sum(
+                db.case((ProjectCollaborator.status == 'pending', 1), else_=0)
+            ), 0).label('pending_invitations')
+        ).filter(ProjectCollaborator.project_id == project_id).subquery()
+        
+        comment_counts = db.session.query(
+            db.func.count(Comment.id).label('total_comments'),
+            db.func.coalesce(db.func.sum(
+                db.case((Comment.is_resolved == True, 1), else_=0)  # noqa: E712
+            ), 0).label('resolved_comments')
+        ).filter(Comment.project_id == project_id).subquery()
+        
+        # Both subqueries yield exactly one row, so the join is a 1x1 product
+        row = db.session.query(collaborator_counts, comment_counts).select_from(
+            collaborator_counts
+        ).join(comment_counts, db.true()).one()
+        
+        return {
+            'total_collaborators': int(row.total_collaborators),
+            'pending_invitations': int(row.pending_invitations),
+            'total_comments': int(row.total_comments),
+            'resolved_comments': int(row.resolved_comments)
+        }
+    
+    def _count_active_collaborators(self, project_id: str, days: int = 7) -> int:
+        """Count collaborators seen within the activity window"""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        return db.session.query(db.func.count(ProjectCollaborator.id)).filter(
+            ProjectCollaborator.project_id == project_id,
+            ProjectCollaborator.last_access > cutoff
+        ).scalar() or 0
+    
+    # Denormalized counters
+    
+    def _counters_enabled(self) -> bool:
+        try:
+            return current_app.config.get('COLLABORATION_COUNTERS_ENABLED', False)
+        except RuntimeError:
+            return False
+    
+    def _get_counter_stats(self, project_id: str) -> Optional[Dict]:
+        """Read the counters row; None (live aggregates) until a write or the CLI creates it
+        
+        Analytics is served from a read-only route, so it never writes the row.
+        """
+        if not self._counters_enabled():
+            return None
+        
+        stats = ProjectCollaborationStats.query.get(project_id)
+        return stats.to_dict() if stats else None
+    
+    def rebuild_counters(self, project_id: str) -> ProjectCollaborationStats:
+        """Recompute the counters row for a project from source tables"""
+        aggregated = self._aggregate_collaboration_stats(project_id)
+        
+        stats = ProjectCollaborationStats.query.get(project_id)
+        if not stats:
+            stats = ProjectCollaborationStats(project_id=project_id)
+            db.session.add(stats)
+        
+        for field, value in aggregated.items():
+            setattr(stats, field, value)
+        
+        return stats
+    
+    def _bump_counters(self, project_id: str, **deltas):
+        """Atomically apply counter deltas in the caller's transaction"""
+        if not self._counters_enabled():
+            return
+        
+        values = {
+            getattr(ProjectCollaborationStats, field): getattr(ProjectCollaborationStats, field) + delta
+            for field, delta in deltas.items()
+        }
+        values[ProjectCollaborationStats.updated_at] = datetime.utcnow()
+        
+        updated = ProjectCollaborationStats.query.filter_by(
+            project_id=project_id
+        ).update(values, synchronize_session=False)
+        
+        if not updated:
+            # First write for this project - seed from source tables, which
+            # already include the pending row once the session is flushed
+            db.session.flush()
+            self.rebuild_counters(project_id)
+    
+    def record_comment_added(self, project_id: str):
+        self._bump_counters(project_id, total_comments=1)
+    
+    def record_comment_resolved(self, project_id: str):
+        self._bump_counters(project_id, resolved_comments=1)
+    
+    def record_invitation_sent(self, project_id: str):
+        self._bump_counters(project_id, total_collaborators=1, pending_invitations=1)
+    
+    def record_invitation_accepted(self, project_id: str):
+        self._bump_counters(project_id, pending_invitations=-1)
+    
     def _calculate_collaboration_score(self, total: int, active: int, comments: int) -> float:
         """Calculate collaboration engagement score"""
         if total == 0:
@@ -0,0 +1,235 @@
+# app/services/export_cache.py - Content-addressed cache of rendered story exports
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict, Optional
+from flask import current_app, request, send_file, Response
+
+# Bump when export layout changes so old artifacts are never served
+EXPORT_RENDER_VERSION = 3
+
+EXPORT_FORMATS = {
+    'txt': 'text/plain',
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'epub': 'application/epub+zip',
+}
+
+def story_content_hash(story, format_type: str, chapters=None) -> str:
+    """Hash of everything that affects the rendered export
+
+    chapters may be a streamed iterable (see iter_story_chapters) so hashing
+    never needs the whole manuscript in memory.
+    """
+    digest = hashlib.sha256()
+    header = [EXPORT_RENDER_VERSION, format_type, story.id, story.title,
+              story.premise, story.story_metadata]
+    digest.update(json.dumps(header, default=str).encode('utf-8'))
+
+    if chapters is None:
+        chapters = sorted(story.chapters, key=lambda c: (c.order or 0, c.id or 0))
+    has_chapters = False
+    for chapter in chapters:
+        has_chapters = True
+        digest.update(b'\x00')
+        digest.update(json.dumps([chapter.title, chapter.content]).encode('utf-8'))
+
+    # Text exports of chapterless stories fall back to the flat manuscript
+    if format_type == 'txt' and not has_chapters:
+        digest.update(b'\x01')
+        digest.update((story.content or '').encode('utf-8'))
+    return digest.hexdigest()
+
+class ExportArtifactCache:
+    """On-disk export store with size-bounded LRU eviction (mtime = last use)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Lazily scanned per process
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def cache_dir(self) -> str:
+        cache_dir = current_app.config.get('EXPORT_CACHE_DIR') or os.path.join(
+            current_app.instance_path, 'export_cache'
+        )
+        os.makedirs(cache_dir, exist_ok=True)
+        return cache_dir
+
+    @property
+    def max_bytes(self) -> int:
+        return int(current_app.config.get('EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+    @property
+    def enabled(self) -> bool:
+        return current_app.config.get('EXPORT_CACHE_ENABLED', True)
+
+    def relative_path(self, story_id: int, format_type: str, digest: str) -> str:
+        return os.path.join(str(story_id), f'{format_type}-{digest}.{format_type}')
+
+    def get(self, story_id: int, format_type: str, digest: str) -> Optional[str]:
+        """Path of a cached artifact, refreshing its LRU position"""
+        path = os.path.join(self.cache_dir, self.relative_path(story_id, format_type, digest))
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, story_id: int, format_type: str, digest: str, stream) -> str:
+        """Store a rendered artifact atomically and evict older entries
+
+        stream is a file-like object or an iterable of byte chunks.
+        """
+        relative = self.relative_path(story_id, format_type, digest)
+        path = os.path.join(self.cache_dir, relative)
+        story_dir = os.path.dirname(path)
+        os.makedirs(story_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=story_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                if hasattr(stream, 'read'):
+                    shutil.copyfileobj(stream, handle)
+                else:
+                    for chunk in stream:
+                        handle.write(chunk)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+
+        # Superseded renders of the same story/format can never be hit again
+        freed = 0
+        prefix = f'{format_type}-'
+        for name in os.listdir(story_dir):
+            stale = os.path.join(story_dir, name)
+            if name.startswith(prefix) and stale != path and not name.endswith('.tmp'):
+                freed += self._remove(stale)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += size - freed
+        self._evict_if_needed()
+        return path
+
+    def _fragment_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, 'fragments', key[:2], f'{key}.pdf')
+
+    def get_fragment(self, key: str) -> Optional[bytes]:
+        """Cached per-chapter PDF fragment (content addressed)"""
+        path = self._fragment_path(key)
+        try:
+            os.utime(path)
+            with open(path, 'rb') as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def put_fragment(self, key: str, data: bytes):
+        """Store a fragment; evicted with the same LRU budget as full exports"""
+        path = self._fragment_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(data)
+        self._evict_if_needed()
+
+    def invalidate_story(self, story_id: int):
+        """Drop every cached artifact for a story"""
+        story_dir = os.path.join(self.cache_dir, str(story_id))
+        if not os.path.isdir(story_dir):
+            return
+        freed = sum(self._remove(os.path.join(story_dir, name)) for name in os.listdir(story_dir))
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= freed
+
+    def _remove(self, path: str) -> int:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            return size
+        except FileNotFoundError:
+            return 0
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Evict least recently used down to 90% of the budget
+            target = int(self.max_bytes * 0.9)
+            entries = sorted(self._scan())
+            self._total_bytes = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self._total_bytes <= target:
+                    break
+                self._total_bytes -= self._remove(path)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'total_bytes': self._total_bytes,
+            'max_bytes': self.max_bytes
+        }
+
+    def send(self, path: str, format_type: str, digest: str, download_name: str) -> Response:
+        """Serve an artifact via nginx X-Accel-Redirect when configured, else sendfile"""
+        accel_prefix = current_app.config.get('EXPORT_CACHE_ACCEL_REDIRECT')
+        if accel_prefix:
+            relative = os.path.relpath(path, self.cache_dir).replace(os.sep, '/')
+            # nginx streams the file from its internal location
+            response = Response(mimetype=EXPORT_FORMATS[format_type])
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + relative
+        else:
+            response = send_file(
+                path, mimetype=EXPORT_FORMATS[format_type], as_attachment=True,
+                download_name=download_name, etag=False, conditional=True
+            )
+        response.set_etag(digest)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+def not_modified(digest: str) -> Optional[Response]:
+    """304 response when the client already holds this export"""
+    if request.if_none_match and request.if_none_match.contains(digest):
+        response = Response(status=304)
+        response.set_etag(digest)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+# Global export cache instance
+export_cache = ExportArtifactCache()
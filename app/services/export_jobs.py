@@ -0,0 +1,216 @@
+# app/services/export_jobs.py - Background export rendering in a process pool
+import io
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from flask import current_app
+from app.services.export_cache import export_cache, story_content_hash, EXPORT_FORMATS
+
+JOB_ID_PATTERN = re.compile(r'^(txt|pdf|docx|epub)-([0-9a-f]{64})$')
+
+class ChapterSnapshot:
+    """Picklable copy of the chapter fields used by the exporters"""
+
+    def __init__(self, id, title, content, order):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.order = order
+
+class StorySnapshot:
+    """Picklable copy of a Story so rendering can run outside the session"""
+
+    def __init__(self, story):
+        self.id = story.id
+        self.title = story.title
+        self.premise = story.premise
+        self.content = story.content
+        self.story_metadata = story.story_metadata
+        self.chapters = [
+            ChapterSnapshot(c.id, c.title, c.content or '', c.order)
+            for c in sorted(story.chapters, key=lambda c: (c.order or 0, c.id or 0))
+        ]
+
+def render_export(snapshot: StorySnapshot, format_type: str) -> bytes:
+    """Render one export format; runs in a worker process"""
+    from app.services.export_service import export_service
+    if format_type == 'txt':
+        return b''.join(export_service.stream_txt(snapshot, snapshot.chapters))
+
+    renderer = getattr(export_service, f'generate_{format_type}')
+    return renderer(snapshot).getvalue()
+
+class ExportJob:
+    """State of one export render; the id is derived from the content hash"""
+
+    def __init__(self, story_id: int, format_type: str, digest: str):
+        self.story_id = story_id
+        self.format = format_type
+        self.digest = digest
+        self.status = 'pending'
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.completed_at = None
+
+    @property
+    def id(self) -> str:
+        return make_job_id(self.format, self.digest)
+
+    def to_dict(self) -> Dict:
+        return {
+            'jobId': self.id,
+            'format': self.format,
+            'status': self.status,
+            'error': self.error,
+            'createdAt': self.created_at.isoformat(),
+            'completedAt': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+def make_job_id(format_type: str, digest: str) -> str:
+    return f'{format_type}-{digest}'
+
+def parse_job_id(job_id: str):
+    """Split a job id into (format, digest), or None if malformed"""
+    match = JOB_ID_PATTERN.match(job_id or '')
+    return (match.group(1), match.group(2)) if match else None
+
+class ExportJobManager:
+    """Submits renders to a worker pool and stores results in the export cache
+
+    Job ids are content addressed, so any web worker can answer for a job
+    whose artifact is already cached, and resubmitting is always safe.
+    """
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs = {}  # {(story_id, job_id): ExportJob}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._orchestrator = None
+
+    def get_executor(self):
+        """Worker pool used for CPU-bound layout (process pool by default)"""
+        with self._lock:
+            if self._executor is None:
+                workers = current_app.config.get('EXPORT_JOB_WORKERS', 2)
+                if current_app.config.get('EXPORT_JOB_EXECUTOR', 'process') == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=workers, thread_name_prefix='export-job'
+                    )
+            return self._executor
+
+    def _get_orchestrator(self):
+        # PDF jobs fan chapter fragments out to the worker pool from a thread
+        with self._lock:
+            if self._orchestrator is None:
+                self._orchestrator = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('EXPORT_JOB_WORKERS', 2),
+                    thread_name_prefix='export-pdf'
+                )
+            return self._orchestrator
+
+    def submit(self, story, format_type: str) -> ExportJob:
+        """Queue a render unless it is cached or already running"""
+        digest = story_content_hash(story, format_type)
+        key = (story.id, make_job_id(format_type, digest))
+
+        with self._lock:
+            job = self._jobs.get(key)
+        if job and (job.status == 'pending' or self._artifact_exists(job)):
+            return job
+
+        job = ExportJob(story.id, format_type, digest)
+        if export_cache.get(story.id, format_type, digest):
+            job.status = 'completed'
+            job.completed_at = datetime.utcnow()
+            self._remember(key, job)
+            return job
+
+        self._remember(key, job)
+        app = current_app._get_current_object()
+        if format_type == 'pdf':
+            future = self._get_orchestrator().submit(self._render_pdf, app, StorySnapshot(story))
+        else:
+            future = self.get_executor().submit(render_export, StorySnapshot(story), format_type)
+        future.add_done_callback(lambda f: self._finish(app, job, f))
+        return job
+
+    def prerender(self, story, formats: List[str] = None) -> List[ExportJob]:
+        """Queue every configured format after a story is saved"""
+        formats = formats if formats is not None else current_app.config.get(
+            'EXPORT_PRERENDER_FORMATS', []
+        )
+        jobs = []
+        for format_type in formats:
+            if format_type in EXPORT_FORMATS:
+                try:
+                    jobs.append(self.submit(story, format_type))
+                except Exception as e:
+                    current_app.logger.warning(f'Export pre-render failed to queue: {e}')
+        return jobs
+
+    def get(self, story, job_id: str) -> Optional[ExportJob]:
+        """Job state for a story; None when the id no longer matches its content"""
+        parsed = parse_job_id(job_id)
+        if not parsed:
+            return None
+        format_type, digest = parsed
+        if story_content_hash(story, format_type) != digest:
+            return None
+
+        with self._lock:
+            job = self._jobs.get((story.id, job_id))
+        if job and (job.status != 'completed' or self._artifact_exists(job)):
+            return job
+
+        # Unknown here (another worker, a restart or an evicted artifact):
+        # resubmitting is idempotent
+        return self.submit(story, format_type)
+
+    def _artifact_exists(self, job: ExportJob) -> bool:
+        return job.status == 'completed' and export_cache.get(
+            job.story_id, job.format, job.digest
+        ) is not None
+
+    def artifact_path(self, job: ExportJob) -> Optional[str]:
+        if job.status != 'completed':
+            return None
+        return export_cache.get(job.story_id, job.format, job.digest)
+
+    def _remember(self, key, job: ExportJob):
+        with self._lock:
+            if key not in self._jobs and len(self._jobs) >= self.max_jobs:
+                # Forget the oldest finished job first
+                finished = [k for k, j in self._jobs.items() if j.status != 'pending']
+                self._jobs.pop(finished[0] if finished else next(iter(self._jobs)))
+            self._jobs[key] = job
+
+    def _render_pdf(self, app, snapshot: StorySnapshot) -> bytes:
+        from app.services.export_service import export_service
+        with app.app_context():
+            return export_service.generate_pdf(
+                snapshot, fragment_store=export_cache, executor=self.get_executor()
+            ).getvalue()
+
+    def _finish(self, app, job: ExportJob, future):
+        with app.app_context():
+            try:
+                export_cache.put(job.story_id, job.format, job.digest, io.BytesIO(future.result()))
+                job.status = 'completed'
+            except Exception as e:
+                app.logger.error(f'Export job {job.id} failed: {e}')
+                job.status = 'failed'
+                job.error = str(e)
+            job.completed_at = datetime.utcnow()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ('pending', 'completed', 'failed')}
+
+# Global export job manager instance
+export_jobs = ExportJobManager()
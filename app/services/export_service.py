@@ -3,114 +3,46 @@ import io
 import json
 import tempfile
 import os
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from docx import Document
-from docx.shared import Pt, Inches
-from ebooklib import epub
+import zipfile
+from datetime import datetime
 import html
+from app.utils.lazy_imports import lazy_module
+
+# Layout engines are imported on first export, not at app start
+docx = lazy_module('docx')
+pdf_fragments = lazy_module('app.services.pdf_fragments')
+
+STREAM_CHUNK_SIZE = 64 * 1024
+EPUB_SPOOL_MAX_SIZE = 8 * 1024 * 1024  # Spill EPUB assembly to disk beyond this
 
 class ExportService:
     def __init__(self):
         self.temp_dir = tempfile.gettempdir()
     
-    def generate_pdf(self, story):
-        """Generate a PDF from the story"""
-        buffer = io.BytesIO()
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
+    def generate_pdf(self, story, chapters=None, fragment_store=None, executor=None):
+        """Generate a PDF from the story, re-rendering only changed chapters"""
+        if pdf_fragments.PDF_MERGE_AVAILABLE:
+            return pdf_fragments.pdf_fragment_renderer.render(story, chapters, fragment_store, executor)
         
-        # Create custom styles
-        title_style = ParagraphStyle(
-            'TitleStyle',
-            parent=styles['Title'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1  # Center alignment
-        )
+        # Without pypdf, lay out the whole story in one pass
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, PageBreak
         
-        premise_style = ParagraphStyle(
-            'PremiseStyle',
-            parent=styles['Italic'],
-            fontSize=12,
-            spaceBefore=0,
-            spaceAfter=20,
-            alignment=1  # Center alignment
-        )
-        
-        chapter_title_style = ParagraphStyle(
-            'ChapterTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceBefore=20,
-            spaceAfter=20,
-            alignment=1  # Center alignment
-        )
-        
-        body_style = ParagraphStyle(
-            'BodyStyle',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceBefore=12,
-            spaceAfter=12,
-            leading=14
-        )
-        
-        # Create content elements
         elements = []
+        for i, (kind, payload) in enumerate(pdf_fragments.story_fragment_specs(story, chapters)):
+            if i:
+                elements.append(PageBreak())
+            elements.extend(pdf_fragments.FRAGMENT_BUILDERS[kind](payload))
         
-        # Add title and premise
-        elements.append(Paragraph(story.title, title_style))
-        if story.premise:
-            elements.append(Paragraph(story.premise, premise_style))
-        elements.append(Spacer(1, 30))
-        
-        # Get chapters
-        metadata = json.loads(story.metadata) if story.metadata else {}
-        
-        # Add chapters
-        for chapter in story.chapters:
-            elements.append(PageBreak())
-            elements.append(Paragraph(chapter.title, chapter_title_style))
-            
-            # Process chapter content
-            paragraphs = chapter.content.split('\n\n')
-            for para in paragraphs:
-                if para.strip():
-                    elements.append(Paragraph(para, body_style))
-        
-        # Add metadata page at the end
-        elements.append(PageBreak())
-        elements.append(Paragraph("About This Story", title_style))
-        
-        elements.append(Paragraph(f"<b>Genre:</b> {metadata.get('genre', 'Not specified')}", body_style))
-        elements.append(Paragraph(f"<b>Theme:</b> {metadata.get('theme', 'Not specified')}", body_style))
-        elements.append(Paragraph(f"<b>Target Audience:</b> {metadata.get('targetAudience', 'Not specified')}", body_style))
-        elements.append(Paragraph(f"<b>Tone:</b> {metadata.get('tone', 'Not specified')}", body_style))
-        
-        if metadata.get('uniqueElements'):
-            elements.append(Paragraph("<b>Unique Elements:</b>", body_style))
-            for element in metadata.get('uniqueElements', []):
-                elements.append(Paragraph(f"• {element}", body_style))
-        
-        if metadata.get('keySymbols'):
-            elements.append(Paragraph("<b>Key Symbols:</b>", body_style))
-            for symbol in metadata.get('keySymbols', []):
-                elements.append(Paragraph(f"• {symbol}", body_style))
-        
-        # Build PDF
-        doc.build(elements)
+        buffer = io.BytesIO()
+        SimpleDocTemplate(buffer, pagesize=letter).build(elements)
         buffer.seek(0)
         return buffer
     
     def generate_docx(self, story):
         """Generate a DOCX from the story"""
         # Create DOCX document
-        doc = Document()
+        doc = docx.Document()
         
         # Add title and premise
         doc.add_heading(story.title, 0)
@@ -123,7 +55,7 @@ class ExportService:
         doc.add_page_break()
         
         # Get metadata
-        metadata = json.loads(story.metadata) if story.metadata else {}
+        metadata = json.loads(story.story_metadata) if story.story_metadata else {}
         
         # Add chapters
         for chapter in story.chapters:
@@ -163,152 +95,181 @@ class ExportService:
     
     def generate_epub(self, story):
         """Generate an EPUB from the story"""
-        # Create EPUB book
-        book = epub.EpubBook()
-        
-        # Set metadata
-        book.set_identifier(f'storyforge-{story.id}')
-        book.set_title(story.title)
-        book.set_language('en')
-        
-        metadata = json.loads(story.metadata) if story.metadata else {}
-        if metadata.get('genre'):
-            book.add_metadata('DC', 'subject', metadata.get('genre'))
-        
-        # Add CSS
-        style = '''
-        @namespace epub "http://www.idpf.org/2007/ops";
-        body {
-            font-family: Cambria, Liberation Serif, Bitstream Vera Serif, Georgia, Times, Times New Roman, serif;
-            margin: 5%;
-            text-align: justify;
-        }
-        h1, h2 {
-            text-align: center;
-            page-break-before: always;
-        }
-        .title {
-            margin: 3em 0;
-            text-align: center;
-        }
-        .premise {
-            margin: 1em 10%;
-            text-align: center;
-            font-style: italic;
-        }
-        '''
-        
-        css = epub.EpubItem(
-            uid="style_default",
-            file_name="style/default.css",
-            media_type="text/css",
-            content=style
-        )
-        book.add_item(css)
-        
-        # Add title page
-        title_page = epub.EpubHtml(title='Title Page', file_name='title_page.xhtml')
-        title_page.content = f'''
-        <html xmlns="http://www.w3.org/1999/xhtml">
-        <head>
-            <title>{story.title}</title>
-            <link rel="stylesheet" href="style/default.css" type="text/css" />
-        </head>
-        <body>
-            <div class="title">
-                <h1>{story.title}</h1>
-            </div>
-            
-            {'<div class="premise"><p>' + story.premise + '</p></div>' if story.premise else ''}
-        </body>
-        </html>
-        '''
-        book.add_item(title_page)
-        
-        # Add chapters
-        chapters = []
-        for i, chapter in enumerate(story.chapters):
-            # Create chapter
-            c = epub.EpubHtml(
-                title=chapter.title,
-                file_name=f'chapter_{i+1}.xhtml',
-                lang='en'
-            )
+        buffer = io.BytesIO()
+        self.write_epub(story, story.chapters, buffer)
+        buffer.seek(0)
+        return buffer
+    
+    def stream_txt(self, story, chapters):
+        """Yield a plain-text export one chapter at a time"""
+        yield f"{story.title}\n\n{story.premise or ''}\n\n".encode('utf-8')
+        
+        has_chapters = False
+        for chapter in chapters:
+            has_chapters = True
+            yield f"# {chapter.title}\n\n{chapter.content or ''}\n\n".encode('utf-8')
+        
+        # Stories saved without chapters only have the flat manuscript
+        if not has_chapters and story.content:
+            yield story.content.encode('utf-8')
+    
+    def stream_epub(self, story, chapters, chunk_size=STREAM_CHUNK_SIZE):
+        """Yield an EPUB built chapter by chapter in a spooled temp file"""
+        with tempfile.SpooledTemporaryFile(max_size=EPUB_SPOOL_MAX_SIZE) as spool:
+            self.write_epub(story, chapters, spool)
+            spool.seek(0)
+            while True:
+                chunk = spool.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def write_epub(self, story, chapters, fileobj):
+        """Write an EPUB 3 package into fileobj, holding one chapter at a time"""
+        metadata = json.loads(story.story_metadata) if story.story_metadata else {}
+        title = html.escape(story.title or '')
+        
+        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as book:
+            # The mimetype entry must come first and be stored uncompressed
+            book.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+            book.writestr('META-INF/container.xml', EPUB_CONTAINER_XML)
+            book.writestr('EPUB/style/default.css', EPUB_STYLE)
             
-            # Process chapter content
-            paragraphs = chapter.content.split('\n\n')
-            formatted_paragraphs = [f'<p>{para}</p>' for para in paragraphs if para.strip()]
+            premise = f'<div class="premise"><p>{html.escape(story.premise)}</p></div>' if story.premise else ''
+            book.writestr('EPUB/title_page.xhtml', _xhtml_page(
+                story.title, f'<div class="title"><h1>{title}</h1></div>{premise}'
+            ))
             
-            c.content = f'''
-            <html xmlns="http://www.w3.org/1999/xhtml">
-            <head>
-                <title>{chapter.title}</title>
-                <link rel="stylesheet" href="style/default.css" type="text/css" />
-            </head>
-            <body>
-                <h2>{chapter.title}</h2>
-                {''.join(formatted_paragraphs)}
-            </body>
-            </html>
-            '''
+            # Only titles are kept; chapter bodies are written and released
+            toc = []
+            for i, chapter in enumerate(chapters):
+                file_name = f'chapter_{i + 1}.xhtml'
+                paragraphs = ''.join(
+                    f'<p>{html.escape(para)}</p>'
+                    for para in (chapter.content or '').split('\n\n') if para.strip()
+                )
+                book.writestr(f'EPUB/{file_name}', _xhtml_page(
+                    chapter.title, f'<h2>{html.escape(chapter.title or "")}</h2>{paragraphs}'
+                ))
+                toc.append((file_name, chapter.title))
             
-            book.add_item(c)
-            chapters.append(c)
-        
-        # Add metadata page
-        about_page = epub.EpubHtml(title='About This Story', file_name='about.xhtml')
-        about_page.content = f'''
-        <html xmlns="http://www.w3.org/1999/xhtml">
-        <head>
-            <title>About This Story</title>
-            <link rel="stylesheet" href="style/default.css" type="text/css" />
-        </head>
-        <body>
-            <h2>About This Story</h2>
-            <p><strong>Genre:</strong> {metadata.get('genre', 'Not specified')}</p>
-            <p><strong>Theme:</strong> {metadata.get('theme', 'Not specified')}</p>
-            <p><strong>Target Audience:</strong> {metadata.get('targetAudience', 'Not specified')}</p>
-            <p><strong>Tone:</strong> {metadata.get('tone', 'Not specified')}</p>
+            about = [
+                '<h2>About This Story</h2>',
+                f"<p><strong>Genre:</strong> {html.escape(str(metadata.get('genre', 'Not specified')))}</p>",
+                f"<p><strong>Theme:</strong> {html.escape(str(metadata.get('theme', 'Not specified')))}</p>",
+                f"<p><strong>Target Audience:</strong> {html.escape(str(metadata.get('targetAudience', 'Not specified')))}</p>",
+                f"<p><strong>Tone:</strong> {html.escape(str(metadata.get('tone', 'Not specified')))}</p>",
+            ]
+            for label, key in (('Unique Elements', 'uniqueElements'), ('Key Symbols', 'keySymbols')):
+                if metadata.get(key):
+                    items = ''.join(f'<li>{html.escape(str(item))}</li>' for item in metadata[key])
+                    about.append(f'<p><strong>{label}:</strong></p><ul>{items}</ul>')
+            book.writestr('EPUB/about.xhtml', _xhtml_page('About This Story', ''.join(about)))
+            toc.append(('about.xhtml', 'About This Story'))
             
-            {('<p><strong>Unique Elements:</strong></p><ul>' + 
-              ''.join([f'<li>{element}</li>' for element in metadata.get('uniqueElements', [])]) + 
-              '</ul>') if metadata.get('uniqueElements') else ''}
-              
-            {('<p><strong>Key Symbols:</strong></p><ul>' + 
-              ''.join([f'<li>{symbol}</li>' for symbol in metadata.get('keySymbols', [])]) + 
-              '</ul>') if metadata.get('keySymbols') else ''}
-        </body>
-        </html>
-        '''
-        book.add_item(about_page)
-        chapters.append(about_page)
-        
-        # Define Table Of Contents
-        book.toc = (
-            (epub.Section('Title Page'), (title_page,)),
-            (epub.Section('Chapters'), chapters)
-        )
-        
-        # Add default NCX and Nav
-        book.add_item(epub.EpubNcx())
-        book.add_item(epub.EpubNav())
-        
-        # Define spine
-        book.spine = ['nav', title_page] + chapters
-        
-        # Create the EPUB file
-        buffer = io.BytesIO()
-        epub.write_epub(buffer, book)
-        buffer.seek(0)
-        return buffer
+            # Navigation and package documents come last, once all chapters are known
+            nav_items = ''.join(
+                f'<li><a href="{name}">{html.escape(label or "")}</a></li>' for name, label in toc
+            )
+            book.writestr('EPUB/nav.xhtml', _xhtml_page(
+                'Contents', f'<nav epub:type="toc" id="toc"><h2>Contents</h2><ol>{nav_items}</ol></nav>'
+            ))
+            book.writestr('EPUB/toc.ncx', _ncx(story, toc))
+            book.writestr('EPUB/content.opf', _opf(story, metadata, toc))
+
+EPUB_CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="EPUB/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+EPUB_STYLE = """
+@namespace epub "http://www.idpf.org/2007/ops";
+body {
+    font-family: Cambria, Liberation Serif, Bitstream Vera Serif, Georgia, Times, Times New Roman, serif;
+    margin: 5%;
+    text-align: justify;
+}
+h1, h2 {
+    text-align: center;
+    page-break-before: always;
+}
+.title {
+    margin: 3em 0;
+    text-align: center;
+}
+.premise {
+    margin: 1em 10%;
+    text-align: center;
+    font-style: italic;
+}
+"""
+
+def _xhtml_page(title, body):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<!DOCTYPE html>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="en">'
+        f'<head><title>{html.escape(title or "")}</title>'
+        '<link rel="stylesheet" href="style/default.css" type="text/css" /></head>'
+        f'<body>{body}</body></html>'
+    )
+
+def _ncx(story, toc):
+    points = ''.join(
+        f'<navPoint id="nav-{i}" playOrder="{i}"><navLabel><text>{html.escape(label or "")}</text></navLabel>'
+        f'<content src="{name}"/></navPoint>'
+        for i, (name, label) in enumerate(toc, start=1)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">'
+        f'<head><meta name="dtb:uid" content="storyforge-{story.id}"/></head>'
+        f'<docTitle><text>{html.escape(story.title or "")}</text></docTitle>'
+        f'<navMap>{points}</navMap></ncx>'
+    )
+
+def _opf(story, metadata, toc):
+    manifest = ''.join(
+        f'<item id="item-{i}" href="{name}" media-type="application/xhtml+xml"/>'
+        for i, (name, _) in enumerate(toc, start=1)
+    )
+    spine = ''.join(f'<itemref idref="item-{i}"/>' for i in range(1, len(toc) + 1))
+    subject = f'<dc:subject>{html.escape(str(metadata["genre"]))}</dc:subject>' if metadata.get('genre') else ''
+    modified = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">'
+        '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        f'<dc:identifier id="id">storyforge-{story.id}</dc:identifier>'
+        f'<dc:title>{html.escape(story.title or "")}</dc:title>'
+        f'<dc:language>en</dc:language>{subject}'
+        f'<meta property="dcterms:modified">{modified}</meta>'
+        '</metadata><manifest>'
+        '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+        '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>'
+        '<item id="style" href="style/default.css" media-type="text/css"/>'
+        '<item id="title_page" href="title_page.xhtml" media-type="application/xhtml+xml"/>'
+        f'{manifest}</manifest>'
+        f'<spine toc="ncx"><itemref idref="nav"/><itemref idref="title_page"/>{spine}</spine>'
+        '</package>'
+    )
+
+def iter_story_chapters(story_id, batch_size=50):
+    """Stream chapter rows in order through a server-side cursor"""
+    from app import db
+    from app.models import StoryChapter
+    
+    query = (
+        db.select(StoryChapter.id, StoryChapter.title, StoryChapter.content, StoryChapter.order)
+        .where(StoryChapter.story_id == story_id)
+        .order_by(StoryChapter.order, StoryChapter.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in db.session.execute(query):
+        yield row
 
 # Create singleton instance
 export_service = ExportService()
-
-# For the generate_pdf, generate_docx, and generate_epub functions in the story_bp routes,
-# replace the function calls with:
-# from app.services.export_service import export_service
-# ...
-# file_stream = export_service.generate_pdf(story)
-# file_stream = export_service.generate_docx(story)
-# file_stream = export_service.generate_epub(story)
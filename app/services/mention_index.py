@@ -0,0 +1,247 @@
+# app/services/mention_index.py - Inverted index of story object mentions in scene text
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, event, inspect, insert, select
+from app import db
+from app.models import Scene, StoryObject, ObjectMention
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.text_normalize import iter_words
+
+# Scene fields scanned for mentions
+MENTION_FIELDS = ('title', 'description', 'conflict', 'hook')
+
+# StoryObject.object_type -> analyzer extraction category
+OBJECT_CATEGORIES = {'character': 'characters', 'location': 'locations', 'conflict': 'conflicts'}
+
+def object_names(name: Optional[str], attributes: Optional[Dict]) -> List[str]:
+    """Name plus attributes['aliases'] (a list or a comma-separated string)"""
+    aliases = (attributes or {}).get('aliases') or []
+    if isinstance(aliases, str):
+        aliases = aliases.split(',')
+    return [n.strip() for n in [name or ''] + list(aliases) if isinstance(n, str) and n.strip()]
+
+def name_pattern(name: str) -> Tuple[str, ...]:
+    return tuple(term for _, _, term in iter_words(name, keep_stopwords=True))
+
+def build_matcher(objects: Iterable[Tuple[int, str, Optional[Dict]]]) -> AhoCorasick:
+    """Automaton over the normalized word sequences of every name and alias"""
+    matcher = AhoCorasick()
+    for object_id, name, attributes in objects:
+        for alias in object_names(name, attributes):
+            matcher.add(name_pattern(alias), object_id)
+    return matcher.build()
+
+def scan_text(matcher: AhoCorasick, text_value: Optional[str]) -> Dict[int, List[List[int]]]:
+    """object id -> [[start, end], ...] character spans (leftmost-longest per object)"""
+    spans = list(iter_words(text_value or '', keep_stopwords=True))
+    if not spans or not matcher.patterns:
+        return {}
+    found = {}
+    for start, end, object_id in matcher.find([term for _, _, term in spans]):
+        found.setdefault(object_id, []).append((start, end))
+
+    result = {}
+    for object_id, matches in found.items():
+        taken, covered_to = [], -1
+        for start, end in sorted(matches, key=lambda m: (m[0], -m[1])):
+            if start >= covered_to:  # Alias inside a longer name counts once
+                taken.append([spans[start][0], spans[end - 1][1]])
+                covered_to = end
+        result[object_id] = taken
+    return result
+
+def scan_fields(matcher: AhoCorasick, values: Dict[str, Optional[str]]) -> Dict[int, Dict[str, List]]:
+    """object id -> {field: spans} over several fields of one scene"""
+    result = {}
+    for field, value in values.items():
+        for object_id, spans in scan_text(matcher, value).items():
+            result.setdefault(object_id, {})[field] = spans
+    return result
+
+class MentionIndex:
+    """ObjectMention rows kept current by mapper events; critics and the UI read them"""
+
+    MATCHER_CACHE_SIZE = 128
+
+    def __init__(self):
+        self.enabled = True
+        self._matchers = OrderedDict()  # object signature -> AhoCorasick
+        self._lock = threading.Lock()
+        self.scenes_scanned = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('MENTION_INDEX_ENABLED', True)
+
+    def matcher(self, objects: Sequence[Tuple[int, str, Optional[Dict]]]) -> AhoCorasick:
+        """Automaton for these objects, reused while their names and aliases are unchanged"""
+        signature = tuple((object_id, name, tuple(object_names(name, attributes)))
+                          for object_id, name, attributes in objects)
+        with self._lock:
+            matcher = self._matchers.get(signature)
+            if matcher is not None:
+                self._matchers.move_to_end(signature)
+                return matcher
+        matcher = build_matcher(objects)
+        with self._lock:
+            self._matchers[signature] = matcher
+            while len(self._matchers) > self.MATCHER_CACHE_SIZE:
+                self._matchers.popitem(last=False)
+        return matcher
+
+    def _project_objects(self, connection, project_id: str):
+        return [tuple(row) for row in connection.execute(
+            select(StoryObject.id, StoryObject.name, StoryObject.attributes)
+            .where(StoryObject.project_id == project_id).order_by(StoryObject.id)
+        )]
+
+    @staticmethod
+    def _rows(project_id: str, scene_id: int, object_id: int, positions: Dict) -> Dict:
+        return {'project_id': project_id, 'scene_id': scene_id, 'object_id': object_id,
+                'positions': positions, 'mention_count': sum(len(s) for s in positions.values())}
+
+    # Incremental maintenance (called from flush events with the flush connection)
+
+    def index_scene(self, connection, scene):
+        """Rescan one scene against every object of its project"""
+        matcher = self.matcher(self._project_objects(connection, scene.project_id))
+        found = scan_fields(matcher, {field: getattr(scene, field) for field in MENTION_FIELDS})
+        self.scenes_scanned += 1
+        connection.execute(delete(ObjectMention.__table__).where(ObjectMention.scene_id == scene.id))
+        if found:
+            connection.execute(insert(ObjectMention.__table__), [
+                self._rows(scene.project_id, scene.id, object_id, positions)
+                for object_id, positions in found.items()
+            ])
+
+    def index_object(self, connection, story_object):
+        """Rescan the project's scenes for one (new or renamed) object"""
+        matcher = build_matcher([(story_object.id, story_object.name, story_object.attributes)])
+        connection.execute(delete(ObjectMention.__table__).where(ObjectMention.object_id == story_object.id))
+        if not matcher.patterns:
+            return
+        rows = []
+        scenes = connection.execute(
+            select(Scene.id, *[getattr(Scene, field) for field in MENTION_FIELDS])
+            .where(Scene.project_id == story_object.project_id)
+        )
+        for scene in scenes:
+            self.scenes_scanned += 1
+            found = scan_fields(matcher, {field: getattr(scene, field) for field in MENTION_FIELDS})
+            if story_object.id in found:
+                rows.append(self._rows(story_object.project_id, scene.id, story_object.id,
+                                       found[story_object.id]))
+        if rows:
+            connection.execute(insert(ObjectMention.__table__), rows)
+
+    def remove_scene(self, connection, scene_id: int):
+        connection.execute(delete(ObjectMention.__table__).where(ObjectMention.scene_id == scene_id))
+
+    def remove_object(self, connection, object_id: int):
+        connection.execute(delete(ObjectMention.__table__).where(ObjectMention.object_id == object_id))
+
+    def rebuild(self, project_id: Optional[str] = None) -> Dict[str, int]:
+        """Recompute every mention (or one project's) in a single pass per project"""
+        connection = db.session.connection()
+        statement = delete(ObjectMention.__table__)
+        projects = select(StoryObject.project_id).distinct()
+        if project_id:
+            statement = statement.where(ObjectMention.project_id == project_id)
+            projects = projects.where(StoryObject.project_id == project_id)
+        connection.execute(statement)
+
+        counts = {'projects': 0, 'scenes': 0, 'mentions': 0}
+        for (pid,) in connection.execute(projects).all():
+            matcher = self.matcher(self._project_objects(connection, pid))
+            rows = []
+            scenes = connection.execute(
+                select(Scene.id, *[getattr(Scene, field) for field in MENTION_FIELDS])
+                .where(Scene.project_id == pid)
+            ).all()
+            for scene in scenes:
+                found = scan_fields(matcher, {field: getattr(scene, field) for field in MENTION_FIELDS})
+                rows.extend(self._rows(pid, scene.id, object_id, positions)
+                            for object_id, positions in found.items())
+            if rows:
+                connection.execute(insert(ObjectMention.__table__), rows)
+            counts['projects'] += 1
+            counts['scenes'] += len(scenes)
+            counts['mentions'] += len(rows)
+        db.session.commit()
+        return counts
+
+    # Queries
+
+    def usage(self, project_id: str, object_id: Optional[int] = None) -> Dict[int, List[Dict]]:
+        """object id -> mentions in story order ({scene_id, order_index, mention_count, positions})"""
+        query = db.session.query(ObjectMention, Scene.order_index).join(
+            Scene, Scene.id == ObjectMention.scene_id
+        ).filter(ObjectMention.project_id == project_id)
+        if object_id is not None:
+            query = query.filter(ObjectMention.object_id == object_id)
+
+        usage = {}
+        for mention, order_index in query.order_by(Scene.order_index, Scene.id):
+            entry = mention.to_dict()
+            entry['order_index'] = order_index
+            usage.setdefault(mention.object_id, []).append(entry)
+        return usage
+
+    def objects_by_scene(self, project_id: str) -> Dict[int, List[int]]:
+        """scene id -> ids of the objects it mentions"""
+        result = {}
+        for object_id, mentions in self.usage(project_id).items():
+            for mention in mentions:
+                result.setdefault(mention['scene_id'], []).append(object_id)
+        return result
+
+    def find_in_text(self, project_id: str, text_value: str) -> Dict[str, List[str]]:
+        """Known project objects named in arbitrary text, grouped by extraction category"""
+        objects = StoryObject.query.filter_by(project_id=project_id).order_by(StoryObject.id).all()
+        matcher = self.matcher([(o.id, o.name, o.attributes) for o in objects])
+        found = scan_text(matcher, text_value)
+        result = {}
+        for story_object in objects:
+            if story_object.id in found:
+                category = OBJECT_CATEGORIES.get(story_object.object_type, 'objects')
+                result.setdefault(category, []).append(story_object.name)
+        return result
+
+# Global mention index instance
+mention_index = MentionIndex()
+
+@event.listens_for(Scene, 'after_insert')
+def _index_new_scene(mapper, connection, target):
+    if mention_index.enabled:
+        mention_index.index_scene(connection, target)
+
+@event.listens_for(Scene, 'after_update')
+def _reindex_scene(mapper, connection, target):
+    state = inspect(target)
+    if mention_index.enabled and any(
+        state.attrs[field].history.has_changes() for field in MENTION_FIELDS + ('project_id',)
+    ):
+        mention_index.index_scene(connection, target)
+
+@event.listens_for(Scene, 'before_delete')
+def _unindex_scene(mapper, connection, target):
+    if mention_index.enabled:
+        mention_index.remove_scene(connection, target.id)
+
+@event.listens_for(StoryObject, 'after_insert')
+def _index_new_object(mapper, connection, target):
+    if mention_index.enabled:
+        mention_index.index_object(connection, target)
+
+@event.listens_for(StoryObject, 'after_update')
+def _reindex_object(mapper, connection, target):
+    state = inspect(target)
+    if mention_index.enabled and any(
+        state.attrs[field].history.has_changes() for field in ('name', 'attributes', 'project_id')
+    ):
+        mention_index.index_object(connection, target)
+
+@event.listens_for(StoryObject, 'before_delete')
+def _unindex_object(mapper, connection, target):
+    if mention_index.enabled:
+        mention_index.remove_object(connection, target.id)
@@ -0,0 +1,147 @@
+# app/services/password_hasher.py - Password hashing off the request thread
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict, Optional
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full"""
+    pass
+
+def _green_threads_patched() -> Optional[str]:
+    """Name of the green-thread library that monkey-patched threading, if any"""
+    try:
+        import eventlet.patcher
+        if eventlet.patcher.is_monkey_patched('thread'):
+            return 'eventlet'
+    except ImportError:
+        pass
+    try:
+        import gevent.monkey
+        if gevent.monkey.is_module_patched('threading'):
+            return 'gevent'
+    except ImportError:
+        pass
+    return None
+
+class PasswordHasher:
+    """Bounded worker pool for PBKDF2/scrypt so logins don't stall the event loop
+
+    hashlib releases the GIL while hashing, so OS threads are enough; under
+    eventlet/gevent the work goes to the library's native thread pool instead
+    of (green) executor threads.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._method_prefixes = {}  # {method: stored hash prefix}
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def _config(self, key: str, default):
+        if has_app_context():
+            return current_app.config.get(key, default)
+        return default
+
+    @property
+    def method(self) -> str:
+        return self._config('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+    @property
+    def workers(self) -> int:
+        return max(1, int(self._config('PASSWORD_HASH_WORKERS', 4)))
+
+    @property
+    def max_queue(self) -> int:
+        return max(0, int(self._config('PASSWORD_HASH_MAX_QUEUE', 64)))
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self._config('PASSWORD_HASH_EXECUTOR', 'thread') == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix='password-hash'
+                        )
+        return self._executor
+
+    def _run(self, fn, *args):
+        """Run fn in the pool, rejecting work beyond workers + max_queue"""
+        if not self._config('PASSWORD_HASH_OFFLOAD', True):
+            return fn(*args)
+
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHasherBusy('Password hashing queue is full')
+            self.pending += 1
+
+        try:
+            green = _green_threads_patched()
+            if green == 'eventlet':
+                from eventlet import tpool
+                return tpool.execute(fn, *args)
+            if green == 'gevent':
+                from gevent import get_hub
+                return get_hub().threadpool.apply(fn, args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def hash(self, password: str) -> str:
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        """Check a password against a stored hash"""
+        if not pwhash:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """Whether a stored hash was made with different cost parameters"""
+        if not pwhash:
+            return False
+        method = self.method
+        prefix = self._method_prefixes.get(method)
+        if prefix is None:
+            # Werkzeug normalizes e.g. "pbkdf2" to "pbkdf2:sha256:600000"
+            prefix = generate_password_hash('', method).split('$', 1)[0]
+            self._method_prefixes[method] = prefix
+        return pwhash.split('$', 1)[0] != prefix
+
+    def note_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+
+    def stats(self) -> Dict:
+        return {
+            'method': self.method,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'queue_depth': max(0, self.pending - self.workers),
+            'in_flight': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'rehashed': self.rehashed
+        }
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
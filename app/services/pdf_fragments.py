@@ -0,0 +1,192 @@
+# app/services/pdf_fragments.py - Incremental PDF export from cached per-chapter fragments
+import hashlib
+import html
+import io
+import json
+from typing import Dict, List, Optional, Tuple
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PDF_MERGE_AVAILABLE = True
+except ImportError:
+    PDF_MERGE_AVAILABLE = False
+
+# Bump when fragment layout or styles change
+FRAGMENT_VERSION = 1
+
+_styles = None
+
+def pdf_styles() -> Dict[str, ParagraphStyle]:
+    """Paragraph styles shared by every fragment (built once per process)"""
+    global _styles
+    if _styles is None:
+        styles = getSampleStyleSheet()
+        _styles = {
+            'title': ParagraphStyle(
+                'TitleStyle',
+                parent=styles['Title'],
+                fontSize=24,
+                spaceAfter=30,
+                alignment=1  # Center alignment
+            ),
+            'premise': ParagraphStyle(
+                'PremiseStyle',
+                parent=styles['Italic'],
+                fontSize=12,
+                spaceBefore=0,
+                spaceAfter=20,
+                alignment=1  # Center alignment
+            ),
+            'chapter_title': ParagraphStyle(
+                'ChapterTitle',
+                parent=styles['Heading1'],
+                fontSize=18,
+                spaceBefore=20,
+                spaceAfter=20,
+                alignment=1  # Center alignment
+            ),
+            'body': ParagraphStyle(
+                'BodyStyle',
+                parent=styles['Normal'],
+                fontSize=12,
+                spaceBefore=12,
+                spaceAfter=12,
+                leading=14
+            ),
+        }
+    return _styles
+
+def _text(value) -> str:
+    return html.escape(str(value or ''))
+
+def _front_elements(title, premise):
+    styles = pdf_styles()
+    elements = [Paragraph(_text(title), styles['title'])]
+    if premise:
+        elements.append(Paragraph(_text(premise), styles['premise']))
+    elements.append(Spacer(1, 30))
+    return elements
+
+def _chapter_elements(title, content):
+    styles = pdf_styles()
+    elements = [Paragraph(_text(title), styles['chapter_title'])]
+    for para in (content or '').split('\n\n'):
+        if para.strip():
+            elements.append(Paragraph(_text(para), styles['body']))
+    return elements
+
+def _about_elements(metadata):
+    styles = pdf_styles()
+    body = styles['body']
+    elements = [
+        Paragraph("About This Story", styles['title']),
+        Paragraph(f"<b>Genre:</b> {_text(metadata.get('genre', 'Not specified'))}", body),
+        Paragraph(f"<b>Theme:</b> {_text(metadata.get('theme', 'Not specified'))}", body),
+        Paragraph(f"<b>Target Audience:</b> {_text(metadata.get('targetAudience', 'Not specified'))}", body),
+        Paragraph(f"<b>Tone:</b> {_text(metadata.get('tone', 'Not specified'))}", body),
+    ]
+    for label, key in (('Unique Elements', 'uniqueElements'), ('Key Symbols', 'keySymbols')):
+        if metadata.get(key):
+            elements.append(Paragraph(f"<b>{label}:</b>", body))
+            for item in metadata.get(key, []):
+                elements.append(Paragraph(f"• {_text(item)}", body))
+    return elements
+
+FRAGMENT_BUILDERS = {
+    'front': lambda payload: _front_elements(*payload),
+    'chapter': lambda payload: _chapter_elements(*payload),
+    'about': lambda payload: _about_elements(payload[0]),
+}
+
+def render_fragment(spec: Tuple[str, tuple]) -> bytes:
+    """Lay out one fragment as a standalone PDF; safe to run in a worker process"""
+    kind, payload = spec
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(FRAGMENT_BUILDERS[kind](payload))
+    return buffer.getvalue()
+
+def fragment_key(spec: Tuple[str, tuple]) -> str:
+    return hashlib.sha256(
+        json.dumps([FRAGMENT_VERSION, spec[0], spec[1]], default=str).encode('utf-8')
+    ).hexdigest()
+
+def story_fragment_specs(story, chapters=None) -> List[Tuple[str, tuple]]:
+    """Fragment specs in document order: front matter, one per chapter, about page"""
+    metadata = json.loads(story.story_metadata) if story.story_metadata else {}
+    if chapters is None:
+        chapters = sorted(story.chapters, key=lambda c: (c.order or 0, c.id or 0))
+    specs = [('front', (story.title, story.premise))]
+    specs.extend(('chapter', (chapter.title, chapter.content or '')) for chapter in chapters)
+    specs.append(('about', (metadata,)))
+    return specs
+
+def _page_number_overlay(page_count: int) -> 'PdfReader':
+    """Footer page numbers for the merged document (fragments are unnumbered)"""
+    buffer = io.BytesIO()
+    width, _ = letter
+    overlay = canvas.Canvas(buffer, pagesize=letter)
+    for number in range(1, page_count + 1):
+        if number > 1:  # Title page stays clean
+            overlay.setFont('Helvetica', 9)
+            overlay.drawCentredString(width / 2, 30, str(number))
+        overlay.showPage()
+    overlay.save()
+    buffer.seek(0)
+    return PdfReader(buffer)
+
+class PdfFragmentRenderer:
+    """Renders missing fragments (optionally in parallel) and merges the document"""
+
+    def __init__(self):
+        self.rendered = 0
+        self.reused = 0
+
+    def render(self, story, chapters=None, store=None, executor=None) -> io.BytesIO:
+        """Build the story PDF, re-laying out only fragments missing from store
+
+        store needs get_fragment(key) -> bytes|None and put_fragment(key, bytes);
+        executor is any concurrent.futures executor for parallel layout.
+        """
+        specs = story_fragment_specs(story, chapters)
+        keys = [fragment_key(spec) for spec in specs]
+
+        fragments: List[Optional[bytes]] = [store.get_fragment(key) if store else None for key in keys]
+        missing = [i for i, data in enumerate(fragments) if data is None]
+        self.reused += len(specs) - len(missing)
+        self.rendered += len(missing)
+
+        mapper = executor.map if executor is not None and len(missing) > 1 else map
+        for i, data in zip(missing, mapper(render_fragment, [specs[i] for i in missing])):
+            fragments[i] = data
+            if store:
+                store.put_fragment(keys[i], data)
+
+        return self.merge(specs, fragments)
+
+    def merge(self, specs, fragments: List[bytes]) -> io.BytesIO:
+        """Concatenate fragments, add chapter bookmarks and renumber pages"""
+        writer = PdfWriter()
+        for (kind, payload), data in zip(specs, fragments):
+            start_page = len(writer.pages)
+            writer.append(PdfReader(io.BytesIO(data)))
+            if kind == 'chapter':
+                writer.add_outline_item(str(payload[0] or ''), start_page)
+
+        overlay = _page_number_overlay(len(writer.pages))
+        for page, number_page in zip(writer.pages, overlay.pages):
+            page.merge_page(number_page)
+
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        buffer.seek(0)
+        return buffer
+
+    def stats(self) -> Dict:
+        return {'rendered': self.rendered, 'reused': self.reused}
+
+# Global fragment renderer instance
+pdf_fragment_renderer = PdfFragmentRenderer()
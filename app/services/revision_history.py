@@ -0,0 +1,304 @@
+# app/services/revision_history.py - Scene and chapter history as compressed skip-deltas
+import json
+import re
+import zlib
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+from flask import has_request_context, request, session as http_session
+from sqlalchemy import and_, delete, event, func, inspect, insert, select
+from app import db
+from app.models import Scene, StoryChapter, Revision
+from app.utils.pagination import encode_cursor, decode_cursor
+
+# entity type -> (model, versioned fields)
+TRACKED = {
+    'scene': (Scene, ('title', 'description', 'scene_type', 'order_index', 'location', 'conflict',
+                      'emotional_intensity', 'hook', 'character_focus')),
+    'chapter': (StoryChapter, ('title', 'content', 'scene_ids', 'order')),
+}
+
+# Words and the whitespace between them; text deltas copy/skip/insert runs of these
+TOKEN_RE = re.compile(r'\S+|\s+')
+
+def skip_base(number: int, keyframe_number: int) -> int:
+    """Delta base of a revision: clear the lowest set bit of its offset from the keyframe
+
+    Any revision is then at most log2(keyframe interval) deltas away from its
+    keyframe, and a delta spans the edits since its base (amortized O(log n)).
+    """
+    offset = number - keyframe_number
+    return keyframe_number + (offset & (offset - 1))
+
+def delta_chain(number: int, keyframe_number: int) -> List[int]:
+    """Revisions to apply, keyframe first, to rebuild `number`"""
+    chain = [number]
+    while chain[-1] != keyframe_number:
+        chain.append(skip_base(chain[-1], keyframe_number))
+    return chain[::-1]
+
+def text_ops(old: str, new: str) -> List:
+    """Ops turning old into new: int > 0 copies tokens, int < 0 skips them, str inserts"""
+    a, b = TOKEN_RE.findall(old), TOKEN_RE.findall(new)
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(''.join(b[j1:j2]))
+    return ops
+
+def apply_text_ops(old: str, ops: List) -> str:
+    tokens, position, out = TOKEN_RE.findall(old), 0, []
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif op > 0:
+            out.extend(tokens[position:position + op])
+            position += op
+        else:
+            position -= op
+    return ''.join(out)
+
+def encode_delta(base: Dict, new: Dict) -> Dict:
+    """Changed fields only; text fields as token diffs, everything else replaced"""
+    delta = {'set': {}, 'diff': {}}
+    for field, value in new.items():
+        previous = base.get(field)
+        if previous == value:
+            continue
+        if isinstance(previous, str) and isinstance(value, str):
+            delta['diff'][field] = text_ops(previous, value)
+        else:
+            delta['set'][field] = value
+    return delta
+
+def apply_delta(base: Dict, delta: Dict) -> Dict:
+    snapshot = dict(base)
+    snapshot.update(delta.get('set', {}))
+    for field, ops in delta.get('diff', {}).items():
+        snapshot[field] = apply_text_ops(base.get(field) or '', ops)
+    return snapshot
+
+def pack(data: Dict) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+def unpack(payload: bytes) -> Dict:
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+class RevisionHistory:
+    """Append-only version history written from flush events"""
+
+    def __init__(self):
+        self.enabled = True
+        self.keyframe_interval = 64
+        self.keep_last = 200
+        self.max_age_days = 90
+
+    def init_app(self, app):
+        self.enabled = app.config.get('REVISION_HISTORY_ENABLED', True)
+        self.keyframe_interval = max(int(app.config.get('REVISION_KEYFRAME_INTERVAL', 64)), 1)
+        self.keep_last = max(int(app.config.get('REVISION_KEEP_LAST', 200)), 1)
+        self.max_age_days = int(app.config.get('REVISION_MAX_AGE_DAYS', 90))
+
+    @staticmethod
+    def snapshot(entity_type: str, target) -> Dict:
+        return {field: getattr(target, field) for field in TRACKED[entity_type][1]}
+
+    # Writing
+
+    def record(self, connection, entity_type: str, target, previous: Optional[Dict] = None,
+               inserted: bool = False):
+        """Append a revision for target's current state
+
+        previous is the pre-update state, stored first as a keyframe when the
+        entity has no history yet (rows created before history existed).
+        History that predates the row itself (inserted, or older than its
+        created_at) belongs to a deleted row whose id was reused and is dropped.
+        """
+        table = Revision.__table__
+        latest = connection.execute(
+            select(table.c.number, table.c.keyframe_number, table.c.created_at)
+            .where(table.c.entity_type == entity_type, table.c.entity_id == target.id)
+            .order_by(table.c.number.desc()).limit(1)
+        ).first()
+        if latest is not None and (inserted or self._predates(latest.created_at, target)):
+            self.purge(connection, entity_type, target.id)
+            latest = None
+        if latest is None and previous is not None:
+            self._write(connection, entity_type, target.id, 1, 1, None, previous, list(previous))
+            latest = (1, 1)
+
+        current = self.snapshot(entity_type, target)
+        if latest is None:
+            self._write(connection, entity_type, target.id, 1, 1, None, current, list(current))
+            return
+
+        number = latest[0] + 1
+        if number - latest[1] >= self.keyframe_interval:
+            delta = encode_delta(self.reconstruct(connection, entity_type, target.id, latest[0]), current)
+            changed = sorted(set(delta['set']) | set(delta['diff']))
+            self._write(connection, entity_type, target.id, number, number, None, current, changed)
+            self.prune(connection, entity_type, target.id)
+            return
+
+        base_number = skip_base(number, latest[1])
+        delta = encode_delta(self.reconstruct(connection, entity_type, target.id, base_number), current)
+        changed = sorted(set(delta['set']) | set(delta['diff']))
+        self._write(connection, entity_type, target.id, number, latest[1], base_number, delta, changed)
+
+    @staticmethod
+    def _predates(revision_created_at: Optional[datetime], target) -> bool:
+        created_at = getattr(target, 'created_at', None)
+        return revision_created_at is not None and created_at is not None and revision_created_at < created_at
+
+    def purge(self, connection, entity_type: str, entity_id: int) -> int:
+        """Drop an entity's whole history (the row was deleted)"""
+        table = Revision.__table__
+        return connection.execute(
+            delete(table).where(table.c.entity_type == entity_type, table.c.entity_id == entity_id)
+        ).rowcount
+
+    def _write(self, connection, entity_type, entity_id, number, keyframe_number, base_number, data, changed):
+        payload = pack(data)
+        user_id = None
+        if has_request_context():
+            # JWT routes carry the user on the request; cookie routes in the session
+            current_user = getattr(request, 'current_user', None)
+            user_id = current_user.id if current_user is not None else http_session.get('user_id')
+        connection.execute(insert(Revision.__table__).values(
+            entity_type=entity_type, entity_id=entity_id, number=number,
+            keyframe_number=keyframe_number, base_number=base_number, payload=payload,
+            payload_size=len(payload), changed_fields=changed, user_id=user_id,
+            created_at=datetime.utcnow()
+        ))
+
+    # Reading
+
+    def reconstruct(self, connection, entity_type: str, entity_id: int, number: int) -> Optional[Dict]:
+        """State at revision `number`: one keyframe plus at most log2(interval) deltas, two queries"""
+        table = Revision.__table__
+        keyframe_number = connection.execute(
+            select(table.c.keyframe_number).where(
+                table.c.entity_type == entity_type, table.c.entity_id == entity_id, table.c.number == number
+            )
+        ).scalar()
+        if keyframe_number is None:
+            return None
+
+        chain = delta_chain(number, keyframe_number)
+        payloads = dict(connection.execute(
+            select(table.c.number, table.c.payload).where(
+                table.c.entity_type == entity_type, table.c.entity_id == entity_id,
+                table.c.number.in_(chain)
+            )
+        ).all())
+        snapshot = unpack(payloads[keyframe_number])
+        for step in chain[1:]:
+            snapshot = apply_delta(snapshot, unpack(payloads[step]))
+        return snapshot
+
+    def get(self, entity_type: str, entity_id: int, number: int) -> Optional[Dict]:
+        revision = Revision.query.filter_by(entity_type=entity_type, entity_id=entity_id, number=number).first()
+        if revision is None:
+            return None
+        result = revision.to_dict()
+        result['snapshot'] = self.reconstruct(db.session.connection(), entity_type, entity_id, number)
+        return result
+
+    def list_revisions(self, entity_type: str, entity_id: int, cursor: Optional[str] = None,
+                       limit: int = 50) -> Dict:
+        """Newest-first revision metadata, keyset paginated on number"""
+        query = Revision.query.filter_by(entity_type=entity_type, entity_id=entity_id)
+        decoded = decode_cursor(cursor)
+        if decoded and isinstance(decoded[0], int):
+            query = query.filter(Revision.number < decoded[0])
+        rows = query.order_by(Revision.number.desc()).limit(limit + 1).all()
+        page = rows[:limit]
+        return {
+            'revisions': [r.to_dict() for r in page],
+            'next_cursor': encode_cursor(page[-1].number) if len(rows) > limit else None
+        }
+
+    # Retention
+
+    def prune(self, connection, entity_type: str, entity_id: int, keep_last: Optional[int] = None,
+              now: Optional[datetime] = None) -> int:
+        """Drop whole keyframe groups older than the retention window"""
+        table = Revision.__table__
+        keep_last = self.keep_last if keep_last is None else keep_last
+        scope = and_(table.c.entity_type == entity_type, table.c.entity_id == entity_id)
+
+        oldest_kept = None
+        if keep_last:
+            oldest_kept = connection.execute(
+                select(table.c.number).where(scope).order_by(table.c.number.desc())
+                .offset(keep_last - 1).limit(1)
+            ).scalar()
+            if oldest_kept is None:
+                return 0  # Fewer revisions than keep_last
+        if self.max_age_days > 0:
+            cutoff = (now or datetime.utcnow()) - timedelta(days=self.max_age_days)
+            recent = connection.execute(
+                select(func.min(table.c.number)).where(scope, table.c.created_at >= cutoff)
+            ).scalar()
+            if recent is not None and (oldest_kept is None or recent < oldest_kept):
+                oldest_kept = recent
+        if oldest_kept is None:
+            return connection.execute(delete(table).where(scope)).rowcount
+
+        # Deltas need their keyframe group, so the boundary is the kept revision's keyframe
+        boundary = connection.execute(
+            select(table.c.keyframe_number).where(scope, table.c.number == oldest_kept)
+        ).scalar()
+        return connection.execute(delete(table).where(scope, table.c.number < boundary)).rowcount
+
+    def prune_all(self, now: Optional[datetime] = None) -> int:
+        """Apply the retention policy everywhere, dropping history left by bulk deletes"""
+        connection = db.session.connection()
+        removed = 0
+        for entity_type, (model, _) in TRACKED.items():
+            live = set(db.session.execute(select(model.id)).scalars())
+            entity_ids = db.session.execute(
+                select(Revision.entity_id).where(Revision.entity_type == entity_type).distinct()
+            ).scalars().all()
+            for entity_id in entity_ids:
+                keep_last = None if entity_id in live else 0
+                removed += self.prune(connection, entity_type, entity_id, keep_last, now)
+        db.session.commit()
+        return removed
+
+# Global revision history instance
+revision_history = RevisionHistory()
+
+def _register(entity_type: str, model, fields):
+    @event.listens_for(model, 'after_insert')
+    def _first_revision(mapper, connection, target):
+        if revision_history.enabled:
+            revision_history.record(connection, entity_type, target, inserted=True)
+
+    @event.listens_for(model, 'after_update')
+    def _next_revision(mapper, connection, target):
+        if not revision_history.enabled:
+            return
+        state = inspect(target)
+        histories = {field: state.attrs[field].history for field in fields}
+        if not any(history.has_changes() for history in histories.values()):
+            return
+        previous = {
+            field: history.deleted[0] if history.deleted else getattr(target, field)
+            for field, history in histories.items()
+        }
+        revision_history.record(connection, entity_type, target, previous)
+
+    @event.listens_for(model, 'after_delete')
+    def _drop_history(mapper, connection, target):
+        # SQLite reuses rowids, so a later row must not inherit this history
+        if revision_history.enabled:
+            revision_history.purge(connection, entity_type, target.id)
+
+for _entity_type, (_model, _fields) in TRACKED.items():
+    _register(_entity_type, _model, _fields)
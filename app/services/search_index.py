@@ -0,0 +1,380 @@
+# app/services/search_index.py - Full-text search over scenes, objects, comments and chapters
+import html
+import logging
+import weakref
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import event, inspect, select, text
+from app import db
+from app.models import Scene, StoryObject, Comment, Story, StoryChapter
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.text_normalize import index_terms, iter_words, query_terms
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'search_document'
+
+# kind -> (model, title fields, body fields, parent column); order fixes the doc id encoding
+SEARCHABLE = {
+    'scene': (Scene, ('title',), ('description', 'conflict', 'hook'), 'project_id'),
+    'object': (StoryObject, ('name',), ('description',), 'project_id'),
+    'comment': (Comment, (), ('content',), 'project_id'),
+    'chapter': (StoryChapter, ('title',), ('content',), 'story_id'),
+}
+KINDS = tuple(SEARCHABLE)
+
+# Words of context around the first hit in a highlighted snippet
+SNIPPET_WORDS = 24
+
+def doc_id(kind: str, source_id: int) -> int:
+    """Stable integer key of an indexed row (also the FTS5 rowid)"""
+    return source_id * len(KINDS) + KINDS.index(kind)
+
+def split_doc_id(value: int):
+    source_id, kind_index = divmod(value, len(KINDS))
+    return KINDS[kind_index], source_id
+
+def highlight(text_value: Optional[str], terms: List[str], words: int = SNIPPET_WORDS) -> Optional[str]:
+    """HTML-escaped snippet around the first match with hits wrapped in <mark>"""
+    spans = list(iter_words(text_value or ''))
+    hits = {i for i, (_, _, term) in enumerate(spans)
+            if term and any(term.startswith(wanted) for wanted in terms)}
+    if not hits:
+        return None
+
+    first = max(min(hits) - words // 3, 0)
+    last = min(first + words, len(spans))
+    start = 0 if first == 0 else spans[first][0]
+    end = len(text_value) if last == len(spans) else spans[last - 1][1]
+
+    parts, position = [], start
+    for i in range(first, last):
+        if i in hits:
+            word_start, word_end, _ = spans[i]
+            parts.append(html.escape(text_value[position:word_start]))
+            parts.append('<mark>' + html.escape(text_value[word_start:word_end]) + '</mark>')
+            position = word_end
+    parts.append(html.escape(text_value[position:end]))
+    return ('…' if start > 0 else '') + ''.join(parts) + ('…' if end < len(text_value) else '')
+
+class SqliteFtsBackend:
+    """FTS5 table; the project is an indexed column so MATCH scopes the search"""
+    name = 'sqlite-fts5'
+
+    def exists(self, connection) -> bool:
+        return connection.execute(
+            text('SELECT 1 FROM sqlite_master WHERE name = :name'), {'name': SEARCH_TABLE}
+        ).first() is not None
+
+    def create(self, connection):
+        connection.execute(text(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            "project, title, body, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+
+    @staticmethod
+    def _project_token(project_id: str) -> str:
+        return 'p' + str(project_id).replace('-', '')
+
+    def upsert(self, connection, documents: List[Dict]):
+        rows = [dict(doc, project=self._project_token(doc['project_id'])) for doc in documents]
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = :doc_id'), rows)
+        connection.execute(text(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, project, title, body) '
+            'VALUES (:doc_id, :project, :title, :body)'
+        ), rows)
+
+    def delete(self, connection, doc_ids: List[int]):
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE rowid = :doc_id'),
+                           [{'doc_id': value} for value in doc_ids])
+
+    def clear(self, connection, project_id: Optional[str] = None):
+        if project_id is None:
+            connection.execute(text(f'DELETE FROM {SEARCH_TABLE}'))
+            return
+        connection.execute(text(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+            f'(SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match)'
+        ), {'match': f'project : "{self._project_token(project_id)}"'})
+
+    def search(self, connection, project_id: str, terms: List[str], after, limit: int):
+        match = (f'project : "{self._project_token(project_id)}" AND {{title body}} : ('
+                 + ' AND '.join(f'"{term}"*' for term in terms) + ')')
+        params = {'match': match, 'limit': limit}
+        keyset = ''
+        if after:
+            keyset = 'WHERE score < :score OR (score = :score AND doc_id > :doc_id)'
+            params.update(score=after[0], doc_id=after[1])
+        # bm25() is lower-is-better; title hits weigh 4x body hits
+        return connection.execute(text(
+            f'SELECT doc_id, score FROM (SELECT rowid AS doc_id, '
+            f'-bm25({SEARCH_TABLE}, 0.0, 4.0, 1.0) AS score '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match) '
+            f'{keyset} ORDER BY score DESC, doc_id LIMIT :limit'
+        ), params).all()
+
+class PostgresTsvectorBackend:
+    """Weighted tsvector column with a GIN index ('simple' config: terms arrive pre-stemmed)"""
+    name = 'postgresql-tsvector'
+
+    def exists(self, connection) -> bool:
+        return connection.execute(
+            text('SELECT to_regclass(:name) IS NOT NULL'), {'name': SEARCH_TABLE}
+        ).scalar()
+
+    def create(self, connection):
+        connection.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            'doc_id BIGINT PRIMARY KEY, project_id VARCHAR(36) NOT NULL, document TSVECTOR NOT NULL)'
+        ))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_project ON {SEARCH_TABLE} (project_id)'
+        ))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)'
+        ))
+
+    def upsert(self, connection, documents: List[Dict]):
+        connection.execute(text(
+            f'INSERT INTO {SEARCH_TABLE} (doc_id, project_id, document) VALUES (:doc_id, :project_id, '
+            "setweight(to_tsvector('simple', :title), 'A') || setweight(to_tsvector('simple', :body), 'B')) "
+            'ON CONFLICT (doc_id) DO UPDATE SET project_id = EXCLUDED.project_id, document = EXCLUDED.document'
+        ), documents)
+
+    def delete(self, connection, doc_ids: List[int]):
+        connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE doc_id = :doc_id'),
+                           [{'doc_id': value} for value in doc_ids])
+
+    def clear(self, connection, project_id: Optional[str] = None):
+        if project_id is None:
+            connection.execute(text(f'TRUNCATE {SEARCH_TABLE}'))
+        else:
+            connection.execute(text(f'DELETE FROM {SEARCH_TABLE} WHERE project_id = :project_id'),
+                               {'project_id': project_id})
+
+    def search(self, connection, project_id: str, terms: List[str], after, limit: int):
+        params = {'project_id': project_id, 'query': ' & '.join(f'{term}:*' for term in terms),
+                  'limit': limit}
+        keyset = ''
+        if after:
+            keyset = ('WHERE score < CAST(:score AS REAL) OR '
+                      '(score = CAST(:score AS REAL) AND doc_id > :doc_id)')
+            params.update(score=after[0], doc_id=after[1])
+        return connection.execute(text(
+            f'SELECT doc_id, score FROM (SELECT doc_id, '
+            f"ts_rank_cd(document, to_tsquery('simple', :query)) AS score FROM {SEARCH_TABLE} "
+            f"WHERE project_id = :project_id AND document @@ to_tsquery('simple', :query)) ranked "
+            f'{keyset} ORDER BY score DESC, doc_id LIMIT :limit'
+        ), params).all()
+
+class SearchIndex:
+    """Full-text index kept current by mapper events on every flush"""
+
+    BACKENDS = {'sqlite': SqliteFtsBackend, 'postgresql': PostgresTsvectorBackend}
+
+    def __init__(self):
+        self.enabled = True
+        self._schema_ready = weakref.WeakKeyDictionary()  # engine -> bool
+        self.documents_indexed = 0
+        self.documents_removed = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SEARCH_INDEX_ENABLED', True)
+
+    def backend(self, connection):
+        """Backend for this connection's dialect, creating the index schema on first use"""
+        backend_cls = self.BACKENDS.get(connection.dialect.name)
+        if backend_cls is None:
+            return None
+        backend = backend_cls()
+        engine = connection.engine
+        ready = self._schema_ready.get(engine)
+        if ready is None:
+            ready = self.ensure_schema(connection, backend)
+            self._schema_ready[engine] = ready
+        return backend if ready else None
+
+    def ensure_schema(self, connection, backend=None) -> bool:
+        backend = backend or self.BACKENDS[connection.dialect.name]()
+        try:
+            if not backend.exists(connection):
+                backend.create(connection)
+                logger.info('Created %s search index; run `flask rebuild-search-index` to backfill',
+                            backend.name)
+        except Exception as e:
+            logger.warning('Full-text search unavailable (%s): %s', backend.name, e)
+            return False
+        return True
+
+    # Indexing
+
+    def _parent_project(self, connection, kind: str, target) -> Optional[str]:
+        if kind != 'chapter':
+            return target.project_id
+        return connection.execute(
+            select(Story.project_id).where(Story.id == target.story_id)
+        ).scalar()
+
+    def document(self, kind: str, target, project_id: str) -> Dict:
+        _, title_fields, body_fields, _ = SEARCHABLE[kind]
+
+        def terms(fields):
+            return ' '.join(term for field in fields for term in index_terms(getattr(target, field) or ''))
+
+        return {'doc_id': doc_id(kind, target.id), 'project_id': project_id,
+                'title': terms(title_fields), 'body': terms(body_fields)}
+
+    def index(self, connection, kind: str, target):
+        backend = self.backend(connection)
+        if backend is None:
+            return
+        project_id = self._parent_project(connection, kind, target)
+        if project_id is None:
+            return
+        backend.upsert(connection, [self.document(kind, target, project_id)])
+        self.documents_indexed += 1
+
+    def remove(self, connection, kind: str, source_id: int):
+        backend = self.backend(connection)
+        if backend is None:
+            return
+        backend.delete(connection, [doc_id(kind, source_id)])
+        self.documents_removed += 1
+
+    def rebuild(self, project_id: Optional[str] = None, batch_size: int = 500) -> Dict[str, int]:
+        """Reindex every searchable row (or one project's) from scratch"""
+        connection = db.session.connection()
+        self._schema_ready.pop(connection.engine, None)
+        backend = self.backend(connection)
+        if backend is None:
+            raise RuntimeError(f'Full-text search is not supported on {connection.dialect.name}')
+        backend.clear(connection, project_id)
+
+        counts = {}
+        for kind, (model, _, _, _) in SEARCHABLE.items():
+            if kind == 'chapter':
+                query = db.session.query(model, Story.project_id).join(Story, Story.id == model.story_id)
+                if project_id:
+                    query = query.filter(Story.project_id == project_id)
+            else:
+                query = db.session.query(model, model.project_id)
+                if project_id:
+                    query = query.filter(model.project_id == project_id)
+
+            batch, counts[kind] = [], 0
+            for target, owner in query.yield_per(batch_size):
+                batch.append(self.document(kind, target, owner))
+                if len(batch) >= batch_size:
+                    backend.upsert(connection, batch)
+                    counts[kind] += len(batch)
+                    batch = []
+            if batch:
+                backend.upsert(connection, batch)
+                counts[kind] += len(batch)
+        db.session.commit()
+        return counts
+
+    # Querying
+
+    def search(self, project_id: str, query: str, cursor: Optional[str] = None, limit: int = 20) -> Dict:
+        """Ranked, highlighted hits of one project, keyset paginated on (score, doc id)"""
+        terms = query_terms(query)
+        if not terms:
+            return {'results': [], 'terms': [], 'next_cursor': None}
+
+        connection = db.session.connection()
+        backend = self.backend(connection)
+        if backend is None:
+            raise RuntimeError(f'Full-text search is not supported on {connection.dialect.name}')
+
+        decoded = decode_cursor(cursor)
+        after = None
+        if decoded and len(decoded) == 2 and isinstance(decoded[0], (int, float)) \
+                and isinstance(decoded[1], int):
+            after = decoded
+        rows = backend.search(connection, project_id, terms, after, limit + 1)
+        page = rows[:limit]
+
+        results = self._hydrate(project_id, page, terms)
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor(last.score, last.doc_id)
+        return {'results': results, 'terms': terms, 'next_cursor': next_cursor}
+
+    def _hydrate(self, project_id: str, rows, terms: List[str]) -> List[Dict]:
+        """Load the matched rows (one query per kind) and build highlighted results"""
+        wanted = {}
+        for row in rows:
+            kind, source_id = split_doc_id(row.doc_id)
+            wanted.setdefault(kind, []).append(source_id)
+
+        sources = {}
+        for kind, ids in wanted.items():
+            model = SEARCHABLE[kind][0]
+            query = model.query.filter(model.id.in_(ids))
+            if kind == 'chapter':
+                query = query.join(Story, Story.id == model.story_id).filter(Story.project_id == project_id)
+            else:
+                query = query.filter(model.project_id == project_id)
+            sources.update({(kind, source.id): source for source in query})
+
+        results = []
+        for row in rows:
+            kind, source_id = split_doc_id(row.doc_id)
+            source = sources.get((kind, source_id))
+            if source is None:
+                continue  # Deleted behind the index's back (bulk delete); skipped until rebuilt
+            results.append(self._result(kind, source, row.score, terms))
+        return results
+
+    def _result(self, kind: str, source, score: float, terms: List[str]) -> Dict:
+        _, title_fields, body_fields, _ = SEARCHABLE[kind]
+        highlights = {}
+        for field in title_fields + body_fields:
+            snippet = highlight(getattr(source, field), terms)
+            if snippet:
+                highlights[field] = snippet
+
+        result = {'type': kind, 'id': source.id, 'score': float(score), 'highlights': highlights}
+        if kind == 'scene':
+            result.update(title=source.title, order_index=source.order_index)
+        elif kind == 'object':
+            result.update(title=source.name, object_type=source.object_type)
+        elif kind == 'comment':
+            result.update(title=(source.content or '')[:80], scene_id=source.scene_id)
+        else:
+            result.update(title=source.title, story_id=source.story_id, order=source.order)
+        return result
+
+# Global search index instance
+search_index = SearchIndex()
+
+def _register(kind: str, model, fields: Iterable[str]):
+    fields = tuple(fields)
+
+    @event.listens_for(model, 'after_insert')
+    def _index_new(mapper, connection, target):
+        if search_index.enabled:
+            search_index.index(connection, kind, target)
+
+    @event.listens_for(model, 'after_update')
+    def _reindex_changed(mapper, connection, target):
+        if not search_index.enabled:
+            return
+        state = inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in fields):
+            search_index.index(connection, kind, target)
+
+    @event.listens_for(model, 'after_delete')
+    def _unindex(mapper, connection, target):
+        if search_index.enabled:
+            search_index.remove(connection, kind, target.id)
+
+for _kind, (_model, _title_fields, _body_fields, _parent) in SEARCHABLE.items():
+    _register(_kind, _model, _title_fields + _body_fields + (_parent,))
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_schema(metadata, connection, **kw):
+    # db.create_all() / `flask init-db` also create the (non-ORM) search table
+    if search_index.enabled and connection.dialect.name in SearchIndex.BACKENDS:
+        search_index.ensure_schema(connection)
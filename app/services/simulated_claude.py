@@ -0,0 +1,335 @@
+# app/services/simulated_claude.py - Configurable latency/size/failure model for AI simulation mode
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, Iterator, Optional, Tuple
+
+# Named profiles; AI_SIM_PROFILE picks one, AI_SIM_* variables override single fields
+SIMULATION_PRESETS = {
+    # Previous behaviour: fixed 0.5 s, canned response only
+    'fixed': {
+        'ttft_ms': 500, 'ttft_sigma': 0.0, 'ms_per_token': 0.0, 'token_jitter': 0.0,
+        'fill_min': 0.0, 'fill_max': 0.0,
+        'rate_limit_rate': 0.0, 'server_error_rate': 0.0, 'timeout_rate': 0.0, 'timeout_seconds': 30.0,
+    },
+    # Unit tests: no waiting at all
+    'instant': {
+        'ttft_ms': 0, 'ttft_sigma': 0.0, 'ms_per_token': 0.0, 'token_jitter': 0.0,
+        'fill_min': 0.0, 'fill_max': 0.0,
+        'rate_limit_rate': 0.0, 'server_error_rate': 0.0, 'timeout_rate': 0.0, 'timeout_seconds': 30.0,
+    },
+    # Roughly a Sonnet-class model: ~0.8 s to first token, ~60 tokens/s, long-tailed
+    'realistic': {
+        'ttft_ms': 800, 'ttft_sigma': 0.45, 'ms_per_token': 16.0, 'token_jitter': 0.25,
+        'fill_min': 0.3, 'fill_max': 0.9,
+        'rate_limit_rate': 0.0, 'server_error_rate': 0.0, 'timeout_rate': 0.0, 'timeout_seconds': 60.0,
+    },
+    # Capacity planning under provider trouble
+    'degraded': {
+        'ttft_ms': 2500, 'ttft_sigma': 0.7, 'ms_per_token': 30.0, 'token_jitter': 0.4,
+        'fill_min': 0.3, 'fill_max': 0.9,
+        'rate_limit_rate': 0.08, 'server_error_rate': 0.03, 'timeout_rate': 0.01, 'timeout_seconds': 60.0,
+    },
+}
+
+DEFAULT_SIMULATION_PRESET = 'fixed'
+
+# Rough words-per-token ratio, the inverse of ClaudeAPIClient.count_tokens' fallback
+TOKENS_PER_WORD = 1.3
+
+_FILLER_WORDS = (
+    'příběh postava scéna napětí konflikt motiv dopis babička tajemství rozhodnutí cesta '
+    'vzpomínka hlas ticho pravda strach naděje kapitola obraz detail rytmus dialog'
+).split()
+
+class SimulatedAPIError(Exception):
+    """Injected API failure (mirrors the HTTP status the real API would return)"""
+
+    def __init__(self, status_code: int, error_type: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(f'{status_code} {error_type}: {message}')
+        self.status_code = status_code
+        self.error_type = error_type
+        self.retry_after = retry_after
+
+class SimulatedTimeout(SimulatedAPIError):
+    """Injected request that never completed"""
+
+    def __init__(self, seconds: float):
+        super().__init__(504, 'timeout', f'Request timed out after {seconds:.0f}s')
+
+def simulation_profile_from_env(environ=None) -> Dict:
+    """Preset named by AI_SIM_PROFILE with AI_SIM_<FIELD> overrides"""
+    environ = os.environ if environ is None else environ
+    name = environ.get('AI_SIM_PROFILE', DEFAULT_SIMULATION_PRESET)
+    if name not in SIMULATION_PRESETS:
+        raise ValueError(f"Unknown AI_SIM_PROFILE '{name}' (choose from {', '.join(SIMULATION_PRESETS)})")
+    profile = dict(SIMULATION_PRESETS[name], name=name)
+    for field in SIMULATION_PRESETS[name]:
+        value = environ.get(f'AI_SIM_{field.upper()}')
+        if value not in (None, ''):
+            profile[field] = float(value)
+    profile['seed'] = environ.get('AI_SIM_SEED') or None
+    profile['time_scale'] = float(environ.get('AI_SIM_TIME_SCALE', 1.0))
+    return profile
+
+class SimulatedOutcome:
+    """What one simulated call will do: fail, or produce output_tokens after ttft + generation"""
+    __slots__ = ('error', 'ttft', 'per_token', 'output_tokens')
+
+    def __init__(self, error: Optional[SimulatedAPIError], ttft: float, per_token: float, output_tokens: int):
+        self.error = error
+        self.ttft = ttft
+        self.per_token = per_token
+        self.output_tokens = output_tokens
+
+    @property
+    def latency(self) -> float:
+        return self.ttft + self.per_token * self.output_tokens
+
+class SimulatedClaude:
+    """Latency distribution, output sizing and failure injection for simulated Claude calls"""
+
+    def __init__(self, profile: Optional[Dict] = None):
+        self._lock = threading.Lock()
+        self._profile = profile
+        self._occurrences: Dict[str, int] = {}
+        self.calls = 0
+        self.output_tokens = 0
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def profile(self) -> Dict:
+        if self._profile is None:
+            self._profile = simulation_profile_from_env()
+        return self._profile
+
+    def configure(self, profile: Optional[Dict] = None):
+        """Use profile (None = re-read the environment) and restart the seeded sequence"""
+        with self._lock:
+            self._profile = profile
+            self._occurrences.clear()
+            self.calls = 0
+            self.output_tokens = 0
+            self.errors.clear()
+
+    def describe(self) -> Dict:
+        return {key: value for key, value in self.profile.items()}
+
+    def _rng(self, prompt: str, max_tokens: int) -> random.Random:
+        """Seeded: the n-th identical request gets the same outcome in every run, whatever the thread order"""
+        seed = self.profile.get('seed')
+        if seed is None:
+            return random.Random()
+        digest = hashlib.sha256(f'{max_tokens}:{prompt}'.encode('utf-8')).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+        return random.Random(f'{seed}:{digest}:{occurrence}')
+
+    def plan(self, prompt: str, max_tokens: int, inject_errors: bool = True) -> SimulatedOutcome:
+        profile = self.profile
+        rng = self._rng(prompt, max_tokens)
+        ttft = profile['ttft_ms'] / 1000
+        if profile['ttft_sigma']:
+            ttft *= math.exp(rng.gauss(0, profile['ttft_sigma']))
+        per_token = profile['ms_per_token'] / 1000
+        if profile['token_jitter']:
+            per_token *= max(0.1, 1 + rng.gauss(0, profile['token_jitter']))
+        fill = rng.uniform(profile['fill_min'], profile['fill_max']) if profile['fill_max'] else 0.0
+        output_tokens = int(max_tokens * fill)
+
+        error = None
+        roll = rng.random()
+        if inject_errors:
+            if roll < profile['rate_limit_rate']:
+                error = SimulatedAPIError(429, 'rate_limit_error', 'Simulated rate limit', retry_after=rng.uniform(1, 10))
+                ttft, output_tokens = ttft * 0.1, 0
+            elif roll < profile['rate_limit_rate'] + profile['server_error_rate']:
+                status, kind = rng.choice(((500, 'api_error'), (529, 'overloaded_error')))
+                error = SimulatedAPIError(status, kind, 'Simulated server error')
+                output_tokens = 0
+            elif roll < profile['rate_limit_rate'] + profile['server_error_rate'] + profile['timeout_rate']:
+                error = SimulatedTimeout(profile['timeout_seconds'])
+                ttft, output_tokens = profile['timeout_seconds'], 0
+        return SimulatedOutcome(error, ttft, per_token, output_tokens)
+
+    def _sleep(self, seconds: float):
+        scaled = seconds * self.profile['time_scale']
+        if scaled > 0:
+            time.sleep(scaled)
+
+    def _count(self, outcome: SimulatedOutcome):
+        with self._lock:
+            self.calls += 1
+            if outcome.error is not None:
+                self.errors[outcome.error.error_type] = self.errors.get(outcome.error.error_type, 0) + 1
+            else:
+                self.output_tokens += outcome.output_tokens
+
+    def complete(self, prompt: str, canned: str, max_tokens: int = 2000, inject_errors: bool = True) -> str:
+        """Blocking call: wait out the modelled latency, then return or raise"""
+        outcome = self.plan(prompt, max_tokens, inject_errors)
+        self._count(outcome)
+        self._sleep(outcome.latency)
+        if outcome.error is not None:
+            raise outcome.error
+        return pad_response(canned, outcome.output_tokens)
+
+    def stream(self, prompt: str, canned: str, max_tokens: int = 2000) -> Tuple[SimulatedOutcome, Iterator[str]]:
+        """Outcome plus text chunks paced at the modelled token rate (the first after ttft)"""
+        outcome = self.plan(prompt, max_tokens)
+        self._count(outcome)
+
+        def chunks():
+            self._sleep(outcome.ttft)
+            if outcome.error is not None:
+                return
+            words = pad_response(canned, outcome.output_tokens).split(' ')
+            step = 8  # words per streamed delta
+            for index in range(0, len(words), step):
+                chunk = ' '.join(words[index:index + step])
+                yield chunk if index + step >= len(words) else chunk + ' '
+                self._sleep(outcome.per_token * step * TOKENS_PER_WORD)
+
+        return outcome, chunks()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'profile': self.profile['name'],
+                'calls': self.calls,
+                'output_tokens': self.output_tokens,
+                'errors': dict(self.errors)
+            }
+
+def pad_response(canned: str, output_tokens: int) -> str:
+    """Canned answer grown to about output_tokens with trailing prose
+
+    The filler has no braces or brackets, so callers extracting the JSON
+    part with a regex still parse the canned object.
+    """
+    missing_words = int(output_tokens / TOKENS_PER_WORD) - len(canned.split())
+    if missing_words <= 0:
+        return canned
+    filler = ' '.join(_FILLER_WORDS[i % len(_FILLER_WORDS)] for i in range(missing_words))
+    return f'{canned}\n\n{filler.capitalize()}.'
+
+# Global simulated backend instance (configured from AI_SIM_* on first use)
+simulated_claude = SimulatedClaude()
+
+def messages_response(model: str, text: str, input_tokens: int, output_tokens: int) -> Dict:
+    """Anthropic Messages API response body"""
+    return {
+        'id': f'msg_sim_{uuid.uuid4().hex[:24]}',
+        'type': 'message',
+        'role': 'assistant',
+        'model': model,
+        'content': [{'type': 'text', 'text': text}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens}
+    }
+
+def error_body(error: SimulatedAPIError) -> Dict:
+    return {'type': 'error', 'error': {'type': error.error_type, 'message': str(error)}}
+
+def make_stand_in_server(host: str = '127.0.0.1', port: int = 8765, backend: Optional[SimulatedClaude] = None):
+    """Local stand-in for POST /v1/messages (JSON or SSE), for ANTHROPIC_BASE_URL=http://host:port"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from app.services.claude_api import ClaudeAPIClient
+
+    backend = backend or simulated_claude
+    canned_for = ClaudeAPIClient.canned_response
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass  # One line per request would dominate a load test's output
+
+        def _json(self, status: int, body: Dict, headers: Optional[Dict] = None):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _event(self, name: str, data: Dict):
+            self.wfile.write(f'event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'.encode('utf-8'))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip('/') in ('', '/health'):
+                return self._json(200, {'status': 'ok', 'simulated': backend.stats()})
+            self._json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+
+        def do_POST(self):
+            if self.path.split('?')[0].rstrip('/') != '/v1/messages':
+                return self._json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            except ValueError:
+                return self._json(400, {'type': 'error', 'error': {'type': 'invalid_request_error', 'message': 'Invalid JSON'}})
+
+            prompt = '\n'.join(
+                part.get('text', '') if isinstance(part, dict) else str(part)
+                for message in request.get('messages', [])
+                for part in (message.get('content') if isinstance(message.get('content'), list) else [message.get('content', '')])
+            )
+            model = request.get('model', 'claude-simulated')
+            max_tokens = int(request.get('max_tokens', 1024))
+            input_tokens = int(len(f"{request.get('system', '')} {prompt}".split()) * TOKENS_PER_WORD)
+            canned = canned_for(prompt)
+
+            if not request.get('stream'):
+                try:
+                    text = backend.complete(prompt, canned, max_tokens)
+                except SimulatedAPIError as e:
+                    if isinstance(e, SimulatedTimeout):
+                        self.close_connection = True
+                        return  # Like an upstream that never answered
+                    headers = {'Retry-After': f'{e.retry_after:.0f}'} if e.retry_after else None
+                    return self._json(e.status_code, error_body(e), headers)
+                output_tokens = int(len(text.split()) * TOKENS_PER_WORD)
+                return self._json(200, messages_response(model, text, input_tokens, output_tokens))
+
+            outcome, chunks = backend.stream(prompt, canned, max_tokens)
+            if outcome.error is not None:
+                for _ in chunks:
+                    pass  # Waits out the time to the error
+                if isinstance(outcome.error, SimulatedTimeout):
+                    self.close_connection = True
+                    return
+                return self._json(outcome.error.status_code, error_body(outcome.error))
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            message = messages_response(model, '', input_tokens, 0)
+            message['content'], message['stop_reason'] = [], None
+            self._event('message_start', {'type': 'message_start', 'message': message})
+            self._event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                                'content_block': {'type': 'text', 'text': ''}})
+            produced = 0
+            for chunk in chunks:
+                produced += len(chunk.split())
+                self._event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                    'delta': {'type': 'text_delta', 'text': chunk}})
+            self._event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            self._event('message_delta', {'type': 'message_delta',
+                                          'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                          'usage': {'output_tokens': int(produced * TOKENS_PER_WORD)}})
+            self._event('message_stop', {'type': 'message_stop'})
+
+    return ThreadingHTTPServer((host, port), Handler)
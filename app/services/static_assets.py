@@ -0,0 +1,236 @@
+# app/services/static_assets.py - Fingerprinted, precompressed static assets
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from typing import Dict, Optional
+from flask import current_app, request, send_from_directory, Response
+from werkzeug.exceptions import NotFound
+from app.utils.lazy_imports import lazy_module
+
+brotli = lazy_module('brotli')
+
+# Build output lives inside the static folder so nginx serves it from /static/dist/
+ASSET_DIST_DIR = 'dist'
+ASSET_MANIFEST_NAME = 'manifest.json'
+ASSET_MANIFEST_VERSION = 1
+
+# Fingerprinted names change with content, so browsers never need to revalidate
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.html', '.svg', '.json', '.txt', '.map', '.ico'}
+MIN_COMPRESS_BYTES = 256
+
+# Preference order when the client accepts several encodings
+ENCODING_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+# src="/static/js/app.js" / href='/static/css/styles.css' in frontend pages
+STATIC_REFERENCE = re.compile(r'''(?P<attr>\b(?:src|href)=["'])/static/(?P<path>[^"'?#]+)''')
+
+def fingerprint_name(path: str, data: bytes) -> str:
+    """js/app.js -> js/app.<hash>.js"""
+    base, ext = os.path.splitext(path)
+    return f'{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+def _compressed_variants(data: bytes, brotli_quality: int) -> Dict[str, bytes]:
+    """gzip/brotli encodings that are actually smaller than the original"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli.available:
+        variants['br'] = brotli.compress(data, quality=brotli_quality)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+def read_manifest(static_folder: str) -> Dict:
+    path = os.path.join(static_folder, ASSET_DIST_DIR, ASSET_MANIFEST_NAME)
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {'version': ASSET_MANIFEST_VERSION, 'assets': {}}
+
+def build_assets(static_folder: str, brotli_quality: int = 11, keep_previous: bool = True) -> Dict:
+    """Copy static files to dist/ under content-hashed names with .gz/.br siblings
+
+    Files of the previous build are kept (keep_previous) so pages rendered by
+    instances still on the old manifest keep working during a rolling deploy;
+    anything older is pruned.
+    """
+    dist_folder = os.path.join(static_folder, ASSET_DIST_DIR)
+    previous = read_manifest(static_folder)
+    assets = {}
+    stats = {'files': 0, 'written': 0, 'bytes': 0, 'gzip_bytes': 0, 'br_bytes': 0}
+
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d != ASSET_DIST_DIR]
+        dirs.sort()
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as handle:
+                data = handle.read()
+
+            hashed = fingerprint_name(logical, data)
+            target = os.path.join(dist_folder, hashed)
+            variants = {}
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_BYTES:
+                variants = _compressed_variants(data, brotli_quality)
+
+            # Content-addressed: an existing file with this name is already correct
+            if not os.path.exists(target):
+                _write_atomic(target, data)
+                stats['written'] += 1
+            for encoding, suffix in ENCODING_SUFFIXES:
+                if encoding in variants and not os.path.exists(target + suffix):
+                    _write_atomic(target + suffix, variants[encoding])
+
+            assets[logical] = {
+                'file': hashed,
+                'size': len(data),
+                'encodings': [encoding for encoding, _ in ENCODING_SUFFIXES if encoding in variants]
+            }
+            stats['files'] += 1
+            stats['bytes'] += len(data)
+            stats['gzip_bytes'] += len(variants.get('gzip', data))
+            stats['br_bytes'] += len(variants.get('br', variants.get('gzip', data)))
+
+    manifest = {'version': ASSET_MANIFEST_VERSION, 'assets': assets}
+    _write_atomic(
+        os.path.join(dist_folder, ASSET_MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+    )
+
+    keep = {ASSET_MANIFEST_NAME}
+    for entries in (assets, previous.get('assets', {}) if keep_previous else {}):
+        for entry in entries.values():
+            keep.add(entry['file'])
+            keep.update(entry['file'] + suffix for _, suffix in ENCODING_SUFFIXES)
+    pruned = 0
+    for root, _, files in os.walk(dist_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, dist_folder).replace(os.sep, '/') not in keep:
+                os.remove(path)
+                pruned += 1
+
+    stats['pruned'] = pruned
+    stats['brotli'] = brotli.available
+    manifest['stats'] = stats
+    return manifest
+
+class StaticAssets:
+    """Resolves logical asset paths through the build manifest and serves them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._manifest_key = None
+        self._assets = {}
+        self._by_file = {}
+        self._pages = {}
+
+    def init_app(self, app, static_folder: str):
+        self.static_folder = static_folder
+        self.dist_folder = os.path.join(static_folder, ASSET_DIST_DIR)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def _refresh(self):
+        """Reload the manifest when a new build replaced it"""
+        path = os.path.join(self.dist_folder, ASSET_MANIFEST_NAME)
+        try:
+            stat = os.stat(path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            key = None
+        if key == self._manifest_key:
+            return
+        with self._lock:
+            assets = read_manifest(self.static_folder)['assets'] if key else {}
+            self._assets = assets
+            self._by_file = {entry['file']: entry for entry in assets.values()}
+            self._pages.clear()
+            self._manifest_key = key
+
+    @property
+    def enabled(self) -> bool:
+        return current_app.config.get('STATIC_ASSET_MANIFEST', True)
+
+    def url(self, path: str) -> str:
+        """Public URL for a logical static path, fingerprinted when built"""
+        path = path.lstrip('/')
+        if self.enabled:
+            self._refresh()
+            entry = self._assets.get(path)
+            if entry:
+                return f'/static/{ASSET_DIST_DIR}/{entry["file"]}'
+        return f'/static/{path}'
+
+    def rewrite_html(self, html: str) -> str:
+        """Point /static/... references in a page at fingerprinted files"""
+        return STATIC_REFERENCE.sub(lambda m: m.group('attr') + self.url(m.group('path')), html)
+
+    def page(self, directory: str, filename: str) -> Optional[Response]:
+        """Frontend HTML with rewritten asset URLs; None when the page is missing"""
+        path = os.path.join(directory, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self.enabled:
+            self._refresh()
+
+        cached = self._pages.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, encoding='utf-8') as handle:
+                body = handle.read()
+            if self.enabled:
+                body = self.rewrite_html(body)
+            encoded = body.encode('utf-8')
+            cached = (mtime, encoded, hashlib.sha256(encoded).hexdigest()[:32])
+            self._pages[path] = cached
+
+        response = Response(cached[1], mimetype='text/html')
+        response.set_etag(cached[2])
+        response.headers['Cache-Control'] = PAGE_CACHE_CONTROL
+        return response.make_conditional(request)
+
+    def send(self, filename: str) -> Response:
+        """Serve a static file; dist/ files get precompressed bodies and immutable caching"""
+        prefix = ASSET_DIST_DIR + '/'
+        if not filename.startswith(prefix):
+            return send_from_directory(self.static_folder, filename)
+
+        name = filename[len(prefix):]
+        self._refresh()
+        entry = self._by_file.get(name)
+        if entry is None:
+            # Not a current or previous build output (e.g. the manifest itself)
+            raise NotFound()
+
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        encoding = next(
+            (enc for enc, _ in ENCODING_SUFFIXES
+             if enc in entry['encodings'] and request.accept_encodings[enc]),
+            None
+        )
+        suffix = dict(ENCODING_SUFFIXES)[encoding] if encoding else ''
+        response = send_from_directory(self.dist_folder, name + suffix, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+# Global static asset instance
+static_assets = StaticAssets()
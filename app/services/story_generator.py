@@ -1,21 +1,22 @@
 # app/services/story_generator.py
-from app.services.ai_service import claude_client
+from app.services.claude_api import ClaudeAPIClient
 import json
 import re
 from typing import List, Dict, Any
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
 import random
-
-# Download NLTK data if not already present
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
+from app.utils.chapter_segmenter import segment_chapters
 
 class StoryGenerator:
     def __init__(self):
         self.model = "claude-3-5-sonnet"
+        self._claude = None
+    
+    @property
+    def claude(self) -> ClaudeAPIClient:
+        """API client, built on first use so importing the blueprint stays cheap"""
+        if self._claude is None:
+            self._claude = ClaudeAPIClient()
+        return self._claude
     
     def generate_full_story(self, project, scenes, characters, locations, props, narrative_options):
         """Generate a complete story from scenes and objects"""
@@ -148,15 +149,9 @@ class StoryGenerator:
         """
         
         # Call Claude
-        response = claude_client.send_message(
-            model=self.model,
-            prompt=prompt,
-            max_tokens=12000,  # Adjust based on expected story length
-            temperature=0.7,   # Some creativity but not too random
-        )
+        content = self.claude._make_request(prompt, max_tokens=12000)
         
         # Extract JSON from response
-        content = response['content']
         json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
         
         if json_match:
@@ -268,15 +263,9 @@ class StoryGenerator:
         """
         
         # Call Claude
-        response = claude_client.send_message(
-            model=self.model,
-            prompt=prompt,
-            max_tokens=6000,  # Adjust based on expected chapter length
-            temperature=0.7,   # Some creativity but not too random
-        )
+        content = self.claude._make_request(prompt, max_tokens=6000)
         
         # Extract JSON from response
-        content = response['content']
         json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
         
         if json_match:
@@ -308,15 +297,13 @@ class StoryGenerator:
         
         # Try to divide content into chapters
         if content:
-            # Use NLTK to split into sentences
-            sentences = sent_tokenize(content)
-            sentences_per_chapter = max(1, len(sentences) // chapter_count)
+            # Cut at scene/paragraph breaks near each scene group's share of the text
+            weights = [getattr(scene, 'word_count', 0) or 0 for scene in scenes]
+            offsets = segment_chapters(content, chapter_count, weights if any(weights) else None)
             
             chapters = []
-            for i in range(chapter_count):
-                start_idx = i * sentences_per_chapter
-                end_idx = start_idx + sentences_per_chapter if i < chapter_count - 1 else len(sentences)
-                chapter_content = " ".join(sentences[start_idx:end_idx])
+            for i, (start, end) in enumerate(offsets):
+                chapter_content = content[start:end].strip()
                 
                 # Determine which scenes belong to this chapter
                 scene_start = (i * scene_count) // chapter_count
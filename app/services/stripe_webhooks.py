@@ -0,0 +1,69 @@
+# app/services/stripe_webhooks.py - Stripe event handlers run by the webhook queue
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from flask import current_app
+from app.models import BillingPlan, UserSubscription
+from app.services.billing_rollover import billing_rollover
+from app.services.webhook_queue import webhook_queue
+
+def invoice_period(invoice: Dict) -> Optional[Tuple[datetime, datetime]]:
+    """Subscription period an invoice pays for: its subscription line's period, else the invoice's"""
+    for line in (invoice.get('lines') or {}).get('data') or []:
+        period = line.get('period') or {}
+        if line.get('type', 'subscription') == 'subscription' and period.get('start') and period.get('end'):
+            return datetime.utcfromtimestamp(period['start']), datetime.utcfromtimestamp(period['end'])
+    if invoice.get('period_start') and invoice.get('period_end'):
+        return datetime.utcfromtimestamp(invoice['period_start']), datetime.utcfromtimestamp(invoice['period_end'])
+    return None
+
+@webhook_queue.handler('stripe', 'invoice.payment_succeeded')
+def handle_successful_payment(invoice, event=None):
+    """Handle successful payment webhook"""
+    subscription_id = invoice.get('subscription')
+
+    if subscription_id:
+        subscription = UserSubscription.query.filter_by(
+            stripe_subscription_id=subscription_id
+        ).first()
+
+        if subscription:
+            period = invoice_period(invoice)
+            if period is None:
+                current_app.logger.warning(f"Paid invoice {invoice.get('id')} carries no period")
+                return
+            # The paid period starts now, early or late; redeliveries are no-ops
+            billing_rollover.apply_paid_period(subscription.id, *period)
+
+@webhook_queue.handler('stripe', 'invoice.payment_failed')
+def handle_failed_payment(invoice, event=None):
+    """Handle failed payment webhook"""
+    subscription_id = invoice.get('subscription')
+
+    if subscription_id:
+        subscription = UserSubscription.query.filter_by(
+            stripe_subscription_id=subscription_id
+        ).first()
+
+        if subscription:
+            # Could implement dunning management here
+            # For now, just log the failure
+            current_app.logger.warning(f"Payment failed for subscription {subscription.id}")
+
+@webhook_queue.handler('stripe', 'customer.subscription.deleted')
+def handle_subscription_cancelled(subscription_obj, event=None):
+    """Handle subscription cancellation webhook"""
+    subscription_id = subscription_obj.get('id')
+
+    subscription = UserSubscription.query.filter_by(
+        stripe_subscription_id=subscription_id
+    ).first()
+
+    if subscription:
+        subscription.status = 'cancelled'
+
+        # Downgrade user to free plan
+        user = subscription.user
+        free_plan = BillingPlan.query.filter_by(name='free').first()
+        if free_plan:
+            user.plan = 'free'
+            user.tokens_limit = free_plan.monthly_token_limit
@@ -4,6 +4,7 @@ from typing import Dict, Optional, List
 from flask import current_app
 from app import db
 from app.models import User
+from app.utils.identity import get_request_user
 import json
 
 class TokenOperation:
@@ -59,7 +60,7 @@ class TokenManager:
     
     def check_balance(self, user_id: int, required_tokens: int) -> Dict:
         """Check if user has sufficient token balance"""
-        user = User.query.get(user_id)
+        user = get_request_user(user_id)
         if not user:
             return {'allowed': False, 'reason': 'User not found'}
         
@@ -91,9 +92,10 @@ class TokenManager:
                 'details': balance_check
             }
         
-        # Deduct tokens
-        user = User.query.get(operation.user_id)
+        # Deduct tokens (same request-scoped row that check_balance loaded)
+        user = get_request_user(operation.user_id)
         user.tokens_used += operation.total_cost
+        remaining_tokens = user.tokens_limit - user.tokens_used
         
         # Log the operation
         self._log_operation(operation)
@@ -103,7 +105,7 @@ class TokenManager:
             return {
                 'success': True,
                 'tokens_used': operation.total_cost,
-                'remaining_tokens': user.tokens_limit - user.tokens_used,
+                'remaining_tokens': remaining_tokens,
                 'operation_id': len(self.operations_log)
             }
         except Exception as e:
@@ -138,7 +140,7 @@ class TokenManager:
     
     def get_usage_analytics(self, user_id: int, days: int = 30) -> Dict:
         """Get token usage analytics for user"""
-        user = User.query.get(user_id)
+        user = get_request_user(user_id)
         if not user:
             return {'error': 'User not found'}
         
@@ -208,7 +210,7 @@ class TokenManager:
     
     def add_tokens(self, user_id: int, amount: int, reason: str = "Purchase") -> Dict:
         """Add tokens to user account (for purchases/bonuses)"""
-        user = User.query.get(user_id)
+        user = get_request_user(user_id)
         if not user:
             return {'success': False, 'error': 'User not found'}
         
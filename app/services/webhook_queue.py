@@ -0,0 +1,248 @@
+# app/services/webhook_queue.py - Durable, per-customer ordered processing of payment webhooks
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import exists, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+# Events still owed processing; a customer's oldest one blocks the rest
+ACTIVE_STATUSES = ('pending', 'retry', 'processing')
+
+def event_customer(event: Dict) -> str:
+    """Ordering key of an event: the customer its object belongs to"""
+    obj = (event.get('data') or {}).get('object') or {}
+    customer = obj.get('customer')
+    if isinstance(customer, dict):
+        customer = customer.get('id')
+    if not customer and obj.get('object') == 'customer':
+        customer = obj.get('id')
+    return str(customer or '')
+
+def retry_delay(attempts: int, base: float, maximum: float) -> float:
+    """Exponential backoff after the given number of failed attempts"""
+    return min(base * 2 ** max(attempts - 1, 0), maximum)
+
+class WebhookQueue:
+    """Stores verified webhook events once and applies them in the background
+
+    The endpoint only inserts the event (the unique provider event id turns
+    provider retries into no-ops) and answers. Workers claim the oldest
+    outstanding event of each customer with a conditional UPDATE, run its
+    handler and mark it processed in the handler's own transaction, so an
+    event's effects are committed exactly once. While later events of the
+    same customer wait behind a failing one, its backoff is capped at
+    head_retry_max_seconds so one bad event cannot stall them for an hour.
+    """
+
+    def __init__(self):
+        self.handlers = {}  # {(provider, event_type): handler(obj, event)}
+        self.worker_enabled = True
+        self.max_attempts = 8
+        self.retry_base_seconds = 30.0
+        self.retry_max_seconds = 3600.0
+        self.head_retry_max_seconds = 60.0
+        self.lease_seconds = 300.0
+        self.poll_interval = 5.0
+        self.batch_size = 50
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.worker_enabled = app.config.get('WEBHOOK_WORKER_ENABLED', True)
+        self.max_attempts = max(int(app.config.get('WEBHOOK_MAX_ATTEMPTS', 8)), 1)
+        self.retry_base_seconds = float(app.config.get('WEBHOOK_RETRY_BASE_SECONDS', 30))
+        self.retry_max_seconds = float(app.config.get('WEBHOOK_RETRY_MAX_SECONDS', 3600))
+        self.head_retry_max_seconds = float(app.config.get('WEBHOOK_HEAD_RETRY_MAX_SECONDS', 60))
+        self.lease_seconds = float(app.config.get('WEBHOOK_LEASE_SECONDS', 300))
+        self.poll_interval = float(app.config.get('WEBHOOK_POLL_INTERVAL', 5))
+        from app.services import stripe_webhooks  # noqa: F401 - registers the Stripe handlers
+
+    def handler(self, provider: str, event_type: str):
+        """Register a handler; it must not commit (the queue does)"""
+        def decorator(func: Callable):
+            self.handlers[(provider, event_type)] = func
+            return func
+        return decorator
+
+    # Ingestion
+
+    def ingest(self, provider: str, event: Dict, raw: bytes = b'') -> Tuple[WebhookEvent, bool]:
+        """Persist a verified event; returns (row, created), created is False for redeliveries"""
+        event_id = str(event.get('id') or hashlib.sha256(
+            raw or json.dumps(event, sort_keys=True).encode('utf-8')
+        ).hexdigest())
+        now = datetime.utcnow()
+        created = event.get('created')
+        row = WebhookEvent(
+            provider=provider, event_id=event_id, event_type=event.get('type') or '',
+            customer_id=event_customer(event), payload=json.dumps(event),
+            event_created=datetime.utcfromtimestamp(created) if created else now,
+            status='pending', attempts=0, next_attempt_at=now, received_at=now
+        )
+        db.session.add(row)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return WebhookEvent.query.filter_by(provider=provider, event_id=event_id).first(), False
+        self._shorten_head_backoff(row.customer_id, now)
+        self.notify()
+        return row, True
+
+    def _shorten_head_backoff(self, customer_id: str, now: datetime):
+        """Bring a retrying event forward now that a later one waits behind it"""
+        cap = now + timedelta(seconds=self.head_retry_max_seconds)
+        result = db.session.execute(
+            update(WebhookEvent).where(
+                WebhookEvent.customer_id == customer_id,
+                WebhookEvent.status == 'retry',
+                WebhookEvent.next_attempt_at > cap
+            ).values(next_attempt_at=cap).execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            db.session.commit()
+
+    def _has_waiting(self, customer_id: str, event_id: int) -> bool:
+        """Whether other outstanding events of the customer wait behind the event"""
+        return db.session.execute(select(exists().where(
+            WebhookEvent.customer_id == customer_id,
+            WebhookEvent.status.in_(ACTIVE_STATUSES),
+            WebhookEvent.id != event_id
+        ))).scalar()
+
+    # Processing
+
+    def due_heads(self, now: datetime, limit: int) -> List[int]:
+        """Ids of each customer's oldest outstanding event, where that event is due"""
+        position = func.row_number().over(
+            partition_by=WebhookEvent.customer_id,
+            order_by=(WebhookEvent.event_created, WebhookEvent.id)
+        )
+        ranked = select(
+            WebhookEvent.id, WebhookEvent.next_attempt_at, position.label('position')
+        ).where(WebhookEvent.status.in_(ACTIVE_STATUSES)).subquery()
+        return db.session.execute(
+            select(ranked.c.id).where(
+                ranked.c.position == 1,
+                or_(ranked.c.next_attempt_at.is_(None), ranked.c.next_attempt_at <= now)
+            ).order_by(ranked.c.id).limit(limit)
+        ).scalars().all()
+
+    def _claim(self, event_id: int, now: datetime) -> Optional[datetime]:
+        """Take a lease on an event; None if another worker has it"""
+        lease = now + timedelta(seconds=self.lease_seconds)
+        result = db.session.execute(
+            update(WebhookEvent).where(
+                WebhookEvent.id == event_id,
+                WebhookEvent.status.in_(ACTIVE_STATUSES),
+                or_(WebhookEvent.next_attempt_at.is_(None), WebhookEvent.next_attempt_at <= now)
+            ).values(status='processing', next_attempt_at=lease, attempts=WebhookEvent.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return lease if result.rowcount == 1 else None
+
+    def _settle(self, event_id: int, lease: datetime, **values) -> bool:
+        # Only the lease holder may settle; a worker that outlived its lease loses
+        result = db.session.execute(
+            update(WebhookEvent).where(
+                WebhookEvent.id == event_id,
+                WebhookEvent.status == 'processing',
+                WebhookEvent.next_attempt_at == lease
+            ).values(**values).execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def process(self, event_id: int, now: Optional[datetime] = None) -> str:
+        """Claim and apply one event; returns its resulting status or 'skipped'"""
+        now = now or datetime.utcnow()
+        lease = self._claim(event_id, now)
+        if lease is None:
+            return 'skipped'
+
+        event = db.session.get(WebhookEvent, event_id)
+        provider, event_type, attempts = event.provider, event.event_type, event.attempts
+        customer_id = event.customer_id
+        handler = self.handlers.get((provider, event_type))
+        status = 'processed' if handler else 'ignored'
+        try:
+            if handler:
+                data = json.loads(event.payload)
+                handler((data.get('data') or {}).get('object') or {}, data)
+            if not self._settle(event_id, lease, status=status, processed_at=datetime.utcnow(),
+                                next_attempt_at=None, last_error=None):
+                db.session.rollback()
+                return 'skipped'
+            db.session.commit()  # Handler effects and the processed mark land together
+            return status
+        except Exception as e:
+            db.session.rollback()
+            if attempts >= self.max_attempts:
+                status, retry_at = 'dead', None
+                logger.error(f"Webhook {provider}:{event_type} #{event_id} gave up after {attempts} attempts: {e}")
+            else:
+                status = 'retry'
+                maximum = self.retry_max_seconds
+                if self._has_waiting(customer_id, event_id):
+                    maximum = min(maximum, self.head_retry_max_seconds)
+                retry_at = now + timedelta(seconds=retry_delay(attempts, self.retry_base_seconds, maximum))
+                logger.warning(f"Webhook {provider}:{event_type} #{event_id} failed (attempt {attempts}): {e}")
+            self._settle(event_id, lease, status=status, next_attempt_at=retry_at, last_error=str(e)[:2000])
+            db.session.commit()
+            return status
+
+    def process_due(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> Dict[str, int]:
+        """Apply due events until none are left (or limit), one customer head at a time"""
+        limit = limit or self.batch_size
+        stats = {'processed': 0, 'ignored': 0, 'retry': 0, 'dead': 0, 'skipped': 0}
+        handled = 0
+        while handled < limit:
+            heads = self.due_heads(now or datetime.utcnow(), limit - handled)
+            if not heads:
+                break
+            for event_id in heads:
+                stats[self.process(event_id, now)] += 1
+                handled += 1
+            if stats['skipped'] == handled:
+                break  # Everything is leased by other workers
+        return stats
+
+    # Background worker
+
+    def start(self, app):
+        """Run the worker in a daemon thread (no-op if it is already running)
+
+        Called by the serving entrypoint (see start_background_workers), never
+        by create_app, so CLI commands and scripts do not poll the queue.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, args=(app,), name='webhook-queue', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the worker, if this process runs one"""
+        if self.worker_enabled and self._thread is not None:
+            self._wake.set()
+
+    def _run(self, app):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with app.app_context():
+                    self.process_due()
+            except Exception:
+                logger.exception('Webhook worker iteration failed')
+
+# Global webhook queue instance
+webhook_queue = WebhookQueue()
@@ -1,9 +1,14 @@
 # app/story/routes.py
-from flask import Blueprint, request, jsonify, session, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 from app.models import Project, Scene, Story, StoryChapter, StoryObject, User
-from app.utils.auth import login_required
-from app.utils.token_manager import track_ai_operation
-from app.services.ai_service import story_generator
+from app.utils.auth import login_required, track_ai_operation
+from app.utils.jwt_auth import token_required
+from app.utils.db_routing import read_only
+from app.services.story_generator import story_generator
+from app.services.export_service import export_service, iter_story_chapters
+from app.services.export_cache import export_cache, story_content_hash, not_modified, EXPORT_FORMATS
+from app.services.export_jobs import export_jobs
+from app.services.chapter_reconciler import reconcile_chapters
 from app import db
 import json
 from datetime import datetime
@@ -15,9 +20,10 @@ story_bp = Blueprint('story', __name__)
 
 @story_bp.route('/projects/<project_id>/story', methods=['GET'])
 @token_required
+@read_only
 def get_story(project_id):
     """Get story for a project"""
-    user_id = session['user_id']
+    user_id = request.current_user.id
     
     # Check if project exists and user has access
     project = Project.query.filter_by(id=project_id, user_id=user_id).first()
@@ -41,7 +47,7 @@ def get_story(project_id):
             'title': story.title,
             'premise': story.premise,
             'content': story.content,
-            'metadata': json.loads(story.metadata) if story.metadata else {
+            'metadata': json.loads(story.story_metadata) if story.story_metadata else {
                 'genre': project.genre,
                 'theme': '',
                 'targetAudience': project.target_audience or '',
@@ -69,7 +75,7 @@ def get_story(project_id):
 @track_ai_operation('generate_story')
 def generate_story(project_id):
     """Generate story from scenes"""
-    user_id = session['user_id']
+    user_id = request.current_user.id
     data = request.get_json() or {}
     
     # Get narrative options
@@ -125,13 +131,10 @@ def generate_story(project_id):
             existing_story.title = story_data['title']
             existing_story.premise = story_data['premise']
             existing_story.content = story_data['content']
-            existing_story.metadata = json.dumps(story_data['metadata'])
+            existing_story.story_metadata = json.dumps(story_data['metadata'])
             existing_story.word_count = story_data['wordCount']
             existing_story.updated_at = datetime.utcnow()
             
-            # Remove existing chapters
-            StoryChapter.query.filter_by(story_id=existing_story.id).delete()
-            
             story = existing_story
         else:
             # Create new story
@@ -140,23 +143,15 @@ def generate_story(project_id):
                 title=story_data['title'],
                 premise=story_data['premise'],
                 content=story_data['content'],
-                metadata=json.dumps(story_data['metadata']),
+                story_metadata=json.dumps(story_data['metadata']),
                 word_count=story_data['wordCount'],
                 created_at=datetime.utcnow()
             )
             db.session.add(story)
             db.session.flush()  # Get the ID for the new story
         
-        # Create chapters
-        for i, chapter_data in enumerate(story_data['chapters']):
-            chapter = StoryChapter(
-                story_id=story.id,
-                title=chapter_data['title'],
-                content=chapter_data['content'],
-                scene_ids=json.dumps(chapter_data['scenes']),
-                order=i
-            )
-            db.session.add(chapter)
+        # Chapters that came back the same keep their rows (and history)
+        reconcile_chapters(story, story_data['chapters'], sync_content=False)
         
         # Update project phase to 'story' if it's not already
         if project.current_phase != 'story':
@@ -165,6 +160,9 @@ def generate_story(project_id):
         
         db.session.commit()
         
+        # Warm the export cache in the background
+        export_jobs.prerender(story)
+        
         # Update the response with the database IDs
         story_data['id'] = story.id
         story_data['projectId'] = project_id
@@ -184,7 +182,7 @@ def generate_story(project_id):
 @token_required
 def update_story(project_id):
     """Update existing story"""
-    user_id = session['user_id']
+    user_id = request.current_user.id
     data = request.get_json()
     
     # Check if project exists and user has access
@@ -205,34 +203,26 @@ def update_story(project_id):
         if 'premise' in data:
             story.premise = data['premise']
         
+        if 'metadata' in data:
+            story.story_metadata = json.dumps(data['metadata'])
+        
+        # Update chapters if provided: only rows that differ are written, and
+        # content composed from the chapters follows them unless sent explicitly
+        if 'chapters' in data:
+            reconcile_chapters(story, data['chapters'], sync_content=False if 'content' in data else None)
+        
         if 'content' in data:
             story.content = data['content']
             # Update word count
             story.word_count = len(data['content'].split()) if data['content'] else 0
         
-        if 'metadata' in data:
-            story.metadata = json.dumps(data['metadata'])
-        
         story.updated_at = datetime.utcnow()
         
-        # Update chapters if provided
-        if 'chapters' in data:
-            # Remove existing chapters
-            StoryChapter.query.filter_by(story_id=story.id).delete()
-            
-            # Add new chapters
-            for i, chapter_data in enumerate(data['chapters']):
-                chapter = StoryChapter(
-                    story_id=story.id,
-                    title=chapter_data['title'],
-                    content=chapter_data['content'],
-                    scene_ids=json.dumps(chapter_data.get('scenes', [])),
-                    order=i
-                )
-                db.session.add(chapter)
-        
         db.session.commit()
         
+        # Warm the export cache in the background
+        export_jobs.prerender(story)
+        
         return jsonify({
             'success': True,
             'message': 'Story updated successfully'
@@ -247,7 +237,7 @@ def update_story(project_id):
 @track_ai_operation('regenerate_section')
 def regenerate_section(project_id):
     """Regenerate a specific section of the story"""
-    user_id = session['user_id']
+    user_id = request.current_user.id
     data = request.get_json() or {}
     
     chapter_index = data.get('chapterIndex')
@@ -271,8 +261,8 @@ def regenerate_section(project_id):
     if not story:
         return jsonify({'error': 'Story not found'}), 404
     
-    # Get chapters
-    chapters = StoryChapter.query.filter_by(story_id=story.id).order_by(StoryChapter.order).all()
+    # Get chapters (the loaded collection is reused when the story content is updated)
+    chapters = sorted(story.chapters, key=lambda c: (c.order or 0, c.id))
     if chapter_index >= len(chapters):
         return jsonify({'error': 'Chapter index out of range'}), 400
     
@@ -301,21 +291,12 @@ def regenerate_section(project_id):
             narrative_options=narrative_options
         )
         
-        # Update chapter
-        chapter.content = regenerated_chapter['content']
-        db.session.commit()
-        
-        # Get all chapters to return updated story
-        updated_chapters = StoryChapter.query.filter_by(story_id=story.id).order_by(StoryChapter.order).all()
-        
-        # Rebuild full story content
-        full_content = ""
-        for ch in updated_chapters:
-            full_content += f"# {ch.title}\n\n{ch.content}\n\n"
-        
-        story.content = full_content
-        story.word_count = len(full_content.split()) if full_content else 0
-        story.updated_at = datetime.utcnow()
+        # Update the chapter; its section of the story content is spliced in place
+        result = reconcile_chapters(
+            story, [{'id': chapter.id, 'content': regenerated_chapter['content']}],
+            partial=True, sync_content=True
+        )
+        updated_chapters = result['chapters']
         db.session.commit()
         
         # Return updated story
@@ -327,7 +308,7 @@ def regenerate_section(project_id):
                 'title': story.title,
                 'premise': story.premise,
                 'content': story.content,
-                'metadata': json.loads(story.metadata) if story.metadata else {},
+                'metadata': json.loads(story.story_metadata) if story.story_metadata else {},
                 'chapters': [
                     {
                         'id': ch.id,
@@ -351,10 +332,10 @@ def regenerate_section(project_id):
 @token_required
 def export_story(project_id):
     """Export story in various formats"""
-    user_id = session['user_id']
+    user_id = request.current_user.id
     format_type = request.args.get('format', 'pdf')
     
-    if format_type not in ['pdf', 'docx', 'epub', 'txt']:
+    if format_type not in EXPORT_FORMATS:
         return jsonify({'error': 'Invalid format type'}), 400
     
     # Check if project exists and user has access
@@ -362,40 +343,40 @@ def export_story(project_id):
     if not project:
         return jsonify({'error': 'Project not found or access denied'}), 404
     
-    # Check if story exists
-    story = Story.query.filter_by(project_id=project_id).first()
+    # Check if story exists (the flat manuscript is only loaded if needed)
+    story = Story.query.options(db.defer(Story.content)).filter_by(project_id=project_id).first()
     if not story:
         return jsonify({'error': 'Story not found'}), 404
     
     try:
-        # Generate the appropriate file
-        if format_type == 'txt':
-            # Simple text export
-            content = f"{story.title}\n\n{story.premise}\n\n{story.content}"
-            file_stream = io.BytesIO(content.encode('utf-8'))
-            filename = f"{secure_filename(story.title)}.txt"
-            mimetype = 'text/plain'
+        # Repeat downloads are answered from the content-addressed cache
+        digest = story_content_hash(story, format_type, iter_story_chapters(story.id))
+        cached = not_modified(digest)
+        if cached:
+            return cached
         
-        elif format_type == 'pdf':
-            # PDF export (using a hypothetical PDF generation service)
-            from app.services.export_service import generate_pdf
-            file_stream = generate_pdf(story)
-            filename = f"{secure_filename(story.title)}.pdf"
-            mimetype = 'application/pdf'
+        filename = f"{secure_filename(story.title)}.{format_type}"
+        path = export_cache.get(story.id, format_type, digest) if export_cache.enabled else None
+        file_stream = None
         
-        elif format_type == 'docx':
-            # DOCX export (using a hypothetical DOCX generation service)
-            from app.services.export_service import generate_docx
-            file_stream = generate_docx(story)
-            filename = f"{secure_filename(story.title)}.docx"
-            mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-        
-        elif format_type == 'epub':
-            # EPUB export (using a hypothetical EPUB generation service)
-            from app.services.export_service import generate_epub
-            file_stream = generate_epub(story)
-            filename = f"{secure_filename(story.title)}.epub"
-            mimetype = 'application/epub+zip'
+        if path is None:
+            # TXT/EPUB stream chapter by chapter; PDF/DOCX need the full layout
+            if format_type == 'txt':
+                file_stream = export_service.stream_txt(story, iter_story_chapters(story.id))
+            elif format_type == 'epub':
+                file_stream = export_service.stream_epub(story, iter_story_chapters(story.id))
+            elif format_type == 'pdf':
+                # Only chapters whose content changed are laid out again
+                file_stream = export_service.generate_pdf(
+                    story,
+                    fragment_store=export_cache if export_cache.enabled else None,
+                    executor=export_jobs.get_executor()
+                )
+            elif format_type == 'docx':
+                file_stream = export_service.generate_docx(story)
+            
+            if export_cache.enabled:
+                path = export_cache.put(story.id, format_type, digest, file_stream)
         
         # Track export operation
         user = User.query.get(user_id)
@@ -403,15 +384,104 @@ def export_story(project_id):
         db.session.commit()
         
         # Return the file
-        return send_file(
-            file_stream,
-            mimetype=mimetype,
-            as_attachment=True,
-            download_name=filename
-        )
+        if path is not None:
+            return export_cache.send(path, format_type, digest, filename)
+        
+        if hasattr(file_stream, 'read'):
+            response = send_file(
+                file_stream,
+                mimetype=EXPORT_FORMATS[format_type],
+                as_attachment=True,
+                download_name=filename
+            )
+        else:
+            # Chunked response; the generator keeps the session open while streaming
+            response = Response(stream_with_context(file_stream), mimetype=EXPORT_FORMATS[format_type])
+            response.headers.set('Content-Disposition', 'attachment', filename=filename)
+        response.set_etag(digest)
+        return response
     
     except Exception as e:
         return jsonify({'error': f'Failed to export story: {str(e)}'}), 500
 
-# Register blueprint in app/__init__.py
-# app.register_blueprint(story_bp, url_prefix='/api')
+def _export_job_response(project_id, job, status_code=200):
+    """Job payload with polling and download URLs"""
+    job_data = job.to_dict()
+    job_data['statusUrl'] = f'/api/projects/{project_id}/export/{job.id}'
+    if job.status == 'completed':
+        job_data['downloadUrl'] = f'/api/projects/{project_id}/export/{job.id}/download'
+    return jsonify({'success': True, 'job': job_data}), status_code
+
+@story_bp.route('/projects/<project_id>/export', methods=['POST'])
+@token_required
+def create_export_job(project_id):
+    """Queue a background export render"""
+    user_id = request.current_user.id
+    data = request.get_json() or {}
+    format_type = data.get('format', 'pdf')
+    
+    if format_type not in EXPORT_FORMATS:
+        return jsonify({'error': 'Invalid format type'}), 400
+    
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+    
+    story = Story.query.filter_by(project_id=project_id).first()
+    if not story:
+        return jsonify({'error': 'Story not found'}), 404
+    
+    try:
+        job = export_jobs.submit(story, format_type)
+        return _export_job_response(project_id, job, 200 if job.status == 'completed' else 202)
+    except Exception as e:
+        return jsonify({'error': f'Failed to queue export: {str(e)}'}), 500
+
+@story_bp.route('/projects/<project_id>/export/<job_id>', methods=['GET'])
+@token_required
+def get_export_job(project_id, job_id):
+    """Poll a background export"""
+    user_id = request.current_user.id
+    
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+    
+    story = Story.query.filter_by(project_id=project_id).first()
+    if not story:
+        return jsonify({'error': 'Story not found'}), 404
+    
+    job = export_jobs.get(story, job_id)
+    if not job:
+        return jsonify({'error': 'Export job not found or story has changed'}), 404
+    
+    return _export_job_response(project_id, job)
+
+@story_bp.route('/projects/<project_id>/export/<job_id>/download', methods=['GET'])
+@token_required
+def download_export_job(project_id, job_id):
+    """Download a finished background export"""
+    user_id = request.current_user.id
+    
+    project = Project.query.filter_by(id=project_id, user_id=user_id).first()
+    if not project:
+        return jsonify({'error': 'Project not found or access denied'}), 404
+    
+    story = Story.query.filter_by(project_id=project_id).first()
+    if not story:
+        return jsonify({'error': 'Story not found'}), 404
+    
+    job = export_jobs.get(story, job_id)
+    if not job:
+        return jsonify({'error': 'Export job not found or story has changed'}), 404
+    
+    cached = not_modified(job.digest)
+    if cached:
+        return cached
+    
+    path = export_jobs.artifact_path(job)
+    if not path:
+        return jsonify({'error': f'Export is {job.status}', 'job': job.to_dict()}), 409
+    
+    filename = f"{secure_filename(story.title)}.{job.format}"
+    return export_cache.send(path, job.format, job.digest, filename)
@@ -0,0 +1,66 @@
+# app/utils/aho_corasick.py - Multi-pattern matcher over token sequences
+from collections import deque
+from typing import Dict, Hashable, Iterator, List, Sequence, Tuple
+
+class AhoCorasick:
+    """Aho-Corasick automaton; patterns are sequences of symbols (here: normalized words)
+
+    Finds every occurrence of every pattern in one pass over the input,
+    independent of how many patterns there are.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[Hashable, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._own: List[List[Tuple[int, object]]] = [[]]  # (pattern length, payload) ending here
+        self._output: List[List[Tuple[int, object]]] = [[]]  # _own plus the fail chain's, set by build()
+        self._built = False
+        self.patterns = 0
+
+    def add(self, pattern: Sequence[Hashable], payload) -> None:
+        if not pattern:
+            return
+        state = 0
+        for symbol in pattern:
+            nxt = self._goto[state].get(symbol)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][symbol] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+            state = nxt
+        self._own[state].append((len(pattern), payload))
+        self.patterns += 1
+        self._built = False
+
+    def build(self) -> 'AhoCorasick':
+        """Compute failure links and outputs breadth-first (from scratch, so add() may follow)"""
+        self._output = [list(own) for own in self._own]
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for symbol, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(symbol, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._output[nxt] = self._own[nxt] + self._output[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def find(self, symbols: Sequence[Hashable]) -> Iterator[Tuple[int, int, object]]:
+        """Yield (start index, end index exclusive, payload) for every match"""
+        if not self._built:
+            self.build()
+        state = 0
+        for index, symbol in enumerate(symbols):
+            while state and symbol not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(symbol, 0)
+            for length, payload in self._output[state]:
+                yield index + 1 - length, index + 1, payload
@@ -3,6 +3,7 @@ from functools import wraps
 from flask import session, jsonify, request, current_app
 from app.models import User, TokenUsageLog, UserSubscription
 from app.services.token_manager import token_manager, TokenOperation
+from app.utils.identity import load_identity
 from app import db
 from datetime import datetime
 import time
@@ -14,9 +15,9 @@ def login_required(f):
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required'}), 401
         
-        # Check if user still exists and is active
-        user = User.query.get(session['user_id'])
-        if not user or not user.is_active:
+        # Check if user still exists and is active (cached per request/process)
+        identity = load_identity(session['user_id'])
+        if not identity or not identity.is_active:
             session.pop('user_id', None)
             return jsonify({'error': 'User account not found or inactive'}), 401
         
@@ -96,9 +97,11 @@ def execute_token_operation(operation_type: str, user_id: int, input_tokens: int
         db.session.add(log_entry)
         
         # Update user's subscription token usage if applicable
-        subscription = UserSubscription.query.filter_by(user_id=user_id).first()
-        if subscription:
-            subscription.tokens_used_this_period += operation.total_cost
+        # (an atomic increment, so a concurrent period rollover is never overwritten)
+        UserSubscription.query.filter_by(user_id=user_id).update(
+            {UserSubscription.tokens_used_this_period: UserSubscription.tokens_used_this_period + operation.total_cost},
+            synchronize_session=False
+        )
         
         try:
             db.session.commit()
@@ -113,10 +116,12 @@ def track_ai_operation(operation_type: str):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user_id' not in session:
+            # JWT routes (token_required) carry the user on the request
+            current_user = getattr(request, 'current_user', None)
+            user_id = current_user.id if current_user is not None else session.get('user_id')
+            if user_id is None:
                 return jsonify({'error': 'Authentication required'}), 401
             
-            user_id = session['user_id']
             start_time = time.time()
             
             # Get request data for input token estimation
@@ -228,10 +233,12 @@ def collaboration_permission_required(permission: str):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user_id' not in session:
+            # JWT routes (token_required) carry the user on the request
+            current_user = getattr(request, 'current_user', None)
+            user_id = current_user.id if current_user is not None else session.get('user_id')
+            if user_id is None:
                 return jsonify({'error': 'Authentication required'}), 401
             
-            user_id = session['user_id']
             project_id = kwargs.get('project_id') or request.get_json().get('project_id')
             
             if not project_id:
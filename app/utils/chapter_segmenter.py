@@ -0,0 +1,84 @@
+# app/utils/chapter_segmenter.py - Fast offset-based chapter splitting
+import bisect
+import re
+from typing import List, Optional, Sequence, Tuple
+
+# Blank line(s) between paragraphs
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+
+# Explicit scene breaks ("***", "* * *", "---", "#") are preferred cut points; the marker ends the chapter
+SCENE_BREAK = re.compile(r'\n[ \t]*(?:(?:\*[ \t]*){3,}|-{3,}|#{1,6}|§)[ \t]*\n\s*')
+
+# Markdown headings are equally good cut points, but the heading opens the next chapter
+HEADING = re.compile(r'\n[ \t]*#{1,6}[ \t]+\S')
+
+# Sentence end: terminal punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_END = re.compile(r'[.!?…]+["\'”’»)\]]*\s+')
+
+def _chapter_targets(length: int, chapter_count: int, weights: Optional[Sequence[float]]) -> List[int]:
+    """Ideal cut offsets, proportional to scene weights when provided"""
+    if weights:
+        # Group scenes into chapters like _auto_generate_chapters assigns them
+        scene_count = len(weights)
+        total = float(sum(weights)) or 1.0
+        targets = []
+        for i in range(1, chapter_count):
+            scene_end = (i * scene_count) // chapter_count
+            targets.append(int(length * sum(weights[:scene_end]) / total))
+        return targets
+    return [(length * i) // chapter_count for i in range(1, chapter_count)]
+
+def _nearest(boundaries: List[int], target: int, low: int, high: int) -> Optional[int]:
+    """Boundary closest to target within (low, high), or None"""
+    index = bisect.bisect_left(boundaries, target)
+    best = None
+    for candidate in boundaries[max(0, index - 1):index + 1]:
+        if low < candidate < high and (best is None or abs(candidate - target) < abs(best - target)):
+            best = candidate
+    return best
+
+def segment_chapters(text: str, chapter_count: int,
+                     scene_weights: Optional[Sequence[float]] = None,
+                     tolerance: float = 0.5) -> List[Tuple[int, int]]:
+    """Split text into chapter_count (start, end) offsets
+
+    Cuts prefer explicit scene breaks, then paragraph boundaries, then
+    sentence ends, within `tolerance` of a chapter length from each ideal
+    target. Only cut offsets are collected, so no sentence list is built.
+    """
+    length = len(text)
+    if chapter_count <= 1 or length == 0:
+        return [(0, length)]
+
+    targets = _chapter_targets(length, chapter_count, scene_weights)
+    window = max(1, int(length / chapter_count * tolerance))
+
+    # One regex pass each over the text, keeping only offsets
+    scene_breaks = sorted(
+        [match.end() for match in SCENE_BREAK.finditer(text)] +
+        [match.start() for match in HEADING.finditer(text)]
+    )
+    paragraph_breaks = [match.end() for match in PARAGRAPH_BREAK.finditer(text)]
+
+    cuts = []
+    previous = 0
+    for target in targets:
+        low, high = max(previous, target - window), min(length, target + window)
+        cut = _nearest(scene_breaks, target, low, high)
+        if cut is None:
+            cut = _nearest(paragraph_breaks, target, low, high)
+        if cut is None:
+            # Single huge paragraph: first sentence end after the target
+            match = SENTENCE_END.search(text, target, high)
+            cut = match.end() if match else target
+        cut = max(cut, previous)
+        cuts.append(cut)
+        previous = cut
+
+    offsets = [0] + cuts + [length]
+    return [(offsets[i], offsets[i + 1]) for i in range(chapter_count)]
+
+def split_chapters(text: str, chapter_count: int,
+                   scene_weights: Optional[Sequence[float]] = None) -> List[str]:
+    """Chapter texts for segment_chapters offsets (whitespace trimmed)"""
+    return [text[start:end].strip() for start, end in segment_chapters(text, chapter_count, scene_weights)]
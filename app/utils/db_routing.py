@@ -0,0 +1,143 @@
+# app/utils/db_routing.py - Primary/replica session routing with read-your-writes stickiness
+import random
+import threading
+import time
+from functools import wraps
+from typing import Dict, List, Optional
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Replica engines are registered as SQLALCHEMY_BINDS entries with these keys
+REPLICA_BIND_PREFIX = 'replica_'
+
+# Marks a client that wrote recently, so any worker process keeps it on the primary
+STICKY_COOKIE = 'sf_primary'
+
+def replica_binds(urls: List[str]) -> Dict[str, str]:
+    """SQLALCHEMY_BINDS entries for the configured replica URLs"""
+    return {f'{REPLICA_BIND_PREFIX}{index}': url for index, url in enumerate(urls)}
+
+class ReplicaRouter:
+    """Decides per query whether a read may go to a replica"""
+
+    def __init__(self, max_entries: int = 100000):
+        self._lock = threading.Lock()
+        self._last_write: Dict[int, float] = {}
+        self._max_entries = max_entries
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    def init_app(self, app):
+        app.extensions['db_replica_keys'] = sorted(
+            key for key in (app.config.get('SQLALCHEMY_BINDS') or {})
+            if key.startswith(REPLICA_BIND_PREFIX)
+        )
+
+        @app.after_request
+        def _mark_sticky_client(response):
+            if g.get('db_committed_write') and app.extensions['db_replica_keys']:
+                response.set_cookie(
+                    STICKY_COOKIE, '1', max_age=max(1, int(self.sticky_seconds())),
+                    httponly=True, samesite='Lax'
+                )
+            return response
+
+    @staticmethod
+    def sticky_seconds() -> float:
+        return float(current_app.config.get('DATABASE_REPLICA_STICKY_SECONDS', 5))
+
+    def _user_id(self) -> Optional[int]:
+        identity = g.get('identity')
+        return identity.id if identity is not None else None
+
+    def note_write(self):
+        """Remember a committed write so this client reads from the primary for a while"""
+        if not has_app_context():
+            return
+        g.db_committed_write = True
+        user_id = self._user_id()
+        if user_id is None:
+            return
+        with self._lock:
+            if len(self._last_write) >= self._max_entries:
+                cutoff = time.monotonic() - self.sticky_seconds()
+                self._last_write = {k: v for k, v in self._last_write.items() if v > cutoff}
+            self._last_write[user_id] = time.monotonic()
+
+    def is_sticky(self) -> bool:
+        """True while replicas may not have caught up with this client's last write"""
+        if g.get('db_committed_write'):
+            return True
+        if has_request_context() and request.cookies.get(STICKY_COOKIE):
+            return True
+        user_id = self._user_id()
+        last = self._last_write.get(user_id) if user_id is not None else None
+        return last is not None and time.monotonic() - last < self.sticky_seconds()
+
+    def replica_engine(self, db):
+        """Replica engine for this request (one replica per request), or None"""
+        keys = current_app.extensions.get('db_replica_keys')
+        if not keys:
+            return None
+        key = g.get('db_replica_key')
+        if key is None:
+            key = g.db_replica_key = random.choice(keys)
+        return db.engines[key]
+
+    def route(self, session, clause, primary):
+        """Engine for a statement: a replica for SELECTs inside read-only handlers"""
+        if not has_app_context() or not g.get('db_read_only'):
+            return primary
+        if session._flushing or session.info.get('db_wrote') or not getattr(clause, 'is_select', False):
+            return primary
+        if primary is not session._db.engines.get(None) or self.is_sticky():
+            self.primary_reads += 1
+            return primary
+        replica = self.replica_engine(session._db)
+        if replica is None:
+            return primary
+        self.replica_reads += 1
+        return replica
+
+    def stats(self) -> Dict:
+        return {
+            'replicas': len(current_app.extensions.get('db_replica_keys') or []),
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            'sticky_users': len(self._last_write)
+        }
+
+# Global replica router instance
+replica_router = ReplicaRouter()
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends read-only SELECTs to a replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None:
+            return primary
+        return replica_router.route(self, clause, primary)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_flush(session, flush_context):
+    # Later reads in this session must see its own writes
+    session.info['db_wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _note_commit(session):
+    if session.info.get('db_wrote'):
+        replica_router.note_write()
+
+def read_only(f):
+    """Allow a route's SELECTs to be served by a replica"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        previous = g.get('db_read_only', False)
+        g.db_read_only = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.db_read_only = previous
+    return decorated
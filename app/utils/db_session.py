@@ -0,0 +1,65 @@
+# app/utils/db_session.py - Hand pooled connections back during slow external calls
+from contextlib import contextmanager
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+# session.info flag: this transaction has written rows that are not committed yet
+WRITES_PENDING = 'db_writes_pending'
+
+@event.listens_for(Session, 'after_flush')
+def _note_flushed_writes(session, flush_context):
+    session.info[WRITES_PENDING] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[WRITES_PENDING] = True
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _clear_written(session):
+    session.info.pop(WRITES_PENDING, None)
+
+def release_connection() -> bool:
+    """End the current read transaction so its connection returns to the pool
+
+    Commits without expiring loaded objects, so they stay usable; the next
+    query checks a connection out again. Skipped when there are unflushed
+    changes, or flushed/bulk writes not yet committed; the caller commits those.
+    """
+    if not has_app_context():
+        return False
+    session = db.session()
+    if not session.in_transaction() or session.new or session.dirty or session.deleted:
+        return False
+    if session.info.get(WRITES_PENDING):
+        return False
+    expire_on_commit = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = expire_on_commit
+    return True
+
+@contextmanager
+def external_calls():
+    """Load data first, then call Claude inside this block; persist after it
+
+    The connection is released on entry and again before every Claude
+    request made in the block (lazy loads between requests reacquire one).
+    """
+    release_connection()
+    previous = g.get('db_release_before_external_call', False)
+    g.db_release_before_external_call = True
+    try:
+        yield
+    finally:
+        g.db_release_before_external_call = previous
+
+def before_external_call():
+    """Called by API clients right before a network round-trip"""
+    if has_app_context() and g.get('db_release_before_external_call'):
+        release_connection()
@@ -0,0 +1,247 @@
+# app/utils/identity.py - Request-scoped identity backed by a short-TTL auth cache
+import threading
+import time
+from typing import Dict, Optional
+from flask import g, current_app, has_app_context
+from sqlalchemy import event, inspect
+from app import db
+from app.models import User
+
+# Columns whose change must invalidate cached auth state
+AUTH_STATE_FIELDS = ('is_active', 'plan', 'tokens_limit', 'password_hash', 'username', 'email', 'token_epoch')
+
+class UserIdentity:
+    """Immutable snapshot of the user fields needed to authorize a request"""
+
+    __slots__ = ('id', 'username', 'email', 'plan', 'is_active', 'tokens_limit',
+                 'token_epoch', 'claims_only')
+
+    def __init__(self, id: int, username: str, email: str, plan: str,
+                 is_active: bool, tokens_limit: int, token_epoch: int = 0,
+                 claims_only: bool = False):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.plan = plan
+        self.is_active = is_active
+        self.tokens_limit = tokens_limit
+        self.token_epoch = token_epoch
+        self.claims_only = claims_only
+
+    @classmethod
+    def from_user(cls, user: User) -> 'UserIdentity':
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            plan=user.plan,
+            is_active=bool(user.is_active),
+            tokens_limit=user.tokens_limit,
+            token_epoch=user.token_epoch or 0
+        )
+
+    @classmethod
+    def from_claims(cls, payload: Dict) -> 'UserIdentity':
+        """Identity trusted from signed JWT claims only (no DB read)
+        
+        The plan is as of token issue; anything plan-dependent (limits,
+        features) must read the subscription or user row instead.
+        """
+        return cls(
+            id=payload['user_id'],
+            username=payload.get('username'),
+            email=None,
+            plan=payload.get('plan'),
+            is_active=True,  # Deactivation bumps token_epoch, so current claims imply active
+            tokens_limit=None,
+            token_epoch=payload.get('epoch', 0),
+            claims_only=True
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'plan': self.plan
+        }
+
+class UserAuthCache:
+    """Per-process TTL cache of user auth state (use Redis to share across workers)"""
+
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}  # {user_id: (expires_at, identity)}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[UserIdentity]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, identity: UserIdentity, ttl_seconds: float = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+        with self._lock:
+            if identity.id not in self._entries and len(self._entries) >= self.max_entries:
+                # Evict the oldest insertion
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[identity.id] = (time.monotonic() + ttl, identity)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+class TokenEpochRegistry:
+    """Per-process record of the newest token epoch seen for each user
+
+    Tokens carrying an older epoch are known to be revoked without a DB read.
+    Entries are only ever raised, so a stale entry can never un-revoke a token.
+    Another process may revoke without this one noticing, so an entry only
+    vouches for the current epoch (known_epoch) for ttl_seconds after it was
+    last confirmed from the DB; older ones still prove revocation.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._epochs = {}  # {user_id: (epoch, confirmed until)}
+        self._lock = threading.Lock()
+
+    def note(self, user_id: int, epoch: int, ttl_seconds: float = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            known = self._epochs.get(user_id)
+            if known is not None and epoch < known[0]:
+                return
+            if known is None and len(self._epochs) >= self.max_entries:
+                self._epochs.pop(next(iter(self._epochs)))
+            self._epochs[user_id] = (epoch, time.monotonic() + ttl)
+
+    def known_epoch(self, user_id: int) -> Optional[int]:
+        """Current epoch, if confirmed within the TTL; None means ask the DB"""
+        known = self._epochs.get(user_id)
+        if known is None or known[1] <= time.monotonic():
+            return None
+        return known[0]
+
+    def is_revoked(self, user_id: int, epoch: int) -> bool:
+        known = self._epochs.get(user_id)
+        return known is not None and epoch < known[0]
+
+    def clear(self):
+        with self._lock:
+            self._epochs.clear()
+
+# Global auth cache instances
+user_auth_cache = UserAuthCache()
+token_epochs = TokenEpochRegistry()
+
+def _cache_ttl() -> float:
+    if has_app_context():
+        return current_app.config.get('AUTH_CACHE_TTL_SECONDS', user_auth_cache.ttl_seconds)
+    return user_auth_cache.ttl_seconds
+
+def load_identity(user_id: int) -> Optional[UserIdentity]:
+    """Resolve the identity for this request: g, then process cache, then one DB read"""
+    identity = g.get('identity')
+    if identity is not None and identity.id == user_id and not identity.claims_only:
+        return identity
+
+    identity = user_auth_cache.get(user_id)
+    if identity is None:
+        user = get_request_user(user_id)
+        if user is None:
+            return None
+        identity = UserIdentity.from_user(user)
+        user_auth_cache.set(identity, _cache_ttl())
+        token_epochs.note(identity.id, identity.token_epoch, _cache_ttl())
+
+    g.identity = identity
+    return identity
+
+def use_claims_identity(payload: Dict) -> UserIdentity:
+    """Install an identity for this request from verified JWT claims"""
+    identity = user_auth_cache.get(payload['user_id']) or UserIdentity.from_claims(payload)
+    g.identity = identity
+    return identity
+
+def current_identity() -> Optional[UserIdentity]:
+    """Identity loaded by the auth decorators for the current request"""
+    return g.get('identity')
+
+def get_user_identity(user_id: int) -> Optional[UserIdentity]:
+    """Cached identity for any user (e.g. notification payloads) without touching g"""
+    current = g.get('identity') if has_app_context() else None
+    if current is not None and current.id == user_id and not current.claims_only:
+        return current
+
+    identity = user_auth_cache.get(user_id)
+    if identity is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        identity = UserIdentity.from_user(user)
+        user_auth_cache.set(identity, _cache_ttl())
+    return identity
+
+def get_request_user(user_id: int) -> Optional[User]:
+    """Load the User row at most once per request for handlers that need live data"""
+    user = g.get('current_user')
+    if user is not None and user.id == user_id:
+        return user
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        g.current_user = user
+    return user
+
+def invalidate_user(user_id: int):
+    """Drop cached auth state after plan, limit or status changes"""
+    user_auth_cache.invalidate(user_id)
+    if has_app_context():
+        identity = g.get('identity')
+        if identity is not None and identity.id == user_id:
+            g.pop('identity', None)
+
+@event.listens_for(User, 'before_update')
+def _revoke_tokens_on_deactivation(mapper, connection, target):
+    # Issued tokens imply an active account; make them stale. Plan changes do
+    # not revoke: the claimed plan is informational and plan checks read the DB
+    state = inspect(target)
+    deactivated = state.attrs.is_active.history.has_changes() and not target.is_active
+    if deactivated and not state.attrs.token_epoch.history.has_changes():
+        target.revoke_tokens()
+
+@event.listens_for(User, 'after_update')
+def _invalidate_on_auth_change(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in AUTH_STATE_FIELDS):
+        invalidate_user(target.id)
+        token_epochs.note(target.id, target.token_epoch or 0, _cache_ttl())
+
+@event.listens_for(User, 'after_delete')
+def _invalidate_on_delete(mapper, connection, target):
+    invalidate_user(target.id)
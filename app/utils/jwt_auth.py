@@ -4,33 +4,83 @@ import os
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
-from app.models import User
+from app.utils.identity import load_identity, use_claims_identity, token_epochs
 
-def generate_token(user_id):
+JWT_ALGORITHM = 'HS256'
+
+# Methods served from signed claims alone when JWT_CLAIMS_FAST_PATH is on
+READ_ONLY_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+def _signing_key():
+    """Signing key resolved once per app instead of on every request"""
+    key = current_app.extensions.get('jwt_signing_key')
+    if key is None:
+        key = (current_app.config.get('JWT_SECRET_KEY')
+               or current_app.config.get('SECRET_KEY', 'dev-secret-key'))
+        current_app.extensions['jwt_signing_key'] = key
+    return key
+
+def generate_token(user_id, plan=None, token_epoch=0, username=None):
     """Generate JWT token for user"""
     payload = {
         'user_id': user_id,
+        'plan': plan,
+        'epoch': token_epoch or 0,
         'exp': datetime.utcnow() + timedelta(hours=24),
         'iat': datetime.utcnow()
     }
+    if username:
+        payload['username'] = username
     
-    secret_key = current_app.config.get('SECRET_KEY', 'dev-secret-key')
-    token = jwt.encode(payload, secret_key, algorithm='HS256')
+    token = jwt.encode(payload, _signing_key(), algorithm=JWT_ALGORITHM)
     return token
 
-def verify_token(token):
-    """Verify JWT token and return user_id"""
+def generate_user_token(user):
+    """Generate JWT token carrying the user's current plan and token epoch"""
+    return generate_token(user.id, plan=user.plan, token_epoch=user.token_epoch,
+                          username=user.username)
+
+def decode_token(token):
+    """Verify JWT signature/expiry and return its claims"""
     try:
-        secret_key = current_app.config.get('SECRET_KEY', 'dev-secret-key')
-        payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        return payload['user_id']
+        payload = jwt.decode(token, _signing_key(), algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    if 'user_id' not in payload:
+        return None
+    if token_epochs.is_revoked(payload['user_id'], payload.get('epoch', 0)):
+        return None
+    return payload
+
+def verify_token(token):
+    """Verify JWT token and return user_id"""
+    payload = decode_token(token)
+    return payload['user_id'] if payload else None
+
+def _claims_fast_path(payload):
+    """Whether this request may be authorized from the token claims alone"""
+    if request.method not in READ_ONLY_METHODS:
+        return False
+    if not current_app.config.get('JWT_CLAIMS_FAST_PATH', True):
+        return False
+    # Tokens issued before claims were added must take the DB path
+    if payload.get('plan') is None:
+        return False
+    # Claims are only current if they carry the epoch this process confirmed
+    # within AUTH_CACHE_TTL_SECONDS; an unknown or expired one is read from the DB
+    known = token_epochs.known_epoch(payload['user_id'])
+    return known is not None and known == payload.get('epoch', 0)
 
 def token_required(f):
-    """Decorator for routes that require authentication"""
+    """Decorator for routes that require authentication
+    
+    Read-only requests trust the signed claims once this process knows the
+    token's epoch is current; writes, legacy tokens and unknown or mismatched
+    epochs resolve the identity from the cache/database.
+    """
     @wraps(f)
     def decorated_function(*args, **kwargs):
         token = None
@@ -50,17 +100,26 @@ def token_required(f):
         if not token:
             return jsonify({'error': 'Token is missing'}), 401
         
-        user_id = verify_token(token)
-        if user_id is None:
+        payload = decode_token(token)
+        if payload is None:
             return jsonify({'error': 'Token is invalid or expired'}), 401
         
-        # Check if user exists and is active
-        user = User.query.get(user_id)
-        if not user or not user.is_active:
+        if _claims_fast_path(payload):
+            identity = use_claims_identity(payload)
+        else:
+            # Check if user exists (cached per request/process)
+            identity = load_identity(payload['user_id'])
+            if not identity:
+                return jsonify({'error': 'User not found or inactive'}), 401
+            if payload.get('epoch', 0) < identity.token_epoch:
+                return jsonify({'error': 'Token has been revoked'}), 401
+        
+        # A cached identity may be deactivated even when the claims look current
+        if not identity.is_active:
             return jsonify({'error': 'User not found or inactive'}), 401
         
-        # Add user to request context
-        request.current_user = user
+        # Add identity to request context (also available as g.identity)
+        request.current_user = identity
         return f(*args, **kwargs)
     
-    return decorated_function
\ No newline at end of file
+    return decorated_function
@@ -0,0 +1,101 @@
+# app/utils/lazy_imports.py - Load heavy optional dependencies on first use
+import importlib
+import importlib.util
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+class LazyModule:
+    """Module proxy that imports on first attribute access
+
+    `available` only checks that the package can be found, so feature flags
+    such as ANTHROPIC_AVAILABLE cost nothing at import time.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._error = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def available(self) -> bool:
+        if self._module is not None:
+            return True
+        if self._error is not None:
+            return False
+        try:
+            return importlib.util.find_spec(self._name.split('.')[0]) is not None
+        except (ImportError, ValueError):
+            return False
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def load(self):
+        """Import the module (once); raises ImportError if it is missing"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    if self._error is not None:
+                        raise self._error
+                    start = time.perf_counter()
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except ImportError as e:
+                        self._error = e
+                        raise
+                    self.load_seconds = time.perf_counter() - start
+        return self._module
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<LazyModule {self._name} ({state})>'
+
+# Registry of lazily imported modules, used for pre-warming and profiling
+_registry: Dict[str, LazyModule] = {}
+
+def lazy_module(name: str) -> LazyModule:
+    """Shared lazy proxy for a module"""
+    module = _registry.get(name)
+    if module is None:
+        module = _registry.setdefault(name, LazyModule(name))
+    return module
+
+def lazy_modules() -> Dict[str, LazyModule]:
+    return dict(_registry)
+
+def prewarm(names: Optional[Iterable[str]] = None, background: bool = True):
+    """Import registered (or named) modules, by default in a daemon thread"""
+    targets = [lazy_module(name) for name in names] if names else list(_registry.values())
+
+    def _load_all():
+        for module in targets:
+            try:
+                module.load()
+            except ImportError:
+                pass
+
+    if not background:
+        _load_all()
+        return None
+    thread = threading.Thread(target=_load_all, name='lazy-import-prewarm', daemon=True)
+    thread.start()
+    return thread
+
+def load_stats() -> Dict[str, Dict]:
+    return {
+        name: {
+            'available': module.available,
+            'loaded': module.loaded,
+            'load_ms': round(module.load_seconds * 1000, 1) if module.load_seconds else None
+        }
+        for name, module in sorted(_registry.items())
+    }
@@ -0,0 +1,201 @@
+# app/utils/load_seed.py - Deterministic bulk data for load tests
+import math
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import delete, func, insert, select
+from app import db
+from app.models import (
+    User, UserSubscription, Project, Scene, StoryObject, SceneObject, ObjectMention, Story, StoryChapter,
+    Revision, Comment, TokenUsageLog, ProjectCollaborator, ProjectCollaborationStats, UsagePeriod
+)
+
+# Seeded accounts: loadtest-00000@storyforge.test ... (all share this password)
+LOAD_TEST_EMAIL_DOMAIN = 'storyforge.test'
+LOAD_TEST_PASSWORD = 'loadtest123'
+
+# Marks the project every collaborator account is an active editor of
+SHARED_PROJECT_MARKER = 'load_test_shared'
+
+_WORDS = (
+    'babička dopis skříňka válka tajemství nádraží Praha noc zpráva šifra vlak most '
+    'strach naděje dům zahrada svíčka kapsa klíč deník fotografie zima řeka les cesta '
+    'otec sestra voják lékař učitel hlas ticho okno dveře světlo stín pravda lež'
+).split()
+_GENRES = ('mystery', 'fantasy', 'romance', 'thriller', 'sci-fi', 'drama')
+_SCENE_TYPES = ('inciting', 'development', 'climax', 'resolution')
+_OBJECT_TYPES = ('character', 'location', 'item', 'conflict')
+_OPERATIONS = ('analyze_idea', 'create_scene', 'enhanced_critics', 'generate_story', 'suggest_scenes')
+_COMMENT_TYPES = ('general', 'suggestion', 'issue', 'praise')
+
+def load_test_email(index: int) -> str:
+    return f'loadtest-{index:05d}@{LOAD_TEST_EMAIL_DOMAIN}'
+
+def _text(rng: random.Random, words: int) -> str:
+    sentences, remaining = [], words
+    while remaining > 0:
+        length = min(remaining, rng.randint(6, 18))
+        sentence = ' '.join(rng.choice(_WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + '.')
+        remaining -= length
+    return ' '.join(sentences)
+
+def _scene_count(rng: random.Random, low: int, high: int) -> int:
+    """Log-uniform: most projects are small, a few are very large"""
+    return int(round(math.exp(rng.uniform(math.log(low), math.log(high)))))
+
+def _next_id(model) -> int:
+    return (db.session.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _bulk(model, rows: List[Dict], batch: int = 5000):
+    for start in range(0, len(rows), batch):
+        db.session.execute(insert(model), rows[start:start + batch])
+
+def clear_load_data() -> int:
+    """Delete every seeded account and everything hanging off it (bulk, no ORM cascades)"""
+    user_ids = select(User.id).where(User.email.like(f'loadtest-%@{LOAD_TEST_EMAIL_DOMAIN}'))
+    project_ids = select(Project.id).where(Project.user_id.in_(user_ids))
+    scene_ids = select(Scene.id).where(Scene.project_id.in_(project_ids))
+    story_ids = select(Story.id).where(Story.project_id.in_(project_ids))
+    chapter_ids = select(StoryChapter.id).where(StoryChapter.story_id.in_(story_ids))
+    removed = db.session.execute(select(func.count()).select_from(user_ids.subquery())).scalar()
+
+    for statement in (
+        delete(TokenUsageLog).where(
+            TokenUsageLog.user_id.in_(user_ids) | TokenUsageLog.project_id.in_(project_ids)
+        ),
+        delete(Comment).where(Comment.project_id.in_(project_ids) | Comment.user_id.in_(user_ids)),
+        delete(SceneObject).where(SceneObject.scene_id.in_(scene_ids)),
+        delete(ObjectMention).where(ObjectMention.project_id.in_(project_ids)),
+        delete(Revision).where(
+            ((Revision.entity_type == 'scene') & Revision.entity_id.in_(scene_ids))
+            | ((Revision.entity_type == 'chapter') & Revision.entity_id.in_(chapter_ids))
+            | Revision.user_id.in_(user_ids)
+        ),
+        delete(Scene).where(Scene.project_id.in_(project_ids)),
+        delete(StoryObject).where(StoryObject.project_id.in_(project_ids)),
+        delete(StoryChapter).where(StoryChapter.story_id.in_(story_ids)),
+        delete(Story).where(Story.project_id.in_(project_ids)),
+        delete(ProjectCollaborator).where(
+            ProjectCollaborator.project_id.in_(project_ids) | ProjectCollaborator.user_id.in_(user_ids)
+        ),
+        delete(ProjectCollaborationStats).where(ProjectCollaborationStats.project_id.in_(project_ids)),
+        delete(Project).where(Project.user_id.in_(user_ids)),
+        delete(UsagePeriod).where(UsagePeriod.user_id.in_(user_ids)),
+        delete(UserSubscription).where(UserSubscription.user_id.in_(user_ids)),
+        delete(User).where(User.id.in_(user_ids)),
+    ):
+        db.session.execute(statement, execution_options={'synchronize_session': False})
+    db.session.commit()
+    return removed
+
+def seed_load_data(users: int = 50, projects_per_user: int = 2, min_scenes: int = 10,
+                   max_scenes: int = 500, objects_per_project: int = 25, comments_per_scene: float = 1.0,
+                   token_logs_per_user: int = 200, collaborators: int = 5, seed: int = 42) -> Dict:
+    """Insert a reproducible data set sized like production; returns row counts"""
+    from app.services.password_hasher import password_hasher
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = password_hasher.hash(LOAD_TEST_PASSWORD)
+    user_id, scene_id, object_id, comment_id = (
+        _next_id(User), _next_id(Scene), _next_id(StoryObject), _next_id(Comment)
+    )
+
+    user_rows, project_rows, scene_rows, object_rows = [], [], [], []
+    link_rows, comment_rows, log_rows, collaborator_rows = [], [], [], []
+
+    for index in range(users):
+        uid = user_id + index
+        user_rows.append({
+            'id': uid, 'username': f'loadtest_{index:05d}', 'email': load_test_email(index),
+            'password_hash': password_hash, 'plan': 'enterprise', 'tokens_used': 0,
+            'tokens_limit': 10 ** 9, 'is_active': True, 'token_epoch': 0,
+            'created_at': now - timedelta(days=rng.randint(1, 365))
+        })
+
+        own_projects = []
+        for project_index in range(projects_per_user):
+            project_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            shared = index == 0 and project_index == 0
+            project_scenes = _scene_count(rng, min_scenes, max_scenes)
+            own_projects.append(project_id)
+            project_rows.append({
+                'id': project_id, 'title': f'Load test {index}/{project_index}',
+                'description': _text(rng, 40), 'genre': rng.choice(_GENRES), 'current_phase': 'expand',
+                'target_word_count': 50000, 'current_word_count': 0, 'status': 'active',
+                'attributes': {SHARED_PROJECT_MARKER: True} if shared else {},
+                'marketability': rng.randint(1, 5), 'user_id': uid,
+                'created_at': now - timedelta(days=rng.randint(0, 180)), 'updated_at': now
+            })
+
+            first_object = object_id
+            for _ in range(objects_per_project):
+                object_rows.append({
+                    'id': object_id, 'name': f'{rng.choice(_WORDS).capitalize()} {object_id}',
+                    'object_type': rng.choice(_OBJECT_TYPES), 'description': _text(rng, 20),
+                    'importance': rng.choice(('low', 'medium', 'high')), 'status': 'active',
+                    'project_id': project_id
+                })
+                object_id += 1
+
+            word_total = 0
+            for order in range(1, project_scenes + 1):
+                words = rng.randint(80, 400)
+                word_total += words
+                scene_rows.append({
+                    'id': scene_id, 'title': f'Scéna {order}', 'description': _text(rng, words),
+                    'scene_type': rng.choice(_SCENE_TYPES), 'order_index': order,
+                    'location': rng.choice(_WORDS), 'emotional_intensity': round(rng.random(), 2),
+                    'word_count': words, 'dialog_count': rng.randint(0, 12), 'project_id': project_id,
+                    'created_at': now, 'updated_at': now
+                })
+                if objects_per_project:
+                    for linked in rng.sample(range(objects_per_project), min(3, objects_per_project)):
+                        link_rows.append({
+                            'scene_id': scene_id, 'object_id': first_object + linked,
+                            'significance': rng.choice(('main', 'supporting', 'background'))
+                        })
+                for _ in range(int(comments_per_scene) + (rng.random() < comments_per_scene % 1)):
+                    segment = str(comment_id).zfill(Comment.PATH_SEGMENT_WIDTH)
+                    comment_rows.append({
+                        'id': comment_id, 'content': _text(rng, rng.randint(5, 40)),
+                        'project_id': project_id, 'scene_id': scene_id, 'user_id': uid,
+                        'thread_depth': 0, 'root_comment_id': comment_id, 'thread_path': segment,
+                        'is_resolved': rng.random() < 0.3, 'comment_type': rng.choice(_COMMENT_TYPES),
+                        'created_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)), 'updated_at': now
+                    })
+                    comment_id += 1
+                scene_id += 1
+            project_rows[-1]['current_word_count'] = word_total
+
+            if shared:
+                for offset in range(1, min(collaborators, users - 1) + 1):
+                    collaborator_rows.append({
+                        'project_id': project_id, 'user_id': user_id + offset, 'role': 'editor',
+                        'permissions': {'edit_scenes': True}, 'status': 'active', 'invited_by': uid,
+                        'invited_at': now, 'joined_at': now
+                    })
+
+        for _ in range(token_logs_per_user):
+            input_tokens, output_tokens = rng.randint(50, 3000), rng.randint(50, 2000)
+            log_rows.append({
+                'operation_type': rng.choice(_OPERATIONS), 'input_tokens': input_tokens,
+                'output_tokens': output_tokens, 'total_cost': (input_tokens + output_tokens) // 100 + 1,
+                'multiplier': 1.0, 'user_id': uid, 'project_id': rng.choice(own_projects) if own_projects else None,
+                'ai_model_used': 'claude-3-5-sonnet', 'response_time_ms': rng.randint(300, 20000),
+                'billable': True, 'created_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            })
+
+    for model, rows in ((User, user_rows), (Project, project_rows), (StoryObject, object_rows),
+                        (Scene, scene_rows), (SceneObject, link_rows), (Comment, comment_rows),
+                        (TokenUsageLog, log_rows), (ProjectCollaborator, collaborator_rows)):
+        _bulk(model, rows)
+    db.session.commit()
+
+    return {
+        'users': len(user_rows), 'projects': len(project_rows), 'scenes': len(scene_rows),
+        'objects': len(object_rows), 'scene_objects': len(link_rows), 'comments': len(comment_rows),
+        'token_logs': len(log_rows), 'collaborators': len(collaborator_rows), 'seed': seed
+    }
@@ -0,0 +1,342 @@
+# app/utils/load_test.py - Scripted user journeys and socketio collaborators against the real app
+import json
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.services.simulated_claude import simulated_claude
+from app.utils.load_seed import LOAD_TEST_PASSWORD, SHARED_PROJECT_MARKER, load_test_email
+
+# Result file layout version; bump when fields change meaning
+RESULT_FORMAT = 1
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Steps whose endpoint may be absent in this deployment (404 counts as skipped, not failed)
+OPTIONAL_STEPS = frozenset(('export',))
+
+_IDEAS = (
+    'Při úklidu po babičce najdu v její staré skřínce zakódovaný dopis z války.',
+    'A lighthouse keeper receives radio messages from a ship that sank fifty years ago.',
+    'Dvě sestry zdědí knihkupectví, ve kterém se po půlnoci mění konce knih.',
+    'An archivist discovers that the city map she maintains is rewriting the streets.',
+)
+
+def percentile(ordered: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(latencies: List[float]) -> Dict:
+    """Latency percentiles in milliseconds"""
+    ordered = sorted(latencies)
+    summary = {f'p{p}': _ms(percentile(ordered, p)) for p in PERCENTILES}
+    summary['mean'] = _ms(sum(ordered) / len(ordered)) if ordered else None
+    summary['max'] = _ms(ordered[-1]) if ordered else None
+    return summary
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+class Recorder:
+    """Thread-safe per-step latency and outcome collection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Counter] = {}
+        self.errors: Dict[str, int] = {}
+        self.skipped: Dict[str, int] = {}
+
+    def record(self, step: str, seconds: float, status, ok: bool, skipped: bool = False):
+        with self._lock:
+            self.statuses.setdefault(step, Counter())[str(status)] += 1
+            if skipped:
+                self.skipped[step] = self.skipped.get(step, 0) + 1
+                return
+            self.latencies.setdefault(step, []).append(seconds)
+            if not ok:
+                self.errors[step] = self.errors.get(step, 0) + 1
+
+    def steps(self) -> Dict[str, Dict]:
+        with self._lock:
+            result = {}
+            for step in sorted(self.statuses):
+                latencies = self.latencies.get(step, [])
+                result[step] = dict(
+                    summarize(latencies),
+                    count=len(latencies),
+                    errors=self.errors.get(step, 0),
+                    skipped=self.skipped.get(step, 0),
+                    statuses=dict(self.statuses[step])
+                )
+            return result
+
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(len(latencies) for latencies in self.latencies.values())
+
+class VirtualUser:
+    """One seeded account driving the app through its own test client"""
+
+    def __init__(self, app, recorder: Recorder, index: int, rng: random.Random):
+        self.app = app
+        self.client = app.test_client()
+        self.recorder = recorder
+        self.index = index
+        self.rng = rng
+        self.user_id = None
+        self.headers = {}
+
+    def request(self, step: str, method: str, path: str, payload=None):
+        start = time.perf_counter()
+        try:
+            response = self.client.open(path, method=method, json=payload, headers=self.headers)
+        except Exception:
+            self.recorder.record(step, time.perf_counter() - start, 'exception', ok=False)
+            return None, None
+        elapsed = time.perf_counter() - start
+        skipped = step in OPTIONAL_STEPS and response.status_code == 404
+        self.recorder.record(step, elapsed, response.status_code, response.status_code < 400, skipped)
+        return response.status_code, response.get_json(silent=True)
+
+    def login(self) -> bool:
+        status, body = self.request('login', 'POST', '/api/auth/login', {
+            'email': load_test_email(self.index), 'password': LOAD_TEST_PASSWORD
+        })
+        if status != 200 or not body:
+            return False
+        self.user_id = body['user']['id']
+        if body.get('token'):
+            self.headers = {'Authorization': f"Bearer {body['token']}"}
+        # API handlers also read session['user_id'] (the session-auth fallback)
+        with self.client.session_transaction() as flask_session:
+            flask_session['user_id'] = self.user_id
+        return True
+
+    def author_journey(self, scenes: int):
+        """idea -> project -> scenes -> critics -> story -> export"""
+        idea = self.rng.choice(_IDEAS)
+        self.request('analyze_idea', 'POST', '/api/ai/analyze-idea', {'idea_text': idea})
+        status, body = self.request('create_project', 'POST', '/api/ai/create-project-from-idea', {
+            'project_title': f'Journey {self.index}-{self.rng.randrange(10 ** 6)}',
+            'project_description': idea,
+            'project_genre': 'mystery',
+            'original_idea_text': idea,
+            'first_scene': {'title': 'Začátek', 'description': idea},
+            'extracted_objects': {'characters': ['Anna', 'Babička'], 'locations': ['Praha']}
+        })
+        if status != 200 or not body:
+            return
+        project_id = body['project']['id']
+        for number in range(scenes):
+            self.request('create_scene', 'POST', '/api/scenes', {
+                'project_id': project_id,
+                'title': f'Scéna {number + 2}',
+                'description': f'{idea} Anna hledá v Praze další stopu číslo {number + 1}.'
+            })
+        self.request('get_project', 'GET', f'/api/projects/{project_id}')
+        self.request('critics', 'POST', f'/api/ai/projects/{project_id}/enhanced-critics', {
+            'critics': ['dialog', 'pacing']
+        })
+        self.request('generate_story', 'POST', f'/api/ai/projects/{project_id}/generate-story', {})
+        self.request('export', 'POST', f'/api/projects/{project_id}/export', {'format': 'txt'})
+
+    def reader_journey(self):
+        """Browse existing (seeded) projects, comments and analytics"""
+        status, projects = self.request('list_projects', 'GET', '/api/projects')
+        if status != 200 or not projects:
+            return
+        project_id = self.rng.choice(projects)['id']
+        self.request('get_project', 'GET', f'/api/projects/{project_id}')
+        self.request('list_comments', 'GET', f'/api/collaboration/projects/{project_id}/comments?limit=20')
+        self.request('usage_analytics', 'GET', '/api/ai/usage-analytics')
+
+class Collaborator:
+    """A socketio client editing the shared project alongside others"""
+
+    def __init__(self, app, socketio, recorder: Recorder, index: int, project_id: str, scene_ids: List[int],
+                 rng: random.Random):
+        self.user = VirtualUser(app, recorder, index, rng)
+        self.socketio = socketio
+        self.recorder = recorder
+        self.project_id = project_id
+        self.scene_ids = scene_ids
+        self.rng = rng
+        self.received = 0
+
+    def emit(self, event: str, payload: Dict):
+        start = time.perf_counter()
+        try:
+            self.socket.emit(event, payload)
+            ok = True
+        except Exception:
+            ok = False
+        self.recorder.record(f'socket:{event}', time.perf_counter() - start, 'emitted' if ok else 'exception', ok)
+
+    def run(self, events: int):
+        if not self.user.login():
+            return
+        self.socket = self.socketio.test_client(self.user.app, flask_test_client=self.user.client)
+        try:
+            self.emit('join_project', {'project_id': self.project_id})
+            for _ in range(events):
+                scene_id = self.rng.choice(self.scene_ids)
+                event = self.rng.choices(
+                    ('cursor_position', 'typing_indicator', 'scene_changes', 'scene_editing'),
+                    weights=(50, 30, 15, 5)
+                )[0]
+                payload = {'project_id': self.project_id, 'scene_id': scene_id}
+                if event == 'cursor_position':
+                    payload['position'] = {'offset': self.rng.randrange(5000)}
+                elif event == 'typing_indicator':
+                    payload['is_typing'] = self.rng.random() < 0.5
+                elif event == 'scene_changes':
+                    payload['changes'] = {'description': 'Anna otevřela skříňku.'}
+                self.emit(event, payload)
+                self.received += len(self.socket.get_received())
+            self.emit('leave_project', {'project_id': self.project_id})
+            self.received += len(self.socket.get_received())
+        finally:
+            self.socket.disconnect()
+
+def _shared_project():
+    """Seeded shared project id, its scene ids and how many accounts may edit it (see load_seed)"""
+    from app.models import Project, ProjectCollaborator, Scene, User
+
+    owner = User.query.filter_by(email=load_test_email(0)).first()
+    if owner is None:
+        raise RuntimeError('No load-test data found; run `flask seed-load-data` first')
+    shared = next(
+        (p for p in Project.query.filter_by(user_id=owner.id).all() if (p.attributes or {}).get(SHARED_PROJECT_MARKER)),
+        None
+    )
+    if shared is None:
+        return None, [], 0
+    scene_ids = [row.id for row in Scene.query.with_entities(Scene.id).filter_by(project_id=shared.id).limit(200)]
+    editors = ProjectCollaborator.query.filter_by(project_id=shared.id, status='active').count()
+    return shared.id, scene_ids, editors + 1
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        return None
+
+def run_load_test(app, users: int = 10, iterations: int = 3, collaborators: int = 5, scenes: int = 3,
+                  socket_events: int = 50, reader_ratio: float = 0.5, seed: int = 1) -> Dict:
+    """Run the journeys concurrently and return a JSON-serializable result"""
+    from app import db, socketio
+
+    with app.app_context():
+        shared_project_id, shared_scene_ids, editors = _shared_project()
+        url = db.engine.url
+        database = url.render_as_string(hide_password=True)
+        dialect = db.engine.dialect.name
+    collaborators = min(collaborators, editors) if shared_scene_ids else 0
+    if dialect == 'sqlite' and url.database in (None, '', ':memory:') and users + collaborators > 1:
+        raise RuntimeError('In-memory SQLite shares one connection; use a file database for concurrent runs')
+
+    recorder = Recorder()
+    plans = []
+    for index in range(users):
+        rng = random.Random(f'{seed}-user-{index}')
+        kinds = ['reader' if rng.random() < reader_ratio else 'author' for _ in range(iterations)]
+        plans.append((index, rng, kinds))
+
+    def drive(index, rng, kinds):
+        user = VirtualUser(app, recorder, index, rng)
+        if not user.login():
+            return 0
+        completed = 0
+        for kind in kinds:
+            start = time.perf_counter()
+            if kind == 'author':
+                user.author_journey(scenes)
+            else:
+                user.reader_journey()
+            recorder.record(f'journey:{kind}', time.perf_counter() - start, 'done', True)
+            completed += 1
+        return completed
+
+    # Account 0 owns the shared project; 1..N are its seeded editors
+    collaborator_clients = [
+        Collaborator(app, socketio, recorder, index, shared_project_id, shared_scene_ids,
+                     random.Random(f'{seed}-collaborator-{index}'))
+        for index in range(collaborators)
+    ]
+
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, users + len(collaborator_clients))) as pool:
+        journey_futures = [pool.submit(drive, *plan) for plan in plans]
+        socket_futures = [pool.submit(c.run, socket_events) for c in collaborator_clients]
+        journeys_completed = sum(future.result() for future in journey_futures)
+        for future in socket_futures:
+            future.result()
+    wall_seconds = time.perf_counter() - start
+
+    requests_total = recorder.total_requests()
+    return {
+        'format': RESULT_FORMAT,
+        'revision': git_revision(),
+        'started_at': started_at.isoformat() + 'Z',
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'database': database,
+            'dialect': dialect,
+            'ai_simulation': app.config.get('AI_SIMULATION_MODE'),
+            'ai_profile': simulated_claude.describe()
+        },
+        'parameters': {
+            'users': users, 'iterations': iterations, 'collaborators': len(collaborator_clients),
+            'scenes': scenes, 'socket_events': socket_events, 'reader_ratio': reader_ratio, 'seed': seed
+        },
+        'wall_seconds': round(wall_seconds, 3),
+        'journeys_completed': journeys_completed,
+        'requests': requests_total,
+        'throughput_rps': round(requests_total / wall_seconds, 3) if wall_seconds else None,
+        'socket_events_received': sum(c.received for c in collaborator_clients),
+        'ai': simulated_claude.stats(),
+        'steps': recorder.steps()
+    }
+
+def compare_results(baseline: Dict, current: Dict, metric: str = 'p95', tolerance: float = 0.25,
+                    min_delta_ms: float = 5.0) -> List[Dict]:
+    """Steps whose latency metric or error rate regressed beyond tolerance"""
+    regressions = []
+    if baseline.get('parameters') != current.get('parameters'):
+        regressions.append({'step': '*', 'reason': 'parameters differ; results are not comparable'})
+    for step, now in current.get('steps', {}).items():
+        before = baseline.get('steps', {}).get(step)
+        if not before:
+            continue
+        old, new = before.get(metric), now.get(metric)
+        if old is not None and new is not None and new - old > max(min_delta_ms, old * tolerance):
+            regressions.append({
+                'step': step, 'reason': f'{metric} {old:.1f} ms -> {new:.1f} ms',
+                'baseline': old, 'current': new
+            })
+        old_rate = before['errors'] / before['count'] if before.get('count') else 0
+        new_rate = now['errors'] / now['count'] if now.get('count') else 0
+        if new_rate > old_rate + 0.01:
+            regressions.append({
+                'step': step, 'reason': f'error rate {old_rate:.1%} -> {new_rate:.1%}',
+                'baseline': old_rate, 'current': new_rate
+            })
+    return regressions
+
+def write_result(result: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, sort_keys=True)
@@ -0,0 +1,39 @@
+# app/utils/pagination.py - Keyset (cursor) pagination helpers
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def clamp_limit(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Clamp a client supplied page size into the allowed range"""
+    if not limit or limit < 1:
+        return default
+    return min(limit, maximum)
+
+def encode_cursor(*values) -> str:
+    """Encode sort key values into an opaque URL-safe cursor"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple]:
+    """Decode a cursor produced by encode_cursor, or None if absent/invalid"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(payload, list):
+        return None
+    return tuple(payload)
+
+def parse_datetime(value: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,151 @@
+# app/utils/pool_metrics.py - Connection pool sizing and checkout metrics
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import event, exc as sa_exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+# Options only QueuePool understands (in-memory SQLite uses StaticPool)
+QUEUE_POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_use_lifo')
+
+def _is_memory_sqlite(url) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(database_url, options: Optional[Dict]) -> Dict:
+    """SQLALCHEMY_ENGINE_OPTIONS with the timed pool, or without pool sizing for in-memory SQLite"""
+    options = dict(options or {})
+    if _is_memory_sqlite(database_url):
+        for key in QUEUE_POOL_OPTIONS + ('pool_recycle',):
+            options.pop(key, None)
+    else:
+        options.setdefault('poolclass', TimedQueuePool)
+    return options
+
+class _PoolStats:
+    def __init__(self, samples: int):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=samples)
+        self.hold_max = 0.0
+        self.holds = deque(maxlen=samples)
+        self.in_use_peak = 0
+
+class PoolMetrics:
+    """Per-engine checkout wait time, hold time and in-use counts"""
+
+    def __init__(self, samples: int = 1000):
+        self._lock = threading.Lock()
+        self._samples = samples
+        self._engines: Dict[str, Engine] = {}
+        self._stats: Dict[str, _PoolStats] = {}
+
+    def register(self, name: str, engine: Engine):
+        """Track an engine (its pool may be recreated by dispose())"""
+        with self._lock:
+            if self._engines.get(name) is engine:
+                return
+            self._engines[name] = engine
+            self._stats.setdefault(name, _PoolStats(self._samples))
+
+        @event.listens_for(engine, 'checkout')
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info['checked_out_at'] = time.perf_counter()
+            stats = self._stats[name]
+            in_use = self._in_use(engine)
+            if in_use is not None and in_use > stats.in_use_peak:
+                stats.in_use_peak = in_use
+
+        @event.listens_for(engine, 'checkin')
+        def _on_checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop('checked_out_at', None)
+            if started is not None:
+                held = time.perf_counter() - started
+                stats = self._stats[name]
+                stats.holds.append(held)
+                stats.hold_max = max(stats.hold_max, held)
+
+    def _name_for(self, pool) -> Optional[str]:
+        for name, engine in self._engines.items():
+            if engine.pool is pool:
+                return name
+        return None
+
+    def note_wait(self, pool, seconds: float, timed_out: bool = False):
+        name = self._name_for(pool)
+        if name is None:
+            return
+        stats = self._stats[name]
+        with self._lock:
+            if timed_out:
+                stats.timeouts += 1
+            else:
+                stats.checkouts += 1
+            stats.wait_total += seconds
+            stats.wait_max = max(stats.wait_max, seconds)
+            stats.waits.append(seconds)
+
+    @staticmethod
+    def _in_use(engine: Engine) -> Optional[int]:
+        checkedout = getattr(engine.pool, 'checkedout', None)
+        return checkedout() if checkedout else None
+
+    @staticmethod
+    def _percentile(samples, fraction: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current pool state and recent checkout timings per engine (ms)"""
+        result = {}
+        for name, engine in self._engines.items():
+            stats = self._stats[name]
+            pool = engine.pool
+            waits, holds = list(stats.waits), list(stats.holds)
+            result[name] = {
+                'pool_class': type(pool).__name__,
+                'size': pool.size() if hasattr(pool, 'size') else None,
+                'in_use': self._in_use(engine),
+                'in_use_peak': stats.in_use_peak,
+                'idle': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+                'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+                'checkouts': stats.checkouts,
+                'timeouts': stats.timeouts,
+                'wait_ms': {
+                    'avg': round(stats.wait_total / stats.checkouts * 1000, 3) if stats.checkouts else None,
+                    'p50': _ms(self._percentile(waits, 0.5)),
+                    'p95': _ms(self._percentile(waits, 0.95)),
+                    'max': _ms(stats.wait_max),
+                },
+                'hold_ms': {
+                    'p50': _ms(self._percentile(holds, 0.5)),
+                    'p95': _ms(self._percentile(holds, 0.95)),
+                    'max': _ms(stats.hold_max),
+                },
+            }
+        return result
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+# Global pool metrics instance
+pool_metrics = PoolMetrics()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            pool_metrics.note_wait(self, time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.note_wait(self, time.perf_counter() - start)
+        return connection
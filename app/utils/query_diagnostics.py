@@ -0,0 +1,185 @@
+# app/utils/query_diagnostics.py - Slow-query log and N+1 detection (development/staging)
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = r'(?:\?|%\(\w+\)s|%s|:\w+|\$\d+|NULL)'
+_VALUE_LIST = re.compile(rf'\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)')
+_REPEATED_LISTS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+# Statements worth asking the planner about
+_EXPLAINABLE = re.compile(r'^\s*(?:SELECT|WITH)\b', re.IGNORECASE)
+_EXPLAIN_PREFIX = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN ', 'mysql': 'EXPLAIN '}
+
+# Frames under these paths (stdlib, installed packages, this module) are never "the caller"
+_LIBRARY_PATHS = tuple(sorted({
+    os.path.abspath(sysconfig.get_paths()[key]) for key in ('stdlib', 'platstdlib', 'purelib', 'platlib')
+}))
+_THIS_FILE = os.path.abspath(__file__)
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(_THIS_FILE)))
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals, placeholders lists and whitespace normalized"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _VALUE_LIST.sub('(...)', shape)
+    shape = _REPEATED_LISTS.sub('(...)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+def originating_frame() -> Optional[str]:
+    """Innermost project frame (not stdlib, a library or this module) on the current stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename != _THIS_FILE and not filename.startswith(_LIBRARY_PATHS) and not filename.startswith('<'):
+            relative = os.path.relpath(filename, _PROJECT_ROOT)
+            return f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+class RequestQueryLog:
+    """Statement shapes seen in one request (lives in flask.g)"""
+    __slots__ = ('count', 'seconds', 'shapes', 'flagged')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.flagged = {}
+
+    def report(self, endpoint: str, method: str) -> Dict:
+        return {
+            'endpoint': endpoint,
+            'method': method,
+            'queries': self.count,
+            'db_ms': round(self.seconds * 1000, 3),
+            'repeated': self.shapes.most_common(3),
+            'suspected_n_plus_one': [
+                {'fingerprint': shape, 'count': self.shapes[shape], 'frame': frame}
+                for shape, frame in self.flagged.items()
+            ]
+        }
+
+class QueryDiagnostics:
+    """Fingerprints SQL per request, flags repeated shapes and logs slow queries"""
+
+    def __init__(self, recent: int = 200):
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Dict], None]] = []
+        self.findings = deque(maxlen=recent)
+        self.enabled = False
+        self.repeat_threshold = 5
+        self.slow_seconds = 0.2
+
+    def init_app(self, app):
+        self.enabled = app.config.get('QUERY_DIAGNOSTICS', False)
+        if not self.enabled:
+            return
+        self.repeat_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', self.repeat_threshold)
+        self.slow_seconds = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+
+        @app.before_request
+        def _start_query_log():
+            g.query_log = RequestQueryLog()
+
+        @app.after_request
+        def _finish_query_log(response):
+            log = g.pop('query_log', None)
+            if log is not None and self._listeners:
+                report = log.report(request.endpoint or 'unmatched', request.method)
+                for listener in list(self._listeners):
+                    listener(report)
+            return response
+
+    def instrument_engine(self, engine: Engine):
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('diagnostics_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info['diagnostics_start'].pop()
+            log = g.get('query_log') if has_app_context() else None
+            if log is not None:
+                self._track(log, statement)
+                log.seconds += elapsed
+            if elapsed >= self.slow_seconds:
+                self._log_slow(engine, cursor, statement, parameters, executemany, elapsed)
+
+    def _track(self, log: RequestQueryLog, statement: str):
+        shape = fingerprint(statement)
+        log.count += 1
+        log.shapes[shape] += 1
+        if log.shapes[shape] == self.repeat_threshold + 1:
+            frame = originating_frame()
+            log.flagged[shape] = frame
+            endpoint = request.endpoint if has_request_context() else None
+            self._record({
+                'type': 'n_plus_one', 'endpoint': endpoint, 'fingerprint': shape,
+                'count': log.shapes[shape], 'frame': frame
+            })
+            current_app.logger.warning(
+                f"🔁 Possible N+1 in {endpoint}: statement repeated {log.shapes[shape]}x "
+                f"(first flagged at {frame}): {shape[:300]}"
+            )
+
+    def _log_slow(self, engine, cursor, statement, parameters, executemany, elapsed):
+        plan = None if executemany else explain(engine.dialect.name, cursor, statement, parameters)
+        frame = originating_frame()
+        self._record({
+            'type': 'slow_query', 'endpoint': request.endpoint if has_request_context() else None,
+            'fingerprint': fingerprint(statement), 'duration_ms': round(elapsed * 1000, 3),
+            'frame': frame, 'plan': plan
+        })
+        if has_app_context():
+            plan_text = '\n    '.join(plan or ['(no plan)'])
+            current_app.logger.warning(
+                f"🐢 Slow query ({elapsed * 1000:.1f} ms) at {frame}: {statement[:500]}\n    {plan_text}"
+            )
+
+    def _record(self, finding: Dict):
+        with self._lock:
+            self.findings.append(finding)
+
+    @contextmanager
+    def watch(self, listener: Callable[[Dict], None]):
+        """Call listener(report) with each request's query report while active"""
+        self._listeners.append(listener)
+        try:
+            yield listener
+        finally:
+            self._listeners.remove(listener)
+
+def explain(dialect: str, cursor, statement: str, parameters) -> Optional[List[str]]:
+    """Planner output for a SELECT, run on a separate DBAPI cursor (no events fire)"""
+    prefix = _EXPLAIN_PREFIX.get(dialect)
+    if prefix is None or not _EXPLAINABLE.match(statement):
+        return None
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return [' '.join(str(column) for column in row) for row in explain_cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {e}']
+    finally:
+        explain_cursor.close()
+
+# Global query diagnostics instance
+query_diagnostics = QueryDiagnostics()
@@ -0,0 +1,203 @@
+# app/utils/request_metrics.py - Per-request route/DB/AI timing, Server-Timing and Prometheus export
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Dict, List, Optional, Tuple
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Quantiles reported from each rolling window
+QUANTILES = (0.5, 0.95, 0.99)
+
+class RequestTimings:
+    """Accumulates one request's time split (lives in flask.g)"""
+    __slots__ = ('start', 'db_seconds', 'db_count', 'ai_seconds', 'ai_count')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_seconds = 0.0
+        self.db_count = 0
+        self.ai_seconds = 0.0
+        self.ai_count = 0
+
+def current_timings() -> Optional[RequestTimings]:
+    return g.get('request_timings') if has_app_context() else None
+
+class RollingSummary:
+    """Quantiles over the last `window` observations plus lifetime sum/count"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.total += value
+        self.count += 1
+
+    def quantiles(self) -> Dict[float, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(len(ordered) * q))] for q in QUANTILES}
+
+class RequestMetrics:
+    """Rolling latency summaries per endpoint and component"""
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self.window = window
+        self._summaries: Dict[Tuple[str, str, str], RollingSummary] = {}
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._queries: Dict[Tuple[str, str], int] = {}
+        self._ai_calls: Dict[Tuple[str, str], int] = {}
+
+    def init_app(self, app):
+        if not app.config.get('REQUEST_METRICS_ENABLED', True):
+            return
+        self.window = app.config.get('REQUEST_METRICS_WINDOW', self.window)
+        server_timing = app.config.get('SERVER_TIMING_HEADER', True)
+
+        @app.before_request
+        def _start_request_timer():
+            g.request_timings = RequestTimings()
+
+        @app.after_request
+        def _record_request_timings(response):
+            timings = g.pop('request_timings', None)
+            if timings is None:
+                return response
+            total = time.perf_counter() - timings.start
+            endpoint = request.endpoint or 'unmatched'
+            self.observe(endpoint, request.method, response.status_code, total, timings)
+            if server_timing:
+                response.headers.add('Server-Timing', server_timing_header(total, timings))
+            return response
+
+    def instrument_engine(self, engine: Engine):
+        """Count and time every SQL statement executed inside a request"""
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info['query_start'].pop()
+            timings = current_timings()
+            if timings is not None:
+                timings.db_seconds += time.perf_counter() - started
+                timings.db_count += 1
+
+    def observe(self, endpoint: str, method: str, status: int, total: float, timings: RequestTimings):
+        with self._lock:
+            for component, value in (('total', total), ('db', timings.db_seconds), ('ai', timings.ai_seconds)):
+                key = (endpoint, method, component)
+                summary = self._summaries.get(key)
+                if summary is None:
+                    summary = self._summaries[key] = RollingSummary(self.window)
+                summary.observe(value)
+            request_key = (endpoint, method, str(status))
+            self._requests[request_key] = self._requests.get(request_key, 0) + 1
+            self._queries[(endpoint, method)] = self._queries.get((endpoint, method), 0) + timings.db_count
+            self._ai_calls[(endpoint, method)] = self._ai_calls.get((endpoint, method), 0) + timings.ai_count
+
+    def snapshot(self) -> Dict:
+        """Per-endpoint quantiles in milliseconds (for JSON consumers)"""
+        with self._lock:
+            result = {}
+            for (endpoint, method, component), summary in sorted(self._summaries.items()):
+                entry = result.setdefault(f'{method} {endpoint}', {})
+                entry[component] = {f'p{int(q * 100)}': round(v * 1000, 3) for q, v in summary.quantiles().items()}
+                entry['count'] = summary.count
+            return result
+
+    def prometheus(self, extra_lines: List[str] = None) -> str:
+        """Prometheus text exposition of all request metrics"""
+        lines = []
+        with self._lock:
+            for component, help_text in (
+                ('total', 'Request wall time'),
+                ('db', 'Time spent executing SQL per request'),
+                ('ai', 'Time spent waiting on Claude per request'),
+            ):
+                name = 'storyforge_request_seconds' if component == 'total' else f'storyforge_request_{component}_seconds'
+                lines.append(f'# HELP {name} {help_text} (quantiles over the last {self.window} requests)')
+                lines.append(f'# TYPE {name} summary')
+                for (endpoint, method, comp), summary in sorted(self._summaries.items()):
+                    if comp != component:
+                        continue
+                    labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+                    for q, value in summary.quantiles().items():
+                        lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.6f}')
+                    lines.append(f'{name}_sum{{{labels}}} {summary.total:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {summary.count}')
+
+            lines.append('# HELP storyforge_requests_total Requests by endpoint and status')
+            lines.append('# TYPE storyforge_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'storyforge_requests_total{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}')
+
+            for name, help_text, counts in (
+                ('storyforge_db_queries_total', 'SQL statements executed', self._queries),
+                ('storyforge_ai_calls_total', 'Claude requests made', self._ai_calls),
+            ):
+                lines.append(f'# HELP {name} {help_text} by endpoint')
+                lines.append(f'# TYPE {name} counter')
+                for (endpoint, method), count in sorted(counts.items()):
+                    lines.append(f'{name}{{endpoint="{_escape(endpoint)}",method="{method}"}} {count}')
+
+        lines.extend(extra_lines or [])
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._summaries.clear()
+            self._requests.clear()
+            self._queries.clear()
+            self._ai_calls.clear()
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+def server_timing_header(total: float, timings: RequestTimings) -> str:
+    """Server-Timing value, e.g. total;dur=12.3, db;dur=4.1;desc="3 queries" """
+    return ', '.join((
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={timings.db_seconds * 1000:.1f};desc="{timings.db_count} queries"',
+        f'ai;dur={timings.ai_seconds * 1000:.1f};desc="{timings.ai_count} calls"',
+    ))
+
+def record_ai_time(f):
+    """Add the wrapped call's duration to the current request's AI time"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            timings = current_timings()
+            if timings is not None:
+                timings.ai_seconds += time.perf_counter() - start
+                timings.ai_count += 1
+    return decorated
+
+def pool_prometheus_lines(snapshot: Dict[str, Dict]) -> List[str]:
+    """Gauges for the connection pool snapshot (see pool_metrics)"""
+    lines = []
+    for metric, key, help_text in (
+        ('storyforge_db_pool_in_use', 'in_use', 'Connections checked out'),
+        ('storyforge_db_pool_size', 'size', 'Configured pool size'),
+        ('storyforge_db_pool_timeouts_total', 'timeouts', 'Checkouts that timed out'),
+    ):
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {"counter" if metric.endswith("_total") else "gauge"}')
+        for engine, stats in sorted(snapshot.items()):
+            if stats.get(key) is not None:
+                lines.append(f'{metric}{{engine="{_escape(engine)}"}} {stats[key]}')
+    return lines
+
+# Global request metrics instance
+request_metrics = RequestMetrics()
@@ -0,0 +1,92 @@
+# app/utils/sqlite_tuning.py - SQLite performance profile applied on every new connection
+import time
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Defaults for the production profile (config.py can override each one)
+DEFAULT_SQLITE_PROFILE = {
+    'journal_mode': 'WAL',        # Readers no longer block the writer (and vice versa)
+    'synchronous': 'NORMAL',      # Safe with WAL; fsync at checkpoints, not every commit
+    'busy_timeout': 5000,         # ms to wait for the write lock instead of "database is locked"
+    'cache_size': -65536,         # Negative = KiB, i.e. 64 MiB page cache per connection
+    'mmap_size': 268435456,       # 256 MiB memory-mapped reads
+    'temp_store': 'MEMORY',       # Sorts and temp indexes stay off disk
+    'optimize_interval': 3600,    # Seconds between PRAGMA optimize runs per connection
+}
+
+def sqlite_profile_from_config(config) -> Optional[Dict]:
+    """Profile settings from app config, or None when the profile is disabled"""
+    if not config.get('SQLITE_PERFORMANCE_PROFILE', True):
+        return None
+    return {
+        'journal_mode': config.get('SQLITE_JOURNAL_MODE', DEFAULT_SQLITE_PROFILE['journal_mode']),
+        'synchronous': config.get('SQLITE_SYNCHRONOUS', DEFAULT_SQLITE_PROFILE['synchronous']),
+        'busy_timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_PROFILE['busy_timeout']),
+        'cache_size': config.get('SQLITE_CACHE_SIZE', DEFAULT_SQLITE_PROFILE['cache_size']),
+        'mmap_size': config.get('SQLITE_MMAP_SIZE', DEFAULT_SQLITE_PROFILE['mmap_size']),
+        'temp_store': config.get('SQLITE_TEMP_STORE', DEFAULT_SQLITE_PROFILE['temp_store']),
+        'optimize_interval': config.get('SQLITE_OPTIMIZE_INTERVAL', DEFAULT_SQLITE_PROFILE['optimize_interval']),
+    }
+
+def _is_memory_database(engine: Engine) -> bool:
+    return engine.url.database in (None, '', ':memory:') or 'mode=memory' in str(engine.url)
+
+def apply_sqlite_profile(engine: Engine, profile: Optional[Dict] = None) -> bool:
+    """Register connect/checkin listeners that tune SQLite connections
+
+    Returns False (and does nothing) for non-SQLite engines.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    settings = dict(DEFAULT_SQLITE_PROFILE, **(profile or {}))
+    in_memory = _is_memory_database(engine)
+
+    pragmas = [
+        ('busy_timeout', int(settings['busy_timeout'])),
+        ('synchronous', settings['synchronous']),
+        ('cache_size', int(settings['cache_size'])),
+        ('temp_store', settings['temp_store']),
+    ]
+    if not in_memory:
+        # WAL and mmap need a real file
+        pragmas.insert(0, ('journal_mode', settings['journal_mode']))
+        pragmas.append(('mmap_size', int(settings['mmap_size'])))
+    optimize_interval = settings['optimize_interval']
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+            # Let the planner gather stats lazily for tables this connection uses
+            cursor.execute('PRAGMA optimize=0x10002')
+        finally:
+            cursor.close()
+        connection_record.info['sqlite_optimized_at'] = time.monotonic()
+
+    if optimize_interval:
+        @event.listens_for(engine, 'checkin')
+        def _periodic_optimize(dbapi_connection, connection_record):
+            if dbapi_connection is None:
+                return
+            last = connection_record.info.get('sqlite_optimized_at', 0)
+            if time.monotonic() - last >= optimize_interval:
+                connection_record.info['sqlite_optimized_at'] = time.monotonic()
+                try:
+                    dbapi_connection.execute('PRAGMA optimize')
+                except Exception:
+                    pass  # Best effort; never fail a checkin
+
+    return True
+
+def sqlite_status(engine: Engine) -> Dict:
+    """Current PRAGMA values of one pooled connection (for health checks)"""
+    if engine.dialect.name != 'sqlite':
+        return {}
+    with engine.connect() as connection:
+        return {
+            name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+            for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store')
+        }
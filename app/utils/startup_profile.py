@@ -0,0 +1,74 @@
+# app/utils/startup_profile.py - Measure cold-start import cost in a fresh interpreter
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# Dependencies that must stay out of the startup path (see lazy_imports)
+HEAVY_MODULES = ('reportlab', 'docx', 'ebooklib', 'pypdf', 'nltk', 'tiktoken', 'anthropic')
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app import create_app
+create_app({config!r})
+elapsed = time.perf_counter() - start
+print('STARTUP_PROFILE ' + json.dumps({{
+    'create_app_seconds': elapsed,
+    'heavy_loaded': [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+def _parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `python -X importtime` lines into per-module costs"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append({
+                'module': name.strip(),
+                'depth': (len(name) - len(name.lstrip())) // 2,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000
+            })
+        except ValueError:
+            continue
+    return modules
+
+def profile_startup(config_name: str = 'testing', root: str = None) -> Dict:
+    """Run create_app in a fresh interpreter and report import costs"""
+    root = root or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    code = _PROBE.format(config=config_name, heavy=HEAVY_MODULES)
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=root, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+
+    report = None
+    for line in result.stdout.splitlines():
+        if line.startswith('STARTUP_PROFILE '):
+            report = json.loads(line[len('STARTUP_PROFILE '):])
+    if report is None:
+        raise RuntimeError(f'Startup probe failed:\n{result.stderr[-2000:]}')
+
+    report['wall_seconds'] = wall
+    report['modules'] = _parse_importtime(result.stderr)
+    return report
+
+def top_level_costs(modules: List[Dict]) -> List[Dict]:
+    """Cumulative cost per top-level package"""
+    totals = {}
+    for entry in modules:
+        if entry['depth'] == 0:
+            package = entry['module'].split('.')[0]
+            totals[package] = totals.get(package, 0) + entry['cumulative_ms']
+    return [{'package': name, 'cumulative_ms': ms}
+            for name, ms in sorted(totals.items(), key=lambda item: -item[1])]
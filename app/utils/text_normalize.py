@@ -0,0 +1,73 @@
+# app/utils/text_normalize.py - Czech-aware tokenization, diacritics folding and light stemming
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+# Words are runs of letters/digits; apostrophes and hyphens split tokens
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Folded (diacritics-free) Czech function words, plus a handful of English ones
+STOPWORDS = frozenset('''
+    a i k o s u v z ve ze na se si je do po pro pri za od ale jak tak ten ta tu by byl byla
+    bylo jsem jsi jsou jeho jeji jejich ktery ktera ktere co uz jen take nebo ani aby kdyz pak
+    jako jsme jste mu mi me ho ji jim nas vas the and of to in is
+'''.split())
+
+# Case endings of the light Czech stemmer (Dolamic & Savoy), folded, longest first
+_CZECH_SUFFIXES = tuple(sorted(set('''
+    atech etem atum ech ich eho emi emu ete eti iho imi imu ach ata aty ama ami ove ovi ymi
+    em es im um at am os us ym mi ou a e i o u y
+'''.split()), key=len, reverse=True))
+_POSSESSIVE_SUFFIXES = ('ov', 'in', 'uv')
+_MIN_STEM = 3
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics: 'Příliš Žluťoučký' -> 'prilis zlutoucky'"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+@lru_cache(maxsize=65536)
+def stem(folded: str) -> str:
+    """Strip one Czech case ending from a folded word (short words are kept intact)"""
+    if len(folded) <= _MIN_STEM or not folded.isalpha():
+        return folded
+    for suffix in _CZECH_SUFFIXES:
+        if folded.endswith(suffix) and len(folded) - len(suffix) >= _MIN_STEM:
+            folded = folded[:-len(suffix)]
+            break
+    # Possessives: babiččin, otcův
+    if len(folded) > 5 and folded.endswith(_POSSESSIVE_SUFFIXES):
+        folded = folded[:-2]
+    # Palatalised diminutives: babičce/babičky -> babick
+    if folded.endswith('cc'):
+        folded = folded[:-1] + 'k'
+    return folded
+
+def normalize_term(word: str) -> str:
+    """Index/query form of one word; empty for stopwords"""
+    folded = fold(word)
+    return '' if folded in STOPWORDS else stem(folded)
+
+def iter_words(text: str, keep_stopwords: bool = False) -> Iterator[Tuple[int, int, str]]:
+    """(start, end, normalized term) for every word of the original text
+
+    Stopwords get an empty term unless keep_stopwords (name matching needs them).
+    """
+    for match in WORD_RE.finditer(text or ''):
+        if keep_stopwords:
+            yield match.start(), match.end(), stem(fold(match.group()))
+        else:
+            yield match.start(), match.end(), normalize_term(match.group())
+
+def index_terms(text: str) -> List[str]:
+    """Normalized, stopword-free terms in document order"""
+    return [term for _, _, term in iter_words(text) if term]
+
+def query_terms(query: str) -> List[str]:
+    """Distinct normalized terms of a user query, in the order typed"""
+    seen = []
+    for term in index_terms(query):
+        if term not in seen:
+            seen.append(term)
+    return seen
@@ -6,6 +6,43 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///storyforge.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Read replicas (comma separated URLs) for @read_only routes; clients read
+    # from the primary for DATABASE_REPLICA_STICKY_SECONDS after they commit
+    DATABASE_REPLICA_URLS = [u for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u]
+    DATABASE_REPLICA_STICKY_SECONDS = float(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 5))
+    # Connection pool per environment (pool sizing is dropped for in-memory SQLite)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    
+    # Request instrumentation: Server-Timing header and rolling p50/p95/p99 per endpoint
+    REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS_ENABLED', 'true').lower() == 'true'
+    REQUEST_METRICS_WINDOW = int(os.environ.get('REQUEST_METRICS_WINDOW', 1024))
+    SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+    
+    # Query diagnostics (dev/staging): flag statement shapes repeated more than
+    # N_PLUS_ONE_THRESHOLD times per request, log slow queries with their plan
+    QUERY_DIAGNOSTICS = os.environ.get('QUERY_DIAGNOSTICS', 'false').lower() == 'true'
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    
+    # Internal endpoints (/internal/*): allow-listed addresses or X-Internal-Token
+    INTERNAL_ALLOWED_IPS = [ip for ip in os.environ.get('INTERNAL_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+    INTERNAL_METRICS_TOKEN = os.environ.get('INTERNAL_METRICS_TOKEN')
+    
+    # SQLite performance profile (ignored on Postgres): WAL + tuned pragmas per connection
+    SQLITE_PERFORMANCE_PROFILE = os.environ.get('SQLITE_PERFORMANCE_PROFILE', 'true').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))  # negative = KiB
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+    SQLITE_OPTIMIZE_INTERVAL = int(os.environ.get('SQLITE_OPTIMIZE_INTERVAL', 3600))  # seconds, 0 disables
     
     # Claude API Configuration
     ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
@@ -16,6 +53,85 @@ class Config:
     CLAUDE_MAX_REQUESTS_PER_MINUTE = int(os.environ.get('CLAUDE_MAX_REQUESTS_PER_MINUTE', 50))
     CLAUDE_MAX_TOKENS_PER_REQUEST = int(os.environ.get('CLAUDE_MAX_TOKENS_PER_REQUEST', 4000))
     
+    # Request auth: TTL of the per-process user auth state cache (0 disables)
+    AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', 30))
+    # Serve GET/HEAD from signed JWT claims; writes still hit the database
+    JWT_CLAIMS_FAST_PATH = os.environ.get('JWT_CLAIMS_FAST_PATH', 'true').lower() == 'true'
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
+    
+    # Password hashing: werkzeug method string sets the cost (rehashed on login when changed)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')  # thread | process
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 64))
+    PASSWORD_HASH_OFFLOAD = os.environ.get('PASSWORD_HASH_OFFLOAD', 'true').lower() == 'true'
+    
+    # Export artifact cache (defaults to instance/export_cache)
+    EXPORT_CACHE_ENABLED = os.environ.get('EXPORT_CACHE_ENABLED', 'true').lower() == 'true'
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR')
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    # nginx internal location serving EXPORT_CACHE_DIR, e.g. /_export_cache/
+    EXPORT_CACHE_ACCEL_REDIRECT = os.environ.get('EXPORT_CACHE_ACCEL_REDIRECT')
+    # Background export rendering (process pool; reportlab is CPU-bound)
+    EXPORT_JOB_EXECUTOR = os.environ.get('EXPORT_JOB_EXECUTOR', 'process')  # process | thread
+    EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+    # Formats rendered ahead of time when a story is saved, e.g. "pdf,epub"
+    EXPORT_PRERENDER_FORMATS = [f for f in os.environ.get('EXPORT_PRERENDER_FORMATS', '').split(',') if f]
+    
+    # Startup: heavy optional dependencies load on first use; optionally warm them
+    # in a background thread once the app is created
+    LAZY_IMPORT_PREWARM = os.environ.get('LAZY_IMPORT_PREWARM', 'false').lower() == 'true'
+    LAZY_IMPORT_PREWARM_MODULES = [
+        'anthropic', 'tiktoken', 'docx', 'app.services.pdf_fragments'
+    ]
+    LOG_REQUEST_DETAILS = os.environ.get('LOG_REQUEST_DETAILS', 'false').lower() == 'true'
+    
+    # Static assets: serve fingerprinted static/dist files from `flask build-assets` when built
+    STATIC_ASSET_MANIFEST = os.environ.get('STATIC_ASSET_MANIFEST', 'true').lower() == 'true'
+    
+    # Collaboration analytics: keep denormalized per-project counters current
+    # on comment/invitation writes so the analytics endpoint is O(1)
+    COLLABORATION_COUNTERS_ENABLED = os.environ.get('COLLABORATION_COUNTERS_ENABLED', 'true').lower() == 'true'
+
+    # Full-text search: scenes, objects, comments and chapters are indexed on
+    # flush (SQLite FTS5 / PostgreSQL tsvector); `flask rebuild-search-index` backfills
+    SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', 'true').lower() == 'true'
+    # Object mentions: scenes naming each story object (name or attributes.aliases),
+    # kept current on flush for critics and the UI; `flask rebuild-mention-index` backfills
+    MENTION_INDEX_ENABLED = os.environ.get('MENTION_INDEX_ENABLED', 'true').lower() == 'true'
+
+    # Revision history of scenes and chapters: a full snapshot every N revisions,
+    # compressed skip-deltas in between. Retention keeps the newest REVISION_KEEP_LAST
+    # and drops older ones past REVISION_MAX_AGE_DAYS (0 = as soon as they fall out)
+    REVISION_HISTORY_ENABLED = os.environ.get('REVISION_HISTORY_ENABLED', 'true').lower() == 'true'
+    REVISION_KEYFRAME_INTERVAL = int(os.environ.get('REVISION_KEYFRAME_INTERVAL', 64))
+    REVISION_KEEP_LAST = int(os.environ.get('REVISION_KEEP_LAST', 200))
+    REVISION_MAX_AGE_DAYS = int(os.environ.get('REVISION_MAX_AGE_DAYS', 90))
+
+    # Payment webhooks: verified events are stored once (unique provider event id)
+    # and applied by a background worker in per-customer order, retrying with
+    # exponential backoff (at most WEBHOOK_HEAD_RETRY_MAX_SECONDS apart while later
+    # events of the customer wait behind the failing one); the worker runs in the
+    # serving process (run.py) only, and `flask process-webhooks` drains the queue
+    # out of process
+    WEBHOOK_WORKER_ENABLED = os.environ.get('WEBHOOK_WORKER_ENABLED', 'true').lower() == 'true'
+    WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 8))
+    WEBHOOK_RETRY_BASE_SECONDS = float(os.environ.get('WEBHOOK_RETRY_BASE_SECONDS', 30))
+    WEBHOOK_RETRY_MAX_SECONDS = float(os.environ.get('WEBHOOK_RETRY_MAX_SECONDS', 3600))
+    WEBHOOK_HEAD_RETRY_MAX_SECONDS = float(os.environ.get('WEBHOOK_HEAD_RETRY_MAX_SECONDS', 60))
+    WEBHOOK_LEASE_SECONDS = float(os.environ.get('WEBHOOK_LEASE_SECONDS', 300))
+    WEBHOOK_POLL_INTERVAL = float(os.environ.get('WEBHOOK_POLL_INTERVAL', 5))
+
+    # Billing periods: paid subscriptions start their next period when the
+    # renewal invoice is paid; free plans and cancellations past
+    # current_period_end are rolled over in batches (usage snapshot, counters
+    # reset) by an in-process scheduler every BILLING_ROLLOVER_INTERVAL seconds
+    # (serving process only, see run.py) or by `flask rollover-billing-periods`
+    BILLING_ROLLOVER_SCHEDULER = os.environ.get('BILLING_ROLLOVER_SCHEDULER', 'true').lower() == 'true'
+    BILLING_ROLLOVER_INTERVAL = float(os.environ.get('BILLING_ROLLOVER_INTERVAL', 300))
+    BILLING_ROLLOVER_BATCH_SIZE = int(os.environ.get('BILLING_ROLLOVER_BATCH_SIZE', 500))
+    BILLING_PERIOD_DAYS = int(os.environ.get('BILLING_PERIOD_DAYS', 30))
+
     # Token limits by plan
     TOKEN_LIMITS = {
         'free': 1000,
@@ -26,9 +142,20 @@ class Config:
 class DevelopmentConfig(Config):
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///storyforge_dev.db'
+    # Edit static/ files live; a stale build would otherwise shadow them
+    STATIC_ASSET_MANIFEST = os.environ.get('STATIC_ASSET_MANIFEST', 'false').lower() == 'true'
+    QUERY_DIAGNOSTICS = os.environ.get('QUERY_DIAGNOSTICS', 'true').lower() == 'true'
 
 class ProductionConfig(Config):
     DEBUG = False
+    # eventlet workers plus long AI calls need more headroom than the defaults
+    SQLALCHEMY_ENGINE_OPTIONS = dict(
+        Config.SQLALCHEMY_ENGINE_OPTIONS,
+        pool_size=int(os.environ.get('DB_POOL_SIZE', 20)),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        pool_timeout=float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+    )
+    LAZY_IMPORT_PREWARM = os.environ.get('LAZY_IMPORT_PREWARM', 'true').lower() == 'true'
 
 class TestingConfig(Config):
     TESTING = True
@@ -37,6 +164,11 @@ class TestingConfig(Config):
     WTF_CSRF_ENABLED = False
     AI_SIMULATION_MODE = True
     PAYMENT_SIMULATION_MODE = True
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # Keep test logins fast
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    QUERY_DIAGNOSTICS = True  # Query budgets (tests/utils/query_budget.py)
+    WEBHOOK_WORKER_ENABLED = False  # Tests drain the queue explicitly
+    BILLING_ROLLOVER_SCHEDULER = False
     SERVER_NAME = 'localhost.localdomain'  # Required for URL generation in testing
 
 config = {
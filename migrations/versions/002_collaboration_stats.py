@@ -0,0 +1,33 @@
+# migrations/versions/002_collaboration_stats.py - Database Migration
+"""Add per-project collaboration counters
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('project_collaboration_stats',
+        sa.Column('project_id', sa.String(length=36), nullable=False),
+        sa.Column('total_collaborators', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('pending_invitations', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_comments', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('resolved_comments', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id'], ),
+        sa.PrimaryKeyConstraint('project_id')
+    )
+    op.create_index(op.f('ix_comment_project_id'), 'comment', ['project_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_comment_project_id'), table_name='comment')
+    op.drop_table('project_collaboration_stats')
@@ -0,0 +1,59 @@
+# migrations/versions/003_comment_thread_path.py - Database Migration
+"""Add materialized thread path to comments
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+PATH_SEGMENT_WIDTH = 10
+
+def upgrade():
+    op.add_column('comment', sa.Column('root_comment_id', sa.Integer(), nullable=True))
+    op.add_column('comment', sa.Column('thread_path', sa.String(length=512), nullable=True))
+    op.create_index(op.f('ix_comment_root_comment_id'), 'comment', ['root_comment_id'], unique=False)
+    op.create_index(op.f('ix_comment_thread_path'), 'comment', ['thread_path'], unique=False)
+    
+    # Backfill existing threads; parents always have lower ids than replies
+    bind = op.get_bind()
+    comment = sa.table('comment',
+        sa.column('id', sa.Integer),
+        sa.column('parent_comment_id', sa.Integer),
+        sa.column('root_comment_id', sa.Integer),
+        sa.column('thread_path', sa.String)
+    )
+    
+    positions = {}
+    rows = bind.execute(
+        sa.select(comment.c.id, comment.c.parent_comment_id).order_by(comment.c.id)
+    ).fetchall()
+    
+    for comment_id, parent_id in rows:
+        segment = str(comment_id).zfill(PATH_SEGMENT_WIDTH)
+        if parent_id and parent_id in positions:
+            root_id, parent_path = positions[parent_id]
+            positions[comment_id] = (root_id, f'{parent_path}/{segment}')
+        else:
+            positions[comment_id] = (comment_id, segment)
+    
+    for comment_id, (root_id, path) in positions.items():
+        bind.execute(
+            comment.update().where(comment.c.id == comment_id).values(
+                root_comment_id=root_id, thread_path=path
+            )
+        )
+
+def downgrade():
+    op.drop_index(op.f('ix_comment_thread_path'), table_name='comment')
+    op.drop_index(op.f('ix_comment_root_comment_id'), table_name='comment')
+    op.drop_column('comment', 'thread_path')
+    op.drop_column('comment', 'root_comment_id')
@@ -0,0 +1,22 @@
+# migrations/versions/004_user_token_epoch.py - Database Migration
+"""Add token epoch to users for stateless JWT revocation
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('user', sa.Column('token_epoch', sa.Integer(), nullable=False, server_default='0'))
+
+def downgrade():
+    op.drop_column('user', 'token_epoch')
@@ -0,0 +1,26 @@
+# migrations/versions/005_widen_password_hash.py - Database Migration
+"""Widen user.password_hash for configurable hash methods (scrypt)
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128),
+                              type_=sa.String(length=256))
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=256),
+                              type_=sa.String(length=128))
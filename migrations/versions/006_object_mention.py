@@ -0,0 +1,40 @@
+# migrations/versions/006_object_mention.py - Database Migration
+"""Add object mention index (backfill with `flask rebuild-mention-index`)
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('object_mention',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mention_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('positions', sa.JSON(), nullable=True),
+        sa.Column('project_id', sa.String(length=36), nullable=False),
+        sa.Column('object_id', sa.Integer(), nullable=False),
+        sa.Column('scene_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id'], ),
+        sa.ForeignKeyConstraint(['object_id'], ['story_object.id'], ),
+        sa.ForeignKeyConstraint(['scene_id'], ['scene.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('object_id', 'scene_id', name='unique_object_scene_mention')
+    )
+    op.create_index(op.f('ix_object_mention_project_id'), 'object_mention', ['project_id'], unique=False)
+    op.create_index(op.f('ix_object_mention_object_id'), 'object_mention', ['object_id'], unique=False)
+    op.create_index(op.f('ix_object_mention_scene_id'), 'object_mention', ['scene_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_object_mention_scene_id'), table_name='object_mention')
+    op.drop_index(op.f('ix_object_mention_object_id'), table_name='object_mention')
+    op.drop_index(op.f('ix_object_mention_project_id'), table_name='object_mention')
+    op.drop_table('object_mention')
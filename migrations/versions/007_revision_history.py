@@ -0,0 +1,39 @@
+# migrations/versions/007_revision_history.py - Database Migration
+"""Add scene and chapter revision history
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('revision',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('number', sa.Integer(), nullable=False),
+        sa.Column('keyframe_number', sa.Integer(), nullable=False),
+        sa.Column('base_number', sa.Integer(), nullable=True),
+        sa.Column('payload', sa.LargeBinary(), nullable=False),
+        sa.Column('payload_size', sa.Integer(), nullable=True),
+        sa.Column('changed_fields', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('entity_type', 'entity_id', 'number', name='unique_entity_revision')
+    )
+    op.create_index(op.f('ix_revision_created_at'), 'revision', ['created_at'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_revision_created_at'), table_name='revision')
+    op.drop_table('revision')
@@ -0,0 +1,42 @@
+# migrations/versions/008_webhook_events.py - Database Migration
+"""Add the webhook event queue
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('webhook_event',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('event_id', sa.String(length=255), nullable=False),
+        sa.Column('event_type', sa.String(length=100), nullable=False),
+        sa.Column('customer_id', sa.String(length=100), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('event_created', sa.DateTime(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('provider', 'event_id', name='unique_provider_event')
+    )
+    op.create_index(op.f('ix_webhook_event_event_type'), 'webhook_event', ['event_type'], unique=False)
+    op.create_index('ix_webhook_event_queue', 'webhook_event', ['status', 'customer_id', 'event_created'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_webhook_event_queue', table_name='webhook_event')
+    op.drop_index(op.f('ix_webhook_event_event_type'), table_name='webhook_event')
+    op.drop_table('webhook_event')
@@ -0,0 +1,45 @@
+# migrations/versions/009_billing_rollover.py - Database Migration
+"""Index subscription period ends and add per-period usage snapshots
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(op.f('ix_user_subscription_current_period_end'), 'user_subscription',
+                    ['current_period_end'], unique=False)
+    op.create_table('usage_period',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('subscription_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('plan_id', sa.Integer(), nullable=True),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('period_end', sa.DateTime(), nullable=False),
+        sa.Column('tokens_used', sa.Integer(), nullable=True),
+        sa.Column('user_tokens_used', sa.Integer(), nullable=True),
+        sa.Column('tokens_limit', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['subscription_id'], ['user_subscription.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.ForeignKeyConstraint(['plan_id'], ['billing_plan.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('subscription_id', 'period_start', name='unique_subscription_period')
+    )
+    op.create_index(op.f('ix_usage_period_subscription_id'), 'usage_period', ['subscription_id'], unique=False)
+    op.create_index(op.f('ix_usage_period_user_id'), 'usage_period', ['user_id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_usage_period_user_id'), table_name='usage_period')
+    op.drop_index(op.f('ix_usage_period_subscription_id'), table_name='usage_period')
+    op.drop_table('usage_period')
+    op.drop_index(op.f('ix_user_subscription_current_period_end'), table_name='user_subscription')
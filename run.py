@@ -1,11 +1,14 @@
 # run.py - Application Runner
 import os
-from app import create_app, socketio
+from app import create_app, socketio, start_background_workers
 
 config_name = os.getenv('FLASK_CONFIG', 'development')
 app = create_app(config_name)
 
 if __name__ == '__main__':
+    # Not in the reloader's watcher process, which never serves requests
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers(app)
     socketio.run(
         app,
         debug=app.config.get('DEBUG', False),
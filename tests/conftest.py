@@ -12,6 +12,9 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from app import create_app, db
 from app.models import User, Project, Scene, StoryObject, BillingPlan, UserSubscription
 
+# @pytest.mark.query_budget(...) support; pytester runs the plugin against sample test files
+pytest_plugins = ['tests.utils.query_budget', 'pytester']
+
 @pytest.fixture(scope='session')
 def app():
     """Create application for testing"""
@@ -0,0 +1,50 @@
+# tests/performance/test_chapter_split_performance.py - Chapter Splitting Benchmark
+import os
+import time
+import pytest
+from app.utils.chapter_segmenter import segment_chapters
+
+# Budget for splitting a ~100k word manuscript (override on slow CI machines)
+SEGMENT_BUDGET_SECONDS = float(os.environ.get('SEGMENT_BUDGET_SECONDS', 0.1))
+
+def _manuscript(words=100_000):
+    sentence = "The quick brown fox said, \"Jump!\" and the dog did not. "
+    paragraph = sentence * 8
+    paragraph_words = len(paragraph.split())
+    return "\n\n".join(paragraph.strip() for _ in range(words // paragraph_words))
+
+@pytest.mark.slow
+class TestChapterSegmenterPerformance:
+    """Chapter splitting benchmarks"""
+    
+    def test_large_manuscript_within_budget(self):
+        """Test a 100k word story splits within budget"""
+        text = _manuscript()
+        
+        start_time = time.perf_counter()
+        offsets = segment_chapters(text, 30)
+        elapsed = time.perf_counter() - start_time
+        
+        assert len(offsets) == 30
+        assert elapsed < SEGMENT_BUDGET_SECONDS
+    
+    def test_faster_than_nltk(self):
+        """Test the offset pass beats NLTK sentence tokenization"""
+        nltk = pytest.importorskip('nltk')
+        try:
+            nltk.data.find('tokenizers/punkt')
+        except LookupError:
+            pytest.skip('punkt tokenizer data not installed')
+        text = _manuscript()
+        
+        start_time = time.perf_counter()
+        sentences = nltk.tokenize.sent_tokenize(text)
+        per_chapter = max(1, len(sentences) // 30)
+        [" ".join(sentences[i:i + per_chapter]) for i in range(0, len(sentences), per_chapter)]
+        nltk_elapsed = time.perf_counter() - start_time
+        
+        start_time = time.perf_counter()
+        [text[start:end].strip() for start, end in segment_chapters(text, 30)]
+        elapsed = time.perf_counter() - start_time
+        
+        assert elapsed < nltk_elapsed
@@ -0,0 +1,32 @@
+# tests/performance/test_load_harness.py - Load Test Harness Smoke Run
+import pytest
+from app import create_app, db
+from app.utils.load_seed import clear_load_data, seed_load_data
+from app.utils.load_test import run_load_test
+
+@pytest.mark.slow
+class TestLoadHarness:
+    """Seed a small data set and drive journeys and a collaborator through the app"""
+    
+    def test_seed_and_run(self):
+        """Test seeding is reproducible and a run reports every step"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            counts = seed_load_data(users=3, projects_per_user=2, min_scenes=10, max_scenes=40,
+                                    token_logs_per_user=10, collaborators=2, seed=7)
+            assert clear_load_data() == 3
+            assert seed_load_data(users=3, projects_per_user=2, min_scenes=10, max_scenes=40,
+                                  token_logs_per_user=10, collaborators=2, seed=7) == counts
+        
+        # In-memory SQLite allows a single worker per run
+        journeys = run_load_test(app, users=1, iterations=2, collaborators=0, scenes=1, reader_ratio=1.0)
+        sockets = run_load_test(app, users=0, collaborators=1, socket_events=10)
+        
+        assert journeys['journeys_completed'] == 2
+        assert journeys['steps']['list_projects']['errors'] == 0
+        assert journeys['steps']['get_project']['p95'] is not None
+        assert sockets['steps']['socket:join_project']['errors'] == 0
+        assert sum(s['count'] for k, s in sockets['steps'].items() if k.startswith('socket:')) == 12
+        with pytest.raises(RuntimeError):
+            run_load_test(app, users=2, collaborators=0)
@@ -0,0 +1,18 @@
+# tests/performance/test_startup.py - Cold Start Budget
+import os
+import pytest
+from app.utils.startup_profile import profile_startup
+
+# create_app() budget in a fresh interpreter (override on slow CI machines)
+STARTUP_BUDGET_SECONDS = float(os.environ.get('STARTUP_BUDGET_SECONDS', 2.0))
+
+@pytest.mark.slow
+class TestStartupBudget:
+    """Cold start benchmarks"""
+    
+    def test_create_app_within_budget(self):
+        """Test create_app stays within the cold-start budget without heavy imports"""
+        report = profile_startup('testing')
+        
+        assert report['heavy_loaded'] == []
+        assert report['create_app_seconds'] < STARTUP_BUDGET_SECONDS
@@ -0,0 +1,99 @@
+# tests/unit/test_billing_rollover.py - Billing Period Rollover Tests
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.models import User, BillingPlan, UserSubscription, UsagePeriod
+from app.services.billing_rollover import billing_rollover, next_period
+
+class TestBillingRollover:
+    """Test due subscriptions are snapshotted and reset in batches"""
+
+    def test_next_period_catches_up_missed_runs(self):
+        """Test a subscription several periods behind lands in the period containing now"""
+        end = datetime(2026, 1, 1)
+        length = timedelta(days=30)
+        assert next_period(end, end, length) == (end, end + length)
+        assert next_period(end, end + timedelta(days=75), length) == (end + 2 * length, end + 3 * length)
+
+    def test_due_subscriptions_roll_over_in_pages(self):
+        """Test free renewals and cancellations roll on schedule; unpaid paid periods wait"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            free = BillingPlan(name='free', display_name='Free', monthly_token_limit=1000, monthly_price_cents=0)
+            pro = BillingPlan(name='pro', display_name='Pro', monthly_token_limit=10000, monthly_price_cents=900)
+            db.session.add_all([free, pro])
+            db.session.flush()
+
+            now = datetime(2026, 10, 19, 12, 0)
+            ends = [now - timedelta(days=2), now - timedelta(days=1), now - timedelta(hours=1),
+                    now - timedelta(minutes=5), now + timedelta(days=3)]
+            plans = [(free, 'active'), (free, 'active'), (pro, 'active'), (pro, 'cancelling'), (free, 'active')]
+            users = []
+            for i, (end, (plan, status)) in enumerate(zip(ends, plans)):
+                user = User(username=f'writer{i}', email=f'writer{i}@example.com', password_hash='x',
+                            plan=plan.name, tokens_used=100 * (i + 1), tokens_limit=12000)
+                db.session.add(user)
+                db.session.flush()
+                db.session.add(UserSubscription(
+                    user_id=user.id, plan_id=plan.id, status=status, current_period_start=end - timedelta(days=30),
+                    current_period_end=end, tokens_used_this_period=100 * (i + 1)
+                ))
+                users.append(user)
+            db.session.commit()
+
+            billing_rollover.batch_size = 2
+            totals = billing_rollover.run(now=now)
+            assert (totals['renewed'], totals['cancelled'], totals['batches']) == (2, 1, 2)
+            assert billing_rollover.run(now=now)['batches'] == 0  # Nothing left due
+
+            subs = {s.user_id: s for s in UserSubscription.query.all()}
+            first = subs[users[0].id]
+            assert (first.current_period_start, first.current_period_end) == (ends[0], ends[0] + timedelta(days=30))
+            assert first.tokens_used_this_period == 0
+            assert (users[0].tokens_used, users[0].tokens_limit) == (0, 1000)
+            unpaid = subs[users[2].id]  # Renewed only when its invoice is paid
+            assert (unpaid.current_period_end, unpaid.tokens_used_this_period, users[2].tokens_used) == (ends[2], 300, 300)
+            assert subs[users[3].id].status == 'cancelled'
+            assert (users[3].plan, users[3].tokens_limit) == ('free', 1000)
+            assert users[3].token_epoch == 0  # A downgrade does not sign the user out
+            assert subs[users[4].id].tokens_used_this_period == 500 and users[4].tokens_used == 500
+
+            snapshots = UsagePeriod.query.order_by(UsagePeriod.period_end).all()
+            assert [(s.user_id, s.tokens_used, s.period_end) for s in snapshots] == [
+                (users[0].id, 100, ends[0]), (users[1].id, 200, ends[1]), (users[3].id, 400, ends[3])
+            ]
+            db.drop_all()
+
+    def test_paid_period_starts_on_payment(self):
+        """Test an early renewal payment starts the invoice's period once"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            pro = BillingPlan(name='pro', display_name='Pro', monthly_token_limit=10000, monthly_price_cents=900)
+            user = User(username='writer', email='writer@example.com', password_hash='x',
+                        plan='pro', tokens_used=700, tokens_limit=12000)
+            db.session.add_all([pro, user])
+            db.session.flush()
+            start = datetime(2026, 9, 25)
+            subscription = UserSubscription(user_id=user.id, plan_id=pro.id, status='active',
+                                            current_period_start=start, current_period_end=start + timedelta(days=30),
+                                            tokens_used_this_period=700)
+            db.session.add(subscription)
+            db.session.commit()
+
+            paid = (start + timedelta(days=28), start + timedelta(days=58))  # Before the local period ends
+            assert billing_rollover.apply_paid_period(subscription.id, *paid, now=start + timedelta(days=28))
+            db.session.commit()
+            db.session.expire_all()
+            assert (subscription.current_period_start, subscription.current_period_end) == paid
+            assert (subscription.tokens_used_this_period, user.tokens_used, user.tokens_limit) == (0, 0, 10000)
+            snapshot = UsagePeriod.query.one()
+            assert (snapshot.period_start, snapshot.period_end, snapshot.tokens_used) == (
+                start, start + timedelta(days=30), 700)
+
+            subscription.tokens_used_this_period = 50
+            db.session.commit()
+            assert not billing_rollover.apply_paid_period(subscription.id, *paid)  # Same invoice again
+            assert not billing_rollover.apply_paid_period(subscription.id, start, start + timedelta(days=30))
+            assert subscription.tokens_used_this_period == 50 and UsagePeriod.query.count() == 1
+            db.drop_all()
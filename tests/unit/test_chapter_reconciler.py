@@ -0,0 +1,88 @@
+# tests/unit/test_chapter_reconciler.py - Chapter Reconciliation Tests
+from app import create_app, db
+from app.models import User, Project, Story, StoryChapter, Revision
+from app.services.chapter_reconciler import reconcile_chapters, chapter_section
+
+def _story_with_chapters(texts):
+    owner = User(username='writer', email='writer@example.com', password_hash='x')
+    db.session.add(owner)
+    db.session.flush()
+    project = Project(title='Dopisy', user_id=owner.id)
+    db.session.add(project)
+    db.session.flush()
+    story = Story(title='Dopisy', project_id=project.id)
+    db.session.add(story)
+    db.session.flush()
+    for i, (title, content) in enumerate(texts):
+        story.chapters.append(StoryChapter(title=title, content=content, scene_ids='[]', order=i))
+    story.content = ''.join(chapter_section(t, c) for t, c in texts)
+    story.word_count = len(story.content.split())
+    db.session.commit()
+    return story
+
+class TestChapterReconciler:
+    """Test chapters are matched to existing rows and only changes are written"""
+
+    def test_matching_keeps_rows_and_content_stays_composed(self):
+        """Test id, text and position matching, inserts, deletes and the incremental word count"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            story = _story_with_chapters([('Příjezd', 'Vlak zastavil.'), ('Dopis', 'Babička psala.'),
+                                          ('Odjezd', 'Sníh padal celou noc.')])
+            first, second, third = sorted(story.chapters, key=lambda c: c.order)
+            revisions = Revision.query.count()
+
+            result = reconcile_chapters(story, [
+                {'title': 'Příjezd', 'content': 'Vlak zastavil.', 'scenes': []},        # same text, no id
+                {'title': 'Noc', 'content': 'Nová kapitola.', 'scenes': []},            # takes position 1
+                {'id': third.id, 'title': 'Odjezd', 'content': 'Sníh padal do rána.', 'scenes': []},
+                {'title': 'Epilog', 'content': 'Konec.', 'scenes': []},                # inserted
+            ])
+            db.session.commit()
+
+            assert {k: result[k] for k in ('created', 'updated', 'deleted', 'unchanged')} == \
+                {'created': 1, 'updated': 2, 'deleted': 0, 'unchanged': 1}
+            chapters = StoryChapter.query.filter_by(story_id=story.id).order_by(StoryChapter.order).all()
+            assert [c.title for c in chapters] == ['Příjezd', 'Noc', 'Odjezd', 'Epilog']
+            assert [c.id for c in chapters[:3]] == [first.id, second.id, third.id]
+            assert story.content == ''.join(chapter_section(c.title, c.content) for c in chapters)
+            assert story.word_count == len(story.content.split())
+            # The untouched chapter gets no new revision
+            assert Revision.query.count() == revisions + 3
+
+            # Chapters missing from a full list are deleted; moved ones keep their rows
+            result = reconcile_chapters(story, [{'id': third.id}, {'id': first.id}])
+            db.session.commit()
+            assert (result['deleted'], result['updated']) == (2, 2)
+            assert [c.id for c in result['chapters']] == [third.id, first.id]
+            assert db.session.get(StoryChapter, second.id) is None
+            assert story.content == chapter_section(third.title, third.content) + \
+                chapter_section(first.title, first.content)
+            assert story.word_count == len(story.content.split())
+
+            reconcile_chapters(story, [{'id': first.id}, {'id': third.id}])
+            assert story.content.startswith('# Příjezd')
+            db.drop_all()
+
+    def test_partial_edit_and_explicit_content(self):
+        """Test a single-chapter edit touches one row and hand-written content is left alone"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            story = _story_with_chapters([('Příjezd', 'Vlak zastavil.'), ('Dopis', 'Babička psala.')])
+            first, second = sorted(story.chapters, key=lambda c: c.order)
+
+            result = reconcile_chapters(story, [{'id': second.id, 'content': 'Babička psala dlouho do noci.'}],
+                                        partial=True, sync_content=True)
+            db.session.commit()
+            assert (result['updated'], result['unchanged'], result['deleted']) == (1, 0, 0)
+            assert story.content.endswith('# Dopis\n\nBabička psala dlouho do noci.\n\n')
+            assert story.word_count == len(story.content.split())
+
+            story.content = 'Vlastní text.'
+            reconcile_chapters(story, [{'id': first.id, 'title': 'Cesta', 'content': first.content}])
+            db.session.commit()
+            assert story.content == 'Vlastní text.'
+            assert [c.title for c in story.chapters] == ['Cesta']
+            db.drop_all()
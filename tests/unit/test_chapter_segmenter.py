@@ -0,0 +1,46 @@
+# tests/unit/test_chapter_segmenter.py - Chapter Segmentation Tests
+from app.utils.chapter_segmenter import segment_chapters, split_chapters
+
+class TestChapterSegmenter:
+    """Test offset-based chapter splitting"""
+    
+    def test_cuts_on_paragraph_boundaries(self):
+        """Test chapters cover the text and never split a paragraph"""
+        paragraphs = [f"Paragraph {i} starts. It has two sentences." for i in range(12)]
+        text = "\n\n".join(paragraphs)
+        
+        offsets = segment_chapters(text, 3)
+        
+        assert len(offsets) == 3
+        assert offsets[0][0] == 0 and offsets[-1][1] == len(text)
+        assert all(prev[1] == nxt[0] for prev, nxt in zip(offsets, offsets[1:]))
+        chapters = split_chapters(text, 3)
+        assert "\n\n".join(chapters) == text
+    
+    def test_prefers_scene_breaks_and_scene_weights(self):
+        """Test cuts land on scene markers near the weighted scene split"""
+        text = "Short opening.\n\nStill short.\n\n***\n\n" + "Long middle. " * 50 + "\n\nEnd of it."
+        
+        chapters = split_chapters(text, 2, scene_weights=[1, 4])
+        
+        assert chapters[0] == "Short opening.\n\nStill short.\n\n***"
+        assert chapters[1].startswith("Long middle.")
+    
+    def test_single_paragraph_falls_back_to_sentences(self):
+        """Test text without paragraph breaks is cut at a sentence end"""
+        text = " ".join(f"Sentence number {i}." for i in range(40))
+        
+        chapters = split_chapters(text, 4)
+        
+        assert len(chapters) == 4
+        assert all(chapter.endswith('.') for chapter in chapters)
+    
+    def test_headings_open_the_next_chapter(self):
+        """Test a markdown heading is cut before, not after, so it stays with its text"""
+        sections = [f"# Kapitola {i}\n\n" + "Babička psala dopisy. " * 20 for i in range(1, 4)]
+        text = "\n\n".join(section.strip() for section in sections)
+        
+        chapters = split_chapters(text, 3)
+        
+        assert [chapter.split('\n')[0] for chapter in chapters] == ['# Kapitola 1', '# Kapitola 2', '# Kapitola 3']
+        assert all(chapter.count('# Kapitola') == 1 for chapter in chapters)
@@ -0,0 +1,76 @@
+# tests/unit/test_collaboration_stats.py - Collaboration Analytics Counter Tests
+from datetime import datetime
+import pytest
+from app import create_app, db
+from app.cli import rebuild_collaboration_stats_command
+from app.models import User, Project, ProjectCollaborator, ProjectCollaborationStats, Comment
+from app.services.collaboration_manager import CollaborationManager
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    app.config['COLLABORATION_COUNTERS_ENABLED'] = True
+    with app.app_context():
+        db.create_all()
+        owner = User(username='owner', email='owner@example.com', password_hash='x')
+        guest = User(username='guest', email='guest@example.com', password_hash='x')
+        db.session.add_all([owner, guest])
+        db.session.flush()
+        project = Project(id='p1', title='Dopisy', user_id=owner.id)
+        db.session.add(project)
+        db.session.add_all([
+            ProjectCollaborator(project_id='p1', user_id=guest.id, status='active', last_access=datetime.utcnow()),
+            ProjectCollaborator(project_id='p1', user_id=owner.id, status='pending'),
+            Comment(project_id='p1', user_id=guest.id, content='Pěkné.', is_resolved=True),
+            Comment(project_id='p1', user_id=guest.id, content='Zkrátit?'),
+            Comment(project_id='p1', user_id=owner.id, content='Ano.'),
+        ])
+        db.session.commit()
+        yield app
+        db.drop_all()
+
+class TestCollaborationStats:
+    """Test live aggregates, write-side counters and the rebuild command"""
+
+    def test_analytics_use_live_aggregates_without_writing(self, app):
+        """Test a project without a counters row is answered from source tables, read-only"""
+        manager = CollaborationManager()
+        analytics = manager.get_collaboration_analytics('p1')
+
+        assert (analytics['total_collaborators'], analytics['pending_invitations']) == (2, 1)
+        assert (analytics['total_comments'], analytics['resolved_comments']) == (3, 1)
+        assert analytics['active_collaborators'] == 1
+        assert ProjectCollaborationStats.query.count() == 0
+        assert not db.session.new and not db.session.dirty
+
+    def test_writes_seed_and_bump_counters(self, app):
+        """Test the first write seeds the row and later writes apply deltas"""
+        manager = CollaborationManager()
+        db.session.add(Comment(project_id='p1', user_id=1, content='Nový.'))
+        manager.record_comment_added('p1')
+        db.session.commit()
+        assert ProjectCollaborationStats.query.get('p1').total_comments == 4
+
+        manager.record_comment_resolved('p1')
+        manager.record_invitation_sent('p1')
+        manager.record_invitation_accepted('p1')
+        db.session.commit()
+        db.session.expire_all()
+        stats = manager.get_collaboration_analytics('p1')
+        assert (stats['total_comments'], stats['resolved_comments']) == (4, 2)
+        assert (stats['total_collaborators'], stats['pending_invitations']) == (3, 1)
+
+    def test_rebuild_command_recomputes_rows(self, app):
+        """Test rebuild-collaboration-stats creates and corrects counters rows"""
+        db.session.add(ProjectCollaborationStats(project_id='p1', total_comments=99))
+        db.session.commit()
+
+        result = app.test_cli_runner().invoke(rebuild_collaboration_stats_command)
+        assert result.exit_code == 0, result.output
+        assert 'Rebuilt collaboration stats for 1 projects' in result.output
+
+        db.session.expire_all()
+        stats = ProjectCollaborationStats.query.get('p1')
+        assert (stats.total_collaborators, stats.pending_invitations) == (2, 1)
+        assert (stats.total_comments, stats.resolved_comments) == (3, 1)
+        assert 'rebuild-collaboration-stats' in app.cli.list_commands(None)
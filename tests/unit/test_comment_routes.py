@@ -0,0 +1,107 @@
+# tests/unit/test_comment_routes.py - Comment Listing Route Tests
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from app import create_app, db
+from app.models import User, Project, Comment
+from app.utils.jwt_auth import generate_user_token
+
+@pytest.fixture
+def thread():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        owner = User(username='writer', email='writer@example.com', password_hash='x')
+        db.session.add(owner)
+        db.session.flush()
+        project = Project(title='Dopisy', user_id=owner.id)
+        db.session.add(project)
+        db.session.flush()
+
+        start = datetime(2026, 1, 1, 12, 0)
+
+        def comment(content, minutes, parent=None):
+            row = Comment(content=content, project_id=project.id, user_id=owner.id,
+                          parent_comment_id=parent.id if parent else None,
+                          thread_depth=parent.thread_depth + 1 if parent else 0,
+                          created_at=start + timedelta(minutes=minutes))
+            db.session.add(row)
+            db.session.flush()
+            row.set_thread_position(parent)
+            return row
+
+        # Roots 2 and 3 share a timestamp, so the id breaks the tie
+        roots = [comment('Úvod', 0), comment('Nádraží', 1), comment('Dopis', 2), comment('Noc', 2)]
+        first = comment('Souhlas', 10, roots[0])
+        later = comment('Ještě jedno', 11, roots[0])
+        nested = comment('Odpověď na souhlas', 12, first)  # Newest id, but sits under `first`
+        other = Project(title='Jiný', user_id=owner.id)
+        db.session.add(other)
+        db.session.flush()
+        stranger = Comment(content='Cizí', project_id=other.id, user_id=owner.id, thread_depth=0)
+        db.session.add(stranger)
+        db.session.flush()
+        stranger.set_thread_position(None)
+        db.session.commit()
+        ids = SimpleNamespace(roots=[r.id for r in roots], first=first.id, later=later.id, nested=nested.id,
+                              stranger=stranger.id)
+        yield SimpleNamespace(client=app.test_client(), project_id=project.id, ids=ids,
+                              headers={'Authorization': f'Bearer {generate_user_token(owner)}'})
+        db.drop_all()
+
+def _walk(thread, url, key):
+    """Follow next_cursor to the end, returning the pages of ids"""
+    pages, cursor = [], None
+    while True:
+        params = f'&cursor={cursor}' if cursor else ''
+        body = thread.client.get(f'{url}{params}', headers=thread.headers).get_json()
+        pages.append([item['id'] for item in body[key]])
+        cursor = body['next_cursor']
+        if not cursor:
+            return pages, body
+
+class TestCommentRoutes:
+    """Test flat and threaded comment listings over HTTP"""
+
+    def test_flat_pages_are_newest_first_without_gaps(self, thread):
+        """Test the created_at/id keyset cursor walks every comment exactly once"""
+        ids = thread.ids
+        pages, _ = _walk(thread, f'/api/collaboration/projects/{thread.project_id}/comments?limit=3', 'comments')
+
+        assert pages == [
+            [ids.nested, ids.later, ids.first],
+            [ids.roots[3], ids.roots[2], ids.roots[1]],
+            [ids.roots[0]],
+        ]
+
+    def test_threaded_pages_carry_counts_and_first_replies(self, thread):
+        """Test root pages include reply counts and the first replies in thread_path order"""
+        ids = thread.ids
+        url = f'/api/collaboration/projects/{thread.project_id}/comments?threaded=true&limit=2&reply_limit=2'
+        pages, last = _walk(thread, url, 'threads')
+
+        assert pages == [[ids.roots[3], ids.roots[2]], [ids.roots[1], ids.roots[0]]]
+        opening = last['threads'][1]
+        assert opening['reply_count'] == 3
+        assert [r['id'] for r in opening['replies']] == [ids.first, ids.nested]
+        assert last['threads'][0]['reply_count'] == 0 and last['threads'][0]['replies'] == []
+
+    def test_replies_follow_thread_path_across_pages(self, thread):
+        """Test further replies come depth-first, not in id order, across cursor pages"""
+        ids = thread.ids
+        url = f'/api/collaboration/projects/{thread.project_id}/comments/{ids.roots[0]}/replies?limit=2'
+        pages, _ = _walk(thread, url, 'comments')
+
+        assert pages == [[ids.first, ids.nested], [ids.later]]
+
+    def test_reply_parent_must_belong_to_the_project(self, thread):
+        """Test a parent comment from another project is rejected and a local one threads"""
+        url = f'/api/collaboration/projects/{thread.project_id}/comments'
+        response = thread.client.post(url, headers=thread.headers,
+                                      json={'content': 'Podvrh', 'parent_comment_id': thread.ids.stranger})
+        assert response.status_code == 400
+
+        response = thread.client.post(url, headers=thread.headers,
+                                      json={'content': 'Díky', 'parent_comment_id': thread.ids.later})
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()['comment']['thread_depth'] == 2
@@ -0,0 +1,72 @@
+# tests/unit/test_db_routing.py - Read/Write Split Tests
+import pytest
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from app.utils.db_routing import RoutingSession, read_only, replica_binds, replica_router, STICKY_COOKIE
+
+@pytest.fixture
+def routed_app(tmp_path):
+    """App with a primary and a lagging replica (two SQLite files)"""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/primary.db',
+        SQLALCHEMY_BINDS=replica_binds([f'sqlite:///{tmp_path}/replica.db']),
+        DATABASE_REPLICA_STICKY_SECONDS=5
+    )
+    db = SQLAlchemy(session_options={'class_': RoutingSession})
+    
+    class Note(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        text = db.Column(db.String(50))
+    
+    db.init_app(app)
+    replica_router.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Note(id=1, text='fresh'))
+        db.session.commit()
+        # The replica has not replayed the latest write yet
+        replica = db.engines['replica_0']
+        Note.__table__.create(replica)
+        with replica.begin() as connection:
+            connection.execute(Note.__table__.insert(), {'id': 1, 'text': 'stale'})
+    
+    @app.route('/note')
+    @read_only
+    def read_note():
+        return jsonify(text=db.session.get(Note, 1).text)
+    
+    @app.route('/note/primary')
+    def read_note_primary():
+        return jsonify(text=db.session.get(Note, 1).text)
+    
+    @app.route('/note/edit')
+    @read_only
+    def edit_then_read():
+        db.session.add(Note(id=2, text='new'))
+        db.session.commit()
+        return jsonify(text=db.session.get(Note, 1).text)
+    
+    return app
+
+class TestReplicaRouting:
+    """Test read-only routes use replicas with read-your-writes stickiness"""
+    
+    def test_read_only_routes_use_replica(self, routed_app):
+        """Test only decorated routes read from the replica"""
+        client = routed_app.test_client()
+        
+        assert client.get('/note').json['text'] == 'stale'
+        assert client.get('/note/primary').json['text'] == 'fresh'
+    
+    def test_writes_make_client_sticky(self, routed_app):
+        """Test reads after a commit go to the primary, in and across requests"""
+        client = routed_app.test_client()
+        
+        response = client.get('/note/edit')
+        assert response.json['text'] == 'fresh'
+        assert STICKY_COOKIE in response.headers.get('Set-Cookie', '')
+        assert client.get('/note').json['text'] == 'fresh'
+        
+        client.delete_cookie(STICKY_COOKIE)
+        assert client.get('/note').json['text'] == 'stale'
@@ -0,0 +1,35 @@
+# tests/unit/test_db_session.py - Session Release Tests
+from app import create_app, db
+from app.models import User
+from app.utils.db_session import external_calls, release_connection
+
+class TestReleaseConnection:
+    """Test the connection is handed back around external calls"""
+    
+    def test_release_keeps_loaded_objects(self):
+        """Test releasing ends the transaction without expiring objects"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username='pool', email='pool@example.com', password_hash='x'))
+            db.session.commit()
+            user = User.query.filter_by(username='pool').first()
+            assert db.session().in_transaction()
+            
+            with external_calls():
+                assert not db.session().in_transaction()
+                assert user.email == 'pool@example.com'  # No reload needed
+                assert not db.session().in_transaction()
+            
+            user.plan = 'pro'
+            assert not release_connection()  # Pending changes stay with the caller
+            db.session.flush()
+            assert not release_connection()  # Flushed but uncommitted, too
+            db.session.commit()
+            
+            User.query.filter_by(id=user.id).update({'tokens_used': 5})
+            assert not release_connection()  # Bulk writes bypass the unit of work
+            db.session.rollback()
+            User.query.all()
+            assert release_connection()
+            db.drop_all()
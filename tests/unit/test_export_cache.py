@@ -0,0 +1,53 @@
+# tests/unit/test_export_cache.py - Export Artifact Cache Tests
+import io
+import os
+from types import SimpleNamespace
+from flask import Flask
+from app.services.export_cache import ExportArtifactCache, story_content_hash
+
+def make_story(content='Once upon a time.'):
+    chapter = SimpleNamespace(id=1, order=0, title='Chapter 1', content=content)
+    return SimpleNamespace(id=7, title='Story', premise='Premise', content=content,
+                           story_metadata='{}', chapters=[chapter])
+
+def make_app(tmp_path, max_bytes=1024):
+    app = Flask(__name__)
+    app.config.update(EXPORT_CACHE_DIR=str(tmp_path), EXPORT_CACHE_MAX_BYTES=max_bytes)
+    return app
+
+class TestExportArtifactCache:
+    """Test content-addressed export cache"""
+    
+    def test_hash_tracks_content(self):
+        """Test the key changes with chapter content and format"""
+        digest = story_content_hash(make_story(), 'pdf')
+        
+        assert digest == story_content_hash(make_story(), 'pdf')
+        assert digest != story_content_hash(make_story('Changed.'), 'pdf')
+        assert digest != story_content_hash(make_story(), 'epub')
+    
+    def test_put_get_and_supersede(self, tmp_path):
+        """Test artifacts are returned and older renders are replaced"""
+        cache = ExportArtifactCache()
+        with make_app(tmp_path).app_context():
+            assert cache.get(7, 'pdf', 'a') is None
+            old_path = cache.put(7, 'pdf', 'a', io.BytesIO(b'old'))
+            path = cache.put(7, 'pdf', 'b', io.BytesIO(b'new'))
+            
+            assert cache.get(7, 'pdf', 'b') == path
+            assert not os.path.exists(old_path)
+    
+    def test_lru_eviction(self, tmp_path):
+        """Test least recently used artifacts are evicted over budget"""
+        cache = ExportArtifactCache()
+        with make_app(tmp_path, max_bytes=1000).app_context():
+            first = cache.put(1, 'pdf', 'a', io.BytesIO(b'x' * 400))
+            second = cache.put(2, 'pdf', 'a', io.BytesIO(b'x' * 400))
+            os.utime(first, (1, 1))
+            os.utime(second, (2, 2))
+            cache.get(1, 'pdf', 'a')  # first becomes most recent
+            cache.put(3, 'pdf', 'a', io.BytesIO(b'x' * 400))
+            
+            assert os.path.exists(first)
+            assert not os.path.exists(second)
+            assert cache.stats()['evictions'] == 1
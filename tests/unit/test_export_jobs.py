@@ -0,0 +1,47 @@
+# tests/unit/test_export_jobs.py - Background Export Job Tests
+import time
+from types import SimpleNamespace
+from flask import Flask
+from app.services.export_jobs import ExportJobManager, parse_job_id
+
+def make_story(content='Once upon a time.'):
+    chapter = SimpleNamespace(id=1, order=0, title='Chapter 1', content=content)
+    return SimpleNamespace(id=3, title='Story', premise='Premise', content=content,
+                           story_metadata='{}', chapters=[chapter])
+
+def wait_for(job, timeout=10):
+    deadline = time.time() + timeout
+    while job.status == 'pending' and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+class TestExportJobManager:
+    """Test content-addressed export jobs"""
+    
+    def test_job_renders_into_cache(self, tmp_path):
+        """Test a submitted job completes and is deduplicated"""
+        app = Flask(__name__)
+        app.config.update(EXPORT_CACHE_DIR=str(tmp_path), EXPORT_JOB_EXECUTOR='thread')
+        manager = ExportJobManager()
+        
+        with app.app_context():
+            story = make_story()
+            job = manager.submit(story, 'txt')
+            assert parse_job_id(job.id) == ('txt', job.digest)
+            
+            assert wait_for(job).status == 'completed'
+            assert manager.submit(story, 'txt') is job
+            with open(manager.artifact_path(job), 'rb') as handle:
+                assert b'Once upon a time.' in handle.read()
+    
+    def test_stale_job_id_is_rejected(self, tmp_path):
+        """Test ids for old content are not resubmitted"""
+        app = Flask(__name__)
+        app.config.update(EXPORT_CACHE_DIR=str(tmp_path), EXPORT_JOB_EXECUTOR='thread')
+        manager = ExportJobManager()
+        
+        with app.app_context():
+            job = wait_for(manager.submit(make_story(), 'txt'))
+            
+            assert manager.get(make_story('Edited.'), job.id) is None
+            assert manager.get(make_story(), 'txt-nothex') is None
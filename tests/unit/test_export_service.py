@@ -0,0 +1,76 @@
+# tests/unit/test_export_service.py - Streaming Export Writer Tests
+import io
+import zipfile
+from types import SimpleNamespace
+from app.services.export_service import ExportService
+
+def make_story(chapter_count=3):
+    chapters = [
+        SimpleNamespace(id=i, order=i, title=f'Chapter {i}', content=f'First {i}.\n\nSecond & last.')
+        for i in range(chapter_count)
+    ]
+    return SimpleNamespace(id=1, title='Story', premise='Premise', content='Flat manuscript',
+                           story_metadata='{"genre": "drama"}', chapters=chapters)
+
+class TestStreamingExports:
+    """Test chapter-at-a-time TXT and EPUB writers"""
+    
+    def test_txt_streams_one_chunk_per_chapter(self):
+        """Test TXT output is emitted per chapter"""
+        story = make_story()
+        chunks = list(ExportService().stream_txt(story, iter(story.chapters)))
+        
+        assert len(chunks) == 4
+        assert chunks[1].decode('utf-8').startswith('# Chapter 0\n\nFirst 0.')
+    
+    def test_txt_without_chapters_uses_manuscript(self):
+        """Test chapterless stories export the flat content"""
+        story = make_story(chapter_count=0)
+        text = b''.join(ExportService().stream_txt(story, iter([]))).decode('utf-8')
+        
+        assert text.endswith('Flat manuscript')
+    
+    def test_epub_package_structure(self):
+        """Test the EPUB starts with a stored mimetype and lists every chapter"""
+        story = make_story()
+        data = b''.join(ExportService().stream_epub(story, iter(story.chapters), chunk_size=1024))
+        book = zipfile.ZipFile(io.BytesIO(data))
+        
+        first = book.infolist()[0]
+        assert first.filename == 'mimetype'
+        assert first.compress_type == zipfile.ZIP_STORED
+        assert b'Second &amp; last.' in book.read('EPUB/chapter_3.xhtml')
+        assert book.read('EPUB/content.opf').count(b'<itemref') == 6
+
+class MemoryFragmentStore:
+    def __init__(self):
+        self.fragments = {}
+    
+    def get_fragment(self, key):
+        return self.fragments.get(key)
+    
+    def put_fragment(self, key, data):
+        self.fragments[key] = data
+
+class TestIncrementalPdf:
+    """Test per-chapter PDF fragment reuse"""
+    
+    def test_single_chapter_edit_renders_one_fragment(self):
+        """Test only the edited chapter is laid out again"""
+        from pypdf import PdfReader
+        from app.services.pdf_fragments import PdfFragmentRenderer
+        
+        renderer = PdfFragmentRenderer()
+        store = MemoryFragmentStore()
+        story = make_story()
+        
+        first = renderer.render(story, store=store)
+        assert renderer.stats() == {'rendered': 5, 'reused': 0}
+        
+        story.chapters[1].content = 'Rewritten.'
+        renderer.render(story, store=store)
+        assert renderer.stats() == {'rendered': 6, 'reused': 4}
+        
+        reader = PdfReader(first)
+        assert len(reader.pages) == 5
+        assert len(reader.outline) == 3
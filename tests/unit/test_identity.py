@@ -0,0 +1,153 @@
+# tests/unit/test_identity.py - Auth Cache Tests
+import time
+from app import create_app, db
+from app.models import User
+from app.utils.identity import (
+    UserAuthCache, UserIdentity, TokenEpochRegistry, user_auth_cache, token_epochs
+)
+from app.utils.jwt_auth import generate_user_token
+
+def make_identity(user_id=1, plan='pro'):
+    return UserIdentity(id=user_id, username='testuser', email='test@example.com',
+                        plan=plan, is_active=True, tokens_limit=10000)
+
+class TestUserAuthCache:
+    """Test process-level auth state cache"""
+    
+    def test_hit_and_invalidate(self):
+        """Test cached identity is returned until invalidated"""
+        cache = UserAuthCache(ttl_seconds=60)
+        cache.set(make_identity())
+        
+        assert cache.get(1).plan == 'pro'
+        
+        cache.invalidate(1)
+        assert cache.get(1) is None
+    
+    def test_entries_expire(self):
+        """Test entries expire after their TTL"""
+        cache = UserAuthCache()
+        cache.set(make_identity(), ttl_seconds=0.01)
+        time.sleep(0.02)
+        
+        assert cache.get(1) is None
+    
+    def test_bounded_size(self):
+        """Test oldest entry is evicted when full"""
+        cache = UserAuthCache(ttl_seconds=60, max_entries=2)
+        for user_id in (1, 2, 3):
+            cache.set(make_identity(user_id))
+        
+        assert cache.get(1) is None
+        assert cache.get(3) is not None
+
+class TestTokenEpochRegistry:
+    """Test in-memory JWT revocation epochs"""
+    
+    def test_older_epochs_are_revoked(self):
+        """Test tokens below the newest known epoch are rejected"""
+        registry = TokenEpochRegistry()
+        assert not registry.is_revoked(1, 0)
+        
+        registry.note(1, 2)
+        registry.note(1, 1)  # never lowered
+        
+        assert registry.known_epoch(1) == 2
+        assert registry.is_revoked(1, 1)
+        assert not registry.is_revoked(1, 2)
+    
+    def test_confirmation_expires_but_revocation_sticks(self):
+        """Test an unconfirmed epoch sends requests to the DB while older tokens stay revoked"""
+        registry = TokenEpochRegistry()
+        registry.note(1, 2, ttl_seconds=0.01)
+        time.sleep(0.02)
+        
+        assert registry.known_epoch(1) is None
+        assert registry.is_revoked(1, 1)
+        registry.note(1, 2)  # Confirmed again from the DB
+        assert registry.known_epoch(1) == 2
+
+class TestTokenRequired:
+    """Test the claims fast path of token_required against account changes"""
+
+    def test_deactivation_plan_change_and_unknown_epochs(self):
+        """Test stale or inactive identities are rejected on read-only requests"""
+        app = create_app('testing')
+        user_auth_cache.clear()
+        token_epochs.clear()
+        with app.app_context():
+            db.create_all()
+            user = User(username='writer', email='writer@example.com', password_hash='x', plan='free')
+            db.session.add(user)
+            db.session.commit()
+            client = app.test_client()
+
+            def status(token):
+                return client.get('/api/projects/missing/story',
+                                  headers={'Authorization': f'Bearer {token}'}).status_code
+
+            token = generate_user_token(user)
+            assert status(token) == 404  # First sight of the epoch goes to the DB
+            assert token_epochs.known_epoch(user.id) == 0
+            assert status(token) == 404  # Claims fast path
+
+            # A plan change (e.g. right after paying) keeps the caller signed in
+            user.plan = 'pro'
+            db.session.commit()
+            assert user.token_epoch == 0
+            assert status(token) == 404
+            assert client.put('/api/projects/missing/story', json={},
+                              headers={'Authorization': f'Bearer {token}'}).status_code == 404
+
+            # A cached inactive identity is not accepted even with current claims
+            user_auth_cache.set(UserIdentity(id=user.id, username='writer', email=None, plan='pro',
+                                             is_active=False, tokens_limit=None, token_epoch=0), 60)
+            assert status(token) == 401
+            user_auth_cache.clear()
+
+            # Deactivation revokes as well
+            user.is_active = False
+            db.session.commit()
+            assert user.token_epoch == 1 and status(token) == 401
+
+            # A process that never saw the epoch reads the row instead of trusting the claims
+            User.query.filter_by(id=user.id).update({'is_active': True})
+            db.session.commit()
+            token = generate_user_token(user)
+            User.query.filter_by(id=user.id).update({'is_active': False})  # No events, no epoch bump
+            db.session.commit()
+            user_auth_cache.clear()
+            token_epochs.clear()
+            assert status(token) == 401
+            db.drop_all()
+        # Later tests reuse user id 1 at epoch 0
+        user_auth_cache.clear()
+        token_epochs.clear()
+
+    def test_revocation_by_another_process_is_seen_after_the_ttl(self):
+        """Test a token revoked elsewhere stops passing the fast path once the TTL lapses"""
+        app = create_app('testing')
+        app.config['AUTH_CACHE_TTL_SECONDS'] = 0.05
+        user_auth_cache.clear()
+        token_epochs.clear()
+        with app.app_context():
+            db.create_all()
+            user = User(username='writer', email='writer@example.com', password_hash='x', plan='free')
+            db.session.add(user)
+            db.session.commit()
+            user_id, headers = user.id, {'Authorization': f'Bearer {generate_user_token(user)}'}
+        # Requests outside the test's app context, so g is not shared between them
+        client = app.test_client()
+        assert client.get('/api/projects/missing/story', headers=headers).status_code == 404
+        assert client.get('/api/projects/missing/story', headers=headers).status_code == 404
+
+        with app.app_context():
+            # Another worker logs out all devices: no event reaches this process
+            User.query.filter_by(id=user_id).update({'token_epoch': 1})
+            db.session.commit()
+        time.sleep(0.06)
+        assert client.get('/api/projects/missing/story', headers=headers).status_code == 401
+        with app.app_context():
+            db.drop_all()
+        user_auth_cache.clear()
+        token_epochs.clear()
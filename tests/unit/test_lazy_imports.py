@@ -0,0 +1,26 @@
+# tests/unit/test_lazy_imports.py - Lazy Import Tests
+import sys
+import pytest
+from app.utils.lazy_imports import LazyModule, prewarm
+
+class TestLazyModule:
+    """Test on-demand module loading"""
+    
+    def test_imports_on_first_attribute(self):
+        """Test the module is only imported when used"""
+        sys.modules.pop('colorsys', None)
+        module = LazyModule('colorsys')
+        
+        assert module.available
+        assert 'colorsys' not in sys.modules
+        assert module.rgb_to_hsv(1, 0, 0)[0] == 0
+        assert module.loaded and 'colorsys' in sys.modules
+    
+    def test_missing_module(self):
+        """Test missing modules report unavailable and raise on use"""
+        module = LazyModule('storyforge_missing_dependency')
+        
+        assert not module.available
+        with pytest.raises(ImportError):
+            module.anything
+        prewarm(['storyforge_missing_dependency'], background=False)  # swallowed
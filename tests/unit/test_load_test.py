@@ -0,0 +1,39 @@
+# tests/unit/test_load_test.py - Load Test Harness Tests
+from app.utils.load_test import Recorder, compare_results, percentile, summarize
+
+def result(p95, errors=0, count=100, parameters=None):
+    return {
+        'parameters': parameters or {'users': 10},
+        'steps': {'get_project': {'p95': p95, 'errors': errors, 'count': count}}
+    }
+
+class TestLoadTestHarness:
+    """Test percentile reporting and regression comparison"""
+    
+    def test_percentiles_and_recorder(self):
+        """Test nearest-rank percentiles and skipped optional steps"""
+        ordered = [i / 1000 for i in range(1, 101)]
+        assert percentile(ordered, 50) == 0.05
+        assert percentile(ordered, 99) == 0.099
+        assert summarize(ordered)['max'] == 100.0
+        
+        recorder = Recorder()
+        recorder.record('export', 0.01, 404, ok=False, skipped=True)
+        recorder.record('login', 0.02, 200, ok=True)
+        recorder.record('login', 0.03, 500, ok=False)
+        steps = recorder.steps()
+        assert steps['export']['count'] == 0 and steps['export']['skipped'] == 1
+        assert steps['login']['errors'] == 1 and steps['login']['statuses'] == {'200': 1, '500': 1}
+        assert recorder.total_requests() == 2
+    
+    def test_compare_results_flags_regressions(self):
+        """Test p95 and error-rate regressions beyond tolerance are reported"""
+        assert compare_results(result(100.0), result(110.0)) == []
+        assert compare_results(result(2.0), result(6.0)) == []  # Under the absolute noise floor
+        
+        slower = compare_results(result(100.0), result(140.0))
+        assert slower[0]['step'] == 'get_project' and 'p95' in slower[0]['reason']
+        failing = compare_results(result(100.0), result(100.0, errors=5))
+        assert 'error rate' in failing[0]['reason']
+        mismatch = compare_results(result(100.0), result(100.0, parameters={'users': 20}))
+        assert mismatch[0]['step'] == '*'
@@ -0,0 +1,89 @@
+# tests/unit/test_mention_index.py - Object Mention Index Tests
+from app import create_app, db
+from app.models import User, Project, Scene, StoryObject, ObjectMention
+from app.services.ai_analyzer import AIAnalyzer
+from app.services.mention_index import mention_index, build_matcher, scan_text
+from app.utils.aho_corasick import AhoCorasick
+from app.utils.jwt_auth import generate_user_token
+
+class TestAhoCorasick:
+    """Test the multi-pattern matcher"""
+
+    def test_finds_overlapping_patterns_in_one_pass(self):
+        """Test every occurrence of every pattern is reported with its span"""
+        matcher = AhoCorasick()
+        for word in ('he', 'she', 'his', 'hers'):
+            matcher.add(word, word)
+        assert sorted(matcher.find('ushers')) == [(1, 4, 'she'), (2, 4, 'he'), (2, 6, 'hers')]
+
+    def test_adding_after_build_does_not_duplicate_matches(self):
+        """Test a rebuilt automaton reports each match once"""
+        matcher = AhoCorasick()
+        for word in ('he', 'she'):
+            matcher.add(word, word)
+        assert sorted(matcher.find('she')) == [(0, 3, 'she'), (1, 3, 'he')]
+        matcher.add('hers', 'hers')
+        matcher.build()
+        assert sorted(matcher.find('shers')) == [(0, 3, 'she'), (1, 3, 'he'), (1, 5, 'hers')]
+
+    def test_scan_matches_inflected_names_and_aliases(self):
+        """Test Czech inflections match and an alias inside the full name counts once"""
+        matcher = build_matcher([(1, 'Babička Anna', {'aliases': ['Anna']}), (2, 'Dopis', None)])
+        text = 'Babičce Anně přišel dopis. Anna ho schovala.'
+        assert scan_text(matcher, text) == {1: [[0, 12], [27, 31]], 2: [[20, 25]]}
+
+class TestMentionIndex:
+    """Test incremental maintenance and consumers of the mention index"""
+
+    def test_index_follows_scene_and_object_changes(self):
+        """Test scene edits, object renames and deletes keep mentions current"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            owner = User(username='writer', email='writer@example.com', password_hash='x')
+            db.session.add(owner)
+            db.session.flush()
+            project = Project(title='Dopisy', user_id=owner.id)
+            db.session.add(project)
+            db.session.flush()
+
+            grandma = StoryObject(name='Babička', object_type='character', project_id=project.id)
+            db.session.add(grandma)
+            db.session.flush()
+            first = Scene(title='Nádraží', description='Babička čeká s dopisem.', order_index=1,
+                          project_id=project.id)
+            second = Scene(title='Noc', description='Nikdo nepřišel.', order_index=2, project_id=project.id)
+            db.session.add_all([first, second])
+            db.session.flush()
+            letter = StoryObject(name='Dopis', object_type='item', project_id=project.id)
+            db.session.add(letter)
+            db.session.commit()
+
+            usage = mention_index.usage(project.id)
+            assert [m['scene_id'] for m in usage[grandma.id]] == [first.id]
+            assert usage[letter.id][0]['positions'] == {'description': [[15, 22]]}
+            response = app.test_client().get(
+                f'/api/projects/{project.id}/mentions?object_id={letter.id}',
+                headers={'Authorization': f'Bearer {generate_user_token(owner)}'}
+            )
+            assert response.status_code == 200
+            assert response.get_json()['objects'][0]['scene_count'] == 1
+
+            second.description = 'Babičce se zdálo o dopisech. Babička spala.'
+            db.session.commit()
+            assert [m['mention_count'] for m in mention_index.usage(project.id)[grandma.id]] == [1, 2]
+
+            grandma.name = 'Stará paní'
+            grandma.attributes = {'aliases': ['babička']}
+            db.session.commit()
+            assert len(mention_index.usage(project.id, grandma.id)[grandma.id]) == 2
+
+            db.session.delete(letter)
+            db.session.delete(first)
+            db.session.commit()
+            assert {(m.object_id, m.scene_id) for m in ObjectMention.query.all()} == {(grandma.id, second.id)}
+            assert mention_index.rebuild(project.id)['mentions'] == 1
+
+            found = AIAnalyzer()._fallback_object_extraction('Stará paní našla klíč od knihovny.', project.id)
+            assert found['characters'] == ['Stará paní'] and found['locations'] == ['Knihovna']
+            db.drop_all()
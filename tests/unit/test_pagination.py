@@ -0,0 +1,28 @@
+# tests/unit/test_pagination.py - Cursor Pagination Tests
+from datetime import datetime
+from app.utils.pagination import clamp_limit, encode_cursor, decode_cursor, parse_datetime
+
+class TestCursorPagination:
+    """Test keyset cursor helpers"""
+    
+    def test_cursor_round_trip(self):
+        """Test cursor encodes and decodes sort keys"""
+        created_at = datetime(2025, 1, 2, 3, 4, 5)
+        cursor = encode_cursor(created_at, 42)
+        
+        decoded = decode_cursor(cursor)
+        
+        assert parse_datetime(decoded[0]) == created_at
+        assert decoded[1] == 42
+    
+    def test_invalid_cursor_is_ignored(self):
+        """Test garbage cursors decode to None"""
+        assert decode_cursor(None) is None
+        assert decode_cursor('not-a-cursor!') is None
+    
+    def test_clamp_limit(self):
+        """Test page size clamping"""
+        assert clamp_limit(None) == 50
+        assert clamp_limit(0) == 50
+        assert clamp_limit(10) == 10
+        assert clamp_limit(10_000) == 200
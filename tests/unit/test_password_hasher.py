@@ -0,0 +1,38 @@
+# tests/unit/test_password_hasher.py - Password Hashing Pool Tests
+import threading
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+class TestPasswordHasher:
+    """Test pooled password hashing"""
+    
+    def test_hash_and_verify(self):
+        """Test hashes made in the pool verify correctly"""
+        hasher = PasswordHasher()
+        pwhash = hasher.hash('secret123')
+        
+        assert hasher.verify(pwhash, 'secret123')
+        assert not hasher.verify(pwhash, 'wrong')
+        assert hasher.stats()['completed'] == 3
+        hasher.shutdown()
+    
+    def test_needs_rehash_on_cost_change(self):
+        """Test hashes with other cost parameters are flagged for rehash"""
+        hasher = PasswordHasher()
+        app = Flask(__name__)
+        app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
+        
+        with app.app_context():
+            assert not hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:600000'))
+            assert hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:1000'))
+    
+    def test_rejects_when_queue_full(self):
+        """Test work beyond workers + queue is rejected"""
+        hasher = PasswordHasher()
+        hasher.pending = hasher.workers + hasher.max_queue
+        
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash('secret123')
+        assert hasher.stats()['rejected'] == 1
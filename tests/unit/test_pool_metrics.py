@@ -0,0 +1,33 @@
+# tests/unit/test_pool_metrics.py - Connection Pool Tests
+import pytest
+from sqlalchemy import create_engine, exc as sa_exc
+from app.utils.pool_metrics import PoolMetrics, TimedQueuePool, engine_options, pool_metrics
+
+class TestPoolMetrics:
+    """Test pool options and checkout metrics"""
+    
+    def test_engine_options(self):
+        """Test in-memory SQLite drops QueuePool sizing and files get the timed pool"""
+        options = {'pool_size': 5, 'max_overflow': 10, 'pool_pre_ping': True}
+        
+        assert engine_options('sqlite://', options) == {'pool_pre_ping': True}
+        assert engine_options('sqlite:///app.db', options)['poolclass'] is TimedQueuePool
+    
+    def test_checkout_wait_and_timeouts(self, tmp_path):
+        """Test in-use counts and timed-out checkouts are recorded"""
+        engine = create_engine(
+            f'sqlite:///{tmp_path}/pool.db', poolclass=TimedQueuePool,
+            pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+        pool_metrics.register('pool_test', engine)
+        
+        held = engine.connect()
+        with pytest.raises(sa_exc.TimeoutError):
+            engine.connect()
+        stats = pool_metrics.snapshot()['pool_test']
+        held.close()
+        
+        assert stats['in_use'] == 1 and stats['size'] == 1
+        assert stats['checkouts'] == 1 and stats['timeouts'] == 1
+        assert stats['wait_ms']['max'] >= 50
+        assert pool_metrics.snapshot()['pool_test']['hold_ms']['max'] is not None
@@ -0,0 +1,110 @@
+# tests/unit/test_query_diagnostics.py - Slow Query / N+1 Detection Tests
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from app.utils.query_diagnostics import QueryDiagnostics, fingerprint, query_diagnostics
+
+def make_app(diagnostics, **config):
+    app = Flask(__name__)
+    app.config.update(QUERY_DIAGNOSTICS=True, N_PLUS_ONE_THRESHOLD=3, **config)
+    diagnostics.init_app(app)
+    engine = create_engine('sqlite://')
+    diagnostics.instrument_engine(engine)
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE scene (id INTEGER PRIMARY KEY, title TEXT)'))
+        connection.execute(text("INSERT INTO scene (title) VALUES ('a'), ('b'), ('c'), ('d'), ('e')"))
+
+    @app.route('/scenes')
+    def scenes():
+        with engine.connect() as connection:
+            ids = [row.id for row in connection.execute(text('SELECT id FROM scene'))]
+            titles = [
+                connection.execute(text('SELECT title FROM scene WHERE id = :id'), {'id': scene_id}).scalar()
+                for scene_id in ids
+            ]
+        return jsonify(titles=titles)
+
+    return app
+
+class TestQueryDiagnostics:
+    """Test statement fingerprinting, N+1 flagging and query budgets"""
+    
+    def test_fingerprint_normalizes_literals_and_lists(self):
+        """Test statements differing only in literals share a fingerprint"""
+        assert fingerprint("SELECT * FROM scene WHERE id = 7 AND title = 'x'") == \
+            fingerprint("SELECT *  FROM scene\n WHERE id = 12 AND title = 'it''s'")
+        assert fingerprint('SELECT * FROM scene WHERE id IN (?, ?, ?)') == \
+            fingerprint('SELECT * FROM scene WHERE id IN (?)')
+        assert fingerprint('INSERT INTO t (a, b) VALUES (?, ?), (?, ?)') == 'INSERT INTO t (a, b) VALUES (...)'
+    
+    def test_flags_repeated_shape_and_explains_slow_queries(self):
+        """Test a per-row query loop is flagged with its source line and slow SELECTs get a plan"""
+        diagnostics = QueryDiagnostics()
+        app = make_app(diagnostics, SLOW_QUERY_THRESHOLD_MS=0)
+        reports = []
+        
+        with diagnostics.watch(reports.append):
+            app.test_client().get('/scenes')
+        
+        report = reports[0]
+        assert report['queries'] == 6
+        suspect = report['suspected_n_plus_one'][0]
+        assert suspect['count'] == 5
+        assert suspect['frame'].startswith('tests/unit/test_query_diagnostics.py:')
+        n_plus_one = [f for f in diagnostics.findings if f['type'] == 'n_plus_one']
+        assert len(n_plus_one) == 1 and n_plus_one[0]['endpoint'] == 'scenes'
+        plans = [f['plan'] for f in diagnostics.findings if f['type'] == 'slow_query' and f['plan']]
+        assert any('SEARCH scene USING INTEGER PRIMARY KEY' in line for plan in plans for line in plan)
+    
+    @pytest.mark.query_budget({'scenes': 6, 'other': 0})
+    def test_query_budget_marker(self):
+        """Test the budget plugin sees the request and lets an in-budget test pass"""
+        app = make_app(query_diagnostics)
+        seen = []
+        
+        with query_diagnostics.watch(seen.append):
+            app.test_client().get('/scenes')
+        
+        assert seen[0]['queries'] == 6
+    
+    def test_query_budget_fails_a_test_over_budget(self, pytester):
+        """Test the budget plugin fails a test whose request exceeds its budget, with the N+1 culprit"""
+        pytester.makepyfile(test_budget='''
+            import pytest
+            from flask import Flask
+            from sqlalchemy import create_engine, text
+            from app.utils.query_diagnostics import query_diagnostics
+
+            def get_scenes():
+                app = Flask(__name__)
+                app.config.update(QUERY_DIAGNOSTICS=True, N_PLUS_ONE_THRESHOLD=3)
+                query_diagnostics.init_app(app)
+                engine = create_engine('sqlite://')
+                query_diagnostics.instrument_engine(engine)
+
+                @app.route('/scenes')
+                def scenes():
+                    with engine.connect() as connection:
+                        for scene_id in range(5):
+                            connection.execute(text('SELECT :id'), {'id': scene_id})
+                    return 'ok'
+
+                app.test_client().get('/scenes')
+
+            @pytest.mark.query_budget({'scenes': 3})
+            def test_over_budget():
+                get_scenes()
+
+            @pytest.mark.query_budget(5)
+            def test_within_budget():
+                get_scenes()
+        ''')
+        
+        result = pytester.runpytest('-p', 'tests.utils.query_budget')
+        
+        result.assert_outcomes(passed=1, failed=1)
+        result.stdout.fnmatch_lines([
+            '*Query budget exceeded:*',
+            '*GET scenes issued 5 queries (budget 3)*',
+            '*repeated 5x at *test_budget.py:17 in scenes*',
+        ])
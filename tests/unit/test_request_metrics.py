@@ -0,0 +1,46 @@
+# tests/unit/test_request_metrics.py - Request Instrumentation Tests
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+from app.utils.request_metrics import RequestMetrics, RollingSummary, record_ai_time
+
+@record_ai_time
+def fake_claude_call():
+    return 'ok'
+
+class TestRequestMetrics:
+    """Test route/DB/AI timing breakdown"""
+    
+    def test_rolling_quantiles(self):
+        """Test quantiles come from the rolling window only"""
+        summary = RollingSummary(window=100)
+        for value in range(1000):
+            summary.observe(value)
+        
+        quantiles = summary.quantiles()
+        assert quantiles[0.5] == 950 and quantiles[0.99] == 999
+        assert summary.count == 1000
+    
+    def test_server_timing_and_prometheus(self):
+        """Test a request reports SQL and AI time in headers and metrics"""
+        app = Flask(__name__)
+        metrics = RequestMetrics(window=10)
+        metrics.init_app(app)
+        engine = create_engine('sqlite://')
+        metrics.instrument_engine(engine)
+        
+        @app.route('/work')
+        def work():
+            with engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+                connection.execute(text('SELECT 2'))
+            return jsonify(answer=fake_claude_call())
+        
+        response = app.test_client().get('/work')
+        
+        assert 'db;dur=' in response.headers['Server-Timing']
+        assert 'desc="2 queries"' in response.headers['Server-Timing']
+        assert 'desc="1 calls"' in response.headers['Server-Timing']
+        exposition = metrics.prometheus()
+        assert 'storyforge_request_seconds_count{endpoint="work",method="GET"} 1' in exposition
+        assert 'storyforge_db_queries_total{endpoint="work",method="GET"} 2' in exposition
+        assert 'quantile="0.99"' in exposition
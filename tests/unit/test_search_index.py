@@ -0,0 +1,78 @@
+# tests/unit/test_search_index.py - Full-Text Search Tests
+from app import create_app, db
+from app.models import User, Project, Scene, StoryObject, Comment, Story, StoryChapter
+from app.services.search_index import search_index, highlight
+from app.utils.jwt_auth import generate_user_token
+from app.utils.text_normalize import index_terms, query_terms
+
+class TestTextNormalize:
+    """Test Czech folding and light stemming"""
+
+    def test_inflected_forms_share_a_term(self):
+        """Test diacritics are folded and case endings stripped"""
+        assert set(index_terms('Babička, babičce a babičky')) == {'babick'}
+        assert query_terms('Příliš žluťoučký kůň, kůň') == ['prilis', 'zlutouck', 'kun']
+
+    def test_highlight_marks_prefix_matches_and_escapes(self):
+        """Test hits are wrapped in <mark> and the rest is HTML-escaped"""
+        snippet = highlight('<b>Babičce</b> přišel dopis.', ['babick', 'dopis'])
+        assert snippet == '&lt;b&gt;<mark>Babičce</mark>&lt;/b&gt; přišel <mark>dopis</mark>.'
+        assert highlight('Nic tu není', ['babick']) is None
+
+class TestSearchIndex:
+    """Test incremental indexing and the project search endpoint"""
+
+    def test_search_is_incremental_ranked_and_paginated(self):
+        """Test inserts, updates and deletes reach the index and results page by rank"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            owner = User(username='writer', email='writer@example.com', password_hash='x')
+            db.session.add(owner)
+            db.session.flush()
+            project = Project(title='Dopisy', user_id=owner.id)
+            other = Project(title='Jiný', user_id=owner.id)
+            db.session.add_all([project, other])
+            db.session.flush()
+
+            title_hit = Scene(title='Babiččin dopis', description='Na nádraží.', project_id=project.id)
+            body_hit = Scene(title='Noc', description='Babička schovala dopis do skříňky.', project_id=project.id)
+            db.session.add_all([
+                title_hit, body_hit,
+                Scene(title='Dopis', description='Cizí projekt', project_id=other.id),
+                StoryObject(name='Babička', description='Stará paní s dopisy', project_id=project.id),
+            ])
+            db.session.flush()
+            db.session.add(Comment(content='Chybí tu babiččin dopis', project_id=project.id,
+                                   scene_id=body_hit.id, user_id=owner.id))
+            story = Story(title='Dopisy', project_id=project.id)
+            db.session.add(story)
+            db.session.flush()
+            db.session.add(StoryChapter(title='Kapitola 1', content='Dopis od babičky.', story_id=story.id))
+            db.session.commit()
+
+            found = search_index.search(project.id, 'babička dopis', limit=10)
+            assert [r['type'] for r in found['results']].count('scene') == 2
+            assert {r['type'] for r in found['results']} == {'scene', 'object', 'comment', 'chapter'}
+            assert found['results'][0]['id'] == title_hit.id  # Title matches outrank body matches
+            assert found['results'][0]['highlights']['title'] == '<mark>Babiččin</mark> <mark>dopis</mark>'
+
+            first = search_index.search(project.id, 'dopis', limit=2)
+            second = search_index.search(project.id, 'dopis', cursor=first['next_cursor'], limit=10)
+            ids = [(r['type'], r['id']) for r in first['results'] + second['results']]
+            assert len(ids) == len(set(ids)) == 5 and second['next_cursor'] is None
+
+            body_hit.description = 'Prázdná skříňka.'
+            db.session.delete(title_hit)
+            db.session.commit()
+            scenes = [r for r in search_index.search(project.id, 'babička')['results'] if r['type'] == 'scene']
+            assert scenes == []
+            assert search_index.search(project.id, 'skříňky')['results'][0]['id'] == body_hit.id
+
+            client = app.test_client()
+            headers = {'Authorization': f'Bearer {generate_user_token(owner)}'}
+            response = client.get(f'/api/projects/{project.id}/search?q=Babičky', headers=headers)
+            assert response.status_code == 200
+            assert response.get_json()['terms'] == ['babick']
+            assert client.get(f'/api/projects/{project.id}/search', headers=headers).status_code == 400
+            db.drop_all()
@@ -0,0 +1,75 @@
+# tests/unit/test_simulated_claude.py - Simulated Claude Backend Tests
+import json
+import re
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from app.services.simulated_claude import (
+    SIMULATION_PRESETS, SimulatedAPIError, SimulatedClaude, make_stand_in_server, simulation_profile_from_env
+)
+
+CANNED = '{"characters": ["Anna"], "locations": ["Praha"]}'
+
+def profile(**overrides):
+    settings = dict(SIMULATION_PRESETS['realistic'], name='test', seed='7', time_scale=0.0)
+    settings.update(overrides)
+    return settings
+
+class TestSimulatedClaude:
+    """Test the latency, size and failure model of simulation mode"""
+    
+    def test_profile_from_env(self):
+        """Test presets with per-field overrides"""
+        settings = simulation_profile_from_env({'AI_SIM_PROFILE': 'degraded', 'AI_SIM_TTFT_MS': '100'})
+        assert settings['ttft_ms'] == 100.0
+        assert settings['rate_limit_rate'] == SIMULATION_PRESETS['degraded']['rate_limit_rate']
+        assert simulation_profile_from_env({})['name'] == 'fixed'
+        with pytest.raises(ValueError):
+            simulation_profile_from_env({'AI_SIM_PROFILE': 'nope'})
+    
+    def test_seeded_outcomes_and_output_scaling(self):
+        """Test same seed gives the same latencies and output grows with max_tokens while JSON stays parseable"""
+        first, second = SimulatedClaude(profile()), SimulatedClaude(profile())
+        latencies = [first.plan('prompt', 2000).latency for _ in range(5)]
+        assert latencies == [second.plan('prompt', 2000).latency for _ in range(5)]
+        assert len(set(latencies)) > 1
+        
+        short = first.complete('other', CANNED, max_tokens=200)
+        long = first.complete('other', CANNED, max_tokens=4000)
+        assert len(long.split()) > 5 * len(short.split())
+        assert json.loads(re.search(r'\{.*\}', long, re.DOTALL).group())['locations'] == ['Praha']
+    
+    def test_injected_failures(self):
+        """Test configured error rates raise the corresponding API errors"""
+        backend = SimulatedClaude(profile(rate_limit_rate=0.5, server_error_rate=0.3, timeout_rate=0.2))
+        statuses = []
+        for _ in range(60):
+            with pytest.raises(SimulatedAPIError) as error:
+                backend.complete('prompt', CANNED)
+            statuses.append(error.value.status_code)
+        assert {429, 504} <= set(statuses) and set(statuses) & {500, 529}
+        assert sum(backend.stats()['errors'].values()) == 60
+    
+    def test_stand_in_server(self):
+        """Test the HTTP stand-in answers Messages API requests and injects 429s"""
+        backend = SimulatedClaude(profile())
+        server = make_stand_in_server('127.0.0.1', 0, backend)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/v1/messages'
+        body = json.dumps({'model': 'sim', 'max_tokens': 300,
+                           'messages': [{'role': 'user', 'content': 'Analyze scene: Anna'}]}).encode()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, data=body, method='POST')) as response:
+                message = json.loads(response.read())
+            assert message['type'] == 'message' and message['usage']['output_tokens'] > 0
+            assert '"characters"' in message['content'][0]['text']
+            
+            backend.configure(profile(rate_limit_rate=1.0))
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(urllib.request.Request(url, data=body, method='POST'))
+            assert error.value.code == 429
+            assert json.loads(error.value.read())['error']['type'] == 'rate_limit_error'
+        finally:
+            server.shutdown()
+            server.server_close()
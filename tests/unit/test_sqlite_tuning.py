@@ -0,0 +1,26 @@
+# tests/unit/test_sqlite_tuning.py - SQLite Profile Tests
+from sqlalchemy import create_engine
+from app.utils.sqlite_tuning import apply_sqlite_profile, sqlite_status
+
+class TestSqliteProfile:
+    """Test per-connection SQLite pragmas"""
+    
+    def test_file_database_uses_wal(self, tmp_path):
+        """Test file databases get WAL and the tuned pragmas"""
+        engine = create_engine(f'sqlite:///{tmp_path}/profile.db')
+        assert apply_sqlite_profile(engine, {'busy_timeout': 2500})
+        
+        status = sqlite_status(engine)
+        assert status['journal_mode'] == 'wal'
+        assert status['busy_timeout'] == 2500
+        assert status['synchronous'] == 1  # NORMAL
+        assert status['temp_store'] == 2  # MEMORY
+    
+    def test_memory_database_skips_wal(self):
+        """Test in-memory databases keep their journal mode"""
+        engine = create_engine('sqlite://')
+        apply_sqlite_profile(engine)
+        
+        status = sqlite_status(engine)
+        assert status['journal_mode'] == 'memory'
+        assert status['cache_size'] == -65536
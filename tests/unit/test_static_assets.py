@@ -0,0 +1,58 @@
+# tests/unit/test_static_assets.py - Static Asset Pipeline Tests
+import json
+import os
+from flask import Flask
+from app.services.static_assets import StaticAssets, build_assets, IMMUTABLE_CACHE_CONTROL
+
+def _static_tree(root):
+    os.makedirs(os.path.join(root, 'js'))
+    with open(os.path.join(root, 'js', 'app.js'), 'w') as handle:
+        handle.write('console.log("storyforge");\n' * 50)
+    return str(root)
+
+class TestStaticAssets:
+    """Test fingerprinting, precompression and serving"""
+    
+    def test_build_fingerprints_and_prunes(self, tmp_path):
+        """Test builds write hashed files with gzip siblings and keep one previous build"""
+        static_folder = _static_tree(tmp_path)
+        first = build_assets(static_folder)['assets']['js/app.js']
+        
+        dist = os.path.join(static_folder, 'dist')
+        assert first['file'].startswith('js/app.') and first['file'].endswith('.js')
+        assert 'gzip' in first['encodings']
+        assert os.path.exists(os.path.join(dist, first['file'] + '.gz'))
+        
+        for content in ('changed();\n' * 50, 'changed again();\n' * 50):
+            with open(os.path.join(static_folder, 'js', 'app.js'), 'w') as handle:
+                handle.write(content)
+            latest = build_assets(static_folder)['assets']['js/app.js']
+        
+        assert not os.path.exists(os.path.join(dist, first['file']))
+        with open(os.path.join(dist, 'manifest.json')) as handle:
+            assert json.load(handle)['assets']['js/app.js']['file'] == latest['file']
+    
+    def test_pages_and_assets_are_served_from_manifest(self, tmp_path):
+        """Test page references are rewritten and dist files are immutable and precompressed"""
+        static_folder = _static_tree(tmp_path / 'static')
+        pages = tmp_path / 'frontend'
+        pages.mkdir()
+        (pages / 'index.html').write_text('<script src="/static/js/app.js"></script>')
+        build_assets(static_folder)
+        
+        app = Flask(__name__, static_folder=None)
+        assets = StaticAssets()
+        assets.init_app(app, static_folder)
+        app.add_url_rule('/', view_func=lambda: assets.page(str(pages), 'index.html'))
+        app.add_url_rule('/static/<path:filename>', endpoint='static', view_func=assets.send)
+        client = app.test_client()
+        
+        page = client.get('/')
+        url = page.get_data(as_text=True).split('"')[1]
+        assert url.startswith('/static/dist/js/app.')
+        assert client.get('/', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+        
+        asset = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert asset.headers['Content-Encoding'] == 'gzip'
+        assert asset.headers['Cache-Control'] == IMMUTABLE_CACHE_CONTROL
+        assert 'Accept-Encoding' in asset.headers['Vary']
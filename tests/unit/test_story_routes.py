@@ -0,0 +1,169 @@
+# tests/unit/test_story_routes.py - Story Route Tests
+import io
+import os
+import time
+import zipfile
+from types import SimpleNamespace
+import pytest
+from app import create_app, db
+from app.models import User, Project, Scene, Story, StoryChapter
+from app.services.chapter_reconciler import chapter_section
+from app.services.pdf_fragments import pdf_fragment_renderer
+from app.services.story_generator import story_generator
+from app.utils.jwt_auth import generate_user_token
+
+CHAPTERS = [('Příjezd', 'Vlak zastavil na malém nádraží.'), ('Dopis', 'Babička psala každou neděli.')]
+
+@pytest.fixture
+def story(tmp_path):
+    app = create_app('testing')
+    app.config.update(EXPORT_CACHE_DIR=str(tmp_path), EXPORT_JOB_EXECUTOR='thread')
+    with app.app_context():
+        db.create_all()
+        owner = User(username='writer', email='writer@example.com', password_hash='x')
+        db.session.add(owner)
+        db.session.flush()
+        project = Project(title='Dopisy', user_id=owner.id)
+        db.session.add(project)
+        db.session.flush()
+        story = Story(title='Dopisy', premise='Léto u babičky', project_id=project.id,
+                      content=''.join(chapter_section(t, c) for t, c in CHAPTERS))
+        story.word_count = len(story.content.split())
+        db.session.add(story)
+        db.session.flush()
+        for i, (title, content) in enumerate(CHAPTERS):
+            db.session.add(StoryChapter(story_id=story.id, title=title, content=content, scene_ids='[]', order=i))
+        db.session.commit()
+        # Bearer token only: the routes must not depend on a session cookie
+        yield SimpleNamespace(client=app.test_client(), project_id=project.id,
+                              headers={'Authorization': f'Bearer {generate_user_token(owner)}'})
+        db.drop_all()
+
+class TestStoryRoutes:
+    """Test the story blueprint over HTTP"""
+
+    def test_get_story_with_bearer_token(self, story):
+        """Test the story and its chapters are served to a JWT-only client"""
+        client = story.client
+        response = client.get(f'/api/projects/{story.project_id}/story', headers=story.headers)
+        assert response.status_code == 200
+        assert [c['title'] for c in response.get_json()['story']['chapters']] == ['Příjezd', 'Dopis']
+
+    def test_export_is_cached_by_content_hash(self, story, tmp_path):
+        """Test a repeat export is a 304 and the artifact is served from the cache"""
+        client = story.client
+        url = f'/api/projects/{story.project_id}/export-story?format=docx'
+        first = client.get(url, headers=story.headers)
+        assert first.status_code == 200
+        etag = first.headers['ETag'].strip('"')
+        assert os.path.exists(tmp_path / str(Story.query.first().id) / f'docx-{etag}.docx')
+
+        repeat = client.get(url, headers=dict(story.headers, **{'If-None-Match': f'"{etag}"'}))
+        assert repeat.status_code == 304
+        assert client.get(url, headers=story.headers).data == first.data
+
+    def test_export_job_lifecycle(self, story):
+        """Test a queued export can be polled and downloaded"""
+        base = f'/api/projects/{story.project_id}/export'
+        queued = story.client.post(base, json={'format': 'txt'}, headers=story.headers)
+        assert queued.status_code in (200, 202)
+        job = queued.get_json()['job']
+
+        deadline = time.time() + 10
+        while job['status'] == 'pending' and time.time() < deadline:
+            time.sleep(0.02)
+            job = story.client.get(job['statusUrl'], headers=story.headers).get_json()['job']
+        assert job['status'] == 'completed'
+        download = story.client.get(job['downloadUrl'], headers=story.headers)
+        assert download.status_code == 200
+        assert 'Babička psala každou neděli.' in download.data.decode('utf-8')
+
+    def test_saving_the_story_prerenders_exports(self, story, tmp_path):
+        """Test update_story queues the configured formats for the new content"""
+        story.client.application.config['EXPORT_PRERENDER_FORMATS'] = ['txt']
+        response = story.client.put(f'/api/projects/{story.project_id}/story',
+                                    json={'title': 'Dopisy z léta'}, headers=story.headers)
+        assert response.status_code == 200
+
+        artifact_dir = tmp_path / str(Story.query.first().id)
+        deadline = time.time() + 10
+        while not (artifact_dir.exists() and list(artifact_dir.glob('txt-*.txt'))) and time.time() < deadline:
+            time.sleep(0.02)
+        assert b'Dopisy z l' in next(artifact_dir.glob('txt-*.txt')).read_bytes()
+
+    def test_uncached_txt_and_epub_are_streamed(self, story):
+        """Test TXT/EPUB exports are chunked responses when the cache is off"""
+        story.client.application.config['EXPORT_CACHE_ENABLED'] = False
+        base = f'/api/projects/{story.project_id}/export-story'
+
+        txt = story.client.get(f'{base}?format=txt', headers=story.headers)
+        assert txt.status_code == 200 and txt.is_streamed
+        assert 'attachment' in txt.headers['Content-Disposition']
+        assert txt.data.decode('utf-8').index('Příjezd') < txt.data.decode('utf-8').index('Dopis\n')
+
+        epub = story.client.get(f'{base}?format=epub', headers=story.headers)
+        assert epub.status_code == 200 and epub.is_streamed
+        book = zipfile.ZipFile(io.BytesIO(epub.data))
+        assert book.infolist()[0].filename == 'mimetype'
+        assert 'Babička psala'.encode('utf-8') in book.read('EPUB/chapter_2.xhtml')
+
+    def test_regenerated_chapter_is_the_only_pdf_fragment_laid_out_again(self, story, mocker):
+        """Test a re-export after regenerate-section reuses the other fragments"""
+        with story.client.application.app_context():
+            scene = Scene(title='Dopis přišel', project_id=story.project_id, order_index=0)
+            db.session.add(scene)
+            db.session.flush()
+            StoryChapter.query.filter_by(title='Dopis').update({'scene_ids': f'[{scene.id}]'})
+            db.session.commit()
+        url = f'/api/projects/{story.project_id}/export-story?format=pdf'
+
+        first = story.client.get(url, headers=story.headers)
+        assert first.status_code == 200 and first.data.startswith(b'%PDF')
+
+        mocker.patch.object(story_generator, 'regenerate_chapter',
+                            return_value={'content': 'Babička už nepsala.'})
+        regenerated = story.client.post(f'/api/projects/{story.project_id}/regenerate-section',
+                                        json={'chapterIndex': 1}, headers=story.headers)
+        assert regenerated.status_code == 200
+        assert regenerated.get_json()['story']['chapters'][1]['content'] == 'Babička už nepsala.'
+
+        before = pdf_fragment_renderer.stats()
+        second = story.client.get(url, headers=story.headers)
+        assert second.status_code == 200 and second.data != first.data
+        after = pdf_fragment_renderer.stats()
+        # Front matter, the first chapter and the about page come from the fragment cache
+        assert after['rendered'] - before['rendered'] == 1
+        assert after['reused'] - before['reused'] == 3
+
+    def test_chapter_ids_survive_repeated_saves(self, story):
+        """Test saving edited, reordered and id-less chapters keeps the existing rows"""
+        url = f'/api/projects/{story.project_id}/story'
+        chapters = story.client.get(url, headers=story.headers).get_json()['story']['chapters']
+        ids = [c['id'] for c in chapters]
+
+        edited = [dict(chapters[0]), dict(chapters[1], content='Babička už nepsala.')]
+        assert story.client.put(url, json={'chapters': edited}, headers=story.headers).status_code == 200
+        # A client that dropped the ids and swapped the chapters still hits the same rows
+        swapped = [{'title': c['title'], 'content': c['content']} for c in reversed(edited)]
+        assert story.client.put(url, json={'chapters': swapped}, headers=story.headers).status_code == 200
+
+        saved = story.client.get(url, headers=story.headers).get_json()['story']
+        assert [c['id'] for c in saved['chapters']] == ids[::-1]
+        assert saved['chapters'][0]['content'] == 'Babička už nepsala.'
+        assert saved['content'].startswith('# Dopis\n\nBabička už nepsala.')
+        with story.client.application.app_context():
+            assert sorted(c.id for c in StoryChapter.query.all()) == sorted(ids)
+
+    def test_chapter_revisions_with_bearer_token(self, story):
+        """Test chapter history is listed and rebuilt for a JWT-only client"""
+        url = f'/api/projects/{story.project_id}/story'
+        chapters = story.client.get(url, headers=story.headers).get_json()['story']['chapters']
+        chapter = chapters[1]
+        story.client.put(url, json={'chapters': [chapters[0], dict(chapter, content='Už nepsala.')]},
+                         headers=story.headers)
+
+        base = f"/api/projects/{story.project_id}/chapters/{chapter['id']}/revisions"
+        listing = story.client.get(base, headers=story.headers).get_json()
+        assert [r['number'] for r in listing['revisions']] == [2, 1]
+        first = story.client.get(f'{base}/1', headers=story.headers).get_json()['revision']
+        assert first['snapshot']['content'] == chapter['content']
@@ -0,0 +1,140 @@
+# tests/unit/test_webhook_queue.py - Webhook Queue Tests
+from datetime import datetime, timedelta
+from app import create_app, db, start_background_workers
+from app.models import User, BillingPlan, UserSubscription, WebhookEvent
+from app.services.billing_rollover import billing_rollover
+from app.services.webhook_queue import webhook_queue, retry_delay
+
+def _event(event_id, event_type, customer, created, **obj):
+    return {'id': event_id, 'type': event_type, 'created': created,
+            'data': {'object': dict(obj, customer=customer)}}
+
+class TestWebhookQueue:
+    """Test deduplicated ingestion, exactly-once processing, ordering and backoff"""
+
+    def test_redelivered_event_is_applied_once(self):
+        """Test a Stripe retry of a stored event does not reset the period again"""
+        app = create_app('testing')
+        with app.app_context():
+            db.create_all()
+            user = User(username='writer', email='writer@example.com', password_hash='x', tokens_used=700)
+            plan = BillingPlan(name='pro', display_name='Pro', monthly_token_limit=10000, monthly_price_cents=900)
+            db.session.add_all([user, plan])
+            db.session.flush()
+            start = datetime(2026, 9, 25)
+            paid_start, paid_end = start + timedelta(days=28), start + timedelta(days=58)  # Renewed early
+            subscription = UserSubscription(user_id=user.id, plan_id=plan.id, stripe_subscription_id='sub_1',
+                                            current_period_start=start, current_period_end=start + timedelta(days=30),
+                                            tokens_used_this_period=700)
+            db.session.add(subscription)
+            db.session.commit()
+
+            lines = {'data': [{'type': 'subscription', 'period': {
+                'start': int((paid_start - datetime(1970, 1, 1)).total_seconds()),
+                'end': int((paid_end - datetime(1970, 1, 1)).total_seconds())}}]}
+            event = _event('evt_1', 'invoice.payment_succeeded', 'cus_1', 1790000000,
+                           subscription='sub_1', lines=lines)
+            row, created = webhook_queue.ingest('stripe', event)
+            assert created and row.status == 'pending'
+            assert subscription.tokens_used_this_period == 700  # Nothing applied on receipt
+
+            assert webhook_queue.process_due()['processed'] == 1
+            period_end = subscription.current_period_end
+            assert (subscription.current_period_start, period_end) == (paid_start, paid_end)
+            assert (subscription.tokens_used_this_period, user.tokens_used) == (0, 0)
+
+            user.tokens_used = subscription.tokens_used_this_period = 50
+            db.session.commit()
+            again, created = webhook_queue.ingest('stripe', event)
+            assert not created and again.id == row.id
+            assert webhook_queue.process_due()['processed'] == 0
+            assert (subscription.tokens_used_this_period, subscription.current_period_end) == (50, period_end)
+            assert WebhookEvent.query.count() == 1
+            db.drop_all()
+
+    def test_customer_order_and_backoff(self):
+        """Test a failing event holds back its customer's later events but not other customers"""
+        app = create_app('testing')
+        calls = []
+
+        @webhook_queue.handler('test', 'thing.happened')
+        def _record(obj, event):
+            if obj.get('fail'):
+                raise RuntimeError('downstream unavailable')
+            calls.append(event['id'])
+
+        with app.app_context():
+            db.create_all()
+            webhook_queue.ingest('test', _event('b1', 'thing.happened', 'cus_b', 20))
+            webhook_queue.ingest('test', _event('a2', 'thing.happened', 'cus_a', 30))
+            webhook_queue.ingest('test', _event('a1', 'thing.happened', 'cus_a', 10, fail=True))
+            webhook_queue.ingest('test', _event('x1', 'thing.unknown', 'cus_c', 40))
+
+            now = datetime.utcnow()
+            stats = webhook_queue.process_due(now=now)
+            assert (stats['processed'], stats['retry'], stats['ignored']) == (1, 1, 1)
+            assert calls == ['b1']  # a2 waits behind a1, which arrived later but happened first
+            failed = WebhookEvent.query.filter_by(event_id='a1').one()
+            assert failed.status == 'retry' and failed.attempts == 1
+            assert failed.next_attempt_at == now + timedelta(seconds=retry_delay(1, 30, 3600))
+            assert webhook_queue.process_due(now=now + timedelta(seconds=10))['retry'] == 0  # Still backing off
+
+            # Retried until it gives up, never more than a minute apart while a2 waits
+            later = now
+            for attempt in range(2, webhook_queue.max_attempts + 1):
+                later += timedelta(seconds=retry_delay(attempt - 1, 30, 60))
+                webhook_queue.process_due(now=later)
+            assert WebhookEvent.query.filter_by(event_id='a1').one().status == 'dead'
+            assert calls == ['b1', 'a2']
+            db.drop_all()
+        webhook_queue.handlers.pop(('test', 'thing.happened'))
+
+    def test_backoff_is_capped_once_later_events_wait(self):
+        """Test a long backoff is cut short when a later event of the customer arrives"""
+        app = create_app('testing')
+        calls = []
+
+        @webhook_queue.handler('test', 'thing.happened')
+        def _record(obj, event):
+            if obj.get('fail'):
+                raise RuntimeError('downstream unavailable')
+            calls.append(event['id'])
+
+        with app.app_context():
+            db.create_all()
+            webhook_queue.ingest('test', _event('a1', 'thing.happened', 'cus_a', 10, fail=True))
+            later = datetime.utcnow()
+            for attempt in range(1, 5):
+                webhook_queue.process_due(now=later)
+                later += timedelta(seconds=retry_delay(attempt, 30, 3600))
+            failed = WebhookEvent.query.filter_by(event_id='a1').one()
+            assert failed.next_attempt_at == later  # Alone, it backs off in full (240s)
+
+            webhook_queue.ingest('test', _event('a2', 'thing.happened', 'cus_a', 20))
+            db.session.expire_all()
+            assert failed.next_attempt_at <= datetime.utcnow() + timedelta(seconds=60)
+            retry_at = failed.next_attempt_at
+            assert webhook_queue.process_due(now=retry_at)['retry'] == 1
+            db.session.expire_all()
+            assert failed.next_attempt_at == retry_at + timedelta(seconds=60)  # Not retry_delay(5) = 480s
+            assert calls == []
+            db.drop_all()
+        webhook_queue.handlers.pop(('test', 'thing.happened'))
+
+    def test_workers_start_from_the_serving_entrypoint_only(self, mocker):
+        """Test create_app starts no threads and start_background_workers honours the flags"""
+        start_worker = mocker.patch.object(webhook_queue, 'start')
+        start_scheduler = mocker.patch.object(billing_rollover, 'start')
+        app = create_app('testing')
+        app.config.update(WEBHOOK_WORKER_ENABLED=True, BILLING_ROLLOVER_SCHEDULER=True)
+        webhook_queue.init_app(app)
+        billing_rollover.init_app(app)
+        start_worker.assert_not_called()
+        start_scheduler.assert_not_called()
+
+        start_background_workers(app)
+        start_worker.assert_called_once_with(app)
+        start_scheduler.assert_called_once_with(app)
+        testing = create_app('testing')  # Leave the global services configured as tests expect
+        webhook_queue.init_app(testing)
+        billing_rollover.init_app(testing)
@@ -0,0 +1,48 @@
+# tests/utils/query_budget.py - Pytest plugin failing tests that exceed a per-endpoint query budget
+#
+#   @pytest.mark.query_budget(5)                          # every request in the test
+#   @pytest.mark.query_budget({'projects.get_project': 4, 'projects.list_projects': 3})
+#
+# Requires QUERY_DIAGNOSTICS (on in TestingConfig); counts come from app.utils.query_diagnostics.
+import pytest
+from app.utils.query_diagnostics import query_diagnostics
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(limit): fail if a request issues more SQL statements than limit '
+        '(an int, or a dict of endpoint -> limit)'
+    )
+
+def _budget_for(limit, endpoint):
+    if isinstance(limit, dict):
+        return limit.get(endpoint)
+    return limit
+
+def _describe(report, budget):
+    lines = [f"{report['method']} {report['endpoint']} issued {report['queries']} queries (budget {budget})"]
+    for suspect in report['suspected_n_plus_one']:
+        lines.append(f"  repeated {suspect['count']}x at {suspect['frame']}: {suspect['fingerprint'][:200]}")
+    if not report['suspected_n_plus_one']:
+        for shape, count in report['repeated']:
+            lines.append(f'  {count}x {shape[:200]}')
+    return '\n'.join(lines)
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker('query_budget')
+    if marker is None:
+        return (yield)
+    limit = marker.args[0] if marker.args else marker.kwargs.get('limit')
+    over_budget = []
+
+    def check(report):
+        budget = _budget_for(limit, report['endpoint'])
+        if budget is not None and report['queries'] > budget:
+            over_budget.append(_describe(report, budget))
+
+    with query_diagnostics.watch(check):
+        result = yield
+    if over_budget:
+        pytest.fail('Query budget exceeded:\n' + '\n'.join(over_budget), pytrace=False)
+    return result